@@ -9,8 +9,10 @@ from flask_socketio import SocketIO
 from flask_mail import Mail
 from werkzeug.security import generate_password_hash
 import os
+import logging
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
+from .logging_config import configure_logging
 
 # Load environment variables
 load_dotenv()
@@ -28,14 +30,15 @@ else:
     socketio = SocketIO()  # Auto-detect for older Python versions
 
 mail = Mail()
+logger = logging.getLogger(__name__)
 
 # Timezone utility - Beijing Time (UTC+8)
 def get_beijing_time():
     """Get current Beijing time (UTC+8)"""
     return datetime.utcnow() + timedelta(hours=8)
 
-def create_app():
-    """Application factory pattern"""
+def create_app(config_overrides=None):
+    """Application factory pattern (config_overrides replace settings, e.g. the database URI for benchmarks)"""
     
     # Create Flask app with correct template directory
     import os
@@ -119,8 +122,13 @@ def create_app():
     app.config['MAIL_SUPPRESS_SEND'] = False
     app.config['MAIL_DEBUG'] = True
     
-    print(f"[EMAIL CONFIG] Gmail server: {app.config['MAIL_SERVER']}:{app.config['MAIL_PORT']}")
-    print(f"[EMAIL CONFIG] Username: {app.config['MAIL_USERNAME']}")
+    if config_overrides:
+        app.config.update(config_overrides)
+    
+    # Structured logging through a background queue (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT)
+    configure_logging(app)
+    logger.info("Mail server %s:%s as %s", app.config['MAIL_SERVER'], app.config['MAIL_PORT'],
+                app.config['MAIL_USERNAME'])
 
 
     # Initialize extensions
@@ -134,6 +142,50 @@ def create_app():
     
     mail.init_app(app)
     
+    # Background job runner for AI generation and document extraction
+    from .jobs import job_runner
+    job_runner.init_app(app)
+    
+    # Shared on-disk cache of extracted document text
+    from .extract_cache import extract_cache
+    extract_cache.init_app(app)
+    
+    # Join token cache and batched auto-enrollment for QR join bursts
+    from .join_tokens import enrollment_batcher
+    enrollment_batcher.init_app(app)
+    
+    # Full-text search over course questions and answers
+    from .qa_search import qa_search
+    qa_search.init_app(app)
+    
+    # Similar-question suggestions on the ask page
+    from .question_similarity import question_similarity
+    question_similarity.init_app(app)
+    
+    # Periodic recount of answer vote tallies from the vote rows
+    from .answer_votes import vote_reconciler
+    vote_reconciler.init_app(app)
+    
+    # Batched set-based deletes of courses, activities and questions
+    from .deletion import deletion_service
+    deletion_service.init_app(app)
+    
+    # Past-semester archive files and their read path
+    from .archive import archive_store
+    archive_store.init_app(app)
+    
+    # Rendered course page and activity list fragments, invalidated per course
+    from .page_cache import page_cache
+    page_cache.init_app(app, db)
+    
+    # Course catalog for students (anti-join search with keyset pages)
+    from .catalog import course_catalog
+    course_catalog.init_app(app)
+    
+    # Fingerprinted page script/style bundles and the shared Jinja bytecode cache
+    from .assets import asset_pipeline
+    asset_pipeline.init_app(app)
+    
     # User loader
     from .models import User
     @login_manager.user_loader
@@ -158,18 +210,35 @@ def create_app():
         return time_obj.strftime('%Y-%m-%d')
     
     # Register blueprints
-    from .routes import main, auth, courses, activities, qa
+    from .routes import main, auth, courses, activities, qa, jobs, admin
     app.register_blueprint(main.bp)
     app.register_blueprint(auth.bp)
     app.register_blueprint(courses.bp)
     app.register_blueprint(activities.bp)
     app.register_blueprint(qa.qa_bp)
+    app.register_blueprint(jobs.bp)
+    app.register_blueprint(admin.bp)
+    
+    # Register Socket.IO event handlers
+    from . import socket_events
+    
+    # Request, SQL, Socket.IO and AI call metrics at /metrics
+    from . import metrics
+    metrics.init_app(app, db, socketio)
+    
+    # Opt-in per-request profiling for admins (?_profile=1); after metrics so it sees the request's SQL totals
+    from .profiler import request_profiler
+    request_profiler.init_app(app)
+    
+    # Weak ETags, 304s and gzip/brotli bodies; last, so its hook runs before the metrics and profiler hooks
+    from .compression import http_compression
+    http_compression.init_app(app)
     
     # Create database tables and initial data
     with app.app_context():
         try:
             db.create_all()
-            print("✅ Database tables created/verified")
+            logger.info("Database tables created/verified")
             
             # Create default admin user
             admin = User.query.filter_by(email='admin@example.com').first()
@@ -182,12 +251,11 @@ def create_app():
                 )
                 db.session.add(admin)
                 db.session.commit()
-                print("✅ Default admin user created")
+                logger.info("Default admin user created")
             else:
-                print("✅ Admin user already exists")
+                logger.info("Admin user already exists")
         except Exception as e:
-            print(f"⚠️ Database initialization error: {str(e)}")
-            print("   Application will start but database operations may fail")
-            print("   Please check database connection settings")
+            logger.error("Database initialization error: %s. Application will start but database operations "
+                         "may fail; please check database connection settings", e)
     
     return app
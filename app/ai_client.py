@@ -0,0 +1,272 @@
+"""
+AI Provider Client Pool
+Long-lived, pooled HTTP clients for the chat completion providers used by ai_utils
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from app.ai_health import get_breaker
+from app.metrics import observe_ai_call, observe_first_token
+
+# Provider endpoints (both speak the OpenAI-compatible chat completions API)
+ARK_BASE_URL = os.environ.get('ARK_BASE_URL', 'https://ark.cn-beijing.volces.com/api/v3')
+ARK_MODEL = 'doubao-1-5-pro-32k-250115'
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+OPENAI_MODEL = 'gpt-3.5-turbo'
+
+# Pool defaults (overridable through environment variables)
+DEFAULT_TIMEOUT = float(os.environ.get('AI_REQUEST_TIMEOUT', 30))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get('AI_CONNECT_TIMEOUT', 10))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 8))
+DEFAULT_QUEUE_TIMEOUT = float(os.environ.get('AI_QUEUE_TIMEOUT', 5))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.environ.get('AI_KEEPALIVE_EXPIRY', 60))
+
+
+class ProviderError(Exception):
+    """Raised when a provider call fails or returns an unusable response"""
+
+
+class ProviderBusyError(ProviderError):
+    """Raised when all concurrency slots of a provider stay taken for too long"""
+
+
+class ProviderUnavailableError(ProviderError):
+    """Raised without contacting the provider while its circuit breaker is open"""
+
+
+class AIProvider:
+    """
+    A single chat completion provider backed by one long-lived httpx client
+
+    The client keeps TLS connections alive between calls, so only the first
+    request per connection pays the handshake. A bounded semaphore caps the
+    number of in-flight requests so a burst of users cannot open an unbounded
+    number of upstream connections. Every call outcome is reported to the
+    provider's circuit breaker; while it is open calls fail immediately.
+    """
+
+    def __init__(self, name: str, base_url: str, api_key: str, model: str,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 verify: bool = True,
+                 extra_headers: Optional[Dict[str, str]] = None):
+        if httpx is None:
+            raise ImportError("httpx library not installed")
+
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.queue_timeout = queue_timeout
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        headers = {'Authorization': f'Bearer {api_key}'}
+        if extra_headers:
+            headers.update(extra_headers)
+
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            headers=headers,
+            verify=verify,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+
+    @property
+    def breaker(self):
+        return get_breaker(self.name)
+
+    def _acquire_slot(self, timeout: Optional[float] = None):
+        """Take a concurrency slot, failing fast while the circuit breaker is open"""
+        # Never queue longer than the caller is willing to wait for the whole call
+        queue_timeout = min(self.queue_timeout, timeout) if timeout else self.queue_timeout
+        if not self._slots.acquire(timeout=queue_timeout):
+            raise ProviderBusyError(f"{self.name} provider is busy ({self.max_concurrency} requests in flight)")
+        if not self.breaker.allow():
+            self._slots.release()
+            raise ProviderUnavailableError(f"{self.name} circuit breaker is open")
+
+    def _request_timeout(self, timeout: Optional[float]):
+        if timeout is None:
+            return None  # Use client default
+        return httpx.Timeout(timeout, connect=min(timeout, self.connect_timeout))
+
+    def chat(self, messages: List[Dict[str, str]], timeout: Optional[float] = None, **params) -> str:
+        """
+        Send a chat completion request and return the message content
+
+        Args:
+            messages: Chat messages in OpenAI format
+            timeout: Per-request timeout in seconds (defaults to the provider timeout)
+            **params: Extra completion parameters (max_tokens, temperature, ...)
+
+        Returns:
+            Content string of the first choice
+        """
+        self._acquire_slot(timeout)
+        start = time.monotonic()
+        try:
+            payload = {'model': self.model, 'messages': messages}
+            payload.update(params)
+
+            kwargs = {'json': payload}
+            request_timeout = self._request_timeout(timeout)
+            if request_timeout is not None:
+                kwargs['timeout'] = request_timeout
+
+            response = self.client.post('/chat/completions', **kwargs)
+            if response.status_code >= 400:
+                raise ProviderError(f"{self.name} returned HTTP {response.status_code}: {response.text[:200]}")
+
+            try:
+                content = response.json()['choices'][0]['message']['content']
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                raise ProviderError(f"{self.name} returned an unexpected response: {e}")
+        except Exception as e:
+            self.breaker.record_failure(time.monotonic() - start, e)
+            observe_ai_call(self.name, 'chat', 'error', time.monotonic() - start)
+            raise
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success(time.monotonic() - start)
+        observe_ai_call(self.name, 'chat', 'ok', time.monotonic() - start)
+        return content
+
+    def stream_chat(self, messages: List[Dict[str, str]], timeout: Optional[float] = None, **params) -> Iterator[str]:
+        """
+        Send a streaming chat completion request and yield content deltas
+
+        The provider answers with server-sent events (``data: {...}`` lines,
+        terminated by ``data: [DONE]``). The concurrency slot is held until the
+        stream is exhausted or the generator is closed.
+
+        Args:
+            messages: Chat messages in OpenAI format
+            timeout: Per-read timeout in seconds (defaults to the provider timeout)
+            **params: Extra completion parameters (max_tokens, temperature, ...)
+
+        Yields:
+            Content fragments in the order the model produces them
+        """
+        self._acquire_slot(timeout)
+        start = time.monotonic()
+        first_token = True
+        try:
+            payload = {'model': self.model, 'messages': messages, 'stream': True}
+            payload.update(params)
+
+            kwargs = {'json': payload}
+            request_timeout = self._request_timeout(timeout)
+            if request_timeout is not None:
+                kwargs['timeout'] = request_timeout
+
+            with self.client.stream('POST', '/chat/completions', **kwargs) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    raise ProviderError(f"{self.name} returned HTTP {response.status_code}: {response.text[:200]}")
+
+                for line in response.iter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    try:
+                        chunk = json.loads(data)
+                        delta = chunk['choices'][0].get('delta') or {}
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        raise ProviderError(f"{self.name} returned an unexpected stream chunk: {e}")
+                    content = delta.get('content')
+                    if content:
+                        if first_token:
+                            # Streams count as healthy once the first token arrives
+                            self.breaker.record_success(time.monotonic() - start, first_token=True)
+                            observe_first_token(self.name, time.monotonic() - start)
+                            first_token = False
+                        yield content
+            if first_token:
+                self.breaker.record_success(time.monotonic() - start, first_token=True)
+            observe_ai_call(self.name, 'stream', 'ok', time.monotonic() - start)
+        except GeneratorExit:
+            # Consumer stopped reading, not a provider failure
+            if first_token:
+                self.breaker.release_probe()
+            observe_ai_call(self.name, 'stream', 'cancelled', time.monotonic() - start)
+            raise
+        except Exception as e:
+            self.breaker.record_failure(time.monotonic() - start, e)
+            observe_ai_call(self.name, 'stream', 'error', time.monotonic() - start)
+            raise
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close the underlying HTTP client and its pooled connections"""
+        self.client.close()
+
+
+# Process-wide provider registry, keyed by (name, api_key, base_url)
+_providers: Dict[Tuple[str, str, str], AIProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def _build_provider(name: str, api_key: str, base_url: Optional[str]) -> AIProvider:
+    if name == 'ark':
+        # SSL verification disabled for Render deployment
+        # This fixes "getting certificate failed" error on Render
+        return AIProvider('ark', base_url or ARK_BASE_URL, api_key, ARK_MODEL, verify=False)
+    elif name == 'openai':
+        return AIProvider('openai', base_url or OPENAI_BASE_URL, api_key, OPENAI_MODEL)
+    raise ValueError(f"Unknown AI provider: {name}")
+
+
+def get_provider(name: str, api_key: str, base_url: Optional[str] = None) -> AIProvider:
+    """
+    Get the shared provider client for a name/key pair, creating it on first use
+
+    Args:
+        name: Provider name ('ark' or 'openai')
+        api_key: API key for the provider
+        base_url: Optional override of the provider endpoint
+
+    Returns:
+        AIProvider instance reused across requests and threads
+    """
+    key = (name, api_key, base_url or '')
+    provider = _providers.get(key)
+    if provider is not None:
+        return provider
+
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = _build_provider(name, api_key, base_url)
+            _providers[key] = provider
+        return provider
+
+
+def close_all_providers():
+    """Close every pooled provider client (used on shutdown and in benchmarks)"""
+    with _providers_lock:
+        for provider in _providers.values():
+            provider.close()
+        _providers.clear()
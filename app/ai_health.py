@@ -0,0 +1,180 @@
+"""
+AI Provider Health Tracking
+Circuit breakers and latency averages for the chat completion providers
+
+Every provider call reports its outcome here. After AI_BREAKER_FAILURES
+consecutive failures a provider's breaker opens and calls to it fail
+immediately instead of waiting for the request timeout; after
+AI_BREAKER_COOLDOWN seconds one probe call is let through (half-open) and
+its outcome closes or re-opens the breaker. The latency EWMA is used to pick
+hedging delays and failover deadlines. The local fallback generator is
+tracked under the name 'local' so its use shows up in the metrics.
+"""
+
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+BREAKER_ENABLED = os.environ.get('AI_BREAKER_ENABLED', '1') != '0'
+FAILURE_THRESHOLD = int(os.environ.get('AI_BREAKER_FAILURES', 3))
+COOLDOWN_SECONDS = float(os.environ.get('AI_BREAKER_COOLDOWN', 30))
+EWMA_ALPHA = 0.2
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with latency EWMA for one provider"""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown: float = COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.latency_ewma = None
+        self.first_token_ewma = None
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.short_circuits = 0
+        self.hedges = 0
+        self.times_opened = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now (an open breaker lets one probe through after the cooldown)"""
+        if not BREAKER_ENABLED:
+            return True
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.short_circuits += 1
+            return False
+
+    def is_available(self) -> bool:
+        """Non-reserving check used when ranking providers"""
+        if not BREAKER_ENABLED:
+            return True
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.cooldown
+            return not (self.state == HALF_OPEN and self.probe_in_flight)
+
+    @staticmethod
+    def _update(average: Optional[float], value: float) -> float:
+        return value if average is None else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * average
+
+    def record_success(self, latency: float, first_token: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.successes += 1
+            if first_token:
+                self.first_token_ewma = self._update(self.first_token_ewma, latency)
+            else:
+                self.latency_ewma = self._update(self.latency_ewma, latency)
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            if self.state != CLOSED:
+                logger.info("%s breaker closed", self.name)
+            self.state = CLOSED
+
+    def record_failure(self, latency: float, error: Exception):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+            self.probe_in_flight = False
+            # Late failures of calls sent before the breaker opened do not extend the cooldown
+            if self.state != OPEN and (self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold):
+                self.times_opened += 1
+                logger.warning("%s breaker opened after %d failures: %s", self.name, self.consecutive_failures, self.last_error)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Give back a half-open probe slot when the call ended without an outcome"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedges += 1
+
+    def expected_latency(self, first_token: bool = False) -> Optional[float]:
+        return self.first_token_ewma if first_token else self.latency_ewma
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'calls': self.calls,
+                'successes': self.successes,
+                'failures': self.failures,
+                'short_circuits': self.short_circuits,
+                'hedges': self.hedges,
+                'times_opened': self.times_opened,
+                'latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+                'first_token_ewma_ms': round(self.first_token_ewma * 1000, 1) if self.first_token_ewma is not None else None,
+                'retry_in_seconds': round(retry_in, 1) if retry_in is not None else None,
+                'last_error': self.last_error
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Shared breaker for a provider name ('ark', 'openai', 'local')"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def breaker_metrics() -> Dict[str, Dict[str, object]]:
+    """Snapshot of every breaker, keyed by provider name"""
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
+
+
+def reset_breakers():
+    """Forget all health data (used by benchmarks)"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def tracked_fallback(fn):
+    """Record calls of a local fallback generator in the 'local' metrics"""
+    @wraps(fn)
+    def wrapped(*args, **kwargs):
+        start = time.monotonic()
+        result = fn(*args, **kwargs)
+        get_breaker('local').record_success(time.monotonic() - start)
+        return result
+    return wrapped
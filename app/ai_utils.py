@@ -1,12 +1,12 @@
 import os
 import re
-import requests
-import openai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Iterator
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import json
-import traceback
-import urllib3
+import time
+import threading
+import logging
 
 # Add file processing support
 try:
@@ -14,16 +14,6 @@ try:
 except ImportError:
     Document = None
 
-try:
-    import PyPDF2
-except ImportError:
-    PyPDF2 = None
-
-try:
-    import pdfplumber
-except ImportError:
-    pdfplumber = None
-
 try:
     from pptx import Presentation
 except ImportError:
@@ -36,166 +26,78 @@ try:
 except ImportError:
     pass
 
-# Add Volcengine SDK support
-try:
-    from volcenginesdkarkruntime import Ark
-except ImportError:
-    Ark = None
+from app.ai_client import get_provider, ProviderError, ProviderUnavailableError
+from app.ai_health import tracked_fallback
+from app.extraction import extract_document_text
+from app.extract_cache import extract_cache
+from app.answer_clustering import cluster_answers
+from app.chunking import CHUNK_TOKENS, chunk_text, sample_chunks, fit_to_budget
 
-def create_ark_client(api_key: str, base_url: str = None, timeout: int = 30):
-    """
-    Create Ark client with SSL verification disabled for Render deployment
-    This fixes "getting certificate failed" error on Render
-    """
-    # Disable SSL warnings for Render deployment
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-    
-    # Set environment variable to disable SSL verification (for requests/urllib3)
-    os.environ['PYTHONHTTPSVERIFY'] = '0'
-    os.environ['CURL_CA_BUNDLE'] = ''
-    os.environ['REQUESTS_CA_BUNDLE'] = ''
-    
-    # Try to create client with httpx (preferred method)
-    try:
-        import httpx
-        http_client = httpx.Client(
-            verify=False,
-            timeout=timeout
-        )
-        try:
-            # Try with http_client parameter (if SDK supports it)
-            if base_url:
-                return Ark(api_key=api_key, base_url=base_url, http_client=http_client, timeout=timeout)
-            else:
-                return Ark(api_key=api_key, http_client=http_client)
-        except TypeError:
-            # SDK doesn't support http_client parameter, use default client
-            # The environment variables should help with SSL issues
-            if base_url:
-                return Ark(api_key=api_key, base_url=base_url, timeout=timeout)
-            else:
-                return Ark(api_key=api_key)
-    except ImportError:
-        # httpx not available, use default client
-        # The environment variables should help with SSL issues
-        if base_url:
-            return Ark(api_key=api_key, base_url=base_url, timeout=timeout)
-        else:
-            return Ark(api_key=api_key)
+logger = logging.getLogger(__name__)
+
+# Map-reduce question generation over long documents
+CHUNK_CONCURRENCY = int(os.environ.get('AI_CHUNK_CONCURRENCY', 4))
+MAX_CHUNKS = int(os.environ.get('AI_MAX_CHUNKS', 12))
+MAX_CHUNK_QUESTIONS = 10
+
+# Activity prompts carry a single chunk of content
+ACTIVITY_CONTENT_TOKENS = 3000
+
+# Failover: stop waiting for a provider after a deadline derived from its latency EWMA
+FAILOVER_DEADLINE = float(os.environ.get('AI_FAILOVER_DEADLINE', 15))
+FAILOVER_MIN_DEADLINE = float(os.environ.get('AI_FAILOVER_MIN_DEADLINE', 5))
+FAILOVER_LATENCY_FACTOR = 3
+
+# Hedging: also ask the next provider when the first one is slower than usual
+HEDGE_DELAY = float(os.environ.get('AI_HEDGE_DELAY', 3))
+HEDGE_MIN_DELAY = 1.0
+HEDGE_LATENCY_FACTOR = 2
+HEDGE_WORKERS = int(os.environ.get('AI_HEDGE_WORKERS', 64))
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+QUESTION_SYSTEM_PROMPT = (
+    "You are an education expert skilled at generating high-quality classroom interaction questions from teaching text. "
+    "Please generate 3 questions suitable for classroom interaction based on the given teaching text. "
+    "Questions should: 1) Test students' understanding of key concepts; 2) Encourage critical thinking; "
+    "3) Be suitable for short answer or poll format. "
+    "Please return 3 questions directly, one per line, without numbering."
+)
+
+ACTIVITY_SYSTEM_PROMPT = "You are an expert educator creating interactive learning activities. Always return valid JSON format."
 
 def generate_questions(text: str) -> List[str]:
     """Generate questions with enhanced logging"""
-    print("=" * 80)
-    print(f"🔍 [AI_UTILS] generate_questions() called")
-    print(f"   [AI_UTILS] Text length: {len(text)} characters")
-    
-    # Check for valid API keys in priority order
-    ark_api_key = os.environ.get('ARK_API_KEY')
-    openai_api_key = os.environ.get('OPENAI_API_KEY')
-    
-    print(f"   [AI_UTILS] ARK_API_KEY: {'SET (' + str(len(ark_api_key)) + ' chars)' if ark_api_key else 'NOT SET'}")
-    print(f"   [AI_UTILS] OPENAI_API_KEY: {'SET (' + str(len(openai_api_key)) + ' chars)' if openai_api_key else 'NOT SET'}")
-    
-    if ark_api_key and ark_api_key != 'your-bytedance-ark-api-key-here' and len(ark_api_key) > 10:
-        print(f"   [AI_UTILS] ✅ Using ARK API (key length: {len(ark_api_key)})")
-        print("=" * 80)
-        return generate_questions_with_ark(text, ark_api_key)
-    elif openai_api_key and openai_api_key != 'your-openai-api-key-here' and openai_api_key.startswith('sk-'):
-        print(f"   [AI_UTILS] ✅ Using OpenAI API")
-        print("=" * 80)
-        return generate_questions_with_openai(text, openai_api_key)
+    providers = ranked_providers()
+    if providers:
+        logger.info("Generating questions with %s (with failover)", ', '.join(p.name for p in providers),
+                    extra={'text_length': len(text)})
+        return generate_questions_with_failover(text)
     else:
-        print(f"   [AI_UTILS] ⚠️  No valid API key found, using fallback")
-        print("=" * 80)
-        return generate_questions_fallback(text)
-
-def generate_questions_with_ark(text: str, api_key: str) -> List[str]:
-    """Generate questions using ByteDance Ark API with official SDK"""
-    if not Ark:
-        print("❌ [ARK] Ark SDK not available")
-        return generate_questions_fallback(text)
-    
-    try:
-        print(f"🔧 [ARK] Using official ARK SDK method...")
-        print(f"   [ARK] API Key: {api_key[:10]}...{api_key[-5:]}")
-        print(f"   [ARK] Base URL: https://ark.cn-beijing.volces.com/api/v3")
-        
-        # Initialize Ark client with SSL verification disabled for Render
-        # This fixes "getting certificate failed" error on Render
-        client = create_ark_client(api_key)
-        
-        print(f"📡 [ARK] Calling ARK API with encryption headers...")
-        print(f"   [ARK] Model: doubao-1-5-pro-32k-250115")
-        print(f"   [ARK] Text length: {len(text)} characters")
-        
-        # Use official SDK pattern with encryption headers
-        completion = client.chat.completions.create(
-            model="doubao-1-5-pro-32k-250115",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an education expert skilled at generating high-quality classroom interaction questions from teaching text. Please generate 3 questions suitable for classroom interaction based on the given teaching text. Questions should: 1) Test students' understanding of key concepts; 2) Encourage critical thinking; 3) Be suitable for short answer or poll format. Please return 3 questions directly, one per line, without numbering."
-                },
-                {
-                    "role": "user", 
-                    "content": f"Please generate 3 classroom interaction questions for the following teaching text:\n\n{text[:2000]}"
-                }
-            ],
-            extra_headers={
-                'x-is-encrypted': 'true'  # Official encryption header
-            }
-        )
-        
-        print(f"✅ [ARK] ARK API response received with encryption")
-        
-        questions_text = completion.choices[0].message.content.strip()
-        questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
-        
-        print(f"📝 [ARK] Parsed {len(questions)} questions")
-        for i, q in enumerate(questions, 1):
-            print(f"   [ARK] Q{i}: {q[:60]}{'...' if len(q) > 60 else ''}")
-        
-        if len(questions) < 3:
-            print(f"⚠️  [ARK] Only {len(questions)} questions generated, adding fallback")
-            questions.extend(generate_questions_fallback(text)[:3-len(questions)])
-        
-        return questions[:3]
-        
-    except Exception as e:
-        print(f"❌ [ARK] Error: {type(e).__name__}: {str(e)[:200]}")
-        import traceback
-        print(f"   [ARK] Full traceback:")
-        traceback.print_exc()
-        print(f"   [ARK] Falling back to local questions")
+        logger.warning("No healthy AI provider, using fallback questions", extra={'text_length': len(text)})
         return generate_questions_fallback(text)
 
-def generate_questions_with_openai(text: str, api_key: str) -> List[str]:
-    """Generate questions using OpenAI API"""
+def generate_questions_with_failover(text: str) -> List[str]:
+    """Generate questions with the healthiest provider, failing over to the next one or the fallback"""
     try:
-        openai.api_key = api_key
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        questions_text = chat_with_failover(
             messages=[
-                {"role": "system", "content": "You are an education expert skilled at generating high-quality classroom interaction questions from teaching text. Please generate 3 questions suitable for classroom interaction based on the given teaching text. Questions should: 1) Test students' understanding of key concepts; 2) Encourage critical thinking; 3) Be suitable for short answer or poll format. Please return 3 questions directly, one per line, without numbering."},
-                {"role": "user", "content": f"Please generate 3 classroom interaction questions for the following teaching text:\n\n{text}"}
+                {"role": "system", "content": QUESTION_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Please generate 3 classroom interaction questions for the following teaching text:\n\n{fit_to_budget(text, CHUNK_TOKENS)}"}
             ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        questions_text = response.choices[0].message.content.strip()
-        questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
-        
-        if len(questions) < 3:
-            questions.extend(generate_questions_fallback(text)[:3-len(questions)])
-        
-        return questions[:3]
-        
+            timeout=30
+        ).strip()
     except Exception as e:
-        print(f"OpenAI API error: {e}")
+        logger.warning("Question generation failed on all providers: %s", e)
         return generate_questions_fallback(text)
+    
+    questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
+    if len(questions) < 3:
+        questions.extend(generate_questions_fallback(text)[:3-len(questions)])
+    return questions[:3]
 
+@tracked_fallback
 def generate_questions_fallback(text: str) -> List[str]:
     """Improved fallback question generation with better quality"""
     
@@ -261,107 +163,29 @@ def generate_questions_fallback(text: str) -> List[str]:
 
 def generate_activity_from_content(content: str, activity_type: str) -> Dict[str, Any]:
     """Generate a complete activity from teaching content"""
-    # Check for valid API keys in priority order
-    ark_api_key = os.environ.get('ARK_API_KEY')
-    openai_api_key = os.environ.get('OPENAI_API_KEY')
-    
-    if ark_api_key and ark_api_key != 'your-bytedance-ark-api-key-here' and len(ark_api_key) > 10:
-        return generate_activity_with_ark(content, activity_type, ark_api_key)
-    elif openai_api_key and openai_api_key != 'your-openai-api-key-here' and openai_api_key.startswith('sk-'):
-        return generate_activity_with_openai(content, activity_type, openai_api_key)
-    else:
-        return generate_activity_fallback(content, activity_type)
-
-def generate_activity_with_ark(content: str, activity_type: str, api_key: str) -> Dict[str, Any]:
-    """Generate activity using ByteDance Ark API"""
-    if not Ark:
-        print("❌ Ark SDK not available")
+    if not ranked_providers():
         return generate_activity_fallback(content, activity_type)
     
     try:
-        # Use helper function to create client with SSL verification disabled
-        client = create_ark_client(
-            api_key=api_key,
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            timeout=30
-        )
-        
-        if activity_type == 'quiz':
-            prompt = f"""Based on the following teaching content, create a quiz question with multiple choice options and correct answer.
-
-Content: {content}
-
-Please return a JSON object with:
-- title: A descriptive title for the quiz
-- question: The quiz question
-- options: Array of 4 multiple choice options
-- correct_answer: The correct option
-- explanation: Brief explanation of why this is correct
-
-Format as valid JSON only."""
-        
-        elif activity_type == 'poll':
-            prompt = f"""Based on the following teaching content, create a poll question with response options.
-
-Content: {content}
-
-Please return a JSON object with:
-- title: A descriptive title for the poll
-- question: The poll question
-- options: Array of 4-6 response options
-
-Format as valid JSON only."""
-        
-        elif activity_type == 'word_cloud':
-            prompt = f"""Based on the following teaching content, create a word cloud activity.
-
-Content: {content}
-
-Please return a JSON object with:
-- title: A descriptive title for the word cloud
-- question: Instructions for students to submit words/phrases
-
-Format as valid JSON only."""
-        
-        else:  # short_answer
-            prompt = f"""Based on the following teaching content, create a short answer question.
-
-Content: {content}
-
-Please return a JSON object with:
-- title: A descriptive title for the question
-- question: The short answer question
-
-Format as valid JSON only."""
-        
-        completion = client.chat.completions.create(
-            model="doubao-1-5-pro-32k-250115",
+        content_text = chat_with_failover(
             messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert educator creating interactive learning activities. Always return valid JSON format."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
+                {"role": "system", "content": ACTIVITY_SYSTEM_PROMPT},
+                {"role": "user", "content": build_activity_prompt(content, activity_type)}
+            ],
+            timeout=30
         )
-        
-        result = json.loads(completion.choices[0].message.content.strip())
-        return result
-        
+        return json.loads(content_text.strip())
     except Exception as e:
-        print(f"Ark API error: {e}")
+        logger.warning("Activity generation error: %s", e)
         return generate_activity_fallback(content, activity_type)
 
-def generate_activity_with_openai(content: str, activity_type: str, api_key: str) -> Dict[str, Any]:
-    """Generate activity using OpenAI API"""
-    try:
-        openai.api_key = api_key
-        
-        if activity_type == 'quiz':
-            prompt = f"""Based on the following teaching content, create a quiz question with multiple choice options and correct answer.
+def build_activity_prompt(content: str, activity_type: str) -> str:
+    """Build the activity generation prompt for the given activity type"""
+    # Keep the prompt within budget, cut at a heading/paragraph boundary
+    content = fit_to_budget(content, ACTIVITY_CONTENT_TOKENS)
+    
+    if activity_type == 'quiz':
+        prompt = f"""Based on the following teaching content, create a quiz question with multiple choice options and correct answer.
 
 Content: {content}
 
@@ -373,9 +197,9 @@ Please return a JSON object with:
 - explanation: Brief explanation of why this is correct
 
 Format as valid JSON only."""
-        
-        elif activity_type == 'poll':
-            prompt = f"""Based on the following teaching content, create a poll question with response options.
+    
+    elif activity_type == 'poll':
+        prompt = f"""Based on the following teaching content, create a poll question with response options.
 
 Content: {content}
 
@@ -385,9 +209,9 @@ Please return a JSON object with:
 - options: Array of 4-6 response options
 
 Format as valid JSON only."""
-        
-        elif activity_type == 'word_cloud':
-            prompt = f"""Based on the following teaching content, create a word cloud activity.
+    
+    elif activity_type == 'word_cloud':
+        prompt = f"""Based on the following teaching content, create a word cloud activity.
 
 Content: {content}
 
@@ -396,9 +220,9 @@ Please return a JSON object with:
 - question: Instructions for students to submit words/phrases
 
 Format as valid JSON only."""
-        
-        else:  # short_answer
-            prompt = f"""Based the following teaching content, create a short answer question.
+    
+    else:  # short_answer
+        prompt = f"""Based on the following teaching content, create a short answer question.
 
 Content: {content}
 
@@ -407,24 +231,10 @@ Please return a JSON object with:
 - question: The short answer question
 
 Format as valid JSON only."""
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert educator creating interactive learning activities. Always return valid JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
-        
-        result = json.loads(response.choices[0].message.content.strip())
-        return result
-        
-    except Exception as e:
-        print(f"OpenAI API error: {e}")
-        return generate_activity_fallback(content, activity_type)
+    
+    return prompt
 
+@tracked_fallback
 def generate_activity_fallback(content: str, activity_type: str) -> Dict[str, Any]:
     """Fallback activity generation without OpenAI"""
     sentences = re.split(r'[.!?。！？]', content)
@@ -465,102 +275,450 @@ def generate_activity_fallback(content: str, activity_type: str) -> Dict[str, An
             'question': f'Please explain your understanding of: {main_sentence[:50]}...'
         }
 
-def group_answers(answers: List[str]) -> Dict[str, Any]:
-    """Group and analyze student answers using AI"""
-    # Check for valid API keys in priority order
+def configured_providers() -> List[Any]:
+    """
+    Providers with a valid API key, in priority order (Ark first, then OpenAI)
+    """
     ark_api_key = os.environ.get('ARK_API_KEY')
     openai_api_key = os.environ.get('OPENAI_API_KEY')
     
+    providers = []
     if ark_api_key and ark_api_key != 'your-bytedance-ark-api-key-here' and len(ark_api_key) > 10:
-        return group_answers_with_ark(answers, ark_api_key)
-    elif openai_api_key and openai_api_key != 'your-openai-api-key-here' and openai_api_key.startswith('sk-'):
-        return group_answers_with_openai(answers, openai_api_key)
-    else:
-        return group_answers_fallback(answers)
+        providers.append(get_provider('ark', ark_api_key))
+    if openai_api_key and openai_api_key != 'your-openai-api-key-here' and openai_api_key.startswith('sk-'):
+        providers.append(get_provider('openai', openai_api_key))
+    return providers
 
-def group_answers_with_ark(answers: List[str], api_key: str) -> Dict[str, Any]:
-    """Group answers using ByteDance Ark API"""
-    if not Ark:
-        print("❌ Ark SDK not available")
-        return group_answers_fallback(answers)
-    
-    try:
-        # Use helper function to create client with SSL verification disabled
-        client = create_ark_client(
-            api_key=api_key,
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            timeout=30
-        )
-        
-        answers_text = '\n'.join([f"{i+1}. {answer}" for i, answer in enumerate(answers)])
-        
-        prompt = f"""Analyze and group the following student answers. Return a JSON object with:
-- groups: Array of groups, each with 'name', 'description', 'answers' (array of answer indices)
-- summary: Overall summary of the answers
-- insights: Key insights from the analysis
+def ranked_providers() -> List[Any]:
+    """Configured providers whose circuit breaker currently accepts calls"""
+    return [provider for provider in configured_providers() if provider.breaker.is_available()]
 
-Student answers:
-{answers_text}
+def provider_params(provider) -> Dict[str, Any]:
+    """Completion parameters used with each provider for generation prompts"""
+    return {'max_tokens': 500, 'temperature': 0.7} if provider.name == 'openai' else {}
 
-Format as valid JSON only."""
-        
-        completion = client.chat.completions.create(
-            model="doubao-1-5-pro-32k-250115",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert educator analyzing student responses. Group similar answers and provide insights. Always return valid JSON format."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        
-        result = json.loads(completion.choices[0].message.content.strip())
-        return result
-        
-    except Exception as e:
-        print(f"Ark API error: {e}")
-        return group_answers_fallback(answers)
+def failover_deadline(provider, timeout: float, first_token: bool = False) -> float:
+    """
+    Seconds to wait for a provider before failing over
+    
+    Without latency history this is AI_FAILOVER_DEADLINE; afterwards it is
+    a multiple of the latency EWMA, never below AI_FAILOVER_MIN_DEADLINE and
+    never above the request timeout.
+    """
+    expected = provider.breaker.expected_latency(first_token)
+    if expected is None:
+        return min(timeout, FAILOVER_DEADLINE)
+    return min(timeout, max(FAILOVER_MIN_DEADLINE, expected * FAILOVER_LATENCY_FACTOR))
+
+def hedge_delay(provider) -> float:
+    """Seconds to wait for a provider before also sending the request to the next one"""
+    expected = provider.breaker.expected_latency()
+    if expected is None:
+        return HEDGE_DELAY
+    return max(HEDGE_MIN_DELAY, expected * HEDGE_LATENCY_FACTOR)
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='ai-call')
+    return _hedge_executor
+
+def chat_with_failover(messages: List[Dict[str, str]], timeout: float = 30,
+                       params_for: Callable[[Any], Dict[str, Any]] = provider_params) -> str:
+    """
+    Send a chat request to the healthiest provider, hedging and failing over
+    
+    The first provider gets the request; if it has not answered within
+    hedge_delay() the next provider is asked as well, and the first success
+    wins. A provider error moves on to the next provider immediately. The
+    caller stops waiting after failover_deadline() so it can use the local
+    fallback.
+    
+    Raises:
+        ProviderError: No healthy provider, all failed, or the deadline passed
+    """
+    providers = ranked_providers()
+    if not providers:
+        raise ProviderUnavailableError('No healthy AI provider available')
+    
+    executor = _get_hedge_executor()
+    pending = {}
+    errors = []
+    
+    def launch(provider):
+        # Calls are cut at the failover deadline so a hung provider frees its
+        # worker and its breaker learns about the failure without delay
+        call_timeout = failover_deadline(provider, timeout)
+        future = executor.submit(provider.chat, messages, timeout=call_timeout, **params_for(provider))
+        pending[future] = provider
+        return time.monotonic() + hedge_delay(provider)
+    
+    current = providers.pop(0)
+    wait_seconds = failover_deadline(current, timeout)
+    deadline = time.monotonic() + wait_seconds
+    hedge_at = launch(current)
+    
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        wait_until = min(deadline, hedge_at) if providers else deadline
+        done, _ = wait(list(pending), timeout=max(0, wait_until - now), return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                return future.result()
+            except Exception as e:
+                errors.append(f"{provider.name}: {type(e).__name__}: {str(e)[:100]}")
+        
+        if not providers:
+            continue
+        if not pending:
+            logger.info("%s failed, failing over to %s", current.name, providers[0].name)
+        elif time.monotonic() >= hedge_at:
+            current.breaker.record_hedge()
+            logger.info("%s is slow, hedging with %s", current.name, providers[0].name)
+        else:
+            continue
+        current = providers.pop(0)
+        hedge_at = launch(current)
+    
+    if pending:
+        errors.append(f"no answer within {wait_seconds:.1f}s")
+    raise ProviderError('All AI providers failed: ' + '; '.join(errors))
+
+def iter_stream_lines(deltas: Iterable[str]) -> Iterator[str]:
+    """Re-chunk streamed content fragments into complete, non-empty lines"""
+    buffer = []
+    for delta in deltas:
+        parts = delta.split('\n')
+        for part in parts[:-1]:
+            buffer.append(part)
+            line = ''.join(buffer).strip()
+            buffer = []
+            if line:
+                yield line
+        buffer.append(parts[-1])
+    line = ''.join(buffer).strip()
+    if line:
+        yield line
+
+def generate_questions_streaming(text: str, on_question: Callable[[str], None] = None) -> List[str]:
+    """
+    Generate questions in streaming mode
+    
+    Each question is passed to on_question as soon as its line is complete,
+    so the first question reaches the browser long before the completion ends.
+    Missing questions (provider failure or short answer) are filled from
+    generate_questions_fallback.
+    
+    Returns:
+        List of 3 questions (same as generate_questions)
+    """
+    questions = []
+    
+    def emit(question):
+        questions.append(question)
+        if on_question:
+            on_question(question)
+    
+    # One chunk per call; longer documents go through generate_questions_chunked
+    prompt_text = fit_to_budget(text, CHUNK_TOKENS)
+    for provider in ranked_providers():
+        try:
+            # Read timeout doubles as the wait for the first token before failing over
+            stream = provider.stream_chat(
+                messages=[
+                    {"role": "system", "content": QUESTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Please generate 3 classroom interaction questions for the following teaching text:\n\n{prompt_text}"}
+                ],
+                timeout=failover_deadline(provider, 30, first_token=True),
+                **provider_params(provider)
+            )
+            for line in iter_stream_lines(stream):
+                emit(line)
+                if len(questions) >= 3:
+                    stream.close()
+                    break
+        except Exception as e:
+            logger.warning("%s streaming error: %s: %s", provider.name, type(e).__name__, str(e)[:200])
+        # Only switch providers if nothing was shown yet, so questions never mix sources mid-stream
+        if questions:
+            break
+    
+    if len(questions) < 3:
+        for question in generate_questions_fallback(text)[:3 - len(questions)]:
+            emit(question)
+    
+    return questions
+
+def _normalize_question(question: str) -> set:
+    """Word set used to detect near-duplicate questions"""
+    return set(re.findall(r'\w+', question.lower())) - {'the', 'a', 'an', 'of', 'and', 'to', 'in', 'is', 'what', 'how', 'why'}
+
+def is_duplicate_question(question: str, seen: List[set], threshold: float = 0.75) -> bool:
+    """True if question overlaps an already accepted question (Jaccard similarity of words)"""
+    words = _normalize_question(question)
+    if not words:
+        return True
+    for other in seen:
+        if len(words & other) / len(words | other) >= threshold:
+            return True
+    return False
+
+def generate_questions_for_chunk(chunk: str) -> List[str]:
+    """Ask the healthiest provider for 3 questions about a single chunk (no fallback filling)"""
+    questions_text = chat_with_failover(
+        messages=[
+            {"role": "system", "content": QUESTION_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Please generate 3 classroom interaction questions for the following teaching text:\n\n{chunk}"}
+        ],
+        timeout=30
+    )
+    return [q.strip() for q in questions_text.split('\n') if q.strip()][:3]
+
+def generate_questions_chunked(text: str, on_question: Callable[[str], None] = None,
+                               max_workers: int = CHUNK_CONCURRENCY,
+                               max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """
+    Generate questions covering a whole document (map-reduce over chunks)
+    
+    The text is split into token-budgeted chunks along slides, pages and
+    headings. Questions are generated per chunk concurrently (at most
+    max_workers calls in flight), then merged: the first new question of
+    every chunk is accepted as soon as that chunk finishes, the remaining
+    slots are filled from the other candidates in document order, and
+    near-duplicates are dropped. Text that fits one chunk keeps the
+    single-call streaming path.
+    
+    Returns:
+        Between 3 and MAX_CHUNK_QUESTIONS questions
+    """
+    chunks = sample_chunks(chunk_text(text, max_tokens), MAX_CHUNKS)
+    if len(chunks) <= 1 or not ranked_providers():
+        return generate_questions_streaming(text, on_question)
+    
+    target = max(3, min(len(chunks), MAX_CHUNK_QUESTIONS))
+    questions, seen = [], []
+    candidates = [[] for _ in chunks]
+    
+    def accept(question):
+        if len(questions) >= target or is_duplicate_question(question, seen):
+            return False
+        questions.append(question)
+        seen.append(_normalize_question(question))
+        if on_question:
+            on_question(question)
+        return True
+    
+    logger.info("Generating questions from %d chunks with %d concurrent provider calls",
+                len(chunks), min(max_workers, len(chunks)))
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))), thread_name_prefix='ai-chunk')
+    futures = {executor.submit(generate_questions_for_chunk, chunk): index
+               for index, chunk in enumerate(chunks)}
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                candidates[index] = future.result()
+            except Exception as e:
+                logger.warning("Chunk %d failed: %s: %s", index + 1, type(e).__name__, str(e)[:200])
+                continue
+            # First new question of each chunk right away, so every part of the document is covered
+            for question in candidates[index]:
+                if accept(question):
+                    break
+    finally:
+        # Cancel queued chunk calls if the job was cancelled or the consumer failed
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    for chunk_questions in candidates:
+        for question in chunk_questions:
+            accept(question)
+    
+    if len(questions) < 3:
+        for question in generate_questions_fallback(text):
+            accept(question)
+            if len(questions) >= 3:
+                break
+    return questions
 
-def group_answers_with_openai(answers: List[str], api_key: str) -> Dict[str, Any]:
-    """Group answers using OpenAI API"""
+class ActivityStreamParser:
+    """
+    Incremental parser for a streamed activity JSON object
+    
+    Reports each top-level string field (title, question, correct_answer,
+    explanation) and each entry of the options array as soon as its closing
+    quote arrives, without waiting for the JSON object to be complete.
+    """
+    
+    STRING_FIELDS = ('title', 'question', 'correct_answer', 'explanation')
+    _string = r'"((?:[^"\\]|\\.)*)"'
+    _field_re = re.compile(r'"(' + '|'.join(STRING_FIELDS) + r')"\s*:\s*' + _string)
+    _options_re = re.compile(r'"options"\s*:\s*\[')
+    _item_re = re.compile(r'\s*,?\s*' + _string)
+    
+    def __init__(self):
+        self.buffer = ''
+        self.fields = {}
+        self.options = []
+    
+    @staticmethod
+    def _decode(raw):
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
+    
+    def feed(self, delta: str) -> List[tuple]:
+        """Add a content fragment, return newly completed (field, value) pairs"""
+        self.buffer += delta
+        completed = []
+        
+        for match in self._field_re.finditer(self.buffer):
+            name = match.group(1)
+            if name not in self.fields:
+                self.fields[name] = self._decode(match.group(2))
+                completed.append((name, self.fields[name]))
+        
+        options_match = self._options_re.search(self.buffer)
+        if options_match:
+            pos = options_match.end()
+            items = []
+            while True:
+                item = self._item_re.match(self.buffer, pos)
+                if not item:
+                    break
+                items.append(self._decode(item.group(1)))
+                pos = item.end()
+            for value in items[len(self.options):]:
+                self.options.append(value)
+                completed.append(('option', value))
+        
+        return completed
+    
+    def result(self) -> Dict[str, Any]:
+        """Best-effort activity dict: the full JSON if valid, else the parsed fields"""
+        try:
+            return json.loads(self.buffer.strip())
+        except ValueError:
+            result = dict(self.fields)
+            if self.options:
+                result['options'] = list(self.options)
+            return result
+
+def generate_activity_streaming(content: str, activity_type: str,
+                                on_field: Callable[[str, Any], None] = None) -> Dict[str, Any]:
+    """
+    Generate an activity in streaming mode
+    
+    on_field(name, value) is called for each field as it completes; options
+    are reported one at a time with name 'option'.
+    
+    Returns:
+        Activity dict (same shape as generate_activity_from_content)
+    """
+    for provider in ranked_providers():
+        parser = ActivityStreamParser()
+        try:
+            for delta in provider.stream_chat(
+                messages=[
+                    {"role": "system", "content": ACTIVITY_SYSTEM_PROMPT},
+                    {"role": "user", "content": build_activity_prompt(content, activity_type)}
+                ],
+                timeout=failover_deadline(provider, 30, first_token=True),
+                **provider_params(provider)
+            ):
+                for name, value in parser.feed(delta):
+                    if on_field:
+                        on_field(name, value)
+            result = parser.result()
+            if result.get('question'):
+                return result
+        except Exception as e:
+            logger.warning("%s streaming error: %s: %s", provider.name, type(e).__name__, str(e)[:200])
+        # Fields already shown come from this provider; finish with the fallback instead of mixing
+        if parser.fields or parser.options:
+            break
+    
+    result = generate_activity_fallback(content, activity_type)
+    if on_field:
+        for name, value in result.items():
+            if name == 'options' and value:
+                for option in value:
+                    on_field('option', option)
+            elif value is not None:
+                on_field(name, value)
+    return result
+
+def group_answers(answers: List[str], polish_labels: bool = True) -> Dict[str, Any]:
+    """
+    Group and analyze student answers
+    
+    Grouping runs locally (TF-IDF + k-means); when an AI provider is configured
+    it is only asked to rewrite the group names and descriptions.
+    
+    Args:
+        answers: Student answer texts
+        polish_labels: Let the AI provider polish the keyword-based group labels
+    """
     try:
-        openai.api_key = api_key
-        
-        answers_text = '\n'.join([f"{i+1}. {answer}" for i, answer in enumerate(answers)])
-        
-        prompt = f"""Analyze and group the following student answers. Return a JSON object with:
-- groups: Array of groups, each with 'name', 'description', 'answers' (array of answer indices)
-- summary: Overall summary of the answers
+        result = cluster_answers(answers)
+    except ImportError:
+        return group_answers_fallback(answers)
+    
+    if polish_labels and result['groups'] and ranked_providers():
+        result = polish_group_labels(result, answers)
+    return result
+
+def polish_group_labels(result: Dict[str, Any], answers: List[str]) -> Dict[str, Any]:
+    """Ask the AI provider for readable group names; keep the keyword labels on any failure"""
+    group_lines = []
+    for number, group in enumerate(result['groups'], 1):
+        samples = [answers[i][:200] for i in ([group['representative']] + group['answers'])[:3]]
+        group_lines.append(f"Group {number} ({len(group['answers'])} answers, keywords: {', '.join(group['keywords']) or 'none'})")
+        group_lines.extend(f"  - {sample}" for sample in dict.fromkeys(samples))
+    
+    prompt = f"""Student answers have already been grouped. For each group write a short name and a one-sentence description.
+Return a JSON object with:
+- groups: Array with one object per group, in the same order, each with 'name' and 'description'
 - insights: Key insights from the analysis
 
-Student answers:
-{answers_text}
+Groups:
+{chr(10).join(group_lines)}
 
 Format as valid JSON only."""
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+    
+    try:
+        content_text = chat_with_failover(
             messages=[
-                {"role": "system", "content": "You are an expert educator analyzing student responses. Group similar answers and provide insights. Always return valid JSON format."},
+                {"role": "system", "content": "You are an expert educator analyzing student responses. Always return valid JSON format."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=800,
-            temperature=0.3
+            timeout=15,
+            params_for=lambda provider: {'max_tokens': 600, 'temperature': 0.3}
         )
-        
-        result = json.loads(response.choices[0].message.content.strip())
-        return result
-        
+        polished = json.loads(content_text.strip())
+        labels = polished.get('groups') or []
+        if len(labels) != len(result['groups']):
+            raise ValueError(f"expected {len(result['groups'])} groups, got {len(labels)}")
+        
+        for group, label in zip(result['groups'], labels):
+            if label.get('name'):
+                group['name'] = label['name']
+            if label.get('description'):
+                group['description'] = label['description']
+        if polished.get('insights'):
+            result['insights'] = polished['insights']
     except Exception as e:
-        print(f"OpenAI API error: {e}")
-        return group_answers_fallback(answers)
+        logger.warning("Label polishing error: %s", e)
+    return result
 
 def group_answers_fallback(answers: List[str]) -> Dict[str, Any]:
-    """Fallback answer grouping without OpenAI"""
+    """Fallback answer grouping when numpy is not installed"""
     # Simple keyword-based grouping
     word_freq = Counter()
     for answer in answers:
@@ -586,18 +744,29 @@ def group_answers_fallback(answers: List[str]) -> Dict[str, Any]:
         'insights': f'Most common themes: {", ".join(common_words[:3])}'
     }
 
-def extract_text_from_file(file_path: str, file_extension: str) -> str:
+def extract_text_from_file(file_path: str, file_extension: str, max_chars: int = None, use_cache: bool = True) -> str:
     """
     Extract text content from uploaded file
     Supported file formats: .docx, .pdf, .pptx
+    
+    Args:
+        max_chars: Stop reading pages/slides once this many characters are collected
+        use_cache: Reuse text of an identical file extracted before (keyed by SHA-256)
     """
+    if use_cache:
+        return extract_cache.get_or_extract(file_path, file_extension, max_chars, extract_text_uncached)
+    return extract_text_uncached(file_path, file_extension, max_chars)
+
+def extract_text_uncached(file_path: str, file_extension: str, max_chars: int = None) -> str:
+    """Extract text content from uploaded file without consulting the cache"""
     try:
         if file_extension.lower() == '.docx':
-            return extract_text_from_docx(file_path)
+            text = extract_text_from_docx(file_path)
+            return text[:max_chars] if max_chars else text
         elif file_extension.lower() == '.pdf':
-            return extract_text_from_pdf(file_path)
+            return extract_text_from_pdf(file_path, max_chars)
         elif file_extension.lower() == '.pptx':
-            return extract_text_from_pptx(file_path)
+            return extract_text_from_pptx(file_path, max_chars)
         else:
             raise ValueError(f"Unsupported file format: {file_extension}")
     except Exception as e:
@@ -632,75 +801,20 @@ def extract_text_from_docx(file_path: str) -> str:
     except Exception as e:
         raise Exception(f"Error reading Word document: {str(e)}")
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF file, prefer pdfplumber, fallback to PyPDF2"""
-    text = ""
-    
-    # Prefer pdfplumber as it handles complex PDFs better
-    if pdfplumber:
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            if text.strip():
-                return text
-        except Exception as e:
-            print(f"pdfplumber failed: {e}, trying PyPDF2...")
-    
-    # Fallback to PyPDF2
-    if PyPDF2:
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            if text.strip():
-                return text
-        except Exception as e:
-            raise Exception(f"Error reading PDF with PyPDF2: {str(e)}")
-    
+def extract_text_from_pdf(file_path: str, max_chars: int = None) -> str:
+    """Extract text from PDF file, backend chosen by a text-layer probe (pdfplumber preferred)"""
+    text = extract_document_text(file_path, '.pdf', max_chars)
     if not text.strip():
         raise ValueError("No text content found in the PDF file or PDF libraries not available")
-    
     return text
 
-def extract_text_from_pptx(file_path: str) -> str:
+def extract_text_from_pptx(file_path: str, max_chars: int = None) -> str:
     """Extract text from PowerPoint document"""
     if not Presentation:
         raise ImportError("python-pptx library not installed")
     
     try:
-        presentation = Presentation(file_path)
-        full_text = []
-        
-        # Iterate through all slides
-        for slide_num, slide in enumerate(presentation.slides, 1):
-            slide_text = []
-            
-            # Extract all text from slide
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    slide_text.append(shape.text.strip())
-                
-                # If it's a table, extract text from table
-                if shape.has_table:
-                    table = shape.table
-                    for row in table.rows:
-                        for cell in row.cells:
-                            if cell.text.strip():
-                                slide_text.append(cell.text.strip())
-            
-            # If slide has content, add slide title
-            if slide_text:
-                full_text.append(f"=== Slide {slide_num} ===")
-                full_text.extend(slide_text)
-                full_text.append("")  # Add blank line separator
-        
-        text = '\n'.join(full_text)
+        text = extract_document_text(file_path, '.pptx', max_chars)
         if not text.strip():
             raise ValueError("No text content found in the PowerPoint presentation")
         
@@ -0,0 +1,266 @@
+"""
+Answer Clustering Engine
+Local grouping of free-text student answers without an LLM round trip
+
+Answers are turned into TF-IDF vectors (sublinear term frequency, smoothed
+IDF, L2 normalised) and grouped with spherical k-means, which uses mini-batch
+updates once the answer set is large. The number of groups is chosen by the
+silhouette score over a small range of k. Each group is labelled with the
+terms that distinguish its centroid from the overall mean, and the answer
+closest to the centroid is kept as a representative example.
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Common English function words that carry no topic information
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has
+have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over
+own same she should so some such than that the their theirs them themselves then there these
+they this those through to too under until up very was we were what when where which while who
+whom why will with would you your yours yourself yourselves think thinks really
+""".split())
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:\'[a-z]+)?|[一-鿿]+')
+CJK_PATTERN = re.compile(r'[一-鿿]')
+
+MAX_FEATURES = 3000
+MAX_GROUPS = 8
+MINIBATCH_THRESHOLD = 2000
+MINIBATCH_SIZE = 512
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; runs of Chinese characters become character bigrams"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or '').lower()):
+        if CJK_PATTERN.match(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif len(token) > 1 and token not in STOP_WORDS:
+            tokens.append(token)
+    return tokens
+
+
+def tfidf_matrix(answers: List[str], max_features: int = MAX_FEATURES) -> Tuple['np.ndarray', List[str]]:
+    """
+    Build an L2-normalised TF-IDF matrix
+
+    Returns:
+        (matrix of shape [len(answers), vocabulary size], vocabulary terms)
+    """
+    token_lists = [tokenize(answer) for answer in answers]
+    doc_freq = Counter()
+    for tokens in token_lists:
+        doc_freq.update(set(tokens))
+
+    # Terms used by a single student cannot link answers together
+    min_df = 2 if len(answers) >= 10 else 1
+    terms = [term for term, df in doc_freq.most_common(max_features) if df >= min_df]
+    vocabulary = {term: index for index, term in enumerate(terms)}
+
+    matrix = np.zeros((len(answers), len(terms)), dtype=np.float32)
+    for row, tokens in enumerate(token_lists):
+        for term, count in Counter(tokens).items():
+            column = vocabulary.get(term)
+            if column is not None:
+                matrix[row, column] = 1.0 + np.log(count)
+
+    if terms:
+        df = np.array([doc_freq[term] for term in terms], dtype=np.float32)
+        matrix *= np.log((1.0 + len(answers)) / (1.0 + df)) + 1.0
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix, terms
+
+
+def _normalize_rows(matrix: 'np.ndarray') -> 'np.ndarray':
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _init_centroids(matrix: 'np.ndarray', k: int, rng) -> 'np.ndarray':
+    """k-means++ seeding with cosine distance"""
+    n = matrix.shape[0]
+    centroids = [matrix[rng.integers(n)]]
+    closest = 1.0 - matrix @ centroids[0]
+    for _ in range(1, k):
+        weights = np.clip(closest, 0, None) ** 2
+        total = weights.sum()
+        index = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+        centroids.append(matrix[index])
+        closest = np.minimum(closest, 1.0 - matrix @ matrix[index])
+    return np.array(centroids)
+
+
+def spherical_kmeans(matrix: 'np.ndarray', k: int, seed: int = 0, max_iter: int = 30,
+                     batch_size: Optional[int] = None) -> Tuple['np.ndarray', 'np.ndarray']:
+    """
+    Cluster unit-length rows by cosine similarity
+
+    With batch_size set, centroids are updated from random mini-batches with
+    per-centroid learning rates (mini-batch k-means); otherwise full Lloyd
+    iterations are run until assignments stop changing.
+
+    Returns:
+        (labels array, unit-length centroid matrix)
+    """
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    centroids = _init_centroids(matrix, k, rng)
+
+    if batch_size and n > batch_size:
+        counts = np.zeros(k)
+        for _ in range(max_iter):
+            batch = matrix[rng.choice(n, batch_size, replace=False)]
+            nearest = np.argmax(batch @ centroids.T, axis=1)
+            for cluster in range(k):
+                members = batch[nearest == cluster]
+                if len(members):
+                    counts[cluster] += len(members)
+                    rate = len(members) / counts[cluster]
+                    centroids[cluster] = (1 - rate) * centroids[cluster] + rate * members.mean(axis=0)
+            centroids = _normalize_rows(centroids)
+        return np.argmax(matrix @ centroids.T, axis=1), centroids
+
+    labels = None
+    for _ in range(max_iter):
+        new_labels = np.argmax(matrix @ centroids.T, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, matrix)
+        empty = ~sums.any(axis=1)
+        if empty.any():
+            # Re-seed empty clusters with the points worst served by their centroid
+            worst = np.argsort((matrix * centroids[labels]).sum(axis=1))[:empty.sum()]
+            sums[empty] = matrix[worst]
+        centroids = _normalize_rows(sums)
+    return labels, centroids
+
+
+def silhouette_score(similarity: 'np.ndarray', labels: 'np.ndarray') -> float:
+    """Mean silhouette coefficient using cosine distance (1 - similarity)"""
+    distance = 1.0 - similarity
+    clusters = np.unique(labels)
+    if len(clusters) < 2:
+        return -1.0
+
+    # Mean distance from every point to every cluster
+    one_hot = (labels[:, None] == clusters[None, :]).astype(np.float32)
+    sizes = one_hot.sum(axis=0)
+    mean_dist = (distance @ one_hot) / sizes
+
+    own = np.searchsorted(clusters, labels)
+    own_size = sizes[own]
+    a = mean_dist[np.arange(len(labels)), own] * own_size / np.maximum(own_size - 1, 1)
+    mean_dist[np.arange(len(labels)), own] = np.inf
+    b = mean_dist.min(axis=1)
+    s = np.where(own_size > 1, (b - a) / np.maximum(np.maximum(a, b), 1e-9), 0.0)
+    return float(s.mean())
+
+
+def choose_clusters(matrix: 'np.ndarray', max_groups: int = MAX_GROUPS, seed: int = 0) -> 'np.ndarray':
+    """Run k-means for k = 2..max_groups and keep the labelling with the best silhouette"""
+    n = matrix.shape[0]
+    upper = min(max_groups, n - 1, max(2, int(np.sqrt(n)) + 1))
+    batch_size = MINIBATCH_SIZE if n > MINIBATCH_THRESHOLD else None
+
+    # Silhouette on a sample keeps the n x n similarity matrix small
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(n, min(n, 1000), replace=False) if n > 1000 else np.arange(n)
+    similarity = matrix[sample] @ matrix[sample].T
+
+    # A split must beat a single group (silhouette 0), so identical answers stay together
+    best_labels, best_score = np.zeros(n, dtype=int), 0.0
+    for k in range(2, upper + 1):
+        labels, _ = spherical_kmeans(matrix, k, seed=seed, batch_size=batch_size)
+        score = silhouette_score(similarity, labels[sample])
+        if score > best_score:
+            best_labels, best_score = labels, score
+    return best_labels
+
+
+def _label_terms(centroid: 'np.ndarray', mean: 'np.ndarray', terms: List[str], count: int = 3) -> List[str]:
+    """Terms that weigh most in a centroid relative to the whole answer set"""
+    distinctive = centroid - 0.5 * mean
+    order = np.argsort(-distinctive)[:count]
+    return [terms[i] for i in order if centroid[i] > 0]
+
+
+def cluster_answers(answers: List[str], max_groups: int = MAX_GROUPS, seed: int = 0) -> Dict[str, Any]:
+    """
+    Group answers into themes
+
+    Args:
+        answers: Answer texts; group members are reported as indices into this list
+        max_groups: Upper bound on the number of groups tried
+        seed: Random seed for reproducible grouping
+
+    Returns:
+        Dictionary with 'groups' (name, description, answers, keywords,
+        representative), 'summary' and 'insights', the same shape the AI
+        grouping returns
+    """
+    if np is None:
+        raise ImportError("numpy library not installed")
+
+    matrix, terms = tfidf_matrix(answers)
+    has_terms = matrix.any(axis=1) if terms else np.zeros(len(answers), dtype=bool)
+    indices = np.flatnonzero(has_terms)
+
+    groups = []
+    if len(indices) >= 4:
+        labels = choose_clusters(matrix[indices], max_groups, seed)
+    else:
+        labels = np.zeros(len(indices), dtype=int)
+
+    mean = matrix[indices].mean(axis=0) if len(indices) else None
+    for cluster in np.unique(labels):
+        members = indices[labels == cluster]
+        centroid = matrix[members].mean(axis=0)
+        keywords = _label_terms(centroid, mean, terms)
+        representative = int(members[np.argmax(matrix[members] @ centroid)])
+        groups.append({
+            'keywords': keywords,
+            'answers': [int(i) for i in members],
+            'representative': representative
+        })
+
+    groups.sort(key=lambda group: len(group['answers']), reverse=True)
+    for number, group in enumerate(groups, 1):
+        label = ' / '.join(term.title() for term in group['keywords']) or 'Mixed'
+        group['name'] = f'Group {number}: {label}'
+        group['description'] = (f'{len(group["answers"])} answers mentioning '
+                                + ', '.join(f'"{term}"' for term in group['keywords']))
+
+    unmatched = [int(i) for i in np.flatnonzero(~has_terms)]
+    if unmatched:
+        groups.append({
+            'name': f'Group {len(groups) + 1}: Other',
+            'description': 'Answers without terms shared with other students',
+            'answers': unmatched,
+            'keywords': [],
+            'representative': unmatched[0]
+        })
+
+    themes = [group['keywords'][0] for group in groups if group['keywords']]
+    return {
+        'groups': groups,
+        'summary': f'Analyzed {len(answers)} responses with {len(groups)} main themes',
+        'insights': f'Most common themes: {", ".join(themes[:3])}' if themes else 'No recurring themes found'
+    }
@@ -0,0 +1,227 @@
+"""
+Answer Votes
+Atomic vote casting with denormalized up/down/net tallies on the answer row
+
+AnswerVote rows are the source of truth (one per user and answer). The
+answer's upvotes, downvotes and score (upvotes - downvotes) are kept in
+step with them by SQL increments in the same transaction as the vote
+change, so concurrent votes never overwrite each other. The vote row
+change itself is conditional on the state that was read (the unique
+(answer_id, user_id) constraint for new votes, the previous vote_type for
+changes and cancellations); when another request got there first the
+transaction is retried.
+
+reconcile_tallies() recomputes the tallies from AnswerVote and fixes
+answers that drifted (rows written by older code or by hand). It runs in
+a background thread every VOTE_RECONCILE_SECONDS and can be run directly.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+UPVOTE = 'upvote'
+DOWNVOTE = 'downvote'
+VOTE_TYPES = (UPVOTE, DOWNVOTE)
+VOTE_RETRIES = 5
+DEFAULT_RECONCILE_SECONDS = 3600
+RECONCILE_BATCH = 1000
+
+
+class VoteConflict(Exception):
+    """Raised when a vote kept colliding with concurrent votes of the same user"""
+
+
+def _delta(vote_type: Optional[str], sign: int):
+    if vote_type == UPVOTE:
+        return sign, 0
+    if vote_type == DOWNVOTE:
+        return 0, sign
+    return 0, 0
+
+
+def _apply_vote(answer_id: int, user_id: int, vote_type: str):
+    """
+    One attempt at casting a vote inside the current transaction
+
+    Returns:
+        (vote after the change or None, upvote delta, downvote delta), or
+        None when the vote row changed since it was read
+    """
+    from app import db, get_beijing_time
+    from app.models import AnswerVote
+
+    existing = db.session.query(AnswerVote.id, AnswerVote.vote_type)\
+        .filter_by(answer_id=answer_id, user_id=user_id).first()
+    table = AnswerVote.__table__
+
+    if existing is None:
+        db.session.execute(table.insert().values(answer_id=answer_id, user_id=user_id, vote_type=vote_type,
+                                                 created_at=get_beijing_time()))
+        up, down = _delta(vote_type, 1)
+        return vote_type, up, down
+
+    if existing.vote_type == vote_type:
+        # Same vote again cancels it
+        result = db.session.execute(table.delete().where(table.c.id == existing.id,
+                                                         table.c.vote_type == vote_type))
+        if result.rowcount != 1:
+            return None
+        up, down = _delta(vote_type, -1)
+        return None, up, down
+
+    result = db.session.execute(table.update().where(table.c.id == existing.id,
+                                                     table.c.vote_type == existing.vote_type)
+                                .values(vote_type=vote_type))
+    if result.rowcount != 1:
+        return None
+    new_up, new_down = _delta(vote_type, 1)
+    old_up, old_down = _delta(existing.vote_type, -1)
+    return vote_type, new_up + old_up, new_down + old_down
+
+
+def cast_vote(answer_id: int, user_id: int, vote_type: str) -> Dict[str, object]:
+    """
+    Add, switch or cancel a user's vote on an answer
+
+    Returns:
+        The answer's tallies after the vote and the user's current vote
+        ({'upvotes', 'downvotes', 'score', 'vote'})
+    """
+    from sqlalchemy import func
+    from sqlalchemy.exc import IntegrityError
+    from app import db
+    from app.models import Answer
+
+    if vote_type not in VOTE_TYPES:
+        raise ValueError(f'Invalid vote type: {vote_type}')
+
+    answers = Answer.__table__
+    for attempt in range(VOTE_RETRIES):
+        try:
+            outcome = _apply_vote(answer_id, user_id, vote_type)
+            if outcome is None:
+                db.session.rollback()
+                continue
+            current, up, down = outcome
+            if up or down:
+                # coalesce: answers from before the tally columns may still hold NULL
+                db.session.execute(answers.update().where(answers.c.id == answer_id).values(
+                    upvotes=func.coalesce(answers.c.upvotes, 0) + up,
+                    downvotes=func.coalesce(answers.c.downvotes, 0) + down,
+                    score=func.coalesce(answers.c.score, 0) + (up - down)))
+            db.session.commit()
+            break
+        except IntegrityError:
+            # Another request of the same user inserted the vote first
+            db.session.rollback()
+    else:
+        raise VoteConflict(f'Vote on answer {answer_id} by user {user_id} kept conflicting')
+
+    upvotes, downvotes, score = db.session.query(Answer.upvotes, Answer.downvotes, Answer.score)\
+        .filter(Answer.id == answer_id).one()
+    return {'upvotes': upvotes, 'downvotes': downvotes, 'score': score, 'vote': current}
+
+
+def reconcile_tallies(batch_size: int = RECONCILE_BATCH) -> int:
+    """
+    Recompute every answer's tallies from AnswerVote and fix the ones that differ
+
+    Works through answers in id ranges so each transaction stays small.
+
+    Returns:
+        Number of answers corrected
+    """
+    from sqlalchemy import case, func
+    from app import db
+    from app.models import Answer, AnswerVote
+
+    answers = Answer.__table__
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in db.session.query(Answer.id).filter(Answer.id > last_id)
+               .order_by(Answer.id).limit(batch_size)]
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        counted = {
+            answer_id: (int(up or 0), int(down or 0))
+            for answer_id, up, down in db.session.query(
+                AnswerVote.answer_id,
+                func.sum(case((AnswerVote.vote_type == UPVOTE, 1), else_=0)),
+                func.sum(case((AnswerVote.vote_type == DOWNVOTE, 1), else_=0)))
+            .filter(AnswerVote.answer_id.between(ids[0], last_id))
+            .group_by(AnswerVote.answer_id)
+        }
+        stored = db.session.query(Answer.id, Answer.upvotes, Answer.downvotes, Answer.score)\
+            .filter(Answer.id.between(ids[0], last_id))
+        for answer_id, upvotes, downvotes, score in stored:
+            up, down = counted.get(answer_id, (0, 0))
+            if (upvotes, downvotes, score) != (up, down, up - down):
+                # Only if no vote changed the row since it was read; otherwise the next run looks again
+                result = db.session.execute(
+                    answers.update().where(answers.c.id == answer_id, answers.c.upvotes == upvotes,
+                                           answers.c.downvotes == downvotes, answers.c.score == score)
+                    .values(upvotes=up, downvotes=down, score=up - down))
+                fixed += result.rowcount
+        db.session.commit()
+
+    if fixed:
+        logger.warning("Vote reconciliation corrected %d answers", fixed)
+    else:
+        logger.info("Vote reconciliation found no drift")
+    return fixed
+
+
+class VoteReconciler:
+    """
+    Periodic reconcile_tallies() in a daemon thread
+
+    Configuration (app.config or environment):
+        VOTE_RECONCILE_SECONDS: Interval between runs (default 3600, 0 disables)
+    """
+
+    def __init__(self):
+        self.app = None
+        self.interval = float(os.environ.get('VOTE_RECONCILE_SECONDS', DEFAULT_RECONCILE_SECONDS))
+        self._thread = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.corrected = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = float(app.config.get('VOTE_RECONCILE_SECONDS', self.interval))
+        app.extensions['vote_reconciler'] = self
+        if self.interval > 0:
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='vote-reconciler', daemon=True)
+                    self._thread.start()
+
+    def run_once(self) -> int:
+        from app import db
+        with self.app.app_context():
+            try:
+                corrected = reconcile_tallies()
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Vote reconciliation failed: %s", e)
+                return 0
+        self.runs += 1
+        self.corrected += corrected
+        return corrected
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.run_once()
+
+
+vote_reconciler = VoteReconciler()
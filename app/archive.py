@@ -0,0 +1,616 @@
+"""
+Semester Archive
+Moves the activities, responses and Q&A of past-semester courses out of the live tables
+
+An archived course keeps its Course row and enrollments; its activities,
+responses, questions, answers and answer votes are written to one gzip
+compressed JSON Lines file under ARCHIVE_DIR and then removed from the
+live tables (app.deletion batches), so queries over the live tables only
+see current semesters. Course.archived_at marks the course.
+
+File layout (course_<id>.jsonl.gz):
+    {"manifest": {"course_id", "semester", "archived_at", "counts", "ids", "version"}}
+    {"table": "activity", "row": {...}}      activities, responses, questions,
+    ...                                      answers, votes, in that order
+
+The read path is transparent for the historic views: course pages, activity
+results, analytics and CSV exports and the Q&A list and question pages ask
+this module for their rows, which come from the live tables for live
+courses and from the archive (merged with anything added since) for
+archived ones. Archived rows are returned as detached, read-only model
+instances with their course and user relationships filled in, so
+templates render them unchanged. Parsed archives are kept in a small LRU
+keyed by file modification time.
+
+Archiving and restoring run from scripts/archive_semesters.py.
+
+Configuration (app.config or environment):
+    ARCHIVE_DIR: Archive directory (default <project>/data/archive)
+    ARCHIVE_CACHE_COURSES: Parsed archives kept in memory (default 4)
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'archive'))
+DEFAULT_CACHE_COURSES = 4
+ARCHIVE_VERSION = 1
+READ_BATCH = 5000
+INSERT_BATCH = 1000
+
+# Dependency order: restoring inserts in this order, archiving deletes in reverse
+TABLES = ('activity', 'response', 'question', 'answer', 'answer_vote')
+
+# Term order within a year; a winter term is counted at the start of the year it is named after
+TERMS = {
+    'winter': 0, '冬': 0,
+    'spring': 1, '春': 1,
+    'summer': 2, '夏': 2,
+    'fall': 3, 'autumn': 3, '秋': 3,
+}
+
+
+class ArchiveError(Exception):
+    """Raised when a course cannot be archived or restored"""
+
+
+def semester_key(semester: str) -> Optional[Tuple[int, int]]:
+    """
+    Sortable (year, term) of a free-text semester
+
+    Understands "2024 Fall", "Spring 2025", "2024秋", "2024年春季" and
+    academic years such as "2024-2025学年第一学期" (fall 2024) and
+    "2024-2025 第二学期" (spring 2025). Returns None when no year is found.
+    """
+    text = (semester or '').strip().lower()
+    academic = re.search(r'(\d{4})\s*[-–/~至]\s*(\d{4}).*?([一二12])', text)
+    if academic:
+        first, second = int(academic.group(1)), int(academic.group(2))
+        return (first, TERMS['fall']) if academic.group(3) in ('一', '1') else (second, TERMS['spring'])
+    year = re.search(r'(\d{4})', text)
+    if not year:
+        return None
+    term = next((order for name, order in TERMS.items() if name in text), TERMS['fall'])
+    return int(year.group(1)), term
+
+
+class ArchivePagination:
+    """The attributes of a Flask-SQLAlchemy pagination over an in-memory list"""
+
+    def __init__(self, items: list, page: int, per_page: int, total: int):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @classmethod
+    def of(cls, rows: list, page: int, per_page: int) -> 'ArchivePagination':
+        page = max(1, page)
+        start = (page - 1) * per_page
+        return cls(rows[start:start + per_page], page, per_page, len(rows))
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.total / self.per_page)) if self.total else 0
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+    @property
+    def prev_num(self) -> Optional[int]:
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def has_next(self) -> bool:
+        return self.page < self.pages
+
+    @property
+    def next_num(self) -> Optional[int]:
+        return self.page + 1 if self.has_next else None
+
+
+def _tables():
+    from app.models import Activity, Answer, AnswerVote, Question, Response
+    return {'activity': Activity, 'response': Response, 'question': Question, 'answer': Answer,
+            'answer_vote': AnswerVote}
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot archive {type(value).__name__}')
+
+
+def _decoders(model) -> Dict[str, callable]:
+    from sqlalchemy import Date, DateTime
+
+    decoders = {}
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime):
+            decoders[column.name] = datetime.datetime.fromisoformat
+        elif isinstance(column.type, Date):
+            decoders[column.name] = datetime.date.fromisoformat
+    return decoders
+
+
+class _CourseArchive:
+    """One parsed archive file, rows grouped for the read path"""
+
+    def __init__(self, manifest: dict, rows: Dict[str, List[dict]], mtime: float):
+        self.manifest = manifest
+        self.mtime = mtime
+        self.activities = {row['id']: row for row in rows['activity']}
+        self.questions = {row['id']: row for row in rows['question']}
+        self.responses: Dict[int, List[dict]] = {}
+        for row in rows['response']:
+            self.responses.setdefault(row['activity_id'], []).append(row)
+        self.answers: Dict[int, List[dict]] = {}
+        for row in rows['answer']:
+            self.answers.setdefault(row['question_id'], []).append(row)
+        self.votes = rows['answer_vote']
+
+
+class ArchiveStore:
+    """
+    Writes, reads and restores course archives
+
+    Configuration (app.config or environment): see module docstring.
+    """
+
+    def __init__(self):
+        self.directory = os.environ.get('ARCHIVE_DIR', DEFAULT_ARCHIVE_DIR)
+        self.cache_courses = int(os.environ.get('ARCHIVE_CACHE_COURSES', DEFAULT_CACHE_COURSES))
+        self._cache: 'OrderedDict[int, _CourseArchive]' = OrderedDict()
+        self._index: Dict[Tuple[str, int], int] = {}
+        self._index_stamp = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.directory = app.config.get('ARCHIVE_DIR', self.directory)
+        self.cache_courses = int(app.config.get('ARCHIVE_CACHE_COURSES', self.cache_courses))
+        app.extensions['archive_store'] = self
+
+    def path(self, course_id: int) -> str:
+        return os.path.join(self.directory, f'course_{course_id}.jsonl.gz')
+
+    # ---- archiving ----
+
+    @staticmethod
+    def _course_rows(course_id: int) -> Iterator[Tuple[str, dict]]:
+        """Every row of the course's content, table by table in dependency order"""
+        from sqlalchemy import select
+        from app import db
+
+        models = _tables()
+        activity, question, answer = (models[name].__table__ for name in ('activity', 'question', 'answer'))
+        conditions = {
+            'activity': activity.c.course_id == course_id,
+            'response': models['response'].__table__.c.activity_id.in_(
+                select(activity.c.id).where(activity.c.course_id == course_id)),
+            'question': question.c.course_id == course_id,
+            'answer': answer.c.question_id.in_(select(question.c.id).where(question.c.course_id == course_id)),
+            'answer_vote': models['answer_vote'].__table__.c.answer_id.in_(
+                select(answer.c.id).where(answer.c.question_id.in_(
+                    select(question.c.id).where(question.c.course_id == course_id)))),
+        }
+        for name in TABLES:
+            table = models[name].__table__
+            last_id = 0
+            while True:
+                rows = db.session.execute(select(table).where(conditions[name], table.c.id > last_id)
+                                          .order_by(table.c.id).limit(READ_BATCH)).mappings().all()
+                for row in rows:
+                    yield name, dict(row)
+                if len(rows) < READ_BATCH:
+                    break
+                last_id = rows[-1]['id']
+
+    def archive_course(self, course_id: int, progress=None) -> dict:
+        """
+        Write the course's content to its archive file, then remove it from the live tables
+
+        The file is written and read back completely before anything is
+        deleted. Returns the manifest.
+        """
+        from app import db, get_beijing_time
+        from app.deletion import plan_course_content
+        from app.join_tokens import join_token_resolver
+        from app.models import Course
+        from app.page_cache import page_cache
+        from app.qa_search import qa_search
+        from app.question_similarity import question_similarity
+
+        course = db.session.get(Course, course_id)
+        if course is None:
+            raise ArchiveError(f'Course {course_id} does not exist')
+        if course.archived_at is not None and os.path.exists(self.path(course_id)):
+            raise ArchiveError(f'Course {course_id} is already archived')
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(course_id)
+        temp_path = f'{path}.tmp'
+        counts = {name: 0 for name in TABLES}
+        ids = {'activity': [], 'question': []}
+        rows = []
+        for name, row in self._course_rows(course_id):
+            counts[name] += 1
+            if name in ids:
+                ids[name].append(row['id'])
+            rows.append((name, row))
+        manifest = {'course_id': course_id, 'semester': course.semester, 'name': course.name,
+                    'archived_at': get_beijing_time().isoformat(), 'counts': counts, 'ids': ids,
+                    'version': ARCHIVE_VERSION}
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'manifest': manifest}, ensure_ascii=False) + '\n')
+            for name, row in rows:
+                f.write(json.dumps({'table': name, 'row': row}, default=_encode, ensure_ascii=False) + '\n')
+        del rows
+        with open(temp_path, 'rb') as f:
+            os.fsync(f.fileno())
+
+        read_back = self._read(temp_path)
+        read_counts = {'activity': len(read_back.activities), 'question': len(read_back.questions),
+                       'response': sum(map(len, read_back.responses.values())),
+                       'answer': sum(map(len, read_back.answers.values())), 'answer_vote': len(read_back.votes)}
+        if read_counts != counts:
+            os.unlink(temp_path)
+            raise ArchiveError(f'Archive of course {course_id} did not read back ({read_counts} != {counts})')
+        os.replace(temp_path, path)
+
+        # Switch readers to the archive, then empty the live tables
+        course.archived_at = get_beijing_time()
+        db.session.commit()
+        plan = plan_course_content(course_id)
+        live = plan.counts()
+        if (live['activities'], live['responses'], live['questions'], live['answers'], live['answer votes']) != \
+                tuple(counts[name] for name in TABLES):
+            course.archived_at = None
+            db.session.commit()
+            os.unlink(path)
+            raise ArchiveError(f'Course {course_id} changed while it was being archived, run again')
+        plan.run(progress=progress)
+
+        join_token_resolver.invalidate_course(course_id)
+        qa_search.remove_course(course_id)
+        question_similarity.forget_course(course_id)
+        page_cache.bump([course_id])
+        self._forget(course_id)
+        logger.info("Archived course %d (%s): %s", course_id, course.semester,
+                    ', '.join(f'{name} {count}' for name, count in counts.items()))
+        return manifest
+
+    def restore_course(self, course_id: int) -> Dict[str, int]:
+        """Put an archived course's rows back into the live tables and remove the archive file"""
+        from app import db
+        from app.models import Course
+        from app.page_cache import page_cache
+        from app.qa_search import qa_search
+        from app.question_similarity import question_similarity
+
+        course = db.session.get(Course, course_id)
+        path = self.path(course_id)
+        if course is None:
+            raise ArchiveError(f'Course {course_id} does not exist')
+        if not os.path.exists(path):
+            raise ArchiveError(f'Course {course_id} has no archive in {self.directory}')
+
+        models = _tables()
+        archive = self._read(path)
+        tables = {
+            'activity': list(archive.activities.values()),
+            'response': [row for rows in archive.responses.values() for row in rows],
+            # best_answer_id points at an answer that is not back yet
+            'question': [dict(row, best_answer_id=None) for row in archive.questions.values()],
+            'answer': [row for rows in archive.answers.values() for row in rows],
+            'answer_vote': archive.votes,
+        }
+        for name in TABLES:
+            table = models[name].__table__
+            ids = [row['id'] for row in tables[name]]
+            for start in range(0, len(ids), INSERT_BATCH):
+                taken = db.session.query(table.c.id).filter(table.c.id.in_(ids[start:start + INSERT_BATCH])).first()
+                if taken:
+                    raise ArchiveError(f'{name} {taken[0]} of course {course_id} exists in the live table again; '
+                                       f'its id was reused, restore needs manual merging')
+
+        counts = {}
+        for name in TABLES:
+            table = models[name].__table__
+            rows = tables[name]
+            for start in range(0, len(rows), INSERT_BATCH):
+                db.session.execute(table.insert(), rows[start:start + INSERT_BATCH])
+                db.session.commit()
+            counts[name] = len(rows)
+        question = models['question'].__table__
+        for row in archive.questions.values():
+            if row.get('best_answer_id'):
+                db.session.execute(question.update().where(question.c.id == row['id'])
+                                   .values(best_answer_id=row['best_answer_id']))
+        course.archived_at = None
+        db.session.commit()
+
+        os.unlink(path)
+        qa_search.index_course(course_id)
+        question_similarity.forget_course(course_id)
+        page_cache.bump([course_id])
+        self._forget(course_id)
+        logger.info("Restored course %d: %s", course_id, ', '.join(f'{name} {count}' for name, count in counts.items()))
+        return counts
+
+    def manifests(self) -> List[dict]:
+        """Manifests of every archive file, by course id"""
+        if not os.path.isdir(self.directory):
+            return []
+        manifests = []
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.startswith('course_') and filename.endswith('.jsonl.gz'):
+                path = os.path.join(self.directory, filename)
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    manifest = json.loads(f.readline())['manifest']
+                manifest['bytes'] = os.path.getsize(path)
+                manifests.append(manifest)
+        return sorted(manifests, key=lambda manifest: manifest['course_id'])
+
+    # ---- reading ----
+
+    @staticmethod
+    def _read(path: str) -> _CourseArchive:
+        models = _tables()
+        decoders = {name: _decoders(model) for name, model in models.items()}
+        rows = {name: [] for name in TABLES}
+        mtime = os.path.getmtime(path)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            manifest = json.loads(f.readline())['manifest']
+            for line in f:
+                record = json.loads(line)
+                name, row = record['table'], record['row']
+                for column, decode in decoders[name].items():
+                    if row.get(column) is not None:
+                        row[column] = decode(row[column])
+                rows[name].append(row)
+        return _CourseArchive(manifest, rows, mtime)
+
+    def _load(self, course_id: int) -> Optional[_CourseArchive]:
+        path = self.path(course_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            archive = self._cache.get(course_id)
+            if archive is not None and archive.mtime == mtime:
+                self._cache.move_to_end(course_id)
+                self.hits += 1
+                return archive
+            self.misses += 1
+        archive = self._read(path)
+        with self._lock:
+            self._cache[course_id] = archive
+            while len(self._cache) > self.cache_courses:
+                self._cache.popitem(last=False)
+        return archive
+
+    def _forget(self, course_id: int):
+        with self._lock:
+            self._cache.pop(course_id, None)
+            self._index_stamp = None
+
+    def _course_of(self, kind: str, object_id: int) -> Optional[int]:
+        """Archived course holding an activity or question, from the manifests"""
+        try:
+            stamp = tuple((entry.name, entry.stat().st_mtime) for entry in os.scandir(self.directory))
+        except OSError:
+            return None
+        with self._lock:
+            if stamp != self._index_stamp:
+                self._index = {(name, object_id_): manifest['course_id'] for manifest in self.manifests()
+                               for name, ids in manifest['ids'].items() for object_id_ in ids}
+                self._index_stamp = stamp
+            return self._index.get((kind, object_id))
+
+    # ---- model instances for the read path ----
+
+    @staticmethod
+    def _users(ids) -> dict:
+        from app.models import User
+
+        ids = list(set(ids))
+        users = {}
+        for start in range(0, len(ids), INSERT_BATCH):
+            users.update((user.id, user) for user in User.query.filter(User.id.in_(ids[start:start + INSERT_BATCH])))
+        return users
+
+    @staticmethod
+    def _instance(model, row: dict, **related):
+        from sqlalchemy.orm.attributes import set_committed_value
+
+        instance = model(**row)
+        instance.is_archived = True
+        for name, value in related.items():
+            set_committed_value(instance, name, value)
+        return instance
+
+    def _activity(self, row: dict, course):
+        from app.models import Activity
+        return self._instance(Activity, row, course=course)
+
+    def _question(self, row: dict, course, users: dict):
+        from app.models import Question
+        return self._instance(Question, row, course=course, author=users.get(row['author_id']))
+
+    @staticmethod
+    def course_is_archived(course) -> bool:
+        return course is not None and course.archived_at is not None
+
+    def course_activities(self, course, newest_first: bool = True) -> list:
+        """Live and archived activities of a course"""
+        from app.models import Activity
+
+        activities = Activity.query.filter_by(course_id=course.id).order_by(Activity.created_at.desc()).all()
+        archive = self._load(course.id) if self.course_is_archived(course) else None
+        if archive is None:
+            return activities if newest_first else activities[::-1]
+        activities += [self._activity(row, course) for row in archive.activities.values()]
+        activities.sort(key=lambda activity: activity.created_at or datetime.datetime.min, reverse=newest_first)
+        return activities
+
+    def get_activity(self, activity_id: int, options: Sequence = ()):
+        """Live activity (loaded with options and its course), or archived one (with .is_archived set), or None"""
+        from sqlalchemy.orm import joinedload
+        from sqlalchemy.orm.attributes import set_committed_value
+        from app import db
+        from app.models import Activity, Course, Response
+
+        # Callers check activity.course for permissions, so load it with the activity
+        activity = db.session.get(Activity, activity_id, options=list(options) or [joinedload(Activity.course)])
+        if activity is not None:
+            return activity
+        course_id = self._course_of('activity', activity_id)
+        course = db.session.get(Course, course_id) if course_id is not None else None
+        archive = self._load(course_id) if self.course_is_archived(course) else None
+        if archive is None or activity_id not in archive.activities:
+            return None
+        activity = self._activity(archive.activities[activity_id], course)
+        # activity.responses for templates that count them (students are loaded by activity_responses)
+        set_committed_value(activity, 'responses', [self._instance(Response, row, activity=activity)
+                                                    for row in archive.responses.get(activity_id, [])])
+        return activity
+
+    def get_activity_or_404(self, activity_id: int, options: Sequence = ()):
+        from flask import abort
+        activity = self.get_activity(activity_id, options)
+        if activity is None:
+            abort(404)
+        return activity
+
+    def _archived_responses(self, activity) -> List[dict]:
+        archive = self._load(activity.course_id)
+        return archive.responses.get(activity.id, []) if archive is not None else []
+
+    def activity_responses(self, activity, with_students: bool = True) -> list:
+        """Responses of a live or archived activity"""
+        from app.loading import load_profile
+        from app.models import Response
+
+        if not activity.is_archived:
+            query = Response.query.filter_by(activity_id=activity.id)
+            if with_students:
+                query = query.options(*load_profile('activity_responses'))
+            return query.all()
+        rows = self._archived_responses(activity)
+        users = self._users(row['student_id'] for row in rows) if with_students else {}
+        return [self._instance(Response, row, activity=activity, student=users.get(row['student_id']))
+                for row in rows]
+
+    def response_count(self, activity) -> int:
+        from app.models import Response
+
+        if not activity.is_archived:
+            return Response.query.filter_by(activity_id=activity.id).count()
+        return len(self._archived_responses(activity))
+
+    def student_response(self, activity, student_id: int):
+        from app.models import Response
+
+        if not activity.is_archived:
+            return Response.query.filter_by(student_id=student_id, activity_id=activity.id).first()
+        for row in self._archived_responses(activity):
+            if row['student_id'] == student_id:
+                return self._instance(Response, row, activity=activity)
+        return None
+
+    def course_questions(self, course, page: int, per_page: int, options: Sequence = ()):
+        """Newest-first page of a course's live (loaded with options) and archived questions"""
+        from app.models import Question
+
+        query = Question.query.filter_by(course_id=course.id).options(*options).order_by(Question.created_at.desc())
+        archive = self._load(course.id) if self.course_is_archived(course) else None
+        if archive is None:
+            return query.paginate(page=page, per_page=per_page, error_out=False)
+        rows = sorted(archive.questions.values(), key=lambda row: row['created_at'] or datetime.datetime.min,
+                      reverse=True)
+        live = query.all()
+        if live:
+            rows = live + rows  # added after archiving, so newer
+        pagination = ArchivePagination.of(rows, page, per_page)
+        users = self._users(author_id for row in pagination.items if isinstance(row, dict)
+                            for author_id in self._author_ids(row, archive))
+        pagination.items = [self._question_with_answers(row, course, users, archive) if isinstance(row, dict) else row
+                            for row in pagination.items]
+        return pagination
+
+    @staticmethod
+    def _author_ids(row: dict, archive: _CourseArchive) -> List[int]:
+        return [row['author_id']] + [answer['author_id'] for answer in archive.answers.get(row['id'], [])]
+
+    def _question_with_answers(self, row: dict, course, users: dict, archive: _CourseArchive):
+        """Archived question with its answers; users must hold the authors of both"""
+        from sqlalchemy.orm.attributes import set_committed_value
+        from app.models import Answer
+
+        question = self._question(row, course, users)
+        set_committed_value(question, 'answers', [
+            self._instance(Answer, answer, question=question, author=users.get(answer['author_id']))
+            for answer in archive.answers.get(row['id'], [])])
+        return question
+
+    def get_question(self, question_id: int, options: Sequence = ()):
+        """Live question (loaded with options), or archived one with its answers, or None"""
+        from app import db
+        from app.models import Course, Question
+
+        question = db.session.get(Question, question_id, options=list(options))
+        if question is not None:
+            return question
+        course_id = self._course_of('question', question_id)
+        course = db.session.get(Course, course_id) if course_id is not None else None
+        archive = self._load(course_id) if self.course_is_archived(course) else None
+        if archive is None or question_id not in archive.questions:
+            return None
+        row = archive.questions[question_id]
+        return self._question_with_answers(row, course, self._users(self._author_ids(row, archive)), archive)
+
+    def get_question_or_404(self, question_id: int, options: Sequence = ()):
+        from flask import abort
+        question = self.get_question(question_id, options)
+        if question is None:
+            abort(404)
+        return question
+
+    def question_answers(self, question, page: int, per_page: int, options: Sequence = ()):
+        """
+        Best answer and a page of the other answers by score (live answers loaded with options)
+
+        Returns:
+            (best answer or None, pagination of the others)
+        """
+        from app.models import Answer
+
+        if not question.is_archived:
+            query = Answer.query.filter_by(question_id=question.id).options(*options)\
+                .order_by(Answer.score.desc(), Answer.created_at.asc())
+            best = None
+            if question.best_answer_id:
+                best = Answer.query.options(*options).get(question.best_answer_id)
+                query = query.filter(Answer.id != question.best_answer_id)
+            return best, query.paginate(page=page, per_page=per_page, error_out=False)
+        answers = sorted(question.answers, key=lambda answer: (-(answer.score or 0),
+                                                               answer.created_at or datetime.datetime.min))
+        best = next((answer for answer in answers if answer.id == question.best_answer_id), None)
+        return best, ArchivePagination.of([answer for answer in answers if answer is not best], page, per_page)
+
+
+archive_store = ArchiveStore()
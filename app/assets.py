@@ -0,0 +1,157 @@
+"""
+Static Asset Bundles
+Fingerprinted, precompressed page scripts and styles, and a Jinja bytecode cache shared by the workers
+
+Page scripts and styles live in static/css and static/js and are grouped
+into named bundles (BUNDLES). At startup each bundle is concatenated, named
+after its content hash (activity_detail.3f9c2a1b07.js) and compressed once
+with gzip, and with brotli when the package is installed. Templates link
+bundles by name:
+
+    <script src="{{ asset_url('activity_detail.js') }}"></script>
+
+The URL changes whenever the content does, so /assets/ responses may be
+cached for a year (immutable). The precompressed copy matching the
+request's Accept-Encoding is sent as is. In debug mode bundles are rebuilt
+when a source file changes.
+
+Compiled templates are stored in JINJA_CACHE_DIR (jinja2's
+FileSystemBytecodeCache, atomic writes), so a worker that starts later
+loads the compiled code instead of compiling every template again. An
+empty JINJA_CACHE_DIR turns this off.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from typing import Dict, NamedTuple, Tuple
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_SOURCE_DIR = os.path.join(PROJECT_DIR, 'static')
+DEFAULT_JINJA_CACHE_DIR = os.path.join(PROJECT_DIR, 'cache', 'jinja')
+DEFAULT_MAX_AGE = 365 * 24 * 3600
+
+# bundle name -> source files under static/, concatenated in order
+BUNDLES: Dict[str, Tuple[str, ...]] = {
+    'activity_detail.css': ('css/activity_detail.css',),
+    'activity_detail.js': ('js/activity_socket.js', 'js/activity_countdown.js'),
+    'activity_detail_student.js': ('js/activity_detail_student.js',),
+    'activity_detail_instructor.js': ('js/activity_detail_instructor.js', 'js/activity_qr_code.js'),
+    'memory_game.js': ('js/memory_game.js',),
+    'create_activity.css': ('css/create_activity.css',),
+    'create_activity.js': ('js/create_activity.js',),
+}
+
+
+class Asset(NamedTuple):
+    filename: str
+    mimetype: str
+    digest: str
+    body: bytes
+    encoded: Dict[str, bytes]  # content coding -> precompressed body
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    """Precompressed copies that are smaller than the body, best coding first"""
+    encoded = {}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(body, quality=11)
+    encoded['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+    return {coding: data for coding, data in encoded.items() if len(data) < len(body)}
+
+
+class AssetPipeline:
+    """Bundle builder, asset_url() template global and the /assets/ endpoint"""
+
+    def __init__(self):
+        self.source_dir = os.environ.get('ASSET_SOURCE_DIR', DEFAULT_SOURCE_DIR)
+        self.max_age = int(os.environ.get('ASSET_MAX_AGE', DEFAULT_MAX_AGE))
+        self.jinja_cache_dir = os.environ.get('JINJA_CACHE_DIR', DEFAULT_JINJA_CACHE_DIR)
+        self.auto_rebuild = False
+        self._bundles: Dict[str, Asset] = {}
+        self._files: Dict[str, Asset] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from flask import Response, abort, request
+
+        self.source_dir = app.config.get('ASSET_SOURCE_DIR', self.source_dir)
+        self.max_age = int(app.config.get('ASSET_MAX_AGE', self.max_age))
+        self.jinja_cache_dir = app.config.get('JINJA_CACHE_DIR', self.jinja_cache_dir)
+        self.auto_rebuild = app.debug
+        self.build()
+
+        if self.jinja_cache_dir:
+            from jinja2 import FileSystemBytecodeCache
+            try:
+                os.makedirs(self.jinja_cache_dir, exist_ok=True)
+                app.jinja_env.bytecode_cache = FileSystemBytecodeCache(self.jinja_cache_dir)
+            except OSError as e:
+                logger.warning("Jinja bytecode cache disabled, cannot use %s: %s", self.jinja_cache_dir, e)
+        app.add_template_global(self.asset_url, 'asset_url')
+
+        def asset_endpoint(filename):
+            asset = self._files.get(filename)
+            if asset is None:
+                abort(404)
+            coding = next((coding for coding in asset.encoded if request.accept_encodings[coding]), None)
+            response = Response(asset.encoded[coding] if coding else asset.body, mimetype=asset.mimetype)
+            if coding:
+                response.headers['Content-Encoding'] = coding
+            response.headers['Vary'] = 'Accept-Encoding'
+            response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+            response.set_etag(f'{asset.digest}-{coding}' if coding else asset.digest)
+            return response.make_conditional(request)
+
+        app.add_url_rule('/assets/<path:filename>', 'assets', asset_endpoint)
+        app.extensions['assets'] = self
+
+    # ---- bundles ----
+
+    def build(self):
+        """Concatenate, fingerprint and precompress every bundle"""
+        bundles, files, mtimes = {}, {}, {}
+        for name, sources in BUNDLES.items():
+            parts = []
+            for source in sources:
+                path = os.path.join(self.source_dir, source)
+                with open(path, 'rb') as file:
+                    parts.append(file.read())
+                mtimes[path] = os.path.getmtime(path)
+            body = b'\n'.join(parts)
+            digest = hashlib.sha256(body).hexdigest()[:10]
+            stem, extension = os.path.splitext(name)
+            filename = f'{stem}.{digest}{extension}'
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            bundles[name] = files[filename] = Asset(filename, mimetype, digest, body, _compress(body))
+        with self._lock:
+            self._bundles, self._files, self._mtimes = bundles, files, mtimes
+        logger.debug("Built %d asset bundles (%s)", len(bundles), 'gzip, br' if brotli else 'gzip')
+
+    def _changed(self) -> bool:
+        try:
+            return any(os.path.getmtime(path) != mtime for path, mtime in self._mtimes.items())
+        except OSError:
+            return True
+
+    def asset_url(self, name: str) -> str:
+        """Fingerprinted URL of a bundle"""
+        from flask import url_for
+
+        if self.auto_rebuild and self._changed():
+            self.build()
+        return url_for('assets', filename=self._bundles[name].filename)
+
+
+asset_pipeline = AssetPipeline()
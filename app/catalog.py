@@ -0,0 +1,121 @@
+"""
+Course Catalog
+Courses a student can still enroll in, with text search, semester filter and keyset pages
+
+One page is one query on course ids: courses without an enrollment of the
+student (NOT EXISTS on the enrollment (student_id, course_id) index),
+optionally matching every search term in the name or description and a
+semester, newest first, after the cursor (the last id of the previous
+page). There is no OFFSET and no total count, so deep pages cost the same
+as the first and the page does not scan the whole table to number them.
+
+Course cards are rendered once per course version (app.page_cache) and
+shared by all students; only the ids of missing cards are loaded, with
+their instructors. Archived courses are not listed.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 48
+MAX_TERMS = 5
+MAX_TERM_LENGTH = 50
+SEMESTERS_TTL_SECONDS = 60.0
+
+
+def search_terms(query: str) -> List[str]:
+    """Up to MAX_TERMS whitespace-separated terms of a search box"""
+    terms = []
+    for term in (query or '').split():
+        term = term[:MAX_TERM_LENGTH]
+        if term.lower() not in (t.lower() for t in terms):
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+class CourseCatalog:
+    """Catalog queries and cached course cards"""
+
+    def __init__(self):
+        self.page_size = int(os.environ.get('CATALOG_PAGE_SIZE', DEFAULT_PAGE_SIZE))
+        self._semesters: Optional[Tuple[List[str], float]] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.page_size = int(app.config.get('CATALOG_PAGE_SIZE', self.page_size))
+        app.extensions['course_catalog'] = self
+
+    def page(self, student_id: int, query: str = '', semester: str = '', after: Optional[int] = None,
+             limit: Optional[int] = None) -> Tuple[List[int], Optional[int]]:
+        """
+        Ids of one catalog page
+
+        Returns:
+            (course ids newest first, cursor of the next page or None)
+        """
+        from sqlalchemy import exists, or_
+        from app import db
+        from app.models import Course, Enrollment
+
+        limit = min(max(limit or self.page_size, 1), MAX_PAGE_SIZE)
+        enrolled = exists().where(Enrollment.course_id == Course.id, Enrollment.student_id == student_id)
+        ids = db.session.query(Course.id).filter(~enrolled, Course.archived_at.is_(None))
+        for term in search_terms(query):
+            pattern = _like_pattern(term)
+            ids = ids.filter(or_(Course.name.ilike(pattern, escape='\\'),
+                                 Course.description.ilike(pattern, escape='\\')))
+        if semester:
+            ids = ids.filter(Course.semester == semester)
+        if after:
+            ids = ids.filter(Course.id < after)
+        course_ids = [course_id for (course_id,) in ids.order_by(Course.id.desc()).limit(limit + 1)]
+        if len(course_ids) > limit:
+            return course_ids[:limit], course_ids[limit - 1]
+        return course_ids, None
+
+    def semesters(self) -> List[str]:
+        """Semesters of live courses, newest first (refreshed every SEMESTERS_TTL_SECONDS)"""
+        from app import db
+        from app.archive import semester_key
+        from app.models import Course
+
+        with self._lock:
+            if self._semesters is not None and self._semesters[1] > time.monotonic():
+                return self._semesters[0]
+        rows = db.session.query(Course.semester).filter(Course.archived_at.is_(None)).distinct().all()
+        semesters = sorted((semester for (semester,) in rows if semester),
+                           key=lambda semester: (semester_key(semester) or (0, 0), semester), reverse=True)
+        with self._lock:
+            self._semesters = (semesters, time.monotonic() + SEMESTERS_TTL_SECONDS)
+        return semesters
+
+    def cards(self, course_ids: List[int]) -> list:
+        """Rendered cards of the courses, in order; courses deleted meanwhile are left out"""
+        from flask import render_template
+        from app.loading import load_profile
+        from app.models import Course
+        from app.page_cache import page_cache
+
+        keys = [page_cache.course_key('catalog_card', course_id, 'student') for course_id in course_ids]
+
+        def render(missing):
+            courses = {course.id: course for course in Course.query.options(*load_profile('catalog_cards'))
+                       .filter(Course.id.in_([key[2] for key in missing]))}
+            return {key: render_template('courses/catalog_card.html', course=courses[key[2]])
+                    for key in missing if key[2] in courses}
+
+        return page_cache.fragments(keys, render)
+
+
+course_catalog = CourseCatalog()
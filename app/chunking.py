@@ -0,0 +1,122 @@
+"""
+Teaching Text Chunker
+Split long teaching documents into prompt-sized chunks along their structure
+
+Boundaries are tried from coarse to fine: slide markers and page breaks,
+headings, blank-line paragraphs, sentences, and finally a hard split. Pieces
+are packed greedily so each chunk stays within a token budget while keeping
+neighbouring sections together.
+"""
+
+import os
+import re
+from typing import List
+
+# Token budget per chunk (prompt instructions and the answer come on top)
+CHUNK_TOKENS = int(os.environ.get('AI_CHUNK_TOKENS', 1500))
+
+# Slide markers written by the PPTX extractor and form feeds between PDF pages
+PAGE_BREAK_RE = re.compile(r'\f|(?=^=== Slide \d+ ===$)', re.MULTILINE)
+
+# Markdown headings, numbered headings ("1.", "2.3 ", "Chapter 4") and short all-caps lines
+HEADING_RE = re.compile(
+    r'(?=^(?:#{1,6}\s+\S|(?i:chapter|section|part|lecture)\s+\d+\b|\d+(?:\.\d+)*\.?\s+[A-Z一-鿿]'
+    r'|第[一二三四五六七八九十百\d]+[章节部分讲]|[A-Z][A-Z0-9 ,:&-]{3,60}$))',
+    re.MULTILINE
+)
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+SENTENCE_RE = re.compile(r'(?<=[.!?。！？])\s+|(?<=[。！？])')
+CJK_RE = re.compile(r'[　-〿一-鿿＀-￯]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate without a tokenizer
+
+    CJK characters are roughly one token each; other text averages about
+    four characters per token for GPT-style tokenizers.
+    """
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _split(text: str, pattern) -> List[str]:
+    return [part for part in pattern.split(text) if part.strip()]
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    """Last resort: cut by characters, preferring whitespace near the limit"""
+    pieces = []
+    while estimate_tokens(text) > max_tokens:
+        ratio = max_tokens / estimate_tokens(text)
+        cut = max(1, int(len(text) * ratio))
+        space = text.rfind(' ', cut // 2, cut)
+        if space > 0:
+            cut = space
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text.strip():
+        pieces.append(text)
+    return pieces
+
+
+SPLITTERS = (PAGE_BREAK_RE, HEADING_RE, PARAGRAPH_RE, SENTENCE_RE)
+
+
+def _pieces(text: str, max_tokens: int, level: int = 0) -> List[str]:
+    """Split text at the coarsest boundary level that yields pieces within the budget"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    if level >= len(SPLITTERS):
+        return _hard_split(text, max_tokens)
+
+    parts = _split(text, SPLITTERS[level])
+    if len(parts) <= 1:
+        return _pieces(text, max_tokens, level + 1)
+
+    pieces = []
+    for part in parts:
+        pieces.extend(_pieces(part, max_tokens, level + 1))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens estimated tokens
+
+    Args:
+        text: Extracted teaching text
+        max_tokens: Token budget per chunk
+
+    Returns:
+        Chunks in document order (a single chunk when the text already fits)
+    """
+    text = (text or '').strip()
+    if not text:
+        return []
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in _pieces(text, max_tokens):
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(''.join(current).strip())
+            current, current_tokens = [], 0
+        current.append(piece if piece.endswith('\n') else piece + '\n')
+        current_tokens += tokens
+    if current:
+        chunks.append(''.join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def sample_chunks(chunks: List[str], limit: int) -> List[str]:
+    """Keep at most limit chunks, evenly spread over the document so every part is covered"""
+    if limit <= 0 or len(chunks) <= limit:
+        return chunks
+    step = len(chunks) / limit
+    return [chunks[int(i * step)] for i in range(limit)]
+
+
+def fit_to_budget(text: str, max_tokens: int) -> str:
+    """Leading part of text that fits max_tokens, cut at a structural boundary"""
+    chunks = chunk_text(text, max_tokens)
+    return chunks[0] if chunks else ''
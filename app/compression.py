@@ -0,0 +1,182 @@
+"""
+HTTP Compression and Conditional GET
+gzip/brotli response bodies, weak ETags and 304 Not Modified for every blueprint
+
+After each view, a GET/HEAD 200 response without an ETag gets a weak one
+hashed from its body. A request whose If-None-Match names it is answered
+with 304 and no body, so status polls and reloaded pages whose data did
+not change cost a few header bytes. Textual bodies (HTML, JSON, CSV, CSS,
+JavaScript, SVG) of at least HTTP_COMPRESSION_MIN_SIZE bytes are then
+compressed with the best coding the client accepts: brotli when the
+package is installed, otherwise gzip. A strong ETag set by the view gets
+the coding appended ("<etag>-gzip"), since it must differ per encoding.
+Streamed, file and already encoded responses (the /assets/ bundles) pass
+through untouched.
+
+Views that know the versions of what they show can skip the work
+entirely; the page cache versions change with every commit to a course:
+
+    response = http_compression.not_modified(cache_key, current_user.id)
+    if response is not None:
+        return response
+
+Version ETags are only trusted for PAGE_CACHE_TTL seconds and by the
+process that issued them, since other workers learn about changes no
+sooner than that (app.page_cache).
+
+Per blueprint (HTTP_COMPRESSION_BLUEPRINTS, e.g. "auth=off,jobs=etag,
+activities=256"): "off" leaves responses alone, "etag" adds ETags and 304s
+without compressing, a number sets that blueprint's size threshold.
+Endpoints outside a blueprint (/metrics, /assets/) are named "app".
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import Dict, Hashable, Optional, Tuple, Union
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # per response, so fast rather than smallest (the asset bundles use 11)
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html', 'text/plain', 'text/csv', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'image/svg+xml',
+})
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+ETAG_ONLY = 'etag'
+OFF = 'off'
+
+# Version ETags from an earlier process (or deploy) never match
+_PROCESS_TOKEN = uuid.uuid4().hex
+
+
+def _parse_blueprints(spec: Union[str, Dict[str, Union[str, int]]]) -> Dict[str, Union[str, int]]:
+    if isinstance(spec, dict):
+        return dict(spec)
+    settings = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, value = (part.strip() for part in item.split('=', 1))
+            settings[name] = int(value) if value.isdigit() else value.lower()
+    return settings
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class HttpCompression:
+    """after_request hook for ETags, 304s and content-negotiated compression"""
+
+    def __init__(self):
+        self.enabled = os.environ.get('HTTP_COMPRESSION', '1') != '0'
+        self.min_size = int(os.environ.get('HTTP_COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE))
+        self.blueprints = _parse_blueprints(os.environ.get('HTTP_COMPRESSION_BLUEPRINTS', ''))
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('HTTP_COMPRESSION', self.enabled))
+        self.min_size = int(app.config.get('HTTP_COMPRESSION_MIN_SIZE', self.min_size))
+        self.blueprints = _parse_blueprints(app.config.get('HTTP_COMPRESSION_BLUEPRINTS', self.blueprints))
+        # Registered after the metrics and profiler hooks, so it runs before them and they see the 304s
+        app.after_request(self._process)
+        app.extensions['http_compression'] = self
+
+    def settings_for(self, blueprint: Optional[str]) -> Tuple[bool, Optional[int]]:
+        """(ETags and 304s on, compression threshold or None) for a blueprint"""
+        if not self.enabled:
+            return False, None
+        setting = self.blueprints.get(blueprint or 'app', self.min_size)
+        if setting == OFF:
+            return False, None
+        if setting == ETAG_ONLY:
+            return True, None
+        return True, int(setting)
+
+    # ---- version ETags ----
+
+    def not_modified(self, *versions: Hashable):
+        """
+        304 response when the client's copy was rendered from these versions
+
+        Otherwise the versions become the ETag of the view's response and
+        None is returned. Pending flash messages always get a full page.
+        """
+        from flask import Response, g, request, session
+        from app.page_cache import page_cache
+
+        if (not self.settings_for(request.blueprint)[0] or not page_cache.enabled
+                or request.method not in CONDITIONAL_METHODS or session.get('_flashes')):
+            return None
+        window = int(time.time() // page_cache.ttl)
+        digest = hashlib.blake2b(repr((_PROCESS_TOKEN, window) + versions).encode('utf-8'), digest_size=12).hexdigest()
+        g.version_etag = etag = f'v-{digest}'
+        if not request.if_none_match.contains_weak(etag):
+            return None
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    # ---- response hook ----
+
+    def _process(self, response):
+        from flask import g, request
+
+        conditional, min_size = self.settings_for(request.blueprint)
+        if not conditional or response.direct_passthrough or response.is_streamed:
+            return response
+        if (request.method in CONDITIONAL_METHODS and response.status_code == 200
+                and 'ETag' not in response.headers):
+            version_etag = g.pop('version_etag', None)
+            if version_etag:
+                response.set_etag(version_etag, weak=True)
+            else:
+                digest = hashlib.blake2b(response.get_data(), digest_size=12).hexdigest()
+                response.set_etag(digest, weak=True)
+            response.make_conditional(request)
+        if min_size is not None and self._compressible(response, min_size):
+            response.vary.add('Accept-Encoding')
+            coding = self._negotiate(request)
+            if coding:
+                etag, weak = response.get_etag()
+                if etag and not weak:
+                    # A strong ETag names one representation (as for the /assets/ bundles)
+                    response.set_etag(f'{etag}-{coding}')
+                    if request.method in CONDITIONAL_METHODS:
+                        response.make_conditional(request)
+                        if response.status_code == 304:
+                            return response
+                response.set_data(compress(response.get_data(), coding))
+                response.headers['Content-Encoding'] = coding
+        return response
+
+    @staticmethod
+    def _compressible(response, min_size: int) -> bool:
+        return (200 <= response.status_code < 300 and response.status_code != 204
+                and response.mimetype in COMPRESSIBLE_TYPES
+                and 'Content-Encoding' not in response.headers
+                and 'no-transform' not in response.headers.get('Cache-Control', '')
+                and (response.content_length or 0) >= min_size)
+
+    @staticmethod
+    def _negotiate(request) -> Optional[str]:
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+
+http_compression = HttpCompression()
@@ -0,0 +1,290 @@
+"""
+Deletion Service
+Set-based cascading deletes for courses, activities and questions
+
+A deletion is a plan: an ordered list of steps, children before parents
+(votes, answers, questions, responses, activities, enrollments, course),
+so foreign keys hold at every commit. Each delete step is
+    DELETE FROM response WHERE activity_id IN (SELECT id FROM activity WHERE course_id = :c)
+    AND id > :start AND id <= :end
+over consecutive primary key ranges holding at most DELETE_BATCH_SIZE
+matching rows, and every batch is committed on its own, so no
+transaction holds row locks for more than one batch. (Ranges rather than
+DELETE ... LIMIT: MySQL rejects LIMIT in IN subqueries and SQLite only
+supports it in special builds.)
+
+Nothing is loaded into the ORM, so a course with 100k responses costs a
+few hundred statements instead of 100k object deletes. Plans are
+idempotent: a deletion that failed halfway can simply be run again.
+
+Configuration (app.config or environment):
+    DELETE_BATCH_SIZE: Rows per batch and transaction (default 2000)
+    DELETE_BACKGROUND_THRESHOLD: Plans touching more rows than this run as a
+        background job instead of inside the request (default 20000)
+"""
+
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_BACKGROUND_THRESHOLD = 20000
+
+
+class _Step:
+    """One statement of a plan: batched delete (or update) of the rows matching condition"""
+
+    __slots__ = ('label', 'table', 'condition', 'values')
+
+    def __init__(self, label: str, table, condition, values: Optional[dict] = None):
+        self.label = label
+        self.table = table
+        self.condition = condition
+        self.values = values
+
+    def count(self) -> int:
+        from sqlalchemy import func, select
+        from app import db
+
+        return db.session.execute(select(func.count()).select_from(self.table).where(self.condition)).scalar()
+
+    def run(self, batch_size: int, on_batch: Callable[[int], None]) -> int:
+        from sqlalchemy import select
+        from app import db
+
+        table = self.table
+        done = 0
+        last_id = 0
+        while True:
+            # Batches are primary key ranges: find where the next batch_size matching rows end,
+            # then change exactly the matching rows in (last_id, end]. Each batch scans from
+            # where the previous one stopped, so no index on the condition column is needed.
+            end = db.session.execute(select(table.c.id).where(self.condition, table.c.id > last_id)
+                                     .order_by(table.c.id).offset(batch_size - 1).limit(1)).scalar()
+            in_batch = table.c.id > last_id
+            if end is not None:
+                in_batch &= table.c.id <= end
+            if self.values is None:
+                statement = table.delete().where(self.condition, in_batch)
+            else:
+                statement = table.update().where(self.condition, in_batch).values(**self.values)
+            rows = db.session.execute(statement).rowcount
+            db.session.commit()
+            done += rows
+            if rows:
+                on_batch(rows)
+            if end is None:
+                break
+            last_id = end
+        return done
+
+
+class DeletionPlan:
+    """Ordered steps removing one object and everything that depends on it"""
+
+    def __init__(self, kind: str, object_id: int, steps: List[_Step]):
+        self.kind = kind
+        self.object_id = object_id
+        self.steps = steps
+        self._counts = None
+
+    def counts(self) -> Dict[str, int]:
+        """Rows each step will touch"""
+        if self._counts is None:
+            self._counts = {step.label: step.count() for step in self.steps}
+        return self._counts
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts().values())
+
+    def run(self, batch_size: Optional[int] = None,
+            progress: Optional[Callable[[int, str], None]] = None) -> Dict[str, int]:
+        """
+        Execute the plan, committing after every batch
+
+        Args:
+            batch_size: Rows per batch (default: deletion_service.batch_size)
+            progress: Called with (percent, message) after each batch
+
+        Returns:
+            Rows deleted or updated per step
+        """
+        from app import db
+
+        batch_size = batch_size or deletion_service.batch_size
+        total = max(1, self.total) if progress else 1
+        finished = 0
+        results = {}
+        started = time.perf_counter()
+        try:
+            for step in self.steps:
+                def on_batch(rows, step=step):
+                    nonlocal finished
+                    finished += rows
+                    if progress:
+                        progress(min(99, finished * 100 // total), f'Deleting {step.label} ({finished}/{total} rows)')
+
+                results[step.label] = step.run(batch_size, on_batch)
+        except Exception:
+            db.session.rollback()
+            raise
+        logger.info("Deleted %s %d: %d rows in %.2fs (%s)", self.kind, self.object_id, sum(results.values()),
+                    time.perf_counter() - started, ', '.join(f'{label} {rows}' for label, rows in results.items()))
+        return results
+
+
+def plan_course(course_id: int) -> DeletionPlan:
+    """Course with its Q&A, activities, responses and enrollments"""
+    from app.models import Course, Enrollment
+
+    enrollment, course = Enrollment.__table__, Course.__table__
+    plan = plan_course_content(course_id)
+    plan.kind = 'course'
+    plan.steps += [
+        _Step('enrollments', enrollment, enrollment.c.course_id == course_id),
+        _Step('course', course, course.c.id == course_id),
+    ]
+    return plan
+
+
+def plan_course_content(course_id: int) -> DeletionPlan:
+    """A course's Q&A, activities and responses; the course and its enrollments stay"""
+    from sqlalchemy import select
+    from app.models import Activity, Question, Response
+
+    activity, response, question = Activity.__table__, Response.__table__, Question.__table__
+    questions = select(question.c.id).where(question.c.course_id == course_id)
+    activities = select(activity.c.id).where(activity.c.course_id == course_id)
+    steps = [
+        # Stop new submissions before their activity is removed under them
+        _Step('open activities', activity, (activity.c.course_id == course_id) & activity.c.is_active.is_(True),
+              values={'is_active': False}),
+    ]
+    steps += _qa_steps(questions, question.c.course_id == course_id)
+    steps += [
+        _Step('responses', response, response.c.activity_id.in_(activities)),
+        _Step('activities', activity, activity.c.course_id == course_id),
+    ]
+    return DeletionPlan('course content', course_id, steps)
+
+
+def plan_activity(activity_id: int) -> DeletionPlan:
+    """Activity with its responses"""
+    from app.models import Activity, Response
+
+    activity, response = Activity.__table__, Response.__table__
+    return DeletionPlan('activity', activity_id, [
+        _Step('open activities', activity, (activity.c.id == activity_id) & activity.c.is_active.is_(True),
+              values={'is_active': False}),
+        _Step('responses', response, response.c.activity_id == activity_id),
+        _Step('activities', activity, activity.c.id == activity_id),
+    ])
+
+
+def plan_question(question_id: int) -> DeletionPlan:
+    """Question with its answers and their votes"""
+    from sqlalchemy import select
+    from app.models import Question
+
+    question = Question.__table__
+    return DeletionPlan('question', question_id,
+                        _qa_steps(select(question.c.id).where(question.c.id == question_id),
+                                  question.c.id == question_id))
+
+
+def _qa_steps(questions, question_condition) -> List[_Step]:
+    """Steps removing the questions selected by the subquery questions, dependents first"""
+    from sqlalchemy import select
+    from app.models import Answer, AnswerVote, Question
+
+    question, answer, vote = Question.__table__, Answer.__table__, AnswerVote.__table__
+    answers = select(answer.c.id).where(answer.c.question_id.in_(questions))
+    return [
+        # question.best_answer_id points at an answer: break the cycle first
+        _Step('best answers', question, question_condition & question.c.best_answer_id.isnot(None),
+              values={'best_answer_id': None}),
+        _Step('answer votes', vote, vote.c.answer_id.in_(answers)),
+        _Step('answers', answer, answer.c.question_id.in_(questions)),
+        _Step('questions', question, question_condition),
+    ]
+
+
+class DeletionService:
+    """
+    Runs deletion plans and clears the in-process caches that refer to the deleted rows
+
+    Configuration (app.config or environment): see module docstring.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.environ.get('DELETE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+        self.background_threshold = int(os.environ.get('DELETE_BACKGROUND_THRESHOLD',
+                                                       DEFAULT_BACKGROUND_THRESHOLD))
+
+    def init_app(self, app):
+        self.batch_size = int(app.config.get('DELETE_BATCH_SIZE', self.batch_size))
+        self.background_threshold = int(app.config.get('DELETE_BACKGROUND_THRESHOLD', self.background_threshold))
+        app.extensions['deletion_service'] = self
+
+    def should_run_in_background(self, plan: DeletionPlan) -> bool:
+        return plan.total > self.background_threshold
+
+    # ---- deletions (caches are cleared after the last commit) ----
+
+    def delete_course(self, course_id: int, progress=None, plan: Optional[DeletionPlan] = None) -> Dict[str, int]:
+        from app.join_tokens import join_token_resolver, enrollment_batcher
+        from app.page_cache import page_cache
+        from app.qa_search import qa_search
+        from app.question_similarity import question_similarity
+
+        results = (plan or plan_course(course_id)).run(self.batch_size, progress)
+        join_token_resolver.invalidate_course(course_id)
+        enrollment_batcher.forget_course(course_id)
+        qa_search.remove_course(course_id)
+        question_similarity.forget_course(course_id)
+        page_cache.bump([course_id])
+        return results
+
+    def delete_activity(self, activity_id: int, join_token: Optional[str] = None, progress=None,
+                        plan: Optional[DeletionPlan] = None) -> Dict[str, int]:
+        from app import db
+        from app.join_tokens import join_token_resolver
+        from app.models import Activity
+        from app.page_cache import page_cache
+
+        course_id = db.session.query(Activity.course_id).filter_by(id=activity_id).scalar()
+        results = (plan or plan_activity(activity_id)).run(self.batch_size, progress)
+        if join_token:
+            join_token_resolver.invalidate(join_token)
+        page_cache.bump([course_id])
+        return results
+
+    def delete_question(self, course_id: int, question_id: int, progress=None) -> Dict[str, int]:
+        from app.page_cache import page_cache
+        from app.qa_search import qa_search
+        from app.question_similarity import question_similarity
+
+        results = plan_question(question_id).run(self.batch_size, progress)
+        qa_search.remove_question(course_id, question_id)
+        question_similarity.remove_question(course_id, question_id)
+        page_cache.bump([course_id])
+        return results
+
+    # ---- background job entry points (JobRunner passes a JobContext first) ----
+    # Cancelling stops after the current batch; the object then still exists with
+    # part of its data, and deleting it again finishes the work.
+
+    def course_job(self, ctx, course_id: int, name: str = ''):
+        results = self.delete_course(course_id, ctx.report)
+        return {'course_id': course_id, 'name': name, 'deleted': results}
+
+    def activity_job(self, ctx, activity_id: int, join_token: Optional[str] = None, name: str = ''):
+        results = self.delete_activity(activity_id, join_token, ctx.report)
+        return {'activity_id': activity_id, 'name': name, 'deleted': results}
+
+
+deletion_service = DeletionService()
@@ -0,0 +1,249 @@
+"""
+Extracted Text Cache
+Persistent on-disk cache of document text keyed by file content hash
+
+Entries are keyed by SHA-256 of the uploaded bytes plus the extractor
+version, so re-uploading the same syllabus skips PDF/PPTX parsing entirely.
+The store is a plain directory: writes are atomic renames and hit/miss
+counters live in a small stats file updated under a file lock, so every
+worker process on the host shares the same cache. Least recently used
+entries are evicted when the directory grows past its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: stats updates are best-effort without a lock
+    fcntl = None
+
+from app.extraction import EXTRACTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'cache', 'extracted_text'))
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200MB
+
+STATS_FILE = 'stats.json'
+LOCK_FILE = '.lock'
+ENTRY_SUFFIX = '.json'
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Hash a file in blocks without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractCache:
+    """
+    Size-bounded, multi-process text cache
+
+    Configuration (app.config or environment):
+        EXTRACT_CACHE_DIR: Cache directory (default <project>/cache/extracted_text)
+        EXTRACT_CACHE_MAX_BYTES: Size limit before LRU eviction (default 200MB)
+        EXTRACT_CACHE_ENABLED: Set to 0 to bypass the cache
+    """
+
+    def __init__(self):
+        self.cache_dir = os.environ.get('EXTRACT_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_bytes = int(os.environ.get('EXTRACT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.enabled = os.environ.get('EXTRACT_CACHE_ENABLED', '1') != '0'
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.cache_dir = app.config.get('EXTRACT_CACHE_DIR', self.cache_dir)
+        self.max_bytes = int(app.config.get('EXTRACT_CACHE_MAX_BYTES', self.max_bytes))
+        self.enabled = bool(app.config.get('EXTRACT_CACHE_ENABLED', self.enabled))
+        app.extensions['extract_cache'] = self
+
+    # ---- storage helpers ----
+
+    def _ensure_dir(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    @staticmethod
+    def make_key(file_hash: str, file_extension: str) -> str:
+        return f"{file_hash}-{file_extension.lower().lstrip('.')}-v{EXTRACTOR_VERSION}"
+
+    @contextmanager
+    def _locked(self):
+        """Cross-process lock around stats updates and eviction"""
+        self._ensure_dir()
+        with self._thread_lock:
+            with open(os.path.join(self.cache_dir, LOCK_FILE), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_stats_unlocked(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.cache_dir, STATS_FILE)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    def _write_json_atomic(self, path: str, payload):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(payload, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _bump(self, **counters):
+        try:
+            with self._locked():
+                stats = self._read_stats_unlocked()
+                for name, amount in counters.items():
+                    stats[name] = stats.get(name, 0) + amount
+                self._write_json_atomic(os.path.join(self.cache_dir, STATS_FILE), stats)
+        except OSError as e:
+            logger.warning("Failed to update extract cache stats: %s", e)
+
+    # ---- public API ----
+
+    def get(self, key: str, max_chars: Optional[int] = None) -> Optional[str]:
+        """Return cached text covering max_chars characters, or None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        text = entry.get('text', '')
+        # A prefix extracted with a smaller budget cannot serve a larger request
+        if not entry.get('complete') and (max_chars is None or len(text) < max_chars):
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used for LRU eviction
+        except OSError:
+            pass
+        return text[:max_chars] if max_chars else text
+
+    def put(self, key: str, text: str, complete: bool):
+        """Store extracted text; complete=False means it stopped at a character budget"""
+        try:
+            self._ensure_dir()
+            self._write_json_atomic(self._entry_path(key), {
+                'text': text,
+                'complete': complete,
+                'created_at': time.time()
+            })
+            self._bump(writes=1)
+            self._evict()
+        except OSError as e:
+            logger.warning("Failed to store extract cache entry %s: %s", key, e)
+
+    def get_or_extract(self, file_path: str, file_extension: str, max_chars: Optional[int],
+                       extractor: Callable[[str, str, Optional[int]], str]) -> str:
+        """
+        Return extracted text for a file, running extractor only on a cache miss
+
+        Args:
+            file_path: Path of the uploaded file
+            file_extension: File extension including the dot
+            max_chars: Character budget passed to the extractor
+            extractor: Function (file_path, file_extension, max_chars) -> text
+        """
+        if not self.enabled:
+            return extractor(file_path, file_extension, max_chars)
+
+        key = self.make_key(file_sha256(file_path), file_extension)
+        text = self.get(key, max_chars)
+        if text is not None:
+            self._bump(hits=1)
+            return text
+
+        self._bump(misses=1)
+        text = extractor(file_path, file_extension, max_chars)
+        complete = max_chars is None or len(text) < max_chars
+        self.put(key, text, complete)
+        return text
+
+    def _entries(self):
+        try:
+            with os.scandir(self.cache_dir) as it:
+                return [entry for entry in it if entry.is_file() and entry.name.endswith(ENTRY_SUFFIX)
+                        and entry.name != STATS_FILE]
+        except OSError:
+            return []
+
+    def _evict(self):
+        """Remove least recently used entries until the store is under 90% of max_bytes"""
+        with self._locked():
+            entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in self._entries()]
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+
+            target = int(self.max_bytes * 0.9)
+            evicted = 0
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                    evicted += 1
+                except OSError:
+                    pass
+
+            stats = self._read_stats_unlocked()
+            stats['evictions'] = stats.get('evictions', 0) + evicted
+            self._write_json_atomic(os.path.join(self.cache_dir, STATS_FILE), stats)
+
+    def stats(self) -> Dict[str, object]:
+        """Hit rate and storage usage for the admin view"""
+        stats = self._read_stats_unlocked()
+        entries = self._entries()
+        lookups = stats.get('hits', 0) + stats.get('misses', 0)
+        return {
+            'enabled': self.enabled,
+            'cache_dir': self.cache_dir,
+            'hits': stats.get('hits', 0),
+            'misses': stats.get('misses', 0),
+            'writes': stats.get('writes', 0),
+            'evictions': stats.get('evictions', 0),
+            'hit_rate': (stats.get('hits', 0) / lookups * 100) if lookups else 0,
+            'entries': len(entries),
+            'bytes_used': sum(entry.stat().st_size for entry in entries),
+            'max_bytes': self.max_bytes
+        }
+
+    def clear(self):
+        """Delete all entries and reset counters"""
+        with self._locked():
+            for entry in self._entries():
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+            self._write_json_atomic(os.path.join(self.cache_dir, STATS_FILE),
+                                    {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0})
+
+
+extract_cache = ExtractCache()
@@ -0,0 +1,279 @@
+"""
+Document Text Extraction Engine
+Page/slide-chunked extraction for uploaded teaching documents
+
+- A cheap probe on a few sample pages picks the PDF backend (pdfplumber or
+  PyPDF2) instead of running pdfplumber over the whole file and then PyPDF2
+  over the whole file again when the first pass finds nothing.
+- Text is produced page by page and extraction stops as soon as the caller's
+  character budget is filled.
+- Large documents are split into page ranges that run in a process pool.
+"""
+
+import logging
+import os
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+try:
+    from pptx import Presentation
+except ImportError:
+    Presentation = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes (used as part of cache keys)
+EXTRACTOR_VERSION = '3'
+
+# Pages sampled by the text-layer probe
+PROBE_PAGES = 3
+
+# Use the process pool only when at least this many pages/slides must be read
+PARALLEL_MIN_PAGES = int(os.environ.get('EXTRACT_PARALLEL_MIN_PAGES', 40))
+
+# Pages/slides handled by one pool task
+CHUNK_PAGES = int(os.environ.get('EXTRACT_CHUNK_PAGES', 16))
+
+# Worker processes (0 or 1 disables the pool)
+EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Lazily create the shared process pool
+
+    Workers are started with 'spawn' (forking a process with threads or
+    eventlet is not safe). Spawned workers import this module and the main
+    script again, the latter as __mp_main__, so an entry script must not
+    create the app for that name (see run.py).
+    """
+    global _pool
+    if EXTRACT_WORKERS <= 1:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+# ============ PDF ============
+
+def _open_pdf_pages(file_path: str, backend: str):
+    """Yield page objects with an extract_text() method for the chosen backend"""
+    if backend == 'pdfplumber':
+        with pdfplumber.open(file_path) as pdf:
+            for page in pdf.pages:
+                yield page
+                # Release pdfminer layout caches as we go
+                close = getattr(page, 'close', None)
+                if close:
+                    close()
+    else:
+        with open(file_path, 'rb') as file:
+            for page in PyPDF2.PdfReader(file).pages:
+                yield page
+
+
+def pdf_page_count(file_path: str) -> int:
+    if PyPDF2:
+        with open(file_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def probe_pdf_backend(file_path: str, page_count: int) -> Optional[str]:
+    """
+    Pick the extraction backend by reading a few sample pages
+
+    pdfplumber is preferred because it handles complex layouts better; PyPDF2
+    is used when pdfplumber is missing or finds no text on the sample.
+
+    Returns:
+        'pdfplumber', 'pypdf2', or None when no sample page has a text layer
+    """
+    if page_count <= PROBE_PAGES:
+        sample = list(range(page_count))
+    else:
+        sample = sorted({0, page_count // 2, page_count - 1})
+
+    if pdfplumber:
+        try:
+            with pdfplumber.open(file_path, pages=[i + 1 for i in sample]) as pdf:
+                if any((page.extract_text() or '').strip() for page in pdf.pages):
+                    return 'pdfplumber'
+        except Exception as e:
+            logger.info("pdfplumber probe failed: %s, trying PyPDF2", e)
+
+    if PyPDF2:
+        with open(file_path, 'rb') as file:
+            pages = PyPDF2.PdfReader(file).pages
+            if any((pages[i].extract_text() or '').strip() for i in sample):
+                return 'pypdf2'
+
+    return None
+
+
+def extract_pdf_range(file_path: str, backend: str, start: int, stop: int) -> List[str]:
+    """Extract pages [start, stop) with one backend (runs inside pool workers)"""
+    texts = []
+    if backend == 'pdfplumber':
+        with pdfplumber.open(file_path, pages=list(range(start + 1, stop + 1))) as pdf:
+            for page in pdf.pages:
+                texts.append(page.extract_text() or '')
+    else:
+        with open(file_path, 'rb') as file:
+            pages = PyPDF2.PdfReader(file).pages
+            for index in range(start, min(stop, len(pages))):
+                texts.append(pages[index].extract_text() or '')
+    return texts
+
+
+def iter_pdf_text(file_path: str, max_chars: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each PDF page (ending in a newline and form feed) until max_chars is reached"""
+    if not pdfplumber and not PyPDF2:
+        raise ValueError("No text content found in the PDF file or PDF libraries not available")
+
+    page_count = pdf_page_count(file_path)
+    backend = probe_pdf_backend(file_path, page_count)
+    if backend is None:
+        raise ValueError("No text content found in the PDF file or PDF libraries not available")
+
+    if _should_parallelize(page_count, max_chars):
+        pages = _iter_parallel(extract_pdf_range, file_path, backend, page_count)
+    else:
+        pages = (page.extract_text() or '' for page in _open_pdf_pages(file_path, backend))
+
+    # The form feed marks the page boundary for the prompt chunker
+    yield from _take_budget((text + "\n\f" for text in pages if text), max_chars)
+
+
+# ============ PowerPoint ============
+
+def _slide_text(slide_num: int, slide) -> str:
+    """Text of one slide in the '=== Slide n ===' layout used for AI prompts"""
+    slide_text = []
+    for shape in slide.shapes:
+        if hasattr(shape, "text") and shape.text.strip():
+            slide_text.append(shape.text.strip())
+
+        # If it's a table, extract text from table
+        if shape.has_table:
+            for row in shape.table.rows:
+                for cell in row.cells:
+                    if cell.text.strip():
+                        slide_text.append(cell.text.strip())
+
+    if not slide_text:
+        return ''
+    return '\n'.join([f"=== Slide {slide_num} ==="] + slide_text + [""]) + '\n'
+
+
+def extract_pptx_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract slides [start, stop) (runs inside pool workers)"""
+    slides = Presentation(file_path).slides
+    return [_slide_text(index + 1, slides[index]) for index in range(start, min(stop, len(slides)))]
+
+
+def iter_pptx_text(file_path: str, max_chars: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each slide until max_chars is reached"""
+    if not Presentation:
+        raise ImportError("python-pptx library not installed")
+
+    presentation = Presentation(file_path)
+    slide_count = len(presentation.slides)
+
+    if _should_parallelize(slide_count, max_chars):
+        del presentation
+        slides = _iter_parallel(extract_pptx_range, file_path, None, slide_count)
+    else:
+        slides = (_slide_text(num, slide) for num, slide in enumerate(presentation.slides, 1))
+
+    yield from _take_budget((text for text in slides if text), max_chars)
+
+
+# ============ Shared helpers ============
+
+def _should_parallelize(unit_count: int, max_chars: Optional[int]) -> bool:
+    """Only fan out when many pages must really be read (a budget of ~10k chars needs a handful)"""
+    if EXTRACT_WORKERS <= 1 or unit_count < PARALLEL_MIN_PAGES:
+        return False
+    if max_chars is None:
+        return True
+    # Assume ~1500 characters per page; small budgets finish faster sequentially
+    return max_chars // 1500 >= PARALLEL_MIN_PAGES
+
+
+def _iter_parallel(range_fn, file_path: str, backend: Optional[str], unit_count: int) -> Iterator[str]:
+    """
+    Run range_fn over page ranges in the process pool and yield texts in page order
+
+    Only a bounded window of ranges is in flight; when the consumer stops
+    (budget reached) the remaining queued ranges are cancelled.
+    """
+    pool = _get_pool()
+    ranges = deque((start, min(start + CHUNK_PAGES, unit_count))
+                   for start in range(0, unit_count, CHUNK_PAGES))
+    window = deque()
+
+    def submit_next():
+        start, stop = ranges.popleft()
+        args = (file_path, backend, start, stop) if backend else (file_path, start, stop)
+        window.append(pool.submit(range_fn, *args))
+
+    try:
+        while ranges and len(window) < EXTRACT_WORKERS * 2:
+            submit_next()
+        while window:
+            texts = window.popleft().result()
+            if ranges:
+                submit_next()
+            yield from texts
+    finally:
+        for future in window:
+            future.cancel()
+
+
+def _take_budget(texts: Iterator[str], max_chars: Optional[int]) -> Iterator[str]:
+    """Pass texts through until max_chars characters have been produced"""
+    remaining = max_chars
+    for text in texts:
+        if remaining is not None:
+            if len(text) >= remaining:
+                yield text[:remaining]
+                return
+            remaining -= len(text)
+        yield text
+
+
+def iter_document_text(file_path: str, file_extension: str, max_chars: Optional[int] = None) -> Iterator[str]:
+    """Stream text from a PDF or PPTX file in page/slide order"""
+    ext = file_extension.lower()
+    if ext == '.pdf':
+        return iter_pdf_text(file_path, max_chars)
+    elif ext == '.pptx':
+        return iter_pptx_text(file_path, max_chars)
+    raise ValueError(f"Unsupported file format: {file_extension}")
+
+
+def extract_document_text(file_path: str, file_extension: str, max_chars: Optional[int] = None) -> str:
+    """Collect streamed document text into one string (joined once, no repeated concatenation)"""
+    return ''.join(iter_document_text(file_path, file_extension, max_chars))
@@ -0,0 +1,254 @@
+"""
+Background Job Runner
+Bounded worker pool for slow AI generation and document extraction work
+
+Jobs run outside the HTTP request. Progress and results are pushed to the
+submitting user's Socket.IO room (``user_<id>``) as ``job_update`` events,
+streamed partial items as ``job_partial`` events, and both can also be polled
+through the jobs blueprint. Job state lives in the worker process memory, so
+with several Gunicorn workers the polling request must reach the same worker
+(the default single eventlet worker satisfies this).
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobLimitError(Exception):
+    """Raised when a user already has the maximum number of active jobs"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job has been cancelled"""
+
+
+class Job:
+    """A single unit of background work and its observable state"""
+
+    def __init__(self, user_id: int, kind: str):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.status = QUEUED
+        self.progress = 0
+        self.message = 'Queued'
+        self.result = None
+        self.error = None
+        self.partial = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': self.result,
+            'partial': self.partial,
+            'error': self.error
+        }
+
+
+class JobContext:
+    """Handle passed to job functions for progress reporting and cancellation checks"""
+
+    def __init__(self, runner: 'JobRunner', job: Job):
+        self._runner = runner
+        self.job = job
+
+    def report(self, progress: int, message: str = None):
+        """Update job progress (0-100) and push it to the user"""
+        self.check_cancelled()
+        self.job.progress = max(0, min(100, int(progress)))
+        if message:
+            self.job.message = message
+        self._runner.notify(self.job)
+
+    def push(self, item):
+        """Publish one partial result item (e.g. a streamed question) as soon as it is ready"""
+        self.check_cancelled()
+        index = len(self.job.partial)
+        self.job.partial.append(item)
+        self._runner.notify_partial(self.job, index, item)
+
+    def check_cancelled(self):
+        """Abort the job function if a cancellation was requested"""
+        if self.job.cancel_event.is_set():
+            raise JobCancelled()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.job.cancel_event.is_set()
+
+
+class JobRunner:
+    """
+    Bounded thread pool with per-user concurrency limits and result retention
+
+    Configuration (app.config or environment):
+        JOB_MAX_WORKERS: Worker threads in the pool (default 4)
+        JOB_MAX_PER_USER: Active (queued or running) jobs allowed per user (default 2)
+        JOB_RESULT_TTL: Seconds a finished job stays available for polling (default 600)
+        JOB_MAX_RETAINED: Upper bound on retained jobs in memory (default 500)
+    """
+
+    def __init__(self):
+        self.app = None
+        self.max_workers = 4
+        self.max_per_user = 2
+        self.result_ttl = 600
+        self.max_retained = 500
+        self._executor = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = int(app.config.get('JOB_MAX_WORKERS', os.environ.get('JOB_MAX_WORKERS', 4)))
+        self.max_per_user = int(app.config.get('JOB_MAX_PER_USER', os.environ.get('JOB_MAX_PER_USER', 2)))
+        self.result_ttl = int(app.config.get('JOB_RESULT_TTL', os.environ.get('JOB_RESULT_TTL', 600)))
+        self.max_retained = int(app.config.get('JOB_MAX_RETAINED', os.environ.get('JOB_MAX_RETAINED', 500)))
+        app.extensions['job_runner'] = self
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='job-worker')
+        return self._executor
+
+    def submit(self, user_id: int, kind: str, fn: Callable, *args, **kwargs) -> Job:
+        """
+        Queue a job function for execution
+
+        The function is called as ``fn(ctx, *args, **kwargs)`` inside an
+        application context, where ``ctx`` is a JobContext. Its return value
+        becomes the job result and must be JSON serializable.
+
+        Raises:
+            JobLimitError: If the user already has max_per_user active jobs
+        """
+        self._purge()
+        job = Job(user_id, kind)
+
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.user_id == user_id and not j.is_finished)
+            if active >= self.max_per_user:
+                raise JobLimitError(f'You already have {active} running tasks, please wait for them to finish')
+            self._jobs[job.id] = job
+
+        job.future = self._get_executor().submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; queued jobs are dropped, running jobs stop at their next checkpoint"""
+        job = self._jobs.get(job_id)
+        if not job or job.is_finished:
+            return False
+
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED, message='Cancelled')
+        return True
+
+    def notify(self, job: Job):
+        """Push the job state to the owner's Socket.IO room"""
+        try:
+            from app import socketio
+            socketio.emit('job_update', job.to_dict(), room=f'user_{job.user_id}')
+        except Exception as e:
+            logger.warning("Failed to emit update for job %s: %s", job.id, e)
+
+    def notify_partial(self, job: Job, index: int, item):
+        """Push a single partial result item to the owner's Socket.IO room"""
+        try:
+            from app import socketio
+            socketio.emit('job_partial', {'job_id': job.id, 'index': index, 'item': item},
+                          room=f'user_{job.user_id}')
+        except Exception as e:
+            logger.warning("Failed to emit partial result for job %s: %s", job.id, e)
+
+    def _finish(self, job: Job, status: str, result=None, error=None, message=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if status == SUCCEEDED:
+            job.progress = 100
+        if message:
+            job.message = message
+        self.notify(job)
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED, message='Cancelled')
+            return
+
+        job.status = RUNNING
+        job.message = 'Running'
+        self.notify(job)
+
+        ctx = JobContext(self, job)
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    result = fn(ctx, *args, **kwargs)
+            else:
+                result = fn(ctx, *args, **kwargs)
+            if job.cancel_event.is_set():
+                self._finish(job, CANCELLED, message='Cancelled')
+            else:
+                self._finish(job, SUCCEEDED, result=result, message='Completed')
+        except JobCancelled:
+            self._finish(job, CANCELLED, message='Cancelled')
+        except Exception as e:
+            logger.exception("Job %s (%s) failed: %s: %s", job.id, job.kind, type(e).__name__, e,
+                             extra={'job_id': job.id, 'user_id': job.user_id})
+            self._finish(job, FAILED, error=str(e), message='Failed')
+
+    def _purge(self):
+        """Drop expired finished jobs, then the oldest finished ones above max_retained"""
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.is_finished and now - job.finished_at > self.result_ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+            overflow = len(self._jobs) - self.max_retained
+            if overflow > 0:
+                finished = sorted((job for job in self._jobs.values() if job.is_finished),
+                                  key=lambda job: job.finished_at)
+                for job in finished[:overflow]:
+                    del self._jobs[job.id]
+
+
+job_runner = JobRunner()
@@ -0,0 +1,357 @@
+"""
+Join Token Resolution
+In-memory resolver for QR join tokens and batched auto-enrollment
+
+When a QR code is shown in a lecture hall, hundreds of students open the
+same join link within seconds. The resolver keeps token -> activity facts in
+memory (known-bad tokens too, for a shorter time), and concurrent misses for
+the same token share one database lookup. Tokens are dropped from the cache
+when they are regenerated, quick join is toggled, or the activity or course
+is deleted; other workers see such changes after JOIN_TOKEN_CACHE_TTL.
+
+Auto-enrollments from the burst are queued and written by one flusher
+thread: every JOIN_ENROLL_BATCH_WINDOW seconds the pending pairs are checked
+against existing enrollments with one query per course and inserted with one
+commit. The requesting thread waits for its batch, so the enrollment exists
+before the student is redirected to the activity.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+POSITIVE_TTL = float(os.environ.get('JOIN_TOKEN_CACHE_TTL', 60))
+NEGATIVE_TTL = float(os.environ.get('JOIN_TOKEN_NEGATIVE_TTL', 10))
+MAX_TOKEN_ENTRIES = 4096
+MAX_TOKEN_LENGTH = 64
+
+BATCH_WINDOW = float(os.environ.get('JOIN_ENROLL_BATCH_WINDOW', 0.02))
+MAX_BATCH_SIZE = 500
+BATCH_WAIT_TIMEOUT = 10
+
+
+class ResolvedToken:
+    """Cached facts about the activity behind a join token"""
+
+    __slots__ = ('token', 'activity_id', 'course_id', 'course_name', 'allow_quick_join', 'expires_at')
+
+    def __init__(self, token, activity_id, course_id, course_name, allow_quick_join, expires_at):
+        self.token = token
+        self.activity_id = activity_id
+        self.course_id = course_id
+        self.course_name = course_name
+        self.allow_quick_join = allow_quick_join
+        self.expires_at = expires_at
+
+    def is_valid(self) -> bool:
+        """Same rules as Activity.is_token_valid, evaluated from the cached expiry"""
+        from app import get_beijing_time
+        if not self.allow_quick_join:
+            return False
+        if self.expires_at and get_beijing_time() > self.expires_at:
+            return False
+        return True
+
+
+class JoinTokenResolver:
+    """TTL cache of join token lookups with negative caching and single-flight misses"""
+
+    def __init__(self, positive_ttl: float = POSITIVE_TTL, negative_ttl: float = NEGATIVE_TTL,
+                 max_entries: int = MAX_TOKEN_ENTRIES):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.enabled = positive_ttl > 0
+        self._entries = OrderedDict()  # token -> (ResolvedToken or None, expires monotonic)
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _lookup(self, token: str) -> Optional[ResolvedToken]:
+        from app import db
+        from app.models import Activity, Course
+        row = db.session.query(
+            Activity.id, Activity.course_id, Course.name, Activity.allow_quick_join, Activity.token_expires_at
+        ).join(Course, Course.id == Activity.course_id).filter(Activity.join_token == token).first()
+        if row is None:
+            return None
+        return ResolvedToken(token, row[0], row[1], row[2], bool(row[3]), row[4])
+
+    def _cached(self, token: str):
+        """(found, value) for a live cache entry; caller holds the lock"""
+        entry = self._entries.get(token)
+        if entry is None:
+            return False, None
+        value, expires = entry
+        if time.monotonic() >= expires:
+            del self._entries[token]
+            return False, None
+        self._entries.move_to_end(token)
+        if value is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, value
+
+    def resolve(self, token: str) -> Optional[ResolvedToken]:
+        """
+        Activity facts for a join token
+
+        Returns:
+            ResolvedToken, or None when no activity has this token
+        """
+        if not token or len(token) > MAX_TOKEN_LENGTH:
+            return None
+        if not self.enabled:
+            return self._lookup(token)
+
+        while True:
+            with self._lock:
+                found, value = self._cached(token)
+                if found:
+                    return value
+                loading = self._loading.get(token)
+                if loading is None:
+                    loading = self._loading[token] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another request is already querying this token; reuse its result
+            loading.wait(5)
+            if not loading.is_set():
+                return self._lookup(token)
+
+        try:
+            value = self._lookup(token)
+            ttl = self.positive_ttl if value is not None else self.negative_ttl
+            with self._lock:
+                self._entries[token] = (value, time.monotonic() + ttl)
+                self._entries.move_to_end(token)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                self._loading.pop(token, None)
+            loading.set()
+
+    def invalidate(self, token: Optional[str]):
+        """Forget a token (call after changing the activity's token or quick join setting)"""
+        if not token:
+            return
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_course(self, course_id: int):
+        """Forget every cached token of a course (used when the course is deleted)"""
+        with self._lock:
+            for token in [token for token, (value, _) in self._entries.items()
+                          if value is not None and value.course_id == course_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses
+            }
+
+
+class _PendingEnrollment:
+    __slots__ = ('student_id', 'course_id', 'done', 'created', 'error')
+
+    def __init__(self, student_id, course_id):
+        self.student_id = student_id
+        self.course_id = course_id
+        self.done = threading.Event()
+        self.created = False
+        self.error = None
+
+
+class EnrollmentBatcher:
+    """Group-commit writer for quick join auto-enrollments"""
+
+    def __init__(self, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH_SIZE):
+        self.app = None
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._known = OrderedDict()  # (student_id, course_id) -> expires monotonic
+        self._known_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.inserted = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.window = float(app.config.get('JOIN_ENROLL_BATCH_WINDOW', self.window))
+        app.extensions['enrollment_batcher'] = self
+
+    # ---- known enrollments ----
+
+    def _is_known(self, key) -> bool:
+        with self._known_lock:
+            expires = self._known.get(key)
+            if expires is None:
+                return False
+            if time.monotonic() >= expires:
+                del self._known[key]
+                return False
+            return True
+
+    def _remember(self, keys):
+        expires = time.monotonic() + POSITIVE_TTL
+        with self._known_lock:
+            for key in keys:
+                self._known[key] = expires
+                self._known.move_to_end(key)
+            while len(self._known) > MAX_TOKEN_ENTRIES * 4:
+                self._known.popitem(last=False)
+
+    def forget_course(self, course_id: int):
+        """Drop remembered enrollments of a course (used when enrollments are deleted)"""
+        with self._known_lock:
+            for key in [key for key in self._known if key[1] == course_id]:
+                del self._known[key]
+
+    # ---- batching ----
+
+    def ensure_enrolled(self, student_id: int, course_id: int) -> bool:
+        """
+        Enroll a student in a course unless already enrolled
+
+        Returns:
+            True when a new enrollment was created
+        """
+        batching = self.app is not None and self.window > 0
+        if batching and self._is_known((student_id, course_id)):
+            return False
+
+        pending = _PendingEnrollment(student_id, course_id)
+        if not batching:
+            self._write([pending])
+        else:
+            # End the request's transaction so waiting requests do not hold pool connections
+            from app import db
+            db.session.commit()
+            with self._cond:
+                self.requests += 1
+                self._pending.append(pending)
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='enrollment-batcher', daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+            if not pending.done.wait(BATCH_WAIT_TIMEOUT):
+                # Flusher stuck or gone: write directly (the insert is idempotent)
+                self._write([pending])
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.created
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let the rest of the burst arrive before writing
+            time.sleep(self.window)
+            with self._cond:
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            with self.app.app_context():
+                self._write(batch)
+
+    def _write(self, batch):
+        """Insert the missing enrollments of a batch with one commit"""
+        from app import db
+        from app.models import Enrollment
+        from app.page_cache import page_cache
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            by_course = {}
+            for pending in batch:
+                by_course.setdefault(pending.course_id, set()).add(pending.student_id)
+
+            existing = set()
+            for course_id, student_ids in by_course.items():
+                rows = db.session.query(Enrollment.student_id).filter(
+                    Enrollment.course_id == course_id,
+                    Enrollment.student_id.in_(student_ids)
+                ).all()
+                existing.update((student_id, course_id) for (student_id,) in rows)
+
+            new_keys = {(p.student_id, p.course_id) for p in batch} - existing
+            if new_keys:
+                # One multi-row INSERT (no ORM objects needed, the ids are never read)
+                db.session.execute(Enrollment.__table__.insert(),
+                                   [{'student_id': s, 'course_id': c} for s, c in new_keys])
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # Another worker enrolled some of these students meanwhile; insert one by one
+                    db.session.rollback()
+                    new_keys = self._write_each(new_keys)
+
+            if new_keys:
+                page_cache.bump({c for _, c in new_keys}, {s for s, _ in new_keys})
+            self.batches += 1
+            self.inserted += len(new_keys)
+            self._remember({(p.student_id, p.course_id) for p in batch})
+
+            claimed = set()
+            for pending in batch:
+                key = (pending.student_id, pending.course_id)
+                # Duplicate requests in one batch: only the first reports the new enrollment
+                pending.created = key in new_keys and key not in claimed
+                claimed.add(key)
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Failed to write %d enrollments: %s", len(batch), e)
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    @staticmethod
+    def _write_each(keys):
+        from app import db
+        from app.models import Enrollment
+        from sqlalchemy.exc import IntegrityError
+
+        created = set()
+        for student_id, course_id in keys:
+            db.session.add(Enrollment(student_id=student_id, course_id=course_id))
+            try:
+                db.session.commit()
+                created.add((student_id, course_id))
+            except IntegrityError:
+                db.session.rollback()
+        return created
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'inserted': self.inserted,
+            'pending': len(self._pending)
+        }
+
+
+join_token_resolver = JoinTokenResolver()
+enrollment_batcher = EnrollmentBatcher()
@@ -0,0 +1,81 @@
+"""
+Eager Loading Profiles
+Named loader option bundles for the pages whose templates walk relationships
+
+Models declare their relationships lazy, so a template that prints
+answer.author.name for ten answers issues ten extra queries. Each view
+instead loads its rows with a named profile listing the relationship paths
+its template reads:
+
+    Answer.query.options(*load_profile('question_answers'))
+
+Paths are dotted relationship names; many-to-one steps are joined into the
+query (joinedload), collections are fetched with one extra IN query per
+step (selectinload).
+
+With the lazy-load guard on (LAZY_LOAD_GUARD=1, or the app running in
+debug mode unless LAZY_LOAD_GUARD=0), every profile also adds
+raiseload('*') to the loaded entity and to each entity along its paths, so
+a template reaching a relationship the profile does not list raises
+instead of quietly querying once per row. Rows that were already in the
+session before the query keep their own loader settings.
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# name -> (model, relationship paths the view's template reads)
+PROFILES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'activity_list': ('Activity', ('course',)),
+    'activity_results': ('Activity', ('course.enrollments',)),
+    'activity_responses': ('Response', ('student',)),
+    'catalog_cards': ('Course', ('instructor',)),
+    'course_detail': ('Course', ('instructor',)),
+    'course_enrollments': ('Enrollment', ('student',)),
+    'question_list': ('Question', ('author', 'answers')),
+    'question_detail': ('Question', ('author',)),
+    'question_answers': ('Answer', ('author',)),
+    'leaderboard': ('User', ()),
+}
+
+
+def guard_enabled() -> bool:
+    """Whether profiles raise on lazy loads (LAZY_LOAD_GUARD, default: debug mode)"""
+    from flask import current_app, has_app_context
+
+    setting = os.environ.get('LAZY_LOAD_GUARD')
+    if has_app_context():
+        setting = current_app.config.get('LAZY_LOAD_GUARD', setting)
+        if setting is None:
+            return current_app.debug
+    return str(setting).lower() in ('1', 'true', 'yes', 'on')
+
+
+def load_profile(name: str) -> List:
+    """Loader options of a named profile, for Query.options(*...)"""
+    return list(_build(name, guard_enabled()))
+
+
+@lru_cache(maxsize=None)
+def _build(name: str, guard: bool) -> tuple:
+    from sqlalchemy.orm import joinedload, raiseload, selectinload
+    from app import models
+
+    model_name, paths = PROFILES[name]
+    options = []
+    for path in paths:
+        loader, entity = None, getattr(models, model_name)
+        for step in path.split('.'):
+            attribute = getattr(entity, step)
+            strategy = selectinload if attribute.property.uselist else joinedload
+            loader = strategy(attribute) if loader is None else getattr(loader, strategy.__name__)(attribute)
+            entity = attribute.property.mapper.class_
+            if guard:
+                # Wildcards only cover relationships not named by a more specific option
+                options.append(loader.raiseload('*'))
+        if not guard:
+            options.append(loader)
+    if guard:
+        options.append(raiseload('*'))
+    return tuple(options)
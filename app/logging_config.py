@@ -0,0 +1,179 @@
+"""
+Logging Configuration
+Structured, level-gated application logging with a non-blocking handler
+
+Modules log through ``logging.getLogger(__name__)``. configure_logging()
+routes every record through a QueueHandler, so request threads only enqueue
+records; one listener thread formats them and writes to stdout. Output is one
+JSON object per line (LOG_FORMAT=json, the default) or a plain text line
+(LOG_FORMAT=text). Fields passed with ``extra={...}`` become JSON keys.
+
+Settings (environment variables or app.config):
+    LOG_LEVEL    Default level, e.g. INFO
+    LOG_LEVELS   Per-module levels, e.g. "app.routes.activities=DEBUG,app.ai_utils=WARNING"
+    LOG_FORMAT   json or text
+    LOG_QUEUE    0 writes synchronously (useful when debugging a crash)
+
+High-frequency events can be sampled per call site: a record logged with
+``extra={'sample_rate': 10}`` is kept for 1 of every 10 calls with the same
+message template, and the kept record carries the rate.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict
+
+# LogRecord attributes that are not user supplied "extra" fields
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+# Chatty third-party loggers stay quiet unless LOG_LEVELS names them (SQLAlchemy would log every statement)
+LIBRARY_LEVELS = {
+    'sqlalchemy': 'WARNING',
+    'httpx': 'WARNING',
+    'httpcore': 'WARNING',
+    'urllib3': 'WARNING',
+    'engineio': 'WARNING',
+    'socketio': 'WARNING',
+}
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, extra fields, exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable single-line format with extra fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s [%(name)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = _extra_fields(record)
+        if extra:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in extra.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 of every ``sample_rate`` records per logger and message template"""
+
+    def __init__(self):
+        super().__init__()
+        self._counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, 'sample_rate', None)
+        if not rate or rate <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % rate == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records with their message merged but extra fields and exception kept separate"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(app=None):
+    """Install the queue handler on the root logger (repeated calls only update levels)"""
+    global _listener, _queue_handler
+
+    def setting(name, default):
+        if app is not None and name in app.config:
+            return app.config[name]
+        return os.environ.get(name, default)
+
+    level = str(setting('LOG_LEVEL', 'INFO')).upper()
+    log_format = str(setting('LOG_FORMAT', 'json')).lower()
+    use_queue = str(setting('LOG_QUEUE', '1')) != '0'
+
+    with _lock:
+        root = logging.getLogger()
+        root.setLevel(level)
+        levels = dict(LIBRARY_LEVELS)
+        levels.update(_parse_levels(setting('LOG_LEVELS', '')))
+        for name, module_level in levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        if _queue_handler is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(TextFormatter() if log_format == 'text' else JsonFormatter())
+
+        if use_queue:
+            log_queue = queue.SimpleQueue()
+            _queue_handler = _QueueHandler(log_queue)
+            _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(shutdown_logging)
+        else:
+            _queue_handler = stream_handler
+        _queue_handler.addFilter(SamplingFilter())
+
+        # Replace the default handlers (Flask adds one to its app logger)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        if app is not None:
+            from flask.logging import default_handler
+            app.logger.removeHandler(default_handler)
+
+
+def shutdown_logging():
+    """Flush queued records (called at interpreter exit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,494 @@
+"""
+Request Instrumentation
+Latency, SQL, Socket.IO, connection pool and AI call metrics in Prometheus text format
+
+init_app() hooks into every request (latency histogram per endpoint, SQL
+statement count and time per request), into the SQLAlchemy engines (statement
+counts and durations, pool checkout wait) and into the Socket.IO server (emit
+counts per event and room kind, room sizes at scrape time). AI provider calls
+report their durations from ai_client. Everything is exported at /metrics;
+set METRICS_TOKEN to require "Authorization: Bearer <token>" there.
+
+Requests slower than METRICS_SLOW_REQUEST_SECONDS are logged together with
+their SQL (slowest statements first, repeated statements counted) and kept in
+a short in-memory list for the admin view.
+
+Metrics live in process memory, so every Gunicorn worker exports its own.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter as TallyCounter, deque
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_SECONDS = float(os.environ.get('METRICS_SLOW_REQUEST_SECONDS', 1.0))
+MAX_CAPTURED_STATEMENTS = 200
+SLOW_LOG_SIZE = 50
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+AI_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+                                for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, INF_LABEL)} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {count}')
+        return lines
+
+
+class Gauge(_Metric):
+    """Point-in-time values, produced by a callback at scrape time"""
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), collect: Optional[Callable[[], Iterable]] = None):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            samples = list(self.collect()) if self.collect else []
+        except Exception as e:
+            logger.warning("Collecting %s failed: %s", self.name, e)
+            samples = []
+        lines = self.header()
+        for labels, value in samples:
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        """Add a metric; one registered again under the same name (a second create_app) replaces the old one"""
+        self._metrics = [existing for existing in self._metrics if existing.name != metric.name]
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    'http_requests_total', 'HTTP requests by endpoint, method and status', ('endpoint', 'method', 'status')))
+HTTP_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by endpoint', ('endpoint', 'method')))
+HTTP_SQL_QUERIES = registry.register(Histogram(
+    'http_request_sql_queries', 'SQL statements executed per request', ('endpoint',), QUERY_COUNT_BUCKETS))
+HTTP_SQL_SECONDS = registry.register(Histogram(
+    'http_request_sql_seconds', 'Time spent in SQL per request', ('endpoint',)))
+SLOW_REQUESTS = registry.register(Counter(
+    'http_slow_requests_total', 'Requests slower than METRICS_SLOW_REQUEST_SECONDS', ('endpoint',)))
+DB_STATEMENTS = registry.register(Counter(
+    'db_statements_total', 'SQL statements by operation', ('operation',)))
+DB_STATEMENT_SECONDS = registry.register(Histogram(
+    'db_statement_duration_seconds', 'SQL statement duration by operation', ('operation',), SQL_BUCKETS))
+DB_POOL_WAIT = registry.register(Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection', (), SQL_BUCKETS))
+SOCKETIO_EMITS = registry.register(Counter(
+    'socketio_emits_total', 'Socket.IO emits by event and target room kind', ('event', 'target')))
+AI_DURATION = registry.register(Histogram(
+    'ai_request_duration_seconds', 'AI provider call duration (streams: until the last token)',
+    ('provider', 'kind', 'outcome'), AI_BUCKETS))
+AI_FIRST_TOKEN = registry.register(Histogram(
+    'ai_first_token_seconds', 'Time to the first streamed token', ('provider',), AI_BUCKETS))
+
+_slow_log = deque(maxlen=SLOW_LOG_SIZE)
+_request_state = threading.local()
+
+SQL_OPERATION_RE = re.compile(r'^\s*(\w+)')
+ROOM_KIND_RE = re.compile(r'^([a-z]+)_\d+$')
+
+
+# ---- per-request SQL capture ----
+
+def _current_request():
+    return getattr(_request_state, 'record', None)
+
+
+def _sql_operation(statement: str) -> str:
+    match = SQL_OPERATION_RE.match(statement)
+    return match.group(1).upper() if match else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    operation = _sql_operation(statement)
+    DB_STATEMENTS.inc(operation=operation)
+    DB_STATEMENT_SECONDS.observe(elapsed, operation=operation)
+
+    record = _current_request()
+    if record is not None:
+        record['sql_count'] += 1
+        record['sql_time'] += elapsed
+        if len(record['statements']) < MAX_CAPTURED_STATEMENTS:
+            record['statements'].append((statement, elapsed))
+
+
+def _instrument_pool(engine):
+    """Time pool.connect() calls, which block while the pool is exhausted"""
+    pool = engine.pool
+    if getattr(pool, '_metrics_wrapped', False):
+        return
+    connect = pool.connect
+
+    def timed_connect(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return connect(*args, **kwargs)
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+    pool._metrics_wrapped = True
+
+
+def instrument_engine(engine):
+    """Attach statement and pool timing to an engine"""
+    from sqlalchemy import event
+    if getattr(engine, '_metrics_instrumented', False):
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    # dispose() replaces the pool, so wrap the new one as well
+    event.listen(engine, 'engine_disposed', lambda eng: _instrument_pool(eng))
+    _instrument_pool(engine)
+    engine._metrics_instrumented = True
+
+
+# ---- slow request log ----
+
+def _describe_sql(statements: List[Tuple[str, float]], limit: int = 10) -> List[Dict[str, object]]:
+    """Slowest statements, with how often each statement text was executed"""
+    repeats = TallyCounter(statement for statement, _ in statements)
+    slowest = {}
+    for statement, elapsed in statements:
+        if elapsed > slowest.get(statement, -1):
+            slowest[statement] = elapsed
+    ordered = sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{'sql': ' '.join(statement.split())[:500], 'ms': round(elapsed * 1000, 2), 'count': repeats[statement]}
+            for statement, elapsed in ordered]
+
+
+def _log_slow_request(record: Dict[str, object], endpoint: str, status: int, duration: float):
+    SLOW_REQUESTS.inc(endpoint=endpoint)
+    entry = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'method': record['method'],
+        'path': record['path'],
+        'endpoint': endpoint,
+        'status': status,
+        'duration_ms': round(duration * 1000, 1),
+        'sql_count': record['sql_count'],
+        'sql_ms': round(record['sql_time'] * 1000, 1),
+        'statements': _describe_sql(record['statements'])
+    }
+    _slow_log.appendleft(entry)
+    logger.warning("Slow request %s %s (%s) %s took %sms, %s SQL statements in %sms",
+                   entry['method'], entry['path'], endpoint, status, entry['duration_ms'],
+                   entry['sql_count'], entry['sql_ms'],
+                   extra={'endpoint': endpoint, 'duration_ms': entry['duration_ms'], 'sql': entry['statements']})
+
+
+def request_sql_totals() -> Tuple[int, float]:
+    """SQL statement count and seconds of the current request so far"""
+    record = _current_request()
+    if record is None:
+        return 0, 0.0
+    return record['sql_count'], record['sql_time']
+
+
+def slow_requests() -> List[Dict[str, object]]:
+    """Most recent slow requests, newest first"""
+    return list(_slow_log)
+
+
+# ---- request hooks ----
+
+def _start_request():
+    from flask import request
+    _request_state.record = {
+        'start': time.perf_counter(),
+        'method': request.method,
+        'path': request.path,
+        'sql_count': 0,
+        'sql_time': 0.0,
+        'statements': []
+    }
+
+
+def _finish_request(status: int):
+    from flask import request
+    record = _current_request()
+    if record is None:
+        return
+    _request_state.record = None
+
+    duration = time.perf_counter() - record['start']
+    endpoint = request.endpoint or '<unmatched>'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=record['method'], status=status)
+    HTTP_LATENCY.observe(duration, endpoint=endpoint, method=record['method'])
+    HTTP_SQL_QUERIES.observe(record['sql_count'], endpoint=endpoint)
+    HTTP_SQL_SECONDS.observe(record['sql_time'], endpoint=endpoint)
+    if duration >= SLOW_REQUEST_SECONDS:
+        _log_slow_request(record, endpoint, status, duration)
+
+
+# ---- Socket.IO ----
+
+def _room_kind(room) -> str:
+    if room is None:
+        return 'broadcast'
+    if isinstance(room, (list, tuple, set)):
+        return 'multiple'
+    match = ROOM_KIND_RE.match(str(room))
+    return match.group(1) if match else 'sid'
+
+
+def instrument_socketio(socketio):
+    """Count emits on the Socket.IO server (covers socketio.emit and flask_socketio.emit)"""
+    server = getattr(socketio, 'server', None)
+    if server is None or getattr(server, '_metrics_wrapped', False):
+        return
+    emit = server.emit
+
+    def counted_emit(event, *args, **kwargs):
+        room = kwargs.get('to', kwargs.get('room'))
+        SOCKETIO_EMITS.inc(event=event, target=_room_kind(room))
+        return emit(event, *args, **kwargs)
+
+    server.emit = counted_emit
+    server._metrics_wrapped = True
+
+    def room_samples():
+        manager = getattr(socketio.server, 'manager', None)
+        rooms = getattr(manager, 'rooms', {}) or {}
+        connected, kinds = 0, {}
+        for namespace, namespace_rooms in list(rooms.items()):
+            for room, members in list(namespace_rooms.items()):
+                if room is None:
+                    connected += len(members)
+                    continue
+                kind = _room_kind(room)
+                if kind == 'sid':
+                    continue
+                count, total, largest = kinds.get(kind, (0, 0, 0))
+                kinds[kind] = (count + 1, total + len(members), max(largest, len(members)))
+        yield ('connected',), connected
+        for kind, (count, total, largest) in sorted(kinds.items()):
+            yield (f'{kind}_rooms',), count
+            yield (f'{kind}_members',), total
+            yield (f'{kind}_largest_room',), largest
+
+    registry.register(Gauge('socketio_clients', 'Connected clients, rooms and room sizes by room kind',
+                            ('measure',), room_samples))
+
+
+# ---- gauges for existing in-process state ----
+
+def _pool_samples(db, app):
+    def collect():
+        with app.app_context():
+            engines = list(db.engines.items())
+        for bind, engine in engines:
+            pool = engine.pool
+            name = bind or 'default'
+            for state, reader in (('checked_out', 'checkedout'), ('idle', 'checkedin'),
+                                  ('overflow', 'overflow'), ('size', 'size')):
+                fn = getattr(pool, reader, None)
+                if fn is not None:
+                    yield (name, state), fn()
+    return collect
+
+
+def _cache_samples():
+    from app.qr_utils import qr_cache
+    from app.join_tokens import join_token_resolver
+    from app.question_similarity import question_similarity
+    from app.archive import archive_store
+    from app.page_cache import page_cache
+    yield ('qr_images', 'hits'), qr_cache.hits
+    yield ('qr_images', 'misses'), qr_cache.misses
+    yield ('similar_questions', 'hits'), question_similarity.cache_hits
+    yield ('similar_questions', 'misses'), question_similarity.cache_misses
+    yield ('semester_archive', 'hits'), archive_store.hits
+    yield ('semester_archive', 'misses'), archive_store.misses
+    for key, value in join_token_resolver.stats().items():
+        yield ('join_tokens', key), value
+    for key, value in page_cache.stats().items():
+        yield ('page_fragments', key), value
+
+
+def _breaker_samples():
+    from app.ai_health import breaker_metrics, OPEN, HALF_OPEN
+    for provider, snapshot in breaker_metrics().items():
+        state = {OPEN: 2, HALF_OPEN: 1}.get(snapshot['state'], 0)
+        yield (provider,), state
+
+
+def observe_ai_call(provider: str, kind: str, outcome: str, seconds: float):
+    AI_DURATION.observe(seconds, provider=provider, kind=kind, outcome=outcome)
+
+
+def observe_first_token(provider: str, seconds: float):
+    AI_FIRST_TOKEN.observe(seconds, provider=provider)
+
+
+def render() -> str:
+    return registry.render()
+
+
+def init_app(app, db, socketio=None):
+    """Install request hooks, engine and Socket.IO instrumentation and the /metrics endpoint"""
+    from flask import request, Response, abort
+
+    @app.before_request
+    def metrics_start_request():
+        _start_request()
+
+    @app.after_request
+    def metrics_after_request(response):
+        _finish_request(response.status_code)
+        return response
+
+    @app.teardown_request
+    def metrics_teardown_request(exc):
+        # Only still pending when the view raised
+        if _current_request() is not None:
+            _finish_request(500)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    if socketio is not None:
+        instrument_socketio(socketio)
+
+    registry.register(Gauge('db_pool_connections', 'Connection pool usage', ('bind', 'state'), _pool_samples(db, app)))
+    registry.register(Gauge('app_cache_stats', 'In-process cache counters', ('cache', 'measure'), _cache_samples))
+    registry.register(Gauge('ai_breaker_state', 'AI provider breaker state (0 closed, 1 half-open, 2 open)',
+                            ('provider',), _breaker_samples))
+
+    token = app.config.get('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+
+    def metrics_endpoint():
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return Response(render(), mimetype=CONTENT_TYPE.split(';')[0], content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+    app.extensions['metrics'] = registry
@@ -60,11 +60,16 @@ class Course(db.Model):
     description = db.Column(db.Text)
     instructor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: get_beijing_time())
+    # Set while the course's activities and Q&A live in the semester archive (app.archive)
+    archived_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
     enrollments = db.relationship('Enrollment', backref='course', lazy=True)
     activities = db.relationship('Activity', backref='course', lazy=True)
     questions = db.relationship('Question', backref='course', lazy=True)
+    
+    # Catalog pages filtered by semester, newest first (app.catalog)
+    __table_args__ = (db.Index('ix_course_semester_id', 'semester', 'id'),)
 
 class Enrollment(db.Model):
     """Enrollment record model"""
@@ -100,6 +105,8 @@ class Activity(db.Model):
     
     # Relationships
     responses = db.relationship('Response', backref='activity', lazy=True, cascade='all, delete-orphan')
+    # True on read-only instances served from the semester archive (app.archive)
+    is_archived = False
     
     def generate_join_token(self):
         """Generate unique join token (using Beijing time)"""
@@ -155,6 +162,7 @@ class Response(db.Model):
     score = db.Column(db.Integer, default=0)  # Score for this response
     points_earned = db.Column(db.Integer, default=0)
     submitted_at = db.Column(db.DateTime, default=lambda: get_beijing_time())
+    is_archived = False  # see Activity.is_archived
     
     __table_args__ = (db.UniqueConstraint('student_id', 'activity_id'),)
 
@@ -175,6 +183,7 @@ class Question(db.Model):
     # Relationships
     answers = db.relationship('Answer', backref='question', lazy=True, 
                             foreign_keys='Answer.question_id', cascade='all, delete-orphan')
+    is_archived = False  # see Activity.is_archived
 
 class Answer(db.Model):
     """Answer model"""
@@ -182,13 +191,20 @@ class Answer(db.Model):
     content = db.Column(db.Text, nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    upvotes = db.Column(db.Integer, default=0)
+    # Vote tallies kept in step with AnswerVote by app.answer_votes (score = upvotes - downvotes)
+    upvotes = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    downvotes = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+    score = db.Column(db.Integer, default=0, nullable=False, server_default='0')
     is_instructor_answer = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=lambda: get_beijing_time())
     updated_at = db.Column(db.DateTime, default=lambda: get_beijing_time(), onupdate=lambda: get_beijing_time())
     
     # Relationships
     votes = db.relationship('AnswerVote', backref='answer', lazy=True, cascade='all, delete-orphan')
+    is_archived = False  # see Activity.is_archived
+    
+    # Answers of a question ordered by score
+    __table_args__ = (db.Index('ix_answer_question_score', 'question_id', 'score'),)
 
 class AnswerVote(db.Model):
     """Answer vote model"""
@@ -0,0 +1,236 @@
+"""
+Page Fragment Cache
+Rendered HTML of the course page, activity list and catalog cards, kept until the course changes
+
+Every course has an in-memory version number. It is bumped after any commit
+that inserts, updates or deletes one of the course's activities,
+enrollments or questions, or the course itself; set-based writes that
+bypass the ORM (batched deletes, the semester archive, QR auto-enrollment)
+bump it explicitly. Cached fragments are keyed by the versions they were
+rendered from, so a changed course simply stops matching its old entries.
+
+    course page     (course, viewer role, course version)
+    activity list   (viewer role, the viewer's courses and their versions,
+                     page); for admins, who see every course, a global
+                     version bumped together with any course
+    catalog card    (course, course version), shared by all students
+                     (app.catalog)
+
+A student's or instructor's course ids are cached as well and refreshed
+when their enrollments or courses change. Renaming a user bumps a shared
+epoch (names appear in student lists and course headers).
+
+Versions live in one process; other workers see a change after
+PAGE_CACHE_TTL seconds at the latest, when their entries expire.
+PAGE_CACHE_TTL=0 turns the cache off.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 60.0
+DEFAULT_MAX_ENTRIES = 2048
+SESSION_KEY = 'page_cache_changes'
+
+
+class PageCache:
+    """Version-keyed LRU of rendered page fragments"""
+
+    def __init__(self):
+        self.ttl = float(os.environ.get('PAGE_CACHE_TTL', DEFAULT_TTL_SECONDS))
+        self.max_entries = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self._versions: Dict[int, int] = {}
+        self._user_versions: Dict[int, int] = {}
+        self._generation = 0
+        self._epoch = 0
+        self._entries: 'OrderedDict[tuple, Tuple[str, float]]' = OrderedDict()
+        self._user_courses: 'OrderedDict[int, Tuple[int, List[int], float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def init_app(self, app, db):
+        from sqlalchemy import event
+
+        self.ttl = float(app.config.get('PAGE_CACHE_TTL', self.ttl))
+        self.max_entries = int(app.config.get('PAGE_CACHE_MAX_ENTRIES', self.max_entries))
+        for name, listener in (('after_flush', _collect_changes), ('after_commit', _apply_changes),
+                               ('after_rollback', _discard_changes)):
+            if not event.contains(db.session, name, listener):
+                event.listen(db.session, name, listener)
+        app.extensions['page_cache'] = self
+
+    # ---- versions ----
+
+    def bump(self, course_ids: Iterable[int] = (), user_ids: Iterable[int] = (), names: bool = False):
+        """Mark courses (and users' course lists) as changed; call after the change is committed"""
+        with self._lock:
+            for course_id in course_ids:
+                if course_id is not None:
+                    self._versions[course_id] = self._versions.get(course_id, 0) + 1
+            for user_id in user_ids:
+                if user_id is not None:
+                    self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+            if names:
+                self._epoch += 1
+            self._generation += 1
+
+    def course_key(self, name: str, course_id: int, role: str, *extra: Hashable) -> tuple:
+        """Key of a fragment that shows one course"""
+        with self._lock:
+            return (name, role, course_id, self._versions.get(course_id, 0), self._epoch) + extra
+
+    def courses_key(self, name: str, role: str, course_ids: List[int], *extra: Hashable) -> tuple:
+        """Key of a fragment that shows several courses"""
+        with self._lock:
+            versions = tuple(self._versions.get(course_id, 0) for course_id in course_ids)
+            return (name, role, tuple(course_ids), versions, self._epoch) + extra
+
+    def global_key(self, name: str, *extra: Hashable) -> tuple:
+        """Key of a fragment that may show any course"""
+        with self._lock:
+            return (name, 'all', self._generation) + extra
+
+    def user_course_ids(self, user_id: int, load: Callable[[], Iterable[int]]) -> List[int]:
+        """A user's course ids (enrolled or taught), loaded once per change of their courses"""
+        if not self.enabled:
+            return sorted(load())
+        with self._lock:
+            version = self._user_versions.get(user_id, 0)
+            entry = self._user_courses.get(user_id)
+            if entry is not None and entry[0] == version and entry[2] > time.monotonic():
+                self._user_courses.move_to_end(user_id)
+                return entry[1]
+        course_ids = sorted(load())
+        with self._lock:
+            self._user_courses[user_id] = (version, course_ids, time.monotonic() + self.ttl)
+            self._user_courses.move_to_end(user_id)
+            while len(self._user_courses) > self.max_entries:
+                self._user_courses.popitem(last=False)
+        return course_ids
+
+    # ---- fragments ----
+
+    def fragment(self, key: tuple, render: Callable[[], str]):
+        """
+        Cached HTML for key, rendered on a miss
+
+        Compute the key before loading anything for the page, so data read
+        after a concurrent commit is never stored under the older version.
+        """
+        from markupsafe import Markup
+
+        name = key[0]
+        if not self.enabled:
+            return Markup(render())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return Markup(entry[0])
+            self.misses[name] = self.misses.get(name, 0) + 1
+        html = str(render())
+        with self._lock:
+            self._entries[key] = (html, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return Markup(html)
+
+    def fragments(self, keys: List[tuple], render: Callable[[List[tuple]], Dict[tuple, str]]) -> list:
+        """Cached HTML for several keys; render gets the missing keys and returns their HTML by key"""
+        from markupsafe import Markup
+
+        now = time.monotonic()
+        found = {}
+        if self.enabled:
+            with self._lock:
+                for key in keys:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry[1] > now:
+                        self._entries.move_to_end(key)
+                        found[key] = entry[0]
+                        self.hits[key[0]] = self.hits.get(key[0], 0) + 1
+                    else:
+                        self.misses[key[0]] = self.misses.get(key[0], 0) + 1
+        missing = [key for key in keys if key not in found]
+        if missing:
+            rendered = {key: str(html) for key, html in render(missing).items()}
+            found.update(rendered)
+            if self.enabled:
+                with self._lock:
+                    for key, html in rendered.items():
+                        self._entries[key] = (html, now + self.ttl)
+                        self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return [Markup(found[key]) for key in keys if key in found]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_courses.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {'entries': len(self._entries)}
+            for name in set(self.hits) | set(self.misses):
+                stats[f'{name}_hits'] = self.hits.get(name, 0)
+                stats[f'{name}_misses'] = self.misses.get(name, 0)
+            return stats
+
+
+def _values(obj, attribute: str) -> List[int]:
+    """Current and previous values of a column (a row moved between courses changes both)"""
+    from sqlalchemy import inspect
+
+    history = inspect(obj).attrs[attribute].history
+    return [value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None]
+
+
+def _collect_changes(session, flush_context):
+    """Remember which courses this flush touched; applied when the transaction commits"""
+    from app.models import Activity, Course, Enrollment, Question, User
+
+    changes = session.info.setdefault(SESSION_KEY, {'courses': set(), 'users': set(), 'names': False})
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, (Activity, Question)):
+            changes['courses'].update(_values(obj, 'course_id'))
+        elif isinstance(obj, Enrollment):
+            changes['courses'].update(_values(obj, 'course_id'))
+            changes['users'].update(_values(obj, 'student_id'))
+        elif isinstance(obj, Course):
+            changes['courses'].add(obj.id)
+            changes['users'].update(_values(obj, 'instructor_id'))
+        elif isinstance(obj, User) and obj in session.dirty:
+            from sqlalchemy import inspect
+            attrs = inspect(obj).attrs
+            if attrs.name.history.has_changes() or attrs.student_id.history.has_changes():
+                changes['names'] = True
+
+
+def _apply_changes(session):
+    changes = session.info.pop(SESSION_KEY, None)
+    if changes and (changes['courses'] or changes['users'] or changes['names']):
+        page_cache.bump(changes['courses'], changes['users'], changes['names'])
+
+
+def _discard_changes(session):
+    session.info.pop(SESSION_KEY, None)
+
+
+page_cache = PageCache()
@@ -0,0 +1,250 @@
+"""
+Request Profiler
+Opt-in cProfile capture of single requests, stored in an on-disk ring buffer
+
+An admin adds ``?_profile=1`` to a URL (or sends the header
+``X-Profile: 1``) and that one request runs under cProfile from
+before_request to after_request, so the view, its queries and the template
+render are all covered. The result is written to the profile directory as
+a raw .prof file (loadable with pstats or snakeviz) plus a JSON summary
+with the top functions, SQL statement count and time, and template render
+time. Only the newest PROFILER_KEEP profiles are kept.
+
+Requests without the flag pay for one query-string and one header lookup;
+the admin check only runs when the flag is present.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'cache', 'profiles'))
+DEFAULT_KEEP = 50
+QUERY_FLAG = '_profile'
+HEADER_FLAG = 'X-Profile'
+TOP_FUNCTIONS = 30
+
+PROFILE_ID_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]+-[0-9]+$')
+
+
+def _function_label(func) -> str:
+    filename, line, name = func
+    if filename == '~':  # built-in
+        return name
+    parts = filename.replace('\\', '/').split('/')
+    for anchor in ('site-packages', 'app'):
+        if anchor in parts:
+            parts = parts[parts.index(anchor) + (1 if anchor == 'site-packages' else 0):]
+            break
+    else:
+        parts = parts[-2:]
+    return f"{'/'.join(parts)}:{line}({name})"
+
+
+def top_functions(profile: cProfile.Profile, sort: str, limit: int = TOP_FUNCTIONS) -> List[Dict[str, object]]:
+    """Top entries of a profile sorted by 'cumulative' or 'tottime'"""
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    stats.sort_stats(sort)
+    rows = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, total_calls, tottime, cumtime, _ = stats.stats[func]
+        rows.append({
+            'function': _function_label(func),
+            'calls': total_calls if total_calls == primitive_calls else f'{total_calls}/{primitive_calls}',
+            'tottime_ms': round(tottime * 1000, 2),
+            'cumtime_ms': round(cumtime * 1000, 2)
+        })
+    return rows
+
+
+class RequestProfiler:
+    """
+    Per-request profiler for administrators
+
+    Configuration (app.config or environment):
+        PROFILER_ENABLED: Set to 0 to not install the hooks at all
+        PROFILER_DIR: Profile directory (default <project>/cache/profiles)
+        PROFILER_KEEP: Number of profiles kept (default 50)
+    """
+
+    def __init__(self):
+        self.profile_dir = os.environ.get('PROFILER_DIR', DEFAULT_PROFILE_DIR)
+        self.keep = int(os.environ.get('PROFILER_KEEP', DEFAULT_KEEP))
+        self.enabled = os.environ.get('PROFILER_ENABLED', '1') != '0'
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def init_app(self, app):
+        self.profile_dir = app.config.get('PROFILER_DIR', self.profile_dir)
+        self.keep = int(app.config.get('PROFILER_KEEP', self.keep))
+        self.enabled = bool(app.config.get('PROFILER_ENABLED', self.enabled))
+        app.extensions['profiler'] = self
+        if not self.enabled:
+            return
+
+        from flask import before_render_template, template_rendered
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+        before_render_template.connect(self._render_started, app)
+        template_rendered.connect(self._render_finished, app)
+
+    # ---- request hooks ----
+
+    @staticmethod
+    def _requested() -> bool:
+        from flask import request
+        return QUERY_FLAG in request.args or bool(request.headers.get(HEADER_FLAG))
+
+    def _start(self):
+        from flask import g
+        from flask_login import current_user
+        if not self._requested():
+            return
+        if not (current_user.is_authenticated and current_user.role == 'admin'):
+            return
+        g.profile_state = {'start': time.perf_counter(), 'render': 0.0, 'render_start': [], 'templates': []}
+        g.profile_state['profile'] = profile = cProfile.Profile()
+        profile.enable()
+
+    def _finish(self, response):
+        from flask import g
+        state = g.pop('profile_state', None)
+        if state is None:
+            return response
+        state['profile'].disable()
+        duration = time.perf_counter() - state['start']
+        try:
+            profile_id = self._save(state, duration, response.status_code)
+            response.headers['X-Profile-Id'] = profile_id
+        except OSError as e:
+            logger.error("Could not store request profile: %s", e)
+        return response
+
+    @staticmethod
+    def _abandon(exc):
+        from flask import g
+        state = g.pop('profile_state', None)
+        if state is not None:
+            state['profile'].disable()
+
+    @staticmethod
+    def _render_started(sender, template, context, **extra):
+        from flask import g
+        state = g.get('profile_state')
+        if state is not None:
+            state['render_start'].append(time.perf_counter())
+
+    @staticmethod
+    def _render_finished(sender, template, context, **extra):
+        from flask import g
+        state = g.get('profile_state')
+        if state is not None and state['render_start']:
+            state['render'] += time.perf_counter() - state['render_start'].pop()
+            state['templates'].append(template.name)
+
+    # ---- storage ----
+
+    def _new_id(self) -> str:
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{counter}"
+
+    def _save(self, state, duration: float, status: int) -> str:
+        from flask import request
+        from app.metrics import request_sql_totals
+
+        sql_count, sql_time = request_sql_totals()
+        profile = state['profile']
+        profile_id = self._new_id()
+        summary = {
+            'id': profile_id,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint or '<unmatched>',
+            'status': status,
+            'duration_ms': round(duration * 1000, 1),
+            'sql_count': sql_count,
+            'sql_ms': round(sql_time * 1000, 1),
+            'render_ms': round(state['render'] * 1000, 1),
+            'templates': state['templates'],
+            'top_cumulative': top_functions(profile, 'cumulative'),
+            'top_tottime': top_functions(profile, 'tottime')
+        }
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profile.dump_stats(os.path.join(self.profile_dir, profile_id + '.prof'))
+        tmp_path = os.path.join(self.profile_dir, profile_id + '.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f)
+        os.replace(tmp_path, os.path.join(self.profile_dir, profile_id + '.json'))
+        self._prune()
+        logger.info("Stored profile %s for %s %s (%sms)", profile_id, summary['method'], summary['path'],
+                    summary['duration_ms'], extra={'profile_id': profile_id})
+        return profile_id
+
+    def _ids(self) -> List[str]:
+        """Stored profile ids, newest first"""
+        try:
+            names = os.listdir(self.profile_dir)
+        except FileNotFoundError:
+            return []
+        ids = [name[:-5] for name in names if name.endswith('.json') and PROFILE_ID_RE.match(name[:-5])]
+        return sorted(ids, key=lambda pid: (pid[:15], int(pid.rsplit('-', 1)[1])), reverse=True)
+
+    def _remove(self, profile_id: str):
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(self.profile_dir, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+    def _prune(self):
+        for profile_id in self._ids()[self.keep:]:
+            self._remove(profile_id)
+
+    # ---- reading ----
+
+    def get(self, profile_id: str) -> Optional[Dict[str, object]]:
+        if not PROFILE_ID_RE.match(profile_id or ''):
+            return None
+        try:
+            with open(os.path.join(self.profile_dir, profile_id + '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def raw_path(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID_RE.match(profile_id or ''):
+            return None
+        path = os.path.join(self.profile_dir, profile_id + '.prof')
+        return path if os.path.exists(path) else None
+
+    def recent(self) -> List[Dict[str, object]]:
+        """Summaries of the stored profiles, newest first"""
+        profiles = []
+        for profile_id in self._ids():
+            summary = self.get(profile_id)
+            if summary is not None:
+                summary['top'] = summary['top_cumulative'][:3]
+                profiles.append(summary)
+        return profiles
+
+    def clear(self):
+        for profile_id in self._ids():
+            self._remove(profile_id)
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,664 @@
+"""
+Q&A Search
+Full-text search over course questions and answers with pluggable backends
+
+Backends (QA_SEARCH_BACKEND, default "auto"):
+    fts5    SQLite FTS5 table qa_search_index, kept in the application database
+    mysql   MySQL FULLTEXT indexes (ngram parser) on question and answer;
+            MySQL maintains them itself
+    memory  In-process inverted index per course with BM25 ranking, loaded
+            on first search and rechecked against the database every
+            QA_SEARCH_RECHECK_SECONDS so writes from other workers trigger a
+            reload of that course
+
+"auto" picks mysql or fts5 from the database dialect and falls back to
+memory when the database cannot provide full-text search.
+
+Text is tokenized the same way for every backend that indexes it itself:
+lowercased Latin words and numbers, and overlapping bigrams of CJK runs (so
+Chinese text is searchable without a segmenter). Title terms weigh twice as
+much as body terms. The routes call index_question/index_answer after a post
+is created and the remove_* methods after deletes; index failures are logged
+and never fail the request.
+"""
+
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from markupsafe import escape
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_QUERY_LENGTH = 200
+MAX_QUERY_TERMS = 16
+SNIPPET_WIDTH = 160
+CANDIDATE_FACTOR = 5
+MAX_MEMORY_COURSES = 256
+DEFAULT_RECHECK_SECONDS = 5.0
+
+TOKEN_RE = re.compile(r'[0-9a-zÀ-ɏ]+|[㐀-䶿一-鿿]+')
+CJK_RE = re.compile(r'[㐀-䶿一-鿿]')
+STOPWORDS = frozenset(
+    'a an and are as at be but by can do for from how i in is it my of on or so that the this to was what '
+    'when where which who why with you'.split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Search terms of a text: Latin words, numbers and CJK bigrams"""
+    tokens = []
+    for run in TOKEN_RE.findall((text or '').lower()):
+        if CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        elif run not in STOPWORDS:
+            tokens.append(run)
+    return tokens
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct terms of a search query, in order"""
+    return list(dict.fromkeys(tokenize((query or '')[:MAX_QUERY_LENGTH])))[:MAX_QUERY_TERMS]
+
+
+def make_snippet(text: str, terms: Iterable[str], width: int = SNIPPET_WIDTH) -> str:
+    """HTML excerpt of text around the first matching term, with matches wrapped in <mark>"""
+    text = ' '.join((text or '').split())
+    terms = sorted(set(terms), key=len, reverse=True)
+    if not terms:
+        return str(escape(text[:width]))
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - width // 4) if first else 0
+    if start and ' ' in text[start:start + 20]:
+        start = text.index(' ', start) + 1  # do not cut a word in half
+    window = text[start:start + width]
+
+    parts, last = [], 0
+    for match in pattern.finditer(window):
+        parts.append(str(escape(window[last:match.start()])))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(str(escape(window[last:])))
+    prefix = '…' if start else ''
+    suffix = '…' if start + width < len(text) else ''
+    return prefix + ''.join(parts) + suffix
+
+
+class SearchHit(NamedTuple):
+    question_id: int
+    score: float
+    kind: str  # 'question' or 'answer'
+    answer_id: Optional[int]
+
+
+def best_per_question(candidates: Iterable[SearchHit], limit: int) -> List[SearchHit]:
+    """Keep the best scoring document of each question"""
+    best: Dict[int, SearchHit] = {}
+    for hit in candidates:
+        current = best.get(hit.question_id)
+        if current is None or hit.score > current.score:
+            best[hit.question_id] = hit
+    return heapq.nlargest(limit, best.values(), key=lambda hit: hit.score)
+
+
+def _question_tokens(title: str, content: str) -> Counter:
+    counts = Counter(tokenize(content))
+    for token in tokenize(title):
+        counts[token] += TITLE_WEIGHT
+    return counts
+
+
+# ---- in-process BM25 ----
+
+class _CourseIndex:
+    """Inverted index of one course: term -> {doc key: term frequency}"""
+
+    __slots__ = ('postings', 'docs', 'lengths', 'total_length', 'signature', 'checked_at')
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self.docs: Dict[Tuple[str, int], Tuple[int, Counter]] = {}  # ('q'|'a', id) -> (question_id, term counts)
+        self.lengths: Dict[Tuple[str, int], int] = {}
+        self.total_length = 0
+        self.signature = None
+        self.checked_at = 0.0
+
+    def add(self, key, question_id: int, counts: Counter):
+        self.remove(key)
+        length = sum(counts.values())
+        self.docs[key] = (question_id, counts)
+        self.lengths[key] = length
+        self.total_length += length
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[key] = tf
+
+    def remove(self, key) -> bool:
+        entry = self.docs.pop(key, None)
+        if entry is None:
+            return False
+        self.total_length -= self.lengths.pop(key)
+        for term in entry[1]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self.postings[term]
+        return True
+
+    def question_keys(self, question_id: int) -> List[Tuple[str, int]]:
+        return [key for key, (qid, _) in self.docs.items() if qid == question_id]
+
+    def search(self, terms: List[str], limit: int) -> List[SearchHit]:
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs or 1
+        scores: Dict[Tuple[str, int], float] = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, tf in posting.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[key] / avg_length)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return best_per_question(
+            (SearchHit(self.docs[key][0], score, 'question' if key[0] == 'q' else 'answer',
+                       key[1] if key[0] == 'a' else None) for key, score in scores.items()),
+            limit)
+
+
+class MemoryBackend:
+    """
+    BM25 over per-course inverted indexes held in this process
+
+    Each loaded course remembers a signature (count and id sum of its
+    questions and answers). Local writes update index and signature
+    together; a signature that no longer matches the database means another
+    worker changed the course, and the course is reloaded. The signature
+    query scans the course's posts, so it runs at most once per
+    recheck_seconds per course.
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_courses: int = MAX_MEMORY_COURSES, recheck_seconds: float = DEFAULT_RECHECK_SECONDS):
+        self.max_courses = max_courses
+        self.recheck_seconds = recheck_seconds
+        self._courses: 'OrderedDict[int, _CourseIndex]' = OrderedDict()
+        self._lock = threading.RLock()
+
+    def prepare(self):
+        pass
+
+    @staticmethod
+    def _signature(course_id: int) -> tuple:
+        from sqlalchemy import func
+        from app import db
+        from app.models import Answer, Question
+
+        questions = db.session.query(func.count(Question.id), func.coalesce(func.sum(Question.id), 0))\
+            .filter(Question.course_id == course_id).one()
+        answers = db.session.query(func.count(Answer.id), func.coalesce(func.sum(Answer.id), 0))\
+            .join(Question, Answer.question_id == Question.id)\
+            .filter(Question.course_id == course_id).one()
+        return tuple(int(value) for value in tuple(questions) + tuple(answers))
+
+    @staticmethod
+    def _load(course_id: int) -> _CourseIndex:
+        from app import db
+        from app.models import Answer, Question
+
+        index = _CourseIndex()
+        for question_id, title, content in db.session.query(Question.id, Question.title, Question.content)\
+                .filter(Question.course_id == course_id):
+            index.add(('q', question_id), question_id, _question_tokens(title, content))
+        for answer_id, question_id, content in db.session.query(Answer.id, Answer.question_id, Answer.content)\
+                .join(Question, Answer.question_id == Question.id)\
+                .filter(Question.course_id == course_id):
+            index.add(('a', answer_id), question_id, Counter(tokenize(content)))
+        return index
+
+    def _course(self, course_id: int) -> _CourseIndex:
+        now = time.monotonic()
+        with self._lock:
+            index = self._courses.get(course_id)
+            if index is not None and now - index.checked_at < self.recheck_seconds:
+                self._courses.move_to_end(course_id)
+                return index
+        signature = self._signature(course_id)
+        with self._lock:
+            index = self._courses.get(course_id)
+            if index is not None and index.signature == signature:
+                index.checked_at = now
+                self._courses.move_to_end(course_id)
+                return index
+        index = self._load(course_id)
+        index.signature, index.checked_at = signature, now
+        with self._lock:
+            self._courses[course_id] = index
+            self._courses.move_to_end(course_id)
+            while len(self._courses) > self.max_courses:
+                self._courses.popitem(last=False)
+        return index
+
+    def _loaded(self, course_id: int) -> Optional[_CourseIndex]:
+        return self._courses.get(course_id)
+
+    @staticmethod
+    def _shift(index: _CourseIndex, removed: Iterable[Tuple[str, int]], added: Iterable[Tuple[str, int]] = ()):
+        q_count, q_sum, a_count, a_sum = index.signature
+        for sign, keys in ((-1, removed), (1, added)):
+            for kind, doc_id in keys:
+                if kind == 'q':
+                    q_count, q_sum = q_count + sign, q_sum + sign * doc_id
+                else:
+                    a_count, a_sum = a_count + sign, a_sum + sign * doc_id
+        index.signature = (q_count, q_sum, a_count, a_sum)
+
+    def index_question(self, course_id: int, question_id: int, title: str, content: str):
+        with self._lock:
+            index = self._loaded(course_id)
+            if index is not None:
+                key = ('q', question_id)
+                is_new = key not in index.docs
+                index.add(key, question_id, _question_tokens(title, content))
+                if is_new:
+                    self._shift(index, (), [key])
+
+    def index_answer(self, course_id: int, question_id: int, answer_id: int, content: str):
+        with self._lock:
+            index = self._loaded(course_id)
+            if index is not None:
+                key = ('a', answer_id)
+                is_new = key not in index.docs
+                index.add(key, question_id, Counter(tokenize(content)))
+                if is_new:
+                    self._shift(index, (), [key])
+
+    def remove_question(self, course_id: int, question_id: int):
+        with self._lock:
+            index = self._loaded(course_id)
+            if index is not None:
+                removed = index.question_keys(question_id)
+                for key in removed:
+                    index.remove(key)
+                self._shift(index, removed)
+
+    def remove_answer(self, course_id: int, question_id: int, answer_id: int):
+        with self._lock:
+            index = self._loaded(course_id)
+            if index is not None and index.remove(('a', answer_id)):
+                self._shift(index, [('a', answer_id)])
+
+    def remove_course(self, course_id: int):
+        with self._lock:
+            self._courses.pop(course_id, None)
+
+    def index_course(self, course_id: int):
+        # Loaded again from the database on its next search
+        self.remove_course(course_id)
+
+    def search(self, course_id: int, terms: List[str], limit: int) -> List[SearchHit]:
+        index = self._course(course_id)
+        with self._lock:
+            return index.search(terms, limit)
+
+    def rebuild(self):
+        with self._lock:
+            self._courses.clear()
+
+
+# ---- SQLite FTS5 ----
+
+class FTS5Backend:
+    """
+    SQLite FTS5 table holding the pre-tokenized text of every post
+
+    rowid is id * 2 for questions and id * 2 + 1 for answers. The tags
+    column holds "c<course_id> q<question_id>" so a search is restricted to
+    one course and a question's posts can be deleted with one MATCH. Rows
+    are written in the same database as the posts, right after their commit.
+    """
+
+    name = 'fts5'
+    TABLE = 'qa_search_index'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _execute(sql: str, params=None):
+        from sqlalchemy import text
+        from app import db
+        return db.session.execute(text(sql), params or {})
+
+    @staticmethod
+    def _commit():
+        from app import db
+        db.session.commit()
+
+    def prepare(self):
+        """Create the table and fill it when it does not match the posts"""
+        from app import db
+        from app.models import Answer, Question
+
+        with self._lock:
+            self._execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5("
+                          "tags, title, body, question_id UNINDEXED, tokenize='unicode61')")
+            # title matches weigh twice as much as body matches
+            self._execute(f"INSERT INTO {self.TABLE}({self.TABLE}, rank) VALUES ('rank', 'bm25(0.0, 2.0, 1.0)')")
+            self._commit()
+            indexed = self._execute(f"SELECT count(*) FROM {self.TABLE}").scalar()
+            expected = db.session.query(Question.id).count() + db.session.query(Answer.id).count()
+        if indexed != expected:
+            logger.info("Q&A search index has %s rows for %s posts, rebuilding", indexed, expected)
+            self.rebuild()
+
+    @staticmethod
+    def _question_row(course_id, question_id, title, content):
+        return {'rowid': question_id * 2, 'tags': f'c{course_id} q{question_id}',
+                'title': ' '.join(tokenize(title)), 'body': ' '.join(tokenize(content)),
+                'question_id': question_id}
+
+    @staticmethod
+    def _answer_row(course_id, question_id, answer_id, content):
+        return {'rowid': answer_id * 2 + 1, 'tags': f'c{course_id} q{question_id}',
+                'title': '', 'body': ' '.join(tokenize(content)), 'question_id': question_id}
+
+    def _write(self, rows: List[dict]):
+        if rows:
+            self._execute(f"INSERT OR REPLACE INTO {self.TABLE}(rowid, tags, title, body, question_id) "
+                          "VALUES (:rowid, :tags, :title, :body, :question_id)", rows)
+
+    def _delete_tagged(self, tag: str):
+        self._execute(f"DELETE FROM {self.TABLE} WHERE rowid IN "
+                      f"(SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH :match)",
+                      {'match': f'tags:{tag}'})
+
+    def index_question(self, course_id: int, question_id: int, title: str, content: str):
+        self._write([self._question_row(course_id, question_id, title, content)])
+        self._commit()
+
+    def index_answer(self, course_id: int, question_id: int, answer_id: int, content: str):
+        self._write([self._answer_row(course_id, question_id, answer_id, content)])
+        self._commit()
+
+    def remove_question(self, course_id: int, question_id: int):
+        self._delete_tagged(f'q{question_id}')
+        self._commit()
+
+    def remove_answer(self, course_id: int, question_id: int, answer_id: int):
+        self._execute(f"DELETE FROM {self.TABLE} WHERE rowid = :rowid", {'rowid': answer_id * 2 + 1})
+        self._commit()
+
+    def remove_course(self, course_id: int):
+        self._delete_tagged(f'c{course_id}')
+        self._commit()
+
+    def search(self, course_id: int, terms: List[str], limit: int) -> List[SearchHit]:
+        match = 'tags:c%d AND {title body}:(%s)' % (course_id, ' OR '.join(f'"{term}"' for term in terms))
+        rows = self._execute(f"SELECT rowid, question_id, rank FROM {self.TABLE} "
+                             f"WHERE {self.TABLE} MATCH :match ORDER BY rank LIMIT :n",
+                             {'match': match, 'n': limit * CANDIDATE_FACTOR})
+        return best_per_question(
+            (SearchHit(question_id, -rank, 'answer' if rowid % 2 else 'question', rowid // 2 if rowid % 2 else None)
+             for rowid, question_id, rank in rows),
+            limit)
+
+    def _fill(self, batch_size: int, course_id: Optional[int] = None):
+        """Write the rows of every post (or of one course's posts) in batches"""
+        from app import db
+        from app.models import Answer, Question
+
+        questions = db.session.query(Question.course_id, Question.id, Question.title, Question.content)
+        answers = db.session.query(Question.course_id, Answer.question_id, Answer.id, Answer.content)\
+            .join(Question, Answer.question_id == Question.id)
+        if course_id is not None:
+            questions = questions.filter(Question.course_id == course_id)
+            answers = answers.filter(Question.course_id == course_id)
+        batch = []
+        for query, make_row in ((questions, self._question_row), (answers, self._answer_row)):
+            for row in query.yield_per(batch_size):
+                batch.append(make_row(*row))
+                if len(batch) >= batch_size:
+                    self._write(batch)
+                    batch = []
+        self._write(batch)
+
+    def index_course(self, course_id: int, batch_size: int = 2000):
+        with self._lock:
+            self._delete_tagged(f'c{course_id}')
+            self._fill(batch_size, course_id)
+            self._commit()
+
+    def rebuild(self, batch_size: int = 2000):
+        with self._lock:
+            self._execute(f"DELETE FROM {self.TABLE}")
+            self._fill(batch_size)
+            self._execute(f"INSERT INTO {self.TABLE}({self.TABLE}) VALUES ('optimize')")
+            self._commit()
+
+
+# ---- MySQL FULLTEXT ----
+
+class MySQLFulltextBackend:
+    """
+    MySQL FULLTEXT indexes with the ngram parser (handles Chinese text)
+
+    The indexes live on the question and answer tables and are maintained by
+    MySQL in the posting transaction, so the index_* and remove_* hooks have
+    nothing to do.
+    """
+
+    name = 'mysql'
+    INDEXES = (
+        ('question', 'ft_question_title_content', 'title, content'),
+        ('answer', 'ft_answer_content', 'content'),
+    )
+
+    @staticmethod
+    def _execute(sql: str, params=None):
+        from sqlalchemy import text
+        from app import db
+        return db.session.execute(text(sql), params or {})
+
+    def prepare(self):
+        from app import db
+
+        existing = {name for (name,) in self._execute(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND index_type = 'FULLTEXT'")}
+        for table, index_name, columns in self.INDEXES:
+            if index_name not in existing:
+                logger.info("Creating FULLTEXT index %s on %s", index_name, table)
+                self._execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {index_name} ({columns}) WITH PARSER ngram")
+        db.session.commit()
+
+    def index_question(self, course_id, question_id, title, content):
+        pass
+
+    def index_answer(self, course_id, question_id, answer_id, content):
+        pass
+
+    def remove_question(self, course_id, question_id):
+        pass
+
+    def remove_answer(self, course_id, question_id, answer_id):
+        pass
+
+    def remove_course(self, course_id):
+        pass
+
+    def index_course(self, course_id):
+        pass
+
+    def search(self, course_id: int, terms: List[str], limit: int) -> List[SearchHit]:
+        params = {'q': ' '.join(terms), 'course_id': course_id, 'n': limit * CANDIDATE_FACTOR}
+        questions = self._execute(
+            "SELECT id, MATCH(title, content) AGAINST (:q IN NATURAL LANGUAGE MODE) AS score FROM question "
+            "WHERE course_id = :course_id AND MATCH(title, content) AGAINST (:q IN NATURAL LANGUAGE MODE) "
+            "ORDER BY score DESC LIMIT :n", params)
+        answers = self._execute(
+            "SELECT a.id, a.question_id, MATCH(a.content) AGAINST (:q IN NATURAL LANGUAGE MODE) AS score "
+            "FROM answer a JOIN question q ON q.id = a.question_id "
+            "WHERE q.course_id = :course_id AND MATCH(a.content) AGAINST (:q IN NATURAL LANGUAGE MODE) "
+            "ORDER BY score DESC LIMIT :n", params)
+        hits = [SearchHit(question_id, float(score) * TITLE_WEIGHT, 'question', None)
+                for question_id, score in questions]
+        hits.extend(SearchHit(question_id, float(score), 'answer', answer_id)
+                    for answer_id, question_id, score in answers)
+        return best_per_question(hits, limit)
+
+    def rebuild(self):
+        pass
+
+
+BACKENDS = {'memory': MemoryBackend, 'fts5': FTS5Backend, 'mysql': MySQLFulltextBackend}
+
+
+class QASearch:
+    """
+    Search facade used by the routes
+
+    Configuration (app.config or environment):
+        QA_SEARCH_BACKEND: auto (default), memory, fts5 or mysql
+        QA_SEARCH_RECHECK_SECONDS: How often the memory backend looks for
+            posts written by other workers (default 5)
+    """
+
+    def __init__(self):
+        self.setting = os.environ.get('QA_SEARCH_BACKEND', 'auto').lower()
+        self.recheck_seconds = float(os.environ.get('QA_SEARCH_RECHECK_SECONDS', DEFAULT_RECHECK_SECONDS))
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.setting = str(app.config.get('QA_SEARCH_BACKEND', self.setting)).lower()
+        self.recheck_seconds = float(app.config.get('QA_SEARCH_RECHECK_SECONDS', self.recheck_seconds))
+        self._backend = None
+        app.extensions['qa_search'] = self
+
+    @property
+    def backend(self):
+        """The active backend, prepared on first use"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._create_backend()
+        return self._backend
+
+    def _create_backend(self):
+        from app import db
+
+        name = self.setting
+        if name == 'auto':
+            dialect = db.engine.dialect.name
+            name = {'mysql': 'mysql', 'sqlite': 'fts5'}.get(dialect, 'memory')
+        if name not in BACKENDS:
+            logger.warning("Unknown QA_SEARCH_BACKEND %r, using memory", name)
+            name = 'memory'
+        backend = MemoryBackend(recheck_seconds=self.recheck_seconds) if name == 'memory' else BACKENDS[name]()
+        try:
+            backend.prepare()
+        except Exception as e:
+            db.session.rollback()
+            if name == 'memory':
+                raise
+            logger.warning("Q&A search backend %s unavailable (%s), using memory", name, e)
+            backend = MemoryBackend(recheck_seconds=self.recheck_seconds)
+        logger.info("Q&A search backend: %s", backend.name)
+        return backend
+
+    def _apply(self, action: str, *args):
+        """Run an index update; failures are logged and never reach the caller"""
+        from app import db
+        try:
+            getattr(self.backend, action)(*args)
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Q&A search %s%r failed: %s", action, args, e)
+
+    # ---- index maintenance (call after the post's commit) ----
+
+    def index_question(self, question):
+        self._apply('index_question', question.course_id, question.id, question.title, question.content)
+
+    def index_answer(self, answer, course_id: int):
+        self._apply('index_answer', course_id, answer.question_id, answer.id, answer.content)
+
+    def remove_question(self, course_id: int, question_id: int):
+        self._apply('remove_question', course_id, question_id)
+
+    def remove_answer(self, course_id: int, question_id: int, answer_id: int):
+        self._apply('remove_answer', course_id, question_id, answer_id)
+
+    def remove_course(self, course_id: int):
+        self._apply('remove_course', course_id)
+
+    def index_course(self, course_id: int):
+        """Index every post of a course again (after its rows were written in bulk, e.g. a restore)"""
+        self._apply('index_course', course_id)
+
+    def rebuild(self):
+        self.backend.rebuild()
+
+    # ---- querying ----
+
+    def search(self, course_id: int, query: str, limit: int = 10) -> List[Dict[str, object]]:
+        """Best matching questions of a course with highlighted snippets"""
+        from app import db
+        from app.models import Answer, Question
+
+        terms = query_terms(query)
+        if not terms:
+            return []
+        hits = self.backend.search(course_id, terms, limit)
+        if not hits:
+            return []
+
+        questions = dict(
+            (row.id, row) for row in db.session.query(Question.id, Question.title, Question.content,
+                                                      Question.is_resolved, Question.created_at)
+            .filter(Question.id.in_([hit.question_id for hit in hits]), Question.course_id == course_id))
+        answer_ids = [hit.answer_id for hit in hits if hit.answer_id is not None]
+        answers = dict(db.session.query(Answer.id, Answer.content).filter(Answer.id.in_(answer_ids))) \
+            if answer_ids else {}
+
+        results = []
+        for hit in hits:
+            question = questions.get(hit.question_id)
+            if question is None:  # deleted since it was indexed
+                continue
+            if hit.kind == 'answer' and hit.answer_id in answers:
+                matched_in, text = 'answer', answers[hit.answer_id]
+            else:
+                matched_in, text = 'question', question.content
+            results.append({
+                'question_id': question.id,
+                'title': question.title,
+                'title_html': make_snippet(question.title, terms, width=len(question.title)),
+                'snippet': make_snippet(text, terms),
+                'matched_in': matched_in,
+                'answer_id': hit.answer_id if matched_in == 'answer' else None,
+                'is_resolved': question.is_resolved,
+                'created_at': question.created_at,
+                'score': round(hit.score, 4)
+            })
+        return results
+
+
+qa_search = QASearch()
@@ -4,10 +4,106 @@ For generating QR codes for quick activity join
 """
 
 import qrcode
+import qrcode.image.svg
 from io import BytesIO
 import base64
+import hashlib
+import threading
+from collections import OrderedDict
 from flask import url_for, request
 
+# Allowed box sizes for the cached QR endpoint (keeps the cache key space small)
+MIN_QR_SIZE = 2
+MAX_QR_SIZE = 20
+DEFAULT_QR_SIZE = 10
+
+QR_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+
+
+def _build_qr(data, size, border, image_factory=None):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=size,
+        border=border,
+        image_factory=image_factory,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+
+def render_qr_code(data, size=DEFAULT_QR_SIZE, border=2, fmt='png'):
+    """
+    Render a QR code as PNG or SVG bytes
+    
+    Args:
+        data: Data to encode (usually URL)
+        size: QR code size (box_size; pixels per module for PNG)
+        border: Border size
+        fmt: 'png' or 'svg'
+    
+    Returns:
+        Image file content
+    """
+    if fmt == 'svg':
+        return _build_qr(data, size, border, qrcode.image.svg.SvgPathImage).make_image().to_string()
+    
+    img = _build_qr(data, size, border).make_image(fill_color="black", back_color="white")
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+class QRCodeCache:
+    """
+    In-memory LRU cache of rendered QR images keyed by join token, size and format
+    
+    The image only depends on the join URL, so an entry stays valid until the
+    token changes; regenerate_qr_code and toggle_quick_join call invalidate()
+    for the old token. ETags are content hashes, so they agree across workers.
+    """
+    
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_render(self, token, data, size=DEFAULT_QR_SIZE, fmt='png'):
+        """Return (image bytes, etag) for a join token, rendering it on a miss"""
+        key = (token, size, fmt, data)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        
+        body = render_qr_code(data, size=size, fmt=fmt)
+        entry = (body, hashlib.sha256(body).hexdigest()[:32])
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def invalidate(self, token):
+        """Drop every cached image of a join token"""
+        if not token:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == token]:
+                del self._entries[key]
+
+
+qr_cache = QRCodeCache()
+
 
 def generate_qr_code(data, size=10, border=2):
     """
@@ -21,21 +117,8 @@ def generate_qr_code(data, size=10, border=2):
     Returns:
         base64 encoded image string, can be directly used in HTML img src
     """
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=size,
-        border=border,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
     # Convert to base64
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    img_str = base64.b64encode(render_qr_code(data, size=size, border=border)).decode()
     
     return f"data:image/png;base64,{img_str}"
 
@@ -83,3 +166,26 @@ def get_activity_join_url(activity, _external=True):
         token=activity.join_token,
         _external=_external
     )
+
+
+def get_activity_qr_url(activity, fmt='png', size=DEFAULT_QR_SIZE):
+    """
+    Get the URL of the cached QR image endpoint for an activity
+    
+    Args:
+        activity: Activity model instance
+        fmt: 'png' or 'svg'
+        size: QR code box size
+    
+    Returns:
+        Image URL string, or None when the activity has no join token
+    """
+    if not activity.join_token:
+        return None
+    
+    return url_for(
+        'activities.quick_join_qr',
+        token=activity.join_token,
+        fmt=fmt,
+        size=size
+    )
@@ -0,0 +1,286 @@
+"""
+Question Similarity
+Per-course TF-IDF index used to suggest existing questions while a student types a new one
+
+Each question is a sparse vector of sublinear term frequencies (title terms
+count double) over the same tokens as Q&A search. Similarity is cosine with
+IDF weights. Candidates are the questions sharing one of the draft's
+selective terms (found through an inverted index), so common words do not
+make every question a candidate; candidates are then scored on all draft
+terms. Document norms depend on the IDF and are
+recomputed when the course has grown or shrunk by a tenth since the last
+refresh; in between, new questions get their norm from the current IDF.
+
+Courses are loaded on first use and kept up to date by add_question and
+remove_question; like the in-memory search backend, a loaded course is
+rechecked against the database every QA_SEARCH_RECHECK_SECONDS so
+questions posted through other workers show up too.
+
+Suggestions are cached per (course, index version, draft terms), so the
+repeated requests of a debounced text box and drafts that differ only in
+punctuation or stop words are answered from memory.
+"""
+
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.qa_search import DEFAULT_RECHECK_SECONDS, TITLE_WEIGHT, tokenize
+
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 5
+MIN_SIMILARITY = 0.2
+MAX_DRAFT_LENGTH = 2000
+MAX_COURSES = 256
+CACHE_SIZE = 2048
+CACHE_TTL_SECONDS = 30.0
+NORM_REFRESH_RATIO = 0.1
+CANDIDATE_DF_RATIO = 0.02
+CANDIDATE_MIN_DF = 50
+
+
+def draft_terms(title: str, content: str = '') -> Counter:
+    """Term counts of a question (or draft), title terms weighted"""
+    counts = Counter(tokenize((content or '')[:MAX_DRAFT_LENGTH]))
+    for token in tokenize((title or '')[:MAX_DRAFT_LENGTH]):
+        counts[token] += TITLE_WEIGHT
+    return counts
+
+
+def _sublinear(counts: Counter) -> Dict[str, float]:
+    return {term: 1 + math.log(tf) for term, tf in counts.items()}
+
+
+class _CourseVectors:
+    """TF vectors, inverted index and document frequencies of one course"""
+
+    __slots__ = ('vectors', 'postings', 'norms', 'norms_size', 'signature', 'checked_at', 'version')
+
+    def __init__(self):
+        self.vectors: Dict[int, Dict[str, float]] = {}
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.norms: Dict[int, float] = {}
+        self.norms_size = 0
+        self.signature = None
+        self.checked_at = 0.0
+        self.version = 0
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log((1 + len(self.vectors)) / (1 + df)) + 1
+
+    def _norm(self, vector: Dict[str, float]) -> float:
+        return math.sqrt(sum((tf * self.idf(term)) ** 2 for term, tf in vector.items())) or 1.0
+
+    def _refresh_norms(self):
+        self.norms = {question_id: self._norm(vector) for question_id, vector in self.vectors.items()}
+        self.norms_size = len(self.vectors)
+
+    def add(self, question_id: int, counts: Counter):
+        self.remove(question_id)
+        vector = _sublinear(counts)
+        self.vectors[question_id] = vector
+        for term, tf in vector.items():
+            self.postings.setdefault(term, {})[question_id] = tf
+        self.norms[question_id] = self._norm(vector)
+        self.version += 1
+        self._maybe_refresh()
+
+    def remove(self, question_id: int) -> bool:
+        vector = self.vectors.pop(question_id, None)
+        if vector is None:
+            return False
+        self.norms.pop(question_id, None)
+        for term in vector:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(question_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.version += 1
+        self._maybe_refresh()
+        return True
+
+    def _maybe_refresh(self):
+        if abs(len(self.vectors) - self.norms_size) > NORM_REFRESH_RATIO * max(self.norms_size, 10):
+            self._refresh_norms()
+
+    def similar(self, counts: Counter, limit: int, min_score: float,
+                exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        query = {term: tf * self.idf(term) for term, tf in _sublinear(counts).items() if term in self.postings}
+        if not query:
+            return []
+        query_norm = math.sqrt(sum(weight ** 2 for weight in query.values()))
+
+        # Candidates come from the selective terms only (a common word would pull in most of the
+        # course); the candidates' cosine still counts every draft term.
+        by_rarity = sorted(query, key=lambda term: len(self.postings[term]))
+        max_df = max(CANDIDATE_MIN_DF, CANDIDATE_DF_RATIO * len(self.vectors))
+        selective = [term for term in by_rarity if len(self.postings[term]) <= max_df] or by_rarity[:1]
+        candidates = set()
+        for term in selective:
+            candidates.update(self.postings[term])
+        candidates.discard(exclude)
+
+        weights = [(term, weight * self.idf(term)) for term, weight in query.items()]
+        scores = []
+        for question_id in candidates:
+            vector = self.vectors[question_id]
+            dot = sum(weight * vector.get(term, 0.0) for term, weight in weights)
+            scores.append((question_id, dot / (query_norm * self.norms[question_id])))
+        return [(question_id, score) for question_id, score in heapq.nlargest(limit, scores, key=lambda item: item[1])
+                if score >= min_score]
+
+
+class QuestionSimilarity:
+    """
+    Similar-question suggestions for the ask page
+
+    Configuration (app.config or environment):
+        QA_SEARCH_RECHECK_SECONDS: How often a loaded course looks for
+            questions written by other workers (default 5)
+    """
+
+    def __init__(self):
+        self.recheck_seconds = float(os.environ.get('QA_SEARCH_RECHECK_SECONDS', DEFAULT_RECHECK_SECONDS))
+        self._courses: 'OrderedDict[int, _CourseVectors]' = OrderedDict()
+        self._cache: 'OrderedDict[tuple, Tuple[float, List[Dict[str, object]]]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def init_app(self, app):
+        self.recheck_seconds = float(app.config.get('QA_SEARCH_RECHECK_SECONDS', self.recheck_seconds))
+        app.extensions['question_similarity'] = self
+
+    # ---- loading ----
+
+    @staticmethod
+    def _signature(course_id: int) -> tuple:
+        from sqlalchemy import func
+        from app import db
+        from app.models import Question
+
+        count, id_sum = db.session.query(func.count(Question.id), func.coalesce(func.sum(Question.id), 0))\
+            .filter(Question.course_id == course_id).one()
+        return int(count), int(id_sum)
+
+    @staticmethod
+    def _load(course_id: int) -> _CourseVectors:
+        from app import db
+        from app.models import Question
+
+        course = _CourseVectors()
+        for question_id, title, content in db.session.query(Question.id, Question.title, Question.content)\
+                .filter(Question.course_id == course_id):
+            vector = _sublinear(draft_terms(title, content))
+            course.vectors[question_id] = vector
+            for term, tf in vector.items():
+                course.postings.setdefault(term, {})[question_id] = tf
+        course._refresh_norms()
+        return course
+
+    def _course(self, course_id: int) -> _CourseVectors:
+        now = time.monotonic()
+        with self._lock:
+            course = self._courses.get(course_id)
+            if course is not None and now - course.checked_at < self.recheck_seconds:
+                self._courses.move_to_end(course_id)
+                return course
+        signature = self._signature(course_id)
+        with self._lock:
+            course = self._courses.get(course_id)
+            if course is not None and course.signature == signature:
+                course.checked_at = now
+                self._courses.move_to_end(course_id)
+                return course
+            version = course.version + 1 if course is not None else 0
+        course = self._load(course_id)
+        course.signature, course.checked_at, course.version = signature, now, version
+        with self._lock:
+            self._courses[course_id] = course
+            self._courses.move_to_end(course_id)
+            while len(self._courses) > MAX_COURSES:
+                self._courses.popitem(last=False)
+        return course
+
+    # ---- incremental updates (call after the commit) ----
+
+    def add_question(self, question):
+        with self._lock:
+            course = self._courses.get(question.course_id)
+            if course is None:
+                return
+            is_new = question.id not in course.vectors
+            course.add(question.id, draft_terms(question.title, question.content))
+            if is_new and course.signature is not None:
+                count, id_sum = course.signature
+                course.signature = (count + 1, id_sum + question.id)
+
+    def remove_question(self, course_id: int, question_id: int):
+        with self._lock:
+            course = self._courses.get(course_id)
+            if course is not None and course.remove(question_id) and course.signature is not None:
+                count, id_sum = course.signature
+                course.signature = (count - 1, id_sum - question_id)
+
+    def forget_course(self, course_id: int):
+        with self._lock:
+            self._courses.pop(course_id, None)
+
+    # ---- suggestions ----
+
+    def suggest(self, course_id: int, title: str, content: str = '', limit: int = MAX_SUGGESTIONS,
+                exclude: Optional[int] = None) -> List[Dict[str, object]]:
+        """Most similar existing questions of the course, best first"""
+        counts = draft_terms(title, content)
+        if not counts:
+            return []
+        course = self._course(course_id)
+        key = (course_id, course.version, limit, exclude, tuple(sorted(counts.items())))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached[1]
+            self.cache_misses += 1
+            matches = course.similar(counts, limit, MIN_SIMILARITY, exclude)
+
+        results = self._describe(course_id, matches)
+        with self._lock:
+            self._cache[key] = (now + CACHE_TTL_SECONDS, results)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _describe(course_id: int, matches: List[Tuple[int, float]]) -> List[Dict[str, object]]:
+        from sqlalchemy import func
+        from app import db
+        from app.models import Answer, Question
+
+        if not matches:
+            return []
+        rows = db.session.query(Question.id, Question.title, Question.is_resolved, func.count(Answer.id))\
+            .outerjoin(Answer, Answer.question_id == Question.id)\
+            .filter(Question.id.in_([question_id for question_id, _ in matches]), Question.course_id == course_id)\
+            .group_by(Question.id, Question.title, Question.is_resolved)
+        details = {row[0]: row for row in rows}
+        return [{
+            'question_id': question_id,
+            'title': details[question_id][1],
+            'is_resolved': bool(details[question_id][2]),
+            'answer_count': details[question_id][3],
+            'similarity': round(score, 3)
+        } for question_id, score in matches if question_id in details]
+
+
+question_similarity = QuestionSimilarity()
@@ -7,6 +7,8 @@ This package contains all the route handlers organized by functionality:
 - courses: Course management routes
 - activities: Activity management routes
 - qa: Q&A system routes
+- jobs: Background job status routes
+- admin: Admin system pages
 """
 
 # Import all route modules for easier access
@@ -15,6 +17,8 @@ from . import auth
 from . import courses
 from . import activities
 from . import qa
+from . import jobs
+from . import admin
 
 # Make blueprints available at package level
-__all__ = ['main', 'auth', 'courses', 'activities', 'qa']
\ No newline at end of file
+__all__ = ['main', 'auth', 'courses', 'activities', 'qa', 'jobs', 'admin']
\ No newline at end of file
@@ -3,11 +3,18 @@ from flask_login import login_required, current_user, login_user
 from app import db, socketio, get_beijing_time
 from app.models import Course, Activity, Response, User, Enrollment
 from app.forms import ActivityForm, AIQuestionForm
-from app.ai_utils import generate_questions, generate_activity_from_content, group_answers, extract_text_from_file, validate_file_upload
+from app.ai_utils import generate_questions_chunked, generate_activity_streaming, group_answers, extract_text_from_file, validate_file_upload
 from app.email_utils import send_temp_password_email
+from app.jobs import job_runner, JobLimitError, JobCancelled
+from app.join_tokens import join_token_resolver, enrollment_batcher
+from app.deletion import deletion_service, plan_activity
+from app.archive import archive_store
+from app.page_cache import page_cache
+from app.loading import load_profile
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
 import json
+import logging
 import re
 import csv
 import io
@@ -21,6 +28,14 @@ from flask import make_response
 from werkzeug.utils import secure_filename
 
 bp = Blueprint('activities', __name__)
+logger = logging.getLogger(__name__)
+
+# Only every Nth submission is logged at INFO level
+SUBMIT_LOG_SAMPLE_RATE = int(os.environ.get('LOG_SUBMIT_SAMPLE_RATE', 50))
+
+# Maximum teaching text read for AI question generation (extraction stops early at this size);
+# the text is split into token-budgeted chunks that are sent to the provider concurrently
+MAX_GENERATION_CHARS = 200000
 
 # English stopwords for word cloud filtering
 STOPWORDS = {
@@ -44,30 +59,36 @@ def list_activities():
     page = request.args.get('page', 1, type=int)
     per_page = 9  # Display 9 activities per page
     
-    # Get courses for create activity dropdown
-    user_courses = []
+    # Rendered once per page and version of the viewer's courses; keys are taken before any data is read
+    def load_course_ids():
+        if current_user.role == 'instructor':
+            query = db.session.query(Course.id).filter_by(instructor_id=current_user.id)
+        else:
+            query = db.session.query(Enrollment.course_id).filter_by(student_id=current_user.id)
+        return [course_id for (course_id,) in query]
+    
     if current_user.role == 'admin':
-        activities = Activity.query.order_by(Activity.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        user_courses = Course.query.order_by(Course.name).all()
-    elif current_user.role == 'instructor':
-        activities = Activity.query.join(Course).filter(
-            Course.instructor_id == current_user.id
-        ).order_by(Activity.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        user_courses = Course.query.filter_by(instructor_id=current_user.id).order_by(Course.name).all()
+        cache_key = page_cache.global_key('activity_list', page)
     else:
-        enrolled_courses = [enrollment.course for enrollment in current_user.enrollments]
-        course_ids = [course.id for course in enrolled_courses]
-        activities = Activity.query.filter(
-            Activity.course_id.in_(course_ids)
-        ).order_by(Activity.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-    
-    return render_template('activities/activity_list.html', activities=activities.items, pagination=activities, user_courses=user_courses)
+        course_ids = page_cache.user_course_ids(current_user.id, load_course_ids)
+        cache_key = page_cache.courses_key('activity_list', current_user.role, course_ids, page)
+    
+    def render_body():
+        # Get courses for create activity dropdown
+        user_courses = []
+        query = Activity.query.options(*load_profile('activity_list')).order_by(Activity.created_at.desc())
+        if current_user.role == 'admin':
+            user_courses = Course.query.order_by(Course.name).all()
+        else:
+            query = query.filter(Activity.course_id.in_(course_ids))
+            if current_user.role == 'instructor':
+                user_courses = Course.query.filter_by(instructor_id=current_user.id).order_by(Course.name).all()
+        activities = query.paginate(page=page, per_page=per_page, error_out=False)
+        return render_template('activities/activity_list_body.html', activities=activities.items,
+                               pagination=activities, user_courses=user_courses)
+    
+    body = page_cache.fragment(cache_key, render_body)
+    return render_template('activities/activity_list.html', body=body)
 
 def auto_end_activity(activity_id, duration_seconds, started_at_timestamp):
     """Background task: Automatically end activity
@@ -77,8 +98,8 @@ def auto_end_activity(activity_id, duration_seconds, started_at_timestamp):
         duration_seconds: Duration in seconds
         started_at_timestamp: Timestamp when activity was started (used to verify if it's the current start)
     """
-    print(f"[AUTO-END] Starting timer for activity {activity_id}, will end in {duration_seconds} seconds")
-    print(f"[AUTO-END] Started at timestamp: {started_at_timestamp}")
+    logger.info("Auto-end timer started for activity %s, ends in %s seconds", activity_id, duration_seconds,
+                extra={'activity_id': activity_id, 'started_at_timestamp': started_at_timestamp})
     time.sleep(duration_seconds)
     
     try:
@@ -93,18 +114,17 @@ def auto_end_activity(activity_id, duration_seconds, started_at_timestamp):
             # Check if activity's started_at matches when the task was launched
             current_started_timestamp = activity.started_at.timestamp() if activity.started_at else 0
             
-            print(f"[AUTO-END] Activity {activity_id} current started_at: {activity.started_at}")
-            print(f"[AUTO-END] Current timestamp: {current_started_timestamp}")
-            print(f"[AUTO-END] Expected timestamp: {started_at_timestamp}")
+            logger.debug("Auto-end check for activity %s: started_at %s, current timestamp %s, expected %s",
+                         activity_id, activity.started_at, current_started_timestamp, started_at_timestamp)
             
             # Only end if timestamp matches (indicates this is the current start task)
             if activity.is_active and abs(current_started_timestamp - started_at_timestamp) < 1:
-                print(f"[AUTO-END] Auto-ending activity {activity_id}")
                 activity.is_active = False
                 activity.ended_at = get_beijing_time()
                 db.session.commit()
                 
-                print(f"[AUTO-END] Activity {activity_id} ended at {activity.ended_at}")
+                logger.info("Activity %s auto-ended at %s", activity_id, activity.ended_at,
+                            extra={'activity_id': activity_id})
                 
                 # Notify all users that activity has ended
                 socketio.emit('activity_update', {
@@ -116,16 +136,12 @@ def auto_end_activity(activity_id, duration_seconds, started_at_timestamp):
                         'message': 'Activity has ended automatically'
                     }
                 }, room=f'activity_{activity_id}')
-                
-                print(f"[AUTO-END] Notification sent for activity {activity_id}")
             else:
-                print(f"[AUTO-END] Activity {activity_id} was restarted or already ended, skipping auto-end")
+                logger.info("Activity %s was restarted or already ended, skipping auto-end", activity_id)
         else:
-            print(f"[AUTO-END] Activity {activity_id} not found")
-    except Exception as e:
-        print(f"[AUTO-END] Error in auto_end_activity: {e}")
-        import traceback
-        traceback.print_exc()
+            logger.warning("Auto-end: activity %s not found", activity_id)
+    except Exception:
+        logger.exception("Auto-end of activity %s failed", activity_id)
 
 @bp.route('/courses/<int:course_id>/activities/create', methods=['GET', 'POST'])
 @login_required
@@ -185,7 +201,7 @@ def create_activity(course_id):
 @bp.route('/activities/<int:activity_id>')
 @login_required
 def activity_detail(activity_id):
-    activity = Activity.query.get_or_404(activity_id)
+    activity = archive_store.get_activity_or_404(activity_id)
     
     if current_user.role == 'student':
         enrollment = Enrollment.query.filter_by(student_id=current_user.id, course_id=activity.course_id).first()
@@ -198,11 +214,11 @@ def activity_detail(activity_id):
     
     my_response = None
     if current_user.role == 'student':
-        my_response = Response.query.filter_by(student_id=current_user.id, activity_id=activity_id).first()
+        my_response = archive_store.student_response(activity, current_user.id)
     
     # Generate QR code for instructors and admins
     qr_code = None
-    if current_user.role in ['admin', 'instructor']:
+    if current_user.role in ['admin', 'instructor'] and not activity.is_archived:
         if current_user.role == 'admin' or activity.course.instructor_id == current_user.id:
             # Generate QR code if activity allows quick join and has token
             if activity.allow_quick_join:
@@ -211,8 +227,9 @@ def activity_detail(activity_id):
                     db.session.commit()
                 
                 try:
-                    from app.qr_utils import generate_activity_qr_code
-                    qr_code = generate_activity_qr_code(activity, _external=True)
+                    # Cached image endpoint instead of an inline base64 image
+                    from app.qr_utils import get_activity_qr_url
+                    qr_code = get_activity_qr_url(activity)
                 except ImportError:
                     pass  # qrcode library not installed
     
@@ -258,8 +275,7 @@ def start_activity(activity_id):
     activity.ended_at = None
     db.session.commit()
     
-    print(f"[START] Activity {activity_id} started at {activity.started_at}")
-    print(f"[START] is_active: {activity.is_active}")
+    logger.info("Activity %s started at %s", activity_id, activity.started_at, extra={'activity_id': activity_id})
     
     # Get start timestamp for verifying auto-end task
     started_at_timestamp = activity.started_at.timestamp()
@@ -363,11 +379,9 @@ def submit_response(activity_id):
     
     activity = Activity.query.get_or_404(activity_id)
     
-    # Add debug information
-    print(f"[DEBUG] Activity {activity_id} submission attempt")
-    print(f"[DEBUG] is_active: {activity.is_active}")
-    print(f"[DEBUG] started_at: {activity.started_at}")
-    print(f"[DEBUG] ended_at: {activity.ended_at}")
+    # Level-gated: costs one level check per submission unless debug logging is on for this module
+    logger.debug("Submission attempt for activity %s (is_active=%s, started_at=%s, ended_at=%s)",
+                 activity_id, activity.is_active, activity.started_at, activity.ended_at)
     
     if not activity.is_active:
         return jsonify({'success': False, 'message': 'Activity not started or already ended'})
@@ -430,6 +444,9 @@ def submit_response(activity_id):
         db.session.add(response)
     
     db.session.commit()
+    # Sampled: a class submitting at once would otherwise log one line per student
+    logger.info("Response submitted for activity %s", activity_id,
+                extra={'activity_id': activity_id, 'sample_rate': SUBMIT_LOG_SAMPLE_RATE})
     
     # Broadcast new response to all users in the activity room
     socketio.emit('response_added', {
@@ -444,12 +461,8 @@ def submit_response(activity_id):
 @login_required
 def activity_results(activity_id):
     try:
-        from sqlalchemy.orm import joinedload
-        
-        # Load activity with course relationship
-        activity = Activity.query.options(
-            joinedload(Activity.course)
-        ).get_or_404(activity_id)
+        # Live or archived activity
+        activity = archive_store.get_activity_or_404(activity_id, load_profile('activity_results'))
         
         # Check permissions
         if current_user.role not in ['admin', 'instructor']:
@@ -460,10 +473,8 @@ def activity_results(activity_id):
             flash('Insufficient permissions', 'error')
             return redirect(url_for('main.dashboard'))
         
-        # Eager load student relationship to avoid N+1 queries
-        responses = Response.query.options(
-            joinedload(Response.student)
-        ).filter_by(activity_id=activity_id).all()
+        # Students eager loaded to avoid N+1 queries
+        responses = archive_store.activity_responses(activity)
         
         if activity.type == 'poll':
             # Handle both JSON format (from test data) and newline-separated format (from form)
@@ -633,21 +644,104 @@ def activity_results(activity_id):
     
     except Exception as e:
         # Log the error
-        import traceback
-        print(f"❌ Error in activity_results: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in activity_results for activity %s", activity_id)
         
         flash(f'Error loading activity results: {str(e)}', 'error')
         return redirect(url_for('activities.list_activities'))
 
+def describe_generation_error(e):
+    """Turn an AI generation exception into a user-facing message"""
+    error_message = str(e)
+    error_type = type(e).__name__
+    if 'connection' in error_message.lower():
+        return f"[{error_type}] AI service connection failed. Please check network settings. Details: {error_message}"
+    elif 'timeout' in error_message.lower():
+        return f"[{error_type}] AI service request timeout. Please try again. Details: {error_message}"
+    elif 'api' in error_message.lower():
+        return f"[{error_type}] AI service API error. Details: {error_message}"
+    return f"[{error_type}] {error_message}"
+
+def generate_questions_job(ctx, text=None, file_path=None, file_extension=None, filename=None, user_label=''):
+    """Background job: extract text from an uploaded file (optional) and generate questions"""
+    try:
+        if file_path:
+            ctx.report(10, f'Extracting text from {filename}')
+            logger.info("Processing file %s (%s)", filename, file_extension)
+            try:
+                text = extract_text_from_file(file_path, file_extension, max_chars=MAX_GENERATION_CHARS)
+            except Exception as e:
+                logger.warning("File processing error: %s", e)
+                raise Exception(f'File processing failed: {str(e)}')
+            logger.info("Extracted %d characters from %s", len(text), filename)
+    finally:
+        if file_path and os.path.exists(file_path):
+            os.unlink(file_path)
+    
+    if not text or not text.strip():
+        raise ValueError('No text content found in the uploaded file')
+    
+    # Limit text length to avoid overly long input
+    if len(text) > MAX_GENERATION_CHARS:
+        text = text[:MAX_GENERATION_CHARS]
+        logger.info("Text truncated to %d characters", MAX_GENERATION_CHARS)
+    
+    ctx.report(40, 'Generating questions')
+    logger.info("Starting AI question generation for %s", user_label, extra={'text_length': len(text)})
+    logger.debug("Text preview: %s", text[:100])
+    
+    try:
+        # Long documents are chunked and generated concurrently; each accepted
+        # question is pushed to the browser as soon as it is available
+        questions = generate_questions_chunked(text, on_question=lambda q: ctx.push({'question': q}))
+    except JobCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f'Generation failed: {describe_generation_error(e)}')
+    
+    logger.info("Generated %d questions", len(questions))
+    logger.debug("Generated questions: %s", questions)
+    
+    return {'questions': questions}
+
+def generate_activity_job(ctx, content, activity_type):
+    """Background job: generate a complete activity from teaching content"""
+    ctx.report(20, 'Generating activity')
+    try:
+        activity_data = generate_activity_streaming(
+            content, activity_type,
+            on_field=lambda name, value: ctx.push({'field': name, 'value': value})
+        )
+    except JobCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f'Generation failed: {str(e)}')
+    return {'activity': activity_data}
+
+def submit_job_response(kind, fn, **kwargs):
+    """Queue a job for the current user and build the JSON response"""
+    try:
+        job = job_runner.submit(current_user.id, kind, fn, **kwargs)
+    except JobLimitError as e:
+        if kwargs.get('file_path') and os.path.exists(kwargs['file_path']):
+            os.unlink(kwargs['file_path'])
+        return jsonify({'success': False, 'message': str(e)}), 429
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('jobs.job_status', job_id=job.id),
+        'cancel_url': url_for('jobs.cancel_job', job_id=job.id)
+    }), 202
+
 @bp.route('/activities/generate_questions', methods=['POST'])
 @login_required
 def generate_questions_route():
-    """AI question generation route - Enhanced error handling and logging"""
+    """AI question generation route - queues a background job and returns its id"""
     if current_user.role not in ['admin', 'instructor']:
         return jsonify({'success': False, 'message': 'Insufficient permissions'})
     
-    text = ""
+    user_label = f"{current_user.name} (ID: {current_user.id}, Role: {current_user.role})"
     
     # Check if it's a file upload request
     if 'file' in request.files:
@@ -656,98 +750,38 @@ def generate_questions_route():
         # Validate file
         is_valid, message = validate_file_upload(file)
         if not is_valid:
-            print(f"❌ File validation failed: {message}")
+            logger.info("File validation failed: %s", message)
             return jsonify({'success': False, 'message': message})
         
-        # Save temporary file and extract text
+        # Save temporary file; the job extracts the text and removes the file
         try:
-            # Create temporary file
             file_extension = os.path.splitext(secure_filename(file.filename))[1]
             with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
                 file.save(temp_file.name)
                 temp_file_path = temp_file.name
-            
-            print(f"📄 Processing file: {file.filename}, extension: {file_extension}")
-            
-            # Extract text
-            text = extract_text_from_file(temp_file_path, file_extension)
-            print(f"✅ Extracted {len(text)} characters from file")
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
-            
         except Exception as e:
-            print(f"❌ File processing error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("File processing error: %s", e)
             return jsonify({'success': False, 'message': f'File processing failed: {str(e)}'})
+        
+        return submit_job_response('generate_questions', generate_questions_job,
+                                   file_path=temp_file_path,
+                                   file_extension=file_extension,
+                                   filename=file.filename,
+                                   user_label=user_label)
     
-    else:
-        # Process JSON request (original text input method)
-        data = request.get_json()
-        if not data:
-            print("❌ No JSON data provided")
-            return jsonify({'success': False, 'message': 'No data provided'})
-        text = data.get('text', '').strip()
-        print(f"📝 Received text input: {len(text)} characters")
+    # Process JSON request (original text input method)
+    data = request.get_json()
+    if not data:
+        logger.info("Question generation request without data")
+        return jsonify({'success': False, 'message': 'No data provided'})
+    text = data.get('text', '').strip()
+    logger.debug("Received text input: %d characters", len(text))
     
     if not text:
-        print("❌ Empty text provided")
         return jsonify({'success': False, 'message': 'Please enter teaching text or upload a file'})
     
-    # Limit text length to avoid overly long input
-    if len(text) > 10000:
-        text = text[:10000]
-        print(f"⚠️  Text truncated to 10000 characters")
-    
-    try:
-        print("=" * 80)
-        print(f"🤖 [ROUTE] Starting AI question generation...")
-        print(f"   [ROUTE] User: {current_user.name} (ID: {current_user.id}, Role: {current_user.role})")
-        print(f"   [ROUTE] Text length: {len(text)} characters")
-        print(f"   [ROUTE] Text preview: {text[:100]}...")
-        
-        # Check environment variables
-        ark_key = os.environ.get('ARK_API_KEY', '')
-        openai_key = os.environ.get('OPENAI_API_KEY', '')
-        no_proxy = os.environ.get('no_proxy', '')
-        print(f"   [ROUTE] ARK_API_KEY: {'SET (' + ark_key[:10] + '...' + ark_key[-5:] + ')' if ark_key else 'NOT SET'}")
-        print(f"   [ROUTE] OPENAI_API_KEY: {'SET (' + openai_key[:10] + '...)' if openai_key else 'NOT SET'}")
-        print(f"   [ROUTE] no_proxy: {no_proxy if no_proxy else 'NOT SET'}")
-        print(f"   [ROUTE] Calling generate_questions()...")
-        print("=" * 80)
-        
-        questions = generate_questions(text)
-        
-        print("=" * 80)
-        print(f"✅ [ROUTE] Successfully generated {len(questions)} questions")
-        for i, q in enumerate(questions, 1):
-            print(f"   [ROUTE] {i}. {q}")
-        print("=" * 80)
-        
-        return jsonify({'success': True, 'questions': questions})
-        
-    except Exception as e:
-        print("=" * 80)
-        print(f"❌ [ROUTE] Question generation error: {type(e).__name__}: {str(e)}")
-        import traceback
-        print(f"   [ROUTE] Full traceback:")
-        traceback.print_exc()
-        print("=" * 80)
-        
-        # Provide more detailed error information
-        error_message = str(e)
-        error_type = type(e).__name__
-        if 'connection' in error_message.lower():
-            error_message = f"[{error_type}] AI service connection failed. Please check network settings. Details: {error_message}"
-        elif 'timeout' in error_message.lower():
-            error_message = f"[{error_type}] AI service request timeout. Please try again. Details: {error_message}"
-        elif 'api' in error_message.lower():
-            error_message = f"[{error_type}] AI service API error. Details: {error_message}"
-        else:
-            error_message = f"[{error_type}] {error_message}"
-        
-        return jsonify({'success': False, 'message': f'Generation failed: {error_message}'})
+    return submit_job_response('generate_questions', generate_questions_job,
+                               text=text, user_label=user_label)
 
 @bp.route('/activities/status/<int:activity_id>')
 @login_required
@@ -785,11 +819,8 @@ def generate_activity():
     if not content:
         return jsonify({'success': False, 'message': 'Please enter content'})
     
-    try:
-        activity_data = generate_activity_from_content(content, activity_type)
-        return jsonify({'success': True, 'activity': activity_data})
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Generation failed: {str(e)}'})
+    return submit_job_response('generate_activity', generate_activity_job,
+                               content=content, activity_type=activity_type)
 
 @bp.route('/activities/<int:activity_id>/group_answers', methods=['POST'])
 @login_required
@@ -805,8 +836,11 @@ def group_activity_answers(activity_id):
     if not answers:
         return jsonify({'success': False, 'message': 'No answers to group'})
     
+    # Grouping is local; the AI provider only polishes labels unless disabled
+    data = request.get_json(silent=True) or {}
+    
     try:
-        grouped_data = group_answers(answers)
+        grouped_data = group_answers(answers, polish_labels=data.get('polish_labels', True))
         return jsonify({'success': True, 'grouped_data': grouped_data})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Grouping failed: {str(e)}'})
@@ -814,13 +848,13 @@ def group_activity_answers(activity_id):
 @bp.route('/activities/<int:activity_id>/export')
 @login_required
 def export_activity_results(activity_id):
-    activity = Activity.query.get_or_404(activity_id)
+    activity = archive_store.get_activity_or_404(activity_id)
     
     if current_user.role not in ['admin', 'instructor'] or (current_user.role == 'instructor' and activity.course.instructor_id != current_user.id):
         flash('Insufficient permissions', 'error')
         return redirect(url_for('main.dashboard'))
     
-    responses = Response.query.filter_by(activity_id=activity_id).all()
+    responses = archive_store.activity_responses(activity)
     
     # Create CSV
     output = io.StringIO()
@@ -860,13 +894,13 @@ def export_activity_results(activity_id):
 @bp.route('/activities/<int:activity_id>/analytics')
 @login_required
 def activity_analytics(activity_id):
-    activity = Activity.query.get_or_404(activity_id)
+    activity = archive_store.get_activity_or_404(activity_id)
     
     if current_user.role not in ['admin', 'instructor'] or (current_user.role == 'instructor' and activity.course.instructor_id != current_user.id):
         flash('Insufficient permissions', 'error')
         return redirect(url_for('main.dashboard'))
     
-    responses = Response.query.filter_by(activity_id=activity_id).all()
+    responses = archive_store.activity_responses(activity, with_students=False)
     
     # Calculate analytics
     analytics = {
@@ -944,7 +978,7 @@ def export_course_activities(course_id):
         flash('Insufficient permissions', 'error')
         return redirect(url_for('main.dashboard'))
     
-    activities = Activity.query.filter_by(course_id=course_id).all()
+    activities = archive_store.course_activities(course, newest_first=False)
     
     # Create CSV
     output = io.StringIO()
@@ -955,7 +989,7 @@ def export_course_activities(course_id):
     
     # Write data
     for activity in activities:
-        response_count = Response.query.filter_by(activity_id=activity.id).count()
+        response_count = archive_store.response_count(activity)
         status = 'Active' if activity.is_active else 'Ended'
         
         writer.writerow([
@@ -993,14 +1027,19 @@ def delete_activity(activity_id):
         flash('You do not have permission to delete this activity', 'error')
         return redirect(url_for('activities.list_activities'))
     
+    plan = plan_activity(activity.id)
+    if deletion_service.should_run_in_background(plan):
+        try:
+            job = job_runner.submit(current_user.id, 'delete_activity', deletion_service.activity_job,
+                                    activity_id=activity.id, join_token=activity.join_token, name=activity.title)
+        except JobLimitError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('activities.list_activities'))
+        flash(f'Activity "{activity.title}" has {plan.total} records and is being deleted in the background', 'info')
+        return redirect(url_for('activities.list_activities', delete_job=job.id))
+
     try:
-        # Delete all related responses
-        Response.query.filter_by(activity_id=activity_id).delete()
-        
-        # Delete the activity itself
-        db.session.delete(activity)
-        db.session.commit()
-        
+        deletion_service.delete_activity(activity.id, activity.join_token, plan=plan)
         flash(f'Activity "{activity.title}" deleted successfully', 'success')
         
     except Exception as e:
@@ -1057,43 +1096,89 @@ def delete_activity(activity_id):
 @bp.route('/activity/join/<token>')
 def quick_join(token):
     """Quick join activity via QR code token"""
-    # Find activity
-    activity = Activity.query.filter_by(join_token=token).first()
+    # Resolve through the in-memory token cache (a QR code shown in class is hit by everyone at once)
+    resolved = join_token_resolver.resolve(token)
     
-    if not activity:
+    if not resolved:
         flash('Invalid activity link', 'error')
         return redirect(url_for('main.index'))
     
     # Check if token is valid
-    if not activity.is_token_valid():
+    if not resolved.is_valid():
         flash('This activity link has expired or been disabled', 'error')
         return redirect(url_for('main.index'))
     
     # If already logged in
     if current_user.is_authenticated:
-        # Check if already enrolled
-        enrollment = Enrollment.query.filter_by(
-            student_id=current_user.id,
-            course_id=activity.course_id
-        ).first()
-        
-        # If not enrolled, automatically enroll
-        if not enrollment:
-            enrollment = Enrollment(
-                student_id=current_user.id,
-                course_id=activity.course_id
-            )
-            db.session.add(enrollment)
-            db.session.commit()
-            flash(f'Automatically enrolled in course: {activity.course.name}', 'success')
+        # Enroll automatically if needed (writes of a join burst are batched into one commit)
+        if enrollment_batcher.ensure_enrolled(current_user.id, resolved.course_id):
+            flash(f'Automatically enrolled in course: {resolved.course_name}', 'success')
         
         # Redirect to activity detail page
-        return redirect(url_for('activities.activity_detail', activity_id=activity.id))
+        return redirect(url_for('activities.activity_detail', activity_id=resolved.activity_id))
     
     # If not logged in, redirect to quick register page
     return redirect(url_for('activities.quick_register', token=token))
 
 
+@bp.route('/activity/join/<token>/qr.<fmt>')
+def quick_join_qr(token, fmt):
+    """Cached QR code image (PNG or SVG) for a join token"""
+    from app.qr_utils import qr_cache, QR_FORMATS, MIN_QR_SIZE, MAX_QR_SIZE, DEFAULT_QR_SIZE
+    
+    size = request.args.get('size', DEFAULT_QR_SIZE, type=int)
+    if fmt not in QR_FORMATS or not MIN_QR_SIZE <= size <= MAX_QR_SIZE:
+        return jsonify({'success': False, 'message': 'Unsupported QR code format or size'}), 404
+    
+    resolved = join_token_resolver.resolve(token)
+    if not resolved or not resolved.is_valid():
+        return jsonify({'success': False, 'message': 'Invalid activity link'}), 404
+    
+    join_url = url_for('activities.quick_join', token=token, _external=True)
+    body, etag = qr_cache.get_or_render(token, join_url, size=size, fmt=fmt)
+    
+    # The token is part of the URL, so the image never changes for this URL
+    response_obj = make_response(body)
+    response_obj.headers['Content-Type'] = QR_FORMATS[fmt]
+    response_obj.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response_obj.set_etag(etag)
+    return response_obj.make_conditional(request)
+
+
+@bp.route('/courses/<int:course_id>/qr-sheet')
+@login_required
+def course_qr_sheet(course_id):
+    """Printable sheet with the quick join QR code of every activity in a course"""
+    course = Course.query.get_or_404(course_id)
+    
+    if current_user.role not in ['admin', 'instructor'] or (current_user.role == 'instructor' and course.instructor_id != current_user.id):
+        flash('Insufficient permissions', 'error')
+        return redirect(url_for('main.dashboard'))
+    
+    from app.qr_utils import qr_cache
+    
+    activities = Activity.query.filter_by(course_id=course_id, allow_quick_join=True).order_by(Activity.created_at).all()
+    
+    # Issue missing tokens for all activities with a single commit
+    missing = [activity for activity in activities if not activity.join_token]
+    for activity in missing:
+        activity.generate_join_token()
+    if missing:
+        db.session.commit()
+    
+    cards = []
+    for activity in activities:
+        join_url = url_for('activities.quick_join', token=activity.join_token, _external=True)
+        svg, _ = qr_cache.get_or_render(activity.join_token, join_url, size=10, fmt='svg')
+        cards.append({
+            'activity': activity,
+            'join_url': join_url,
+            'svg': svg.decode('utf-8')
+        })
+    
+    return render_template('activities/qr_sheet.html', course=course, cards=cards)
+
+
 @bp.route('/activity/quick-register/<token>', methods=['GET', 'POST'])
 def quick_register(token):
     """Quick register and join activity"""
@@ -1102,17 +1187,19 @@ def quick_register(token):
         return redirect(url_for('activities.quick_join', token=token))
     
     # Find activity
-    activity = Activity.query.filter_by(join_token=token).first()
+    resolved = join_token_resolver.resolve(token)
     
-    if not activity:
+    if not resolved:
         flash('Invalid activity link', 'error')
         return redirect(url_for('main.index'))
     
     # Check if token is valid
-    if not activity.is_token_valid():
+    if not resolved.is_valid():
         flash('This activity link has expired or been disabled', 'error')
         return redirect(url_for('main.index'))
     
+    activity = Activity.query.get_or_404(resolved.activity_id)
+    
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
         email = request.form.get('email', '').strip()
@@ -1224,14 +1311,21 @@ def regenerate_qr_code(activity_id):
     else:
         return jsonify({'success': False, 'message': 'Permission denied'}), 403
     
-    # Regenerate token
+    # Regenerate token; caches are cleared after the commit, so a concurrent
+    # quick join cannot cache the old row again
+    from app.qr_utils import qr_cache, get_activity_qr_url
+    old_token = activity.join_token
     activity.generate_join_token()
     db.session.commit()
+    for token in (old_token, activity.join_token):
+        qr_cache.invalidate(token)
+        join_token_resolver.invalidate(token)
     
     return jsonify({
         'success': True,
         'message': 'QR code regenerated successfully',
-        'token': activity.join_token
+        'token': activity.join_token,
+        'qr_url': get_activity_qr_url(activity)
     })
 
 
@@ -1259,6 +1353,12 @@ def toggle_quick_join(activity_id):
     
     db.session.commit()
     
+    # Cleared after the commit, so a concurrent quick join cannot cache the old setting again
+    if not activity.allow_quick_join:
+        from app.qr_utils import qr_cache
+        qr_cache.invalidate(activity.join_token)
+    join_token_resolver.invalidate(activity.join_token)
+    
     return jsonify({
         'success': True,
         'allow_quick_join': activity.allow_quick_join,
@@ -0,0 +1,91 @@
+"""
+Admin System Routes
+Operational views for administrators
+"""
+
+from functools import wraps
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, abort, send_file
+from flask_login import login_required, current_user
+from app.extract_cache import extract_cache
+from app.ai_health import breaker_metrics
+from app.metrics import slow_requests
+from app.profiler import request_profiler
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+def admin_required(view):
+    """Allow only admin users, redirect everyone else to the dashboard"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if current_user.role != 'admin':
+            flash('Insufficient permissions', 'error')
+            return redirect(url_for('main.dashboard'))
+        return view(*args, **kwargs)
+    return wrapped
+
+@bp.route('/extract-cache')
+@login_required
+@admin_required
+def extract_cache_stats():
+    """Extracted text cache hit rate and storage use"""
+    return render_template('admin/extract_cache.html', stats=extract_cache.stats())
+
+@bp.route('/extract-cache/clear', methods=['POST'])
+@login_required
+@admin_required
+def clear_extract_cache():
+    """Delete all cached extraction results"""
+    extract_cache.clear()
+    flash('Extracted text cache cleared', 'success')
+    return redirect(url_for('admin.extract_cache_stats'))
+
+@bp.route('/ai-health')
+@login_required
+@admin_required
+def ai_health():
+    """Circuit breaker state and latency averages of the AI providers"""
+    return jsonify({'success': True, 'providers': breaker_metrics()})
+
+@bp.route('/slow-requests')
+@login_required
+@admin_required
+def slow_request_log():
+    """Most recent slow requests with their SQL statements"""
+    return jsonify({'success': True, 'requests': slow_requests()})
+
+@bp.route('/profiles')
+@login_required
+@admin_required
+def profiles():
+    """Recently captured request profiles"""
+    return render_template('admin/profiles.html', profiles=request_profiler.recent(),
+                           enabled=request_profiler.enabled, keep=request_profiler.keep)
+
+@bp.route('/profiles/<profile_id>')
+@login_required
+@admin_required
+def profile_detail(profile_id):
+    """Top functions, SQL and render time of one profiled request"""
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        abort(404)
+    return render_template('admin/profile_detail.html', profile=profile)
+
+@bp.route('/profiles/<profile_id>.prof')
+@login_required
+@admin_required
+def download_profile(profile_id):
+    """Raw cProfile data for pstats or snakeviz"""
+    path = request_profiler.raw_path(profile_id)
+    if path is None:
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=f'{profile_id}.prof')
+
+@bp.route('/profiles/clear', methods=['POST'])
+@login_required
+@admin_required
+def clear_profiles():
+    """Delete all stored profiles"""
+    request_profiler.clear()
+    flash('Profiles cleared', 'success')
+    return redirect(url_for('admin.profiles'))
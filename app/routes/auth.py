@@ -6,12 +6,14 @@ from app import db, mail, get_beijing_time
 from app.models import User, EmailCaptcha
 from app.forms import LoginForm, RegistrationForm
 from app.email_utils import send_temp_password_email
+import logging
 import string
 import random
 import secrets
 from datetime import datetime, timedelta
 
 bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -39,22 +41,20 @@ def register():
     
     form = RegistrationForm()
     if request.method == 'POST':
-        print(f"DEBUG: POST request received")
-        print(f"DEBUG: Form data: {dict(request.form)}")
+        # Field names only: the form carries the password and verification code
+        logger.debug("Registration POST with fields %s", sorted(request.form.keys()))
         
         if form.validate_on_submit():
-            print(f"DEBUG: Form validation passed for email: {form.email.data}")
+            logger.debug("Registration form valid for %s", form.email.data)
             # Verify email verification code
             email_captcha = EmailCaptcha.query.filter_by(
                 email=form.email.data, 
                 captcha=form.captcha.data
             ).first()
             
-            print(f"DEBUG: Looking for captcha {form.captcha.data} for email {form.email.data}")
-            
             if not email_captcha:
                 flash('Verification code is incorrect or expired', 'error')
-                print(f"DEBUG: Captcha not found or expired")
+                logger.info("Registration for %s rejected: verification code not found", form.email.data)
                 return render_template('auth/register.html', form=form)
             
             # Check if verification code is expired (5 minutes)
@@ -62,7 +62,7 @@ def register():
                 flash('Verification code expired, please request a new one', 'error')
                 EmailCaptcha.query.filter_by(email=form.email.data).delete()
                 db.session.commit()
-                print(f"DEBUG: Captcha expired")
+                logger.info("Registration for %s rejected: verification code expired", form.email.data)
                 return render_template('auth/register.html', form=form)
         
         # Auto-generate student ID for students
@@ -92,10 +92,10 @@ def register():
             flash(f'Registration successful! Welcome, {user.name}! Your student ID is: {student_id}', 'success')
         else:
             flash(f'Registration successful! Welcome, {user.name}!', 'success')
-        print(f"DEBUG: User {user.name} registered successfully, redirecting to dashboard")
+        logger.info("User %s registered as %s", user.id, user.role, extra={'user_id': user.id})
         return redirect(url_for('main.dashboard'))
     else:
-        print(f"DEBUG: Form validation failed: {form.errors}")
+        logger.debug("Registration form validation failed: %s", form.errors)
     
     return render_template('auth/register.html', form=form)
 
@@ -125,13 +125,10 @@ def send_email_captcha():
     
     # Send email
     try:
-        print(f"[EMAIL DEBUG] Attempting to send email to: {email}")
-        print(f"[EMAIL DEBUG] Captcha: {captcha}")
-        print(f"[EMAIL DEBUG] Mail server: {current_app.config.get('MAIL_SERVER')}")
-        print(f"[EMAIL DEBUG] Mail port: {current_app.config.get('MAIL_PORT')}")
-        print(f"[EMAIL DEBUG] Mail username: {current_app.config.get('MAIL_USERNAME')}")
-        print(f"[EMAIL DEBUG] Mail TLS: {current_app.config.get('MAIL_USE_TLS')}")
-        print(f"[EMAIL DEBUG] Mail SSL: {current_app.config.get('MAIL_USE_SSL')}")
+        logger.info("Sending verification code to %s", email)
+        logger.debug("Mail server %s:%s (TLS=%s, SSL=%s)", current_app.config.get('MAIL_SERVER'),
+                     current_app.config.get('MAIL_PORT'), current_app.config.get('MAIL_USE_TLS'),
+                     current_app.config.get('MAIL_USE_SSL'))
         
         message = Message(
             subject='Classroom Platform - Email Verification Code',
@@ -161,7 +158,7 @@ Classroom Platform Team'''
         for attempt in range(max_retries):
             try:
                 socket.setdefaulttimeout(30)  # 30 second timeout
-                print(f"[EMAIL DEBUG] Attempt {attempt + 1}/{max_retries} - Sending email with 30s timeout...")
+                logger.debug("Email attempt %d/%d with 30s timeout", attempt + 1, max_retries)
                 
                 # Set email connection timeout, force reconnection to avoid DNS cache issues
                 mail_instance = current_app.extensions.get('mail')
@@ -172,19 +169,19 @@ Classroom Platform Team'''
                 original_ssl_context = ssl.create_default_context()
                 
                 mail.send(message)
-                print(f"[EMAIL DEBUG] Email sent successfully to: {email}")
+                logger.info("Verification code sent to %s", email)
                 return jsonify({'code': 200, 'message': 'Verification code sent successfully! Please check your email'})
                 
             except Exception as retry_error:
                 error_str = str(retry_error)
-                print(f"[EMAIL ERROR] Attempt {attempt + 1} failed: {error_str}")
+                logger.warning("Email attempt %d failed: %s", attempt + 1, error_str)
                 
                 # If SSL certificate error, try without certificate verification
                 if 'certificate' in error_str.lower() or 'ssl' in error_str.lower():
-                    print(f"[EMAIL DEBUG] SSL certificate issue detected, trying with relaxed SSL...")
+                    logger.info("SSL certificate issue detected, trying with relaxed SSL")
                 
                 if attempt < max_retries - 1:  # Still have retry chances
-                    print(f"[EMAIL DEBUG] Retrying in {retry_delay} seconds...")
+                    logger.info("Retrying email in %d seconds", retry_delay)
                     time.sleep(retry_delay)
                     retry_delay *= 2  # Exponential backoff
                 else:  # Last attempt failed
@@ -194,8 +191,7 @@ Classroom Platform Team'''
             
     except Exception as e:
         error_msg = str(e)
-        print(f"[EMAIL ERROR] Failed to send email: {error_msg}")
-        print(f"[EMAIL ERROR] Error type: {type(e).__name__}")
+        logger.error("Failed to send verification email to %s: %s: %s", email, type(e).__name__, error_msg)
         
         # Provide more user-friendly error messages
         if 'Lookup timed out' in error_msg or 'timeout' in error_msg.lower():
@@ -336,7 +332,7 @@ def send_change_password_captcha():
         from app.email_utils import send_verification_code_email
         email_sent = send_verification_code_email(email, current_user.name, captcha, 'Change Password')
     except Exception as e:
-        print(f"Error sending email: {e}")
+        logger.error("Error sending password change code: %s", e)
         email_sent = False
     
     return jsonify({'success': email_sent})
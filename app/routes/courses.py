@@ -2,8 +2,15 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 from app import db
-from app.models import Course, User, Enrollment, Activity, Question, Answer, AnswerVote
+from app.models import Course, User, Enrollment
 from app.forms import CourseForm, StudentImportForm
+from app.deletion import deletion_service, plan_course
+from app.archive import archive_store
+from app.page_cache import page_cache
+from app.catalog import course_catalog
+from app.compression import http_compression
+from app.loading import load_profile
+from app.jobs import job_runner, JobLimitError
 import csv
 import io
 
@@ -58,7 +65,13 @@ def create_course():
 @bp.route('/courses/<int:course_id>')
 @login_required
 def course_detail(course_id):
-    course = Course.query.get_or_404(course_id)
+    # Key first: anything committed after this point gets a newer version
+    cache_key = page_cache.course_key('course_detail', course_id, current_user.role)
+    # Unchanged course since the viewer's last visit: 304 without loading anything
+    not_modified = http_compression.not_modified(cache_key, current_user.id)
+    if not_modified is not None:
+        return not_modified
+    course = Course.query.options(*load_profile('course_detail')).get_or_404(course_id)
     
     if current_user.role == 'student':
         enrollment = Enrollment.query.filter_by(student_id=current_user.id, course_id=course_id).first()
@@ -69,10 +82,15 @@ def course_detail(course_id):
         flash('Insufficient permissions', 'error')
         return redirect(url_for('main.dashboard'))
     
-    activities = Activity.query.filter_by(course_id=course_id).order_by(Activity.created_at.desc()).all()
-    enrollments = Enrollment.query.filter_by(course_id=course_id).all()
-    
-    return render_template('courses/course_detail.html', course=course, activities=activities, enrollments=enrollments)
+    def render_body():
+        activities = archive_store.course_activities(course)
+        enrollments = Enrollment.query.options(*load_profile('course_enrollments')).filter_by(course_id=course_id).all()
+        return render_template('courses/course_detail_body.html', course=course, activities=activities,
+                               enrollments=enrollments)
+
+    # Activities and students are rendered once per course version and viewer role
+    body = page_cache.fragment(cache_key, render_body)
+    return render_template('courses/course_detail.html', course=course, body=body)
 
 @bp.route('/courses/<int:course_id>/import_students', methods=['GET', 'POST'])
 @login_required
@@ -141,21 +159,45 @@ def course_enrollments(course_id):
 @bp.route('/courses/browse')
 @login_required
 def browse_courses():
-    """Students browse all available courses"""
+    """Students browse courses they can still enroll in (search, semester filter, keyset pages)"""
     if current_user.role != 'student':
         return redirect(url_for('courses.list_courses'))
     
-    # Get all courses
-    all_courses = Course.query.all()
+    query = request.args.get('q', '').strip()
+    semester = request.args.get('semester', '').strip()
+    after = request.args.get('after', type=int)
+    course_ids, next_cursor = course_catalog.page(current_user.id, query, semester, after)
     
-    # Get student's enrolled course IDs
-    enrolled_course_ids = [enrollment.course_id for enrollment in current_user.enrollments]
+    return render_template('courses/browse_courses.html',
+                         cards=course_catalog.cards(course_ids),
+                         next_cursor=next_cursor,
+                         semesters=course_catalog.semesters(),
+                         query=query,
+                         semester=semester,
+                         after=after)
+
+@bp.route('/courses/browse/search')
+@login_required
+def browse_courses_search():
+    """Next catalog page as rendered cards (JSON, used by "Load more")"""
+    if current_user.role != 'student':
+        return jsonify({'success': False, 'message': 'Only students can browse the course catalog'}), 403
     
-    # Filter out courses not yet enrolled
-    available_courses = [course for course in all_courses if course.id not in enrolled_course_ids]
+    query = request.args.get('q', '').strip()
+    semester = request.args.get('semester', '').strip()
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', type=int)
+    course_ids, next_cursor = course_catalog.page(current_user.id, query, semester, after, limit)
     
-    return render_template('courses/browse_courses.html', 
-                         available_courses=available_courses)
+    filters = {'q': query or None, 'semester': semester or None}
+    return jsonify({
+        'success': True,
+        'course_ids': course_ids,
+        'html': ''.join(course_catalog.cards(course_ids)),
+        'next_cursor': next_cursor,
+        'next_url': url_for('courses.browse_courses', after=next_cursor, **filters) if next_cursor else None,
+        'next_api_url': url_for('courses.browse_courses_search', after=next_cursor, **filters) if next_cursor else None
+    })
 
 @bp.route('/courses/<int:course_id>/enroll', methods=['POST'])
 @login_required
@@ -236,37 +278,20 @@ def delete_course(course_id):
         flash('You do not have permission to delete this course', 'error')
         return redirect(url_for('courses.list_courses'))
     
+    plan = plan_course(course.id)
+    if deletion_service.should_run_in_background(plan):
+        # Large course: delete in batches from a job, the list page shows its progress
+        try:
+            job = job_runner.submit(current_user.id, 'delete_course', deletion_service.course_job,
+                                    course_id=course.id, name=course.name)
+        except JobLimitError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('courses.list_courses'))
+        flash(f'Course "{course.name}" has {plan.total} records and is being deleted in the background', 'info')
+        return redirect(url_for('courses.list_courses', delete_job=job.id))
+
     try:
-        # Delete related data in correct order to avoid foreign key constraint issues
-        
-        # 1. Delete course related questions and answers
-        for question in course.questions:
-            # First, clear best_answer_id to avoid foreign key constraint
-            if question.best_answer_id:
-                question.best_answer_id = None
-                db.session.flush()
-            
-            # Delete all vote records for answers
-            for answer in question.answers:
-                AnswerVote.query.filter_by(answer_id=answer.id).delete()
-            
-            # Delete all answers of the question
-            Answer.query.filter_by(question_id=question.id).delete()
-            
-            # Delete the question
-            db.session.delete(question)
-        
-        # 2. Delete course related activities and responses
-        for activity in course.activities:
-            db.session.delete(activity)  # Responses will be deleted through cascade
-        
-        # 3. Delete enrollment records
-        Enrollment.query.filter_by(course_id=course.id).delete()
-        
-        # 4. Delete the course itself
-        db.session.delete(course)
-        db.session.commit()
-        
+        deletion_service.delete_course(course.id, plan=plan)
         flash('Course deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,42 @@
+"""
+Background Job Routes
+Polling fallback and cancellation for jobs queued on the job runner
+"""
+
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+from app.jobs import job_runner
+
+bp = Blueprint('jobs', __name__)
+
+def _get_own_job(job_id):
+    """Return the job if it exists and belongs to the current user (admins see all)"""
+    job = job_runner.get(job_id)
+    if not job:
+        return None
+    if current_user.role != 'admin' and job.user_id != current_user.id:
+        return None
+    return job
+
+@bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """Poll job progress and result"""
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found or expired'}), 404
+
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found or expired'}), 404
+
+    if not job_runner.cancel(job_id):
+        return jsonify({'success': False, 'message': 'Job has already finished'})
+
+    return jsonify({'success': True, 'message': 'Cancellation requested'})
@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app.models import User, Course, Activity, Response
 from sqlalchemy import func
+from app import db
+from app.loading import load_profile
 
 bp = Blueprint('main', __name__)
 
@@ -197,15 +199,16 @@ def leaderboard():
         flash('Students cannot access leaderboard', 'warning')
         return redirect(url_for('main.dashboard'))
     
-    students = User.query.filter_by(role='student').all()
-    student_stats = []
-    
-    for student in students:
-        response_count = Response.query.filter_by(student_id=student.id).count()
-        student_stats.append({
-            'student': student,
-            'response_count': response_count
-        })
+    # Students with their response counts in one grouped query
+    rows = db.session.query(User, func.count(Response.id))\
+        .outerjoin(Response, Response.student_id == User.id)\
+        .filter(User.role == 'student')\
+        .group_by(User.id)\
+        .order_by(User.id)\
+        .options(*load_profile('leaderboard'))\
+        .all()
+    student_stats = [{'student': student, 'response_count': response_count}
+                     for student, response_count in rows]
     
     student_stats.sort(key=lambda x: x['response_count'], reverse=True)
     
@@ -7,6 +7,12 @@ from flask import Blueprint, render_template, request, flash, redirect, url_for,
 from flask_login import login_required, current_user
 from app import db
 from app.models import Question, Answer, AnswerVote, Course, Enrollment
+from app.qa_search import qa_search
+from app.question_similarity import question_similarity
+from app.answer_votes import cast_vote, VoteConflict, VOTE_TYPES
+from app.deletion import deletion_service
+from app.archive import archive_store
+from app.loading import load_profile
 from datetime import datetime
 
 qa_bp = Blueprint('qa', __name__)
@@ -30,16 +36,79 @@ def course_qa_list(course_id):
         flash('You do not have permission to access this course', 'danger')
         return redirect(url_for('main.dashboard'))
     
-    # Get question list (sorted by creation time)
+    # Full-text search replaces the list when a query is given
+    search_query = request.args.get('q', '').strip()
+    if search_query:
+        return render_template('qa/question_list.html',
+                             course=course,
+                             questions=None,
+                             search_query=search_query,
+                             search_results=qa_search.search(course_id, search_query, limit=20))
+    
+    # Get question list (sorted by creation time, archived semesters included)
     page = request.args.get('page', 1, type=int)
-    questions = Question.query.filter_by(course_id=course_id)\
-        .order_by(Question.created_at.desc())\
-        .paginate(page=page, per_page=10, error_out=False)
+    questions = archive_store.course_questions(course, page, per_page=10,
+                                             options=load_profile('question_list'))
     
     return render_template('qa/question_list.html', 
                          course=course, 
                          questions=questions)
 
+@qa_bp.route('/course/<int:course_id>/qa/search')
+@login_required
+def search_questions(course_id):
+    """Search course questions and answers (JSON)"""
+    course = Course.query.get_or_404(course_id)
+    
+    # Same access rules as the question list
+    if current_user.role == 'student':
+        enrollment = Enrollment.query.filter_by(
+            student_id=current_user.id, 
+            course_id=course_id
+        ).first()
+        if not enrollment:
+            return jsonify({'success': False, 'message': 'You do not have permission to access this course'}), 403
+    elif current_user.role == 'instructor' and course.instructor_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to access this course'}), 403
+    
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    results = qa_search.search(course_id, query, limit=limit)
+    for result in results:
+        result['created_at'] = result['created_at'].isoformat() if result['created_at'] else None
+        result['url'] = url_for('qa.question_detail', course_id=course_id, question_id=result['question_id'])
+    
+    return jsonify({'success': True, 'query': query, 'results': results})
+
+@qa_bp.route('/course/<int:course_id>/qa/similar')
+@login_required
+def similar_questions(course_id):
+    """Existing questions similar to a draft title/content (JSON, polled while typing)"""
+    course = Course.query.get_or_404(course_id)
+    
+    # Same access rules as searching the course's questions
+    if current_user.role == 'student':
+        enrollment = Enrollment.query.filter_by(
+            student_id=current_user.id, 
+            course_id=course_id
+        ).first()
+        if not enrollment:
+            return jsonify({'success': False, 'message': 'You do not have permission to access this course'}), 403
+    elif current_user.role == 'instructor' and course.instructor_id != current_user.id:
+        return jsonify({'success': False, 'message': 'You do not have permission to access this course'}), 403
+    
+    suggestions = question_similarity.suggest(course_id,
+                                              request.args.get('title', ''),
+                                              request.args.get('content', ''))
+    for suggestion in suggestions:
+        suggestion['url'] = url_for('qa.question_detail', course_id=course_id,
+                                    question_id=suggestion['question_id'])
+    
+    response = jsonify({'success': True, 'questions': suggestions})
+    # Lets the browser reuse the answer when the draft goes back to an earlier text
+    response.headers['Cache-Control'] = 'private, max-age=30'
+    return response
+
 @qa_bp.route('/course/<int:course_id>/qa/ask', methods=['GET', 'POST'])
 @login_required
 def ask_question(course_id):
@@ -74,6 +143,8 @@ def ask_question(course_id):
         
         db.session.add(question)
         db.session.commit()
+        qa_search.index_question(question)
+        question_similarity.add_question(question)
         
         flash('Question published successfully!', 'success')
         return redirect(url_for('qa.course_qa_list', course_id=course_id))
@@ -85,7 +156,7 @@ def ask_question(course_id):
 def question_detail(course_id, question_id):
     """Question detail page"""
     course = Course.query.get_or_404(course_id)
-    question = Question.query.get_or_404(question_id)
+    question = archive_store.get_question_or_404(question_id, load_profile('question_detail'))
     
     # Check if question belongs to this course
     if question.course_id != course_id:
@@ -107,16 +178,8 @@ def question_detail(course_id, question_id):
     
     # Get answers (sorted by votes and creation time, with pagination)
     page = request.args.get('page', 1, type=int)
-    answers_query = Answer.query.filter_by(question_id=question_id)\
-        .order_by(Answer.upvotes.desc(), Answer.created_at.asc())
-    
-    # If there's a best answer, pin it to top
-    best_answer = None
-    if question.best_answer_id:
-        best_answer = Answer.query.get(question.best_answer_id)
-        answers_query = answers_query.filter(Answer.id != question.best_answer_id)
-    
-    answers_pagination = answers_query.paginate(page=page, per_page=5, error_out=False)
+    best_answer, answers_pagination = archive_store.question_answers(question, page, per_page=5,
+                                                                   options=load_profile('question_answers'))
     answers = answers_pagination.items
     
     # Add best answer to beginning of list
@@ -157,6 +220,7 @@ def submit_answer(course_id, question_id):
     
     db.session.add(answer)
     db.session.commit()
+    qa_search.index_answer(answer, course_id)
     
     flash('Answer submitted successfully!', 'success')
     return redirect(url_for('qa.question_detail', 
@@ -166,48 +230,24 @@ def submit_answer(course_id, question_id):
 @qa_bp.route('/answer/<int:answer_id>/vote', methods=['POST'])
 @login_required
 def vote_answer(answer_id):
-    """Vote on answer"""
-    answer = Answer.query.get_or_404(answer_id)
-    vote_type = request.json.get('vote_type')  # 'upvote' or 'downvote'
+    """Vote on answer (voting the same way again cancels the vote)"""
+    Answer.query.get_or_404(answer_id)
+    vote_type = (request.get_json(silent=True) or {}).get('vote_type')  # 'upvote' or 'downvote'
     
-    if vote_type not in ['upvote', 'downvote']:
+    if vote_type not in VOTE_TYPES:
         return jsonify({'success': False, 'message': 'Invalid vote type'})
     
-    # Check if already voted
-    existing_vote = AnswerVote.query.filter_by(
-        answer_id=answer_id,
-        user_id=current_user.id
-    ).first()
-    
-    if existing_vote:
-        if existing_vote.vote_type == vote_type:
-            # Cancel vote
-            db.session.delete(existing_vote)
-            if vote_type == 'upvote':
-                answer.upvotes = max(0, answer.upvotes - 1)
-        else:
-            # Change vote type
-            existing_vote.vote_type = vote_type
-            if vote_type == 'upvote':
-                answer.upvotes += 1
-            else:
-                answer.upvotes = max(0, answer.upvotes - 1)
-    else:
-        # New vote
-        vote = AnswerVote(
-            answer_id=answer_id,
-            user_id=current_user.id,
-            vote_type=vote_type
-        )
-        db.session.add(vote)
-        if vote_type == 'upvote':
-            answer.upvotes += 1
-    
-    db.session.commit()
+    try:
+        tallies = cast_vote(answer_id, current_user.id, vote_type)
+    except VoteConflict:
+        return jsonify({'success': False, 'message': 'Vote failed, please try again'}), 409
     
     return jsonify({
         'success': True, 
-        'upvotes': answer.upvotes,
+        'upvotes': tallies['upvotes'],
+        'downvotes': tallies['downvotes'],
+        'score': tallies['score'],
+        'vote': tallies['vote'],
         'message': 'Vote successful'
     })
 
@@ -256,21 +296,8 @@ def delete_question(course_id, question_id):
         return jsonify({'success': False, 'message': 'You do not have permission to delete this question'})
     
     try:
-        # Step 1: Clear best_answer_id to avoid foreign key constraint
-        if question.best_answer_id:
-            question.best_answer_id = None
-            db.session.flush()  # Apply this change first
-        
-        # Step 2: Delete related vote records
-        for answer in question.answers:
-            AnswerVote.query.filter_by(answer_id=answer.id).delete()
-        
-        # Step 3: Delete all answers
-        Answer.query.filter_by(question_id=question_id).delete()
-        
-        # Step 4: Delete the question itself
-        db.session.delete(question)
-        db.session.commit()
+        # Votes, answers and the question as set-based batched deletes
+        deletion_service.delete_question(course_id, question_id)
         
         return jsonify({
             'success': True, 
@@ -315,6 +342,7 @@ def delete_answer(course_id, question_id, answer_id):
         # Delete answer
         db.session.delete(answer)
         db.session.commit()
+        qa_search.remove_answer(course_id, question_id, answer_id)
         
         return jsonify({'success': True, 'message': 'Answer deleted successfully'})
         
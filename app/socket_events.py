@@ -3,6 +3,12 @@ from flask_login import current_user
 from app import socketio, db
 from app.models import Activity, Response
 
+@socketio.on('connect')
+def on_connect():
+    """Join the user's private room for background job updates"""
+    if current_user.is_authenticated:
+        join_room(f'user_{current_user.id}')
+
 @socketio.on('join_activity')
 def on_join_activity(data):
     """Join an activity room for real-time updates"""
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+添加 downvotes 和 score 字段到 Answer 表
+score = upvotes - downvotes，并按 (question_id, score) 建索引；
+最后根据 answer_vote 表重新统计所有回答的票数。可重复执行。
+"""
+import os
+import sys
+
+# Add the parent directory to sys.path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.answer_votes import reconcile_tallies
+from sqlalchemy import text
+
+def add_answer_vote_tallies():
+    """添加票数字段和索引，并重新统计票数"""
+    app = create_app({'VOTE_RECONCILE_SECONDS': 0})
+    
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('answer')]
+            indexes = [index['name'] for index in inspector.get_indexes('answer')]
+            
+            for column in ('downvotes', 'score'):
+                if column in columns:
+                    print(f"✓ {column} 字段已存在")
+                    continue
+                db.session.execute(text(f"ALTER TABLE answer ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"))
+                db.session.commit()
+                print(f"✓ 成功添加 {column} 字段")
+            
+            # 旧数据的 upvotes 可能为 NULL，原子自增前先补 0
+            db.session.execute(text("UPDATE answer SET upvotes = 0 WHERE upvotes IS NULL"))
+            if db.engine.dialect.name == 'mysql':
+                db.session.execute(text("ALTER TABLE answer MODIFY COLUMN upvotes INTEGER NOT NULL DEFAULT 0"))
+            db.session.commit()
+            
+            if 'ix_answer_question_score' in indexes:
+                print("✓ ix_answer_question_score 索引已存在")
+            else:
+                db.session.execute(text("CREATE INDEX ix_answer_question_score ON answer (question_id, score)"))
+                db.session.commit()
+                print("✓ 成功创建 ix_answer_question_score 索引")
+            
+            print("开始根据投票记录重新统计票数...")
+            corrected = reconcile_tallies()
+            print(f"✓ 已更新 {corrected} 条回答的票数")
+            
+            print("\n✅ 迁移完成！")
+            print("说明：")
+            print("  - upvotes / downvotes: 赞成票 / 反对票数量")
+            print("  - score: 净得分（upvotes - downvotes），回答按此排序")
+            return True
+            
+        except Exception as e:
+            print(f"\n❌ 迁移失败: {str(e)}")
+            db.session.rollback()
+            return False
+
+if __name__ == '__main__':
+    success = add_answer_vote_tallies()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+添加 archived_at 字段到 Course 表
+有值表示该课程的活动、作答和问答已移入学期归档（见 scripts/archive_semesters.py）。可重复执行。
+"""
+import os
+import sys
+
+# Add the parent directory to sys.path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from sqlalchemy import text
+
+def add_course_archive():
+    """添加 archived_at 字段"""
+    app = create_app({'VOTE_RECONCILE_SECONDS': 0})
+
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('course')]
+
+            if 'archived_at' in columns:
+                print("✓ archived_at 字段已存在")
+            else:
+                db.session.execute(text("ALTER TABLE course ADD COLUMN archived_at DATETIME NULL"))
+                db.session.commit()
+                print("✓ 成功添加 archived_at 字段")
+
+            print("\n✅ 迁移完成！")
+            print("说明：")
+            print("  - archived_at: 课程归档时间，为空表示数据仍在在线表中")
+            return True
+
+        except Exception as e:
+            print(f"\n❌ 迁移失败: {str(e)}")
+            db.session.rollback()
+            return False
+
+if __name__ == '__main__':
+    success = add_course_archive()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+为 Course 表添加 (semester, id) 索引
+课程目录（浏览课程页）按学期筛选并按 id 倒序分页时使用。可重复执行。
+"""
+import os
+import sys
+
+# Add the parent directory to sys.path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from sqlalchemy import text
+
+def add_course_catalog_index():
+    """添加 ix_course_semester_id 索引"""
+    app = create_app({'VOTE_RECONCILE_SECONDS': 0})
+    
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            indexes = [index['name'] for index in inspector.get_indexes('course')]
+            
+            if 'ix_course_semester_id' in indexes:
+                print("✓ ix_course_semester_id 索引已存在")
+            else:
+                db.session.execute(text("CREATE INDEX ix_course_semester_id ON course (semester, id)"))
+                db.session.commit()
+                print("✓ 成功创建 ix_course_semester_id 索引")
+            
+            print("\n✅ 迁移完成！")
+            print("说明：")
+            print("  - ix_course_semester_id: 浏览课程页按学期筛选、按 id 倒序分页")
+            print("  - 未选学期时按主键倒序分页，已选课程通过 enrollment (student_id, course_id) 唯一索引排除")
+            return True
+            
+        except Exception as e:
+            print(f"\n❌ 迁移失败: {str(e)}")
+            db.session.rollback()
+            return False
+
+if __name__ == '__main__':
+    success = add_course_catalog_index()
+    sys.exit(0 if success else 1)
@@ -18,8 +18,10 @@ if not os.environ.get('SECRET_KEY'):
 if not os.environ.get('DATABASE_URL'):
     os.environ['DATABASE_URL'] = 'sqlite:///classroom.db'
 
-# Create application instance (for gunicorn)
-app = create_app()
+# Create application instance (for gunicorn). Not in the document extraction
+# workers (app.extraction), which 'spawn' re-imports as __mp_main__.
+if __name__ != '__mp_main__':
+    app = create_app()
 
 def main():
     # Check if test data needs to be created
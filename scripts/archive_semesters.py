@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+往届学期归档工具
+把往届课程的活动、作答和问答移出在线表，写入 ARCHIVE_DIR 下的压缩 JSONL 文件；
+课程页面、活动结果、导出和问答页面仍会从归档中读取这些数据（只读）。
+
+用法:
+    python scripts/archive_semesters.py list
+    python scripts/archive_semesters.py archive --before "2025 Spring" [--dry-run]
+    python scripts/archive_semesters.py archive --course 12 --course 15
+    python scripts/archive_semesters.py restore --course 12
+    python scripts/archive_semesters.py restore --semester "2023 Fall"
+
+--before 归档学期早于给定学期的所有课程（"2024 Fall"、"Spring 2025"、"2024秋"、
+"2024-2025学年第一学期" 等写法均可识别；无法识别学期的课程会被跳过）。
+首次使用前请先运行 migrations/add_course_archive_migration.py。
+"""
+
+import argparse
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.archive import archive_store, semester_key, ArchiveError
+from app.models import Course
+
+
+def select_courses(args, archived):
+    """按 --course / --semester / --before 选出课程"""
+    query = Course.query.filter(Course.archived_at.isnot(None) if archived else Course.archived_at.is_(None))
+    courses = query.order_by(Course.id).all()
+    if args.course:
+        courses = [course for course in courses if course.id in set(args.course)]
+    if getattr(args, 'semester', None):
+        courses = [course for course in courses if course.semester.strip() == args.semester.strip()]
+    if getattr(args, 'before', None):
+        cutoff = semester_key(args.before)
+        if cutoff is None:
+            raise SystemExit(f"❌ 无法识别学期: {args.before}")
+        skipped = [course for course in courses if semester_key(course.semester) is None]
+        for course in skipped:
+            print(f"⚠️  跳过课程 {course.id} {course.name}：无法识别学期 \"{course.semester}\"")
+        courses = [course for course in courses
+                   if semester_key(course.semester) is not None and semester_key(course.semester) < cutoff]
+    return courses
+
+
+def list_courses(args):
+    """列出在线课程（按学期）和已归档课程"""
+    live = Course.query.filter(Course.archived_at.is_(None)).all()
+    print("📚 在线课程（按学期）:")
+    by_semester = {}
+    for course in live:
+        by_semester.setdefault(course.semester, []).append(course)
+    for semester in sorted(by_semester, key=lambda s: semester_key(s) or (0, 0)):
+        key = semester_key(semester)
+        label = f"{key[0]}-{key[1]}" if key else "无法识别"
+        print(f"  {semester:<24} ({label}) {len(by_semester[semester])} 门课程")
+
+    manifests = archive_store.manifests()
+    print(f"\n🗄️  已归档课程（{archive_store.directory}）:")
+    if not manifests:
+        print("  （无）")
+    for manifest in manifests:
+        counts = manifest['counts']
+        print(f"  课程 {manifest['course_id']:<6} {manifest.get('name', ''):<24} {manifest['semester']:<16} "
+              f"活动 {counts['activity']}, 作答 {counts['response']}, 问题 {counts['question']}, "
+              f"回答 {counts['answer']}, 投票 {counts['answer_vote']}  "
+              f"{manifest['bytes'] / 1024:.0f} KB  归档于 {manifest['archived_at'][:19]}")
+
+
+def archive(args):
+    """归档选中的课程"""
+    if not args.course and not args.before:
+        raise SystemExit("❌ 请指定 --before 或 --course")
+    courses = select_courses(args, archived=False)
+    if not courses:
+        print("ℹ️  没有需要归档的课程")
+        return True
+    print(f"📦 将归档 {len(courses)} 门课程:")
+    for course in courses:
+        print(f"  课程 {course.id} {course.name} ({course.semester})")
+    if args.dry_run:
+        print("\n(--dry-run) 未做任何修改")
+        return True
+
+    ok = True
+    for course in courses:
+        try:
+            manifest = archive_store.archive_course(course.id)
+            counts = manifest['counts']
+            print(f"✓ 课程 {course.id} 已归档：活动 {counts['activity']}, 作答 {counts['response']}, "
+                  f"问题 {counts['question']}, 回答 {counts['answer']}, 投票 {counts['answer_vote']}")
+        except ArchiveError as e:
+            db.session.rollback()
+            print(f"❌ 课程 {course.id} 归档失败: {e}")
+            ok = False
+    return ok
+
+
+def restore(args):
+    """把归档课程恢复到在线表"""
+    if not args.course and not args.semester:
+        raise SystemExit("❌ 请指定 --course 或 --semester")
+    courses = select_courses(args, archived=True)
+    if not courses:
+        print("ℹ️  没有匹配的已归档课程")
+        return True
+
+    ok = True
+    for course in courses:
+        try:
+            counts = archive_store.restore_course(course.id)
+            print(f"✓ 课程 {course.id} {course.name} 已恢复：" + ', '.join(f'{name} {n}' for name, n in counts.items()))
+        except ArchiveError as e:
+            db.session.rollback()
+            print(f"❌ 课程 {course.id} 恢复失败: {e}")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='往届学期归档工具')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='列出在线课程和已归档课程')
+    archive_parser = commands.add_parser('archive', help='归档课程')
+    archive_parser.add_argument('--before', help='归档学期早于该学期的课程，如 "2025 Spring"')
+    archive_parser.add_argument('--course', type=int, action='append', help='课程 ID（可重复）')
+    archive_parser.add_argument('--dry-run', action='store_true', help='只列出将归档的课程')
+    restore_parser = commands.add_parser('restore', help='恢复已归档课程')
+    restore_parser.add_argument('--course', type=int, action='append', help='课程 ID（可重复）')
+    restore_parser.add_argument('--semester', help='恢复该学期的全部课程')
+    args = parser.parse_args()
+
+    app = create_app({'VOTE_RECONCILE_SECONDS': 0})
+    with app.app_context():
+        if args.command == 'list':
+            list_courses(args)
+            ok = True
+        elif args.command == 'archive':
+            ok = archive(args)
+        else:
+            ok = restore(args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+AI client latency benchmark: cold (new client per call) vs warm (pooled client)
+Runs against the local mock server, no API key required
+
+Usage: python scripts/test_scripts/benchmark_ai_client.py [requests]
+"""
+
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.ai_client import AIProvider  # noqa: E402
+from mock_ai_server import MockAIServer  # noqa: E402
+
+MESSAGES = [
+    {"role": "system", "content": "You are an education expert."},
+    {"role": "user", "content": "Please generate 3 classroom interaction questions."}
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, latencies, connections):
+    print(f"{label:<6} mean={statistics.mean(latencies):7.2f}ms  "
+          f"p50={percentile(latencies, 50):7.2f}ms  "
+          f"p95={percentile(latencies, 95):7.2f}ms  "
+          f"connections={connections}")
+
+
+def run_cold(base_url, count):
+    """Build a new client for every request (old create_ark_client behaviour)"""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        provider = AIProvider('mock', base_url, 'test-key', 'mock-model')
+        provider.chat(MESSAGES)
+        provider.close()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_warm(base_url, count):
+    """Reuse one pooled client for every request"""
+    provider = AIProvider('mock', base_url, 'test-key', 'mock-model')
+    provider.chat(MESSAGES)  # Establish the keep-alive connection first
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        provider.chat(MESSAGES)
+        latencies.append((time.perf_counter() - start) * 1000)
+    provider.close()
+    return latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print("=" * 60)
+    print(f"AI client benchmark ({count} requests per mode)")
+    print("=" * 60)
+
+    server = MockAIServer().start()
+    try:
+        before = server.connection_count
+        cold = run_cold(server.base_url, count)
+        report('cold', cold, server.connection_count - before)
+
+        before = server.connection_count
+        warm = run_warm(server.base_url, count)
+        report('warm', warm, server.connection_count - before)
+
+        speedup = statistics.mean(cold) / statistics.mean(warm)
+        print("-" * 60)
+        print(f"Warm client is {speedup:.1f}x faster per request on average")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
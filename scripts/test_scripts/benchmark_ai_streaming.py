@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-question benchmark: streaming vs blocking question generation
+Runs generate_questions_streaming against the local stub streaming server
+
+Usage: python scripts/test_scripts/benchmark_ai_streaming.py [token_delay_ms]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ai_server import MockAIServer  # noqa: E402
+
+TEACHING_TEXT = (
+    "Photosynthesis converts light energy into chemical energy. "
+    "Chlorophyll absorbs mostly blue and red light. "
+    "The Calvin cycle fixes carbon dioxide into sugars."
+)
+
+
+def main():
+    token_delay = (float(sys.argv[1]) if len(sys.argv) > 1 else 30) / 1000
+
+    server = MockAIServer(delay=0.2, token_delay=token_delay).start()
+
+    # Point the OpenAI provider at the stub server before importing the app modules
+    os.environ.pop('ARK_API_KEY', None)
+    os.environ['OPENAI_API_KEY'] = 'sk-benchmark-key'
+    os.environ['OPENAI_BASE_URL'] = server.base_url
+    from app import ai_client
+    from app.ai_utils import generate_questions_with_failover, generate_questions_streaming
+
+    print("=" * 60)
+    print(f"Streaming benchmark (first byte 200ms, {token_delay * 1000:.0f}ms per token)")
+    print("=" * 60)
+
+    try:
+        start = time.perf_counter()
+        questions = generate_questions_with_failover(TEACHING_TEXT)
+        blocking_total = (time.perf_counter() - start) * 1000
+        print(f"blocking   first question={blocking_total:7.1f}ms  total={blocking_total:7.1f}ms  ({len(questions)} questions)")
+
+        arrivals = []
+        start = time.perf_counter()
+        questions = generate_questions_streaming(
+            TEACHING_TEXT, on_question=lambda q: arrivals.append((time.perf_counter() - start) * 1000)
+        )
+        streaming_total = (time.perf_counter() - start) * 1000
+        print(f"streaming  first question={arrivals[0]:7.1f}ms  total={streaming_total:7.1f}ms  ({len(questions)} questions)")
+        print("           arrivals: " + ", ".join(f"{t:.0f}ms" for t in arrivals))
+
+        print("-" * 60)
+        print(f"Time to first question improved {blocking_total / arrivals[0]:.1f}x")
+    finally:
+        ai_client.close_all_providers()
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark local answer clustering against the keyword fallback
+
+Generates synthetic answer sets with known topics (shared filler words,
+typos and off-topic answers), then reports for each set:
+
+- time of the local TF-IDF + k-means engine (cluster_answers)
+- time of the old keyword grouping (group_answers_fallback)
+- adjusted Rand index and purity of both against the true topics
+
+The keyword grouping may put an answer in several groups or none; answers
+are assigned to the first group containing them, ungrouped answers form
+one extra group.
+
+Usage:
+    python scripts/test_scripts/benchmark_answer_clustering.py [--sizes 100,500,2000] [--topics 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.answer_clustering import cluster_answers
+from app.ai_utils import group_answers_fallback
+
+TOPICS = [
+    ['photosynthesis', 'chlorophyll', 'sunlight', 'glucose', 'leaves', 'energy'],
+    ['gravity', 'mass', 'force', 'acceleration', 'newton', 'weight'],
+    ['democracy', 'vote', 'election', 'citizens', 'government', 'rights'],
+    ['recursion', 'function', 'base', 'case', 'stack', 'calls'],
+    ['inflation', 'prices', 'money', 'supply', 'demand', 'economy'],
+    ['evolution', 'species', 'selection', 'mutation', 'survival', 'genes'],
+    ['climate', 'carbon', 'emissions', 'temperature', 'warming', 'greenhouse'],
+    ['poetry', 'rhyme', 'metaphor', 'verse', 'imagery', 'poem'],
+]
+
+FILLER = ['important', 'because', 'example', 'process', 'basically', 'means', 'main', 'idea',
+          'learned', 'class', 'concept', 'explain', 'understand', 'thing', 'people']
+TEMPLATES = [
+    'I think {a} is about {b} and {c}',
+    '{a} happens when {b} affects {c}, which is {f}',
+    'The {f} idea of {a} is that {b} leads to {c}',
+    'In class we learned {a} means {b} with {c} as an {f}',
+    '{a} {b} {c}',
+    'It is {f} to {g} how {a} relates to {b}',
+]
+
+
+def typo(word, rng):
+    if len(word) > 4 and rng.random() < 0.5:
+        i = rng.randrange(len(word) - 1)
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def make_answers(size, topic_count, seed=0):
+    """Return (answers, true topic labels); about 5% of answers are off-topic noise"""
+    rng = random.Random(seed)
+    topics = TOPICS[:topic_count]
+    answers, labels = [], []
+    for _ in range(size):
+        if rng.random() < 0.05:
+            answers.append(' '.join(rng.sample(FILLER, 3)))
+            labels.append(-1)
+            continue
+        topic = rng.randrange(len(topics))
+        words = rng.sample(topics[topic], 3)
+        if rng.random() < 0.1:
+            words[rng.randrange(3)] = typo(words[0], rng)
+        template = rng.choice(TEMPLATES)
+        answers.append(template.format(a=words[0], b=words[1], c=words[2],
+                                       f=rng.choice(FILLER), g=rng.choice(FILLER)))
+        labels.append(topic)
+    return answers, labels
+
+
+def to_labels(groups, size):
+    labels = [-1] * size
+    for number, group in enumerate(groups):
+        for index in group['answers']:
+            if labels[index] == -1:
+                labels[index] = number
+    return labels
+
+
+def adjusted_rand_index(truth, predicted):
+    pairs = Counter(zip(truth, predicted))
+    def comb2(n):
+        return n * (n - 1) / 2
+    sum_pairs = sum(comb2(n) for n in pairs.values())
+    sum_truth = sum(comb2(n) for n in Counter(truth).values())
+    sum_pred = sum(comb2(n) for n in Counter(predicted).values())
+    expected = sum_truth * sum_pred / comb2(len(truth))
+    maximum = (sum_truth + sum_pred) / 2
+    return (sum_pairs - expected) / (maximum - expected) if maximum != expected else 1.0
+
+
+def purity(truth, predicted):
+    clusters = {}
+    for t, p in zip(truth, predicted):
+        clusters.setdefault(p, Counter())[t] += 1
+    return sum(counter.most_common(1)[0][1] for counter in clusters.values()) / len(truth)
+
+
+def timed(fn, *args, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark local answer clustering')
+    parser.add_argument('--sizes', default='100,500,2000', help='Comma separated answer set sizes')
+    parser.add_argument('--topics', type=int, default=5, help='Number of true topics (max 8)')
+    args = parser.parse_args()
+
+    print(f"{'answers':>8} {'engine':>10} {'time':>10} {'groups':>7} {'ARI':>6} {'purity':>7}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        answers, truth = make_answers(size, min(args.topics, len(TOPICS)))
+        for name, fn in (('kmeans', cluster_answers), ('keywords', group_answers_fallback)):
+            elapsed, result = timed(fn, answers)
+            predicted = to_labels(result['groups'], size)
+            print(f"{size:>8} {name:>10} {elapsed * 1000:>8.1f}ms {len(result['groups']):>7} "
+                  f"{adjusted_rand_index(truth, predicted):>6.3f} {purity(truth, predicted):>7.3f}")
+
+    answers, _ = make_answers(500, min(args.topics, len(TOPICS)))
+    print('\nGroups for 500 answers:')
+    for group in cluster_answers(answers)['groups']:
+        print(f"  {group['name']:<50} {len(group['answers']):>4} e.g. {answers[group['representative']]!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Chunked question generation benchmark: sequential vs concurrent chunk calls
+Runs generate_questions_chunked against the local stub server, which answers
+each chunk with questions about the section headings it contains
+
+Usage: python scripts/test_scripts/benchmark_chunked_generation.py [sections] [latency_ms]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ai_server import MockAIServer  # noqa: E402
+
+PARAGRAPH = (
+    "This section introduces the core idea and works through an example in detail. "
+    "Students should connect the definition to the worked example and to earlier lectures. "
+    "Common misconceptions are discussed along with strategies to avoid them. "
+)
+
+
+def build_lecture(sections):
+    """Lecture text with numbered headings and several paragraphs per section (~2.5k chars each)"""
+    parts = []
+    for number in range(1, sections + 1):
+        parts.append(f"{number}. Topic {number}\n")
+        parts.extend(PARAGRAPH * 3 + "\n\n" for _ in range(3))
+    return ''.join(parts)
+
+
+def chunk_reply(request):
+    """Three questions per chunk, naming the topics found in the prompt"""
+    prompt = request['messages'][-1]['content']
+    topics = re.findall(r'^\d+\. (Topic \d+)$', prompt, re.MULTILINE) or ['the text']
+    return (f"What is the key idea of {topics[0]}?\n"
+            f"How does {topics[-1]} relate to earlier material?\n"
+            f"Which misconception about {topics[0]} is most common?")
+
+
+def main():
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 800) / 1000
+
+    server = MockAIServer(reply=chunk_reply, delay=latency).start()
+
+    # Point the OpenAI provider at the stub server before importing the app modules
+    os.environ.pop('ARK_API_KEY', None)
+    os.environ['OPENAI_API_KEY'] = 'sk-benchmark-key'
+    os.environ['OPENAI_BASE_URL'] = server.base_url
+    from app import ai_client
+    from app.ai_utils import generate_questions_chunked, CHUNK_CONCURRENCY
+    from app.chunking import chunk_text, estimate_tokens
+
+    text = build_lecture(sections)
+    chunks = chunk_text(text)
+    print("=" * 70)
+    print(f"Lecture: {len(text)} chars, ~{estimate_tokens(text)} tokens, {len(chunks)} chunks "
+          f"(largest ~{max(estimate_tokens(c) for c in chunks)} tokens)")
+    print(f"Stub provider latency: {latency * 1000:.0f}ms per call")
+    old_sections = len(re.findall(r'^\d+\. Topic', text[:10000], re.MULTILINE))
+    print(f"Old behaviour: the first 10,000 characters only ({old_sections} of {sections} sections)")
+    print("=" * 70)
+
+    try:
+        results = {}
+        for label, workers in (('sequential', 1), (f'concurrent x{CHUNK_CONCURRENCY}', CHUNK_CONCURRENCY)):
+            arrivals = []
+            requests_before = server.request_count
+            start = time.perf_counter()
+            questions = generate_questions_chunked(
+                text, max_workers=workers,
+                on_question=lambda q: arrivals.append((time.perf_counter() - start) * 1000)
+            )
+            total = (time.perf_counter() - start) * 1000
+            results[label] = total
+            covered = {int(n) for q in questions for n in re.findall(r'Topic (\d+)', q)}
+            print(f"{label:<16} total={total:8.1f}ms  first question={arrivals[0]:7.1f}ms  "
+                  f"calls={server.request_count - requests_before}  questions={len(questions)}  "
+                  f"topics covered={len(covered)}")
+
+        sequential, concurrent = results.values()
+        print("-" * 70)
+        print(f"Concurrent chunk generation is {sequential / concurrent:.1f}x faster than sequential")
+        print("Sample questions:")
+        for question in questions[:5]:
+            print(f"  - {question}")
+    finally:
+        ai_client.close_all_providers()
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
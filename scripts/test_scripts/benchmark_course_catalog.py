@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Browse-courses catalog: full scan in Python vs anti-join with keyset pages
+
+Seeds a temporary SQLite database with --courses courses, --students
+students and --enrollments enrollments per student, then times, for one
+student, the old page (every course loaded, enrolled ones filtered out in
+Python) against the catalog: the first page, a deep page (cursor in the
+oldest tenth of the ids), a text search and a semester filter. Rendering
+goes through the real /courses/browse and /courses/browse/search routes.
+
+Usage: python scripts/test_scripts/benchmark_course_catalog.py [--courses 50000] [--requests 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_qa_search import summarize  # noqa: E402
+
+WORDS = ['algebra', 'biology', 'chemistry', 'databases', 'economics', 'french', 'geometry', 'history',
+         'linguistics', 'networks', 'optics', 'physics', 'statistics', 'writing']
+SEMESTERS = [f'{year} {season}' for year in range(2015, 2026) for season in ('Spring', 'Fall')]
+
+
+def seed(app, args):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Course, Enrollment, User
+
+    rng = random.Random(48)
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='catalog-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        db.session.add(instructor)
+        db.session.flush()
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'catalog-bench-{i}@example.com', 'name': f'Student {i}', 'role': 'student',
+             'student_id': f'CTB{i:06d}', 'password_hash': password} for i in range(args.students)])
+        student_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'student')]
+        db.session.execute(Course.__table__.insert(), [
+            {'name': f'{rng.choice(WORDS).title()} {c}', 'semester': rng.choice(SEMESTERS),
+             'description': ' '.join(rng.sample(WORDS, 3)), 'instructor_id': instructor.id}
+            for c in range(args.courses)])
+        course_ids = [row[0] for row in db.session.query(Course.id)]
+        db.session.execute(Enrollment.__table__.insert(), [
+            {'student_id': student_id, 'course_id': course_id}
+            for student_id in student_ids for course_id in rng.sample(course_ids, args.enrollments)])
+        db.session.commit()
+        return student_ids[0], sorted(course_ids)
+
+
+def old_page(app, student_id):
+    """The page before the catalog: every course loaded and filtered in Python"""
+    from app.models import Course, User
+    from app import db
+
+    with app.app_context():
+        student = db.session.get(User, student_id)
+        all_courses = Course.query.all()
+        enrolled_course_ids = [enrollment.course_id for enrollment in student.enrollments]
+        available = [course for course in all_courses if course.id not in enrolled_course_ids]
+        return len(available)
+
+
+def timed(samples, label, call):
+    started = time.perf_counter()
+    result = call()
+    samples.setdefault(label, []).append(time.perf_counter() - started)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--courses', type=int, default=50000)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--enrollments', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.page_cache import page_cache
+
+    directory = tempfile.mkdtemp(prefix='catalog-bench-')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "bench.db")}',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {}, 'LOG_LEVEL': 'WARNING',
+                      'LOG_LEVELS': 'app.metrics=ERROR', 'VOTE_RECONCILE_SECONDS': 0})
+    print(f"seeding {args.courses} courses ...")
+    student_id, course_ids = seed(app, args)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(student_id)
+        session['_fresh'] = True
+
+    deep = course_ids[len(course_ids) // 10]
+    pages = [
+        ('catalog first page', '/courses/browse'),
+        ('catalog deep page', f'/courses/browse?after={deep}'),
+        ('catalog search', '/courses/browse/search?q=optics+writing'),
+        ('catalog semester', f'/courses/browse/search?semester={SEMESTERS[3].replace(" ", "+")}'),
+    ]
+    samples = {}
+    old_requests = max(1, args.requests // 10)
+    for _ in range(old_requests):
+        available = timed(samples, 'old: all courses, Python filter', lambda: old_page(app, student_id))
+    for _ in range(args.requests):
+        for label, url in pages:
+            response = timed(samples, label, lambda: client.get(url))
+            if response.status_code != 200:
+                raise SystemExit(f'{label}: {url} returned {response.status_code}')
+
+    print(f"\n{available} courses available to the student; old page timed {old_requests}x (query and filter only, no rendering)")
+    for label, values in samples.items():
+        print(f"[{label}]\n  {summarize(values)}")
+    stats = page_cache.stats()
+    print(f"\ncatalog card cache: {stats.get('catalog_card_hits', 0)} hits, {stats.get('catalog_card_misses', 0)} misses")
+
+
+if __name__ == '__main__':
+    main()
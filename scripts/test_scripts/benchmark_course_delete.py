@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Course deletion: ORM cascade vs set-based batched deletes
+
+Seeds a temporary SQLite database with a course holding --responses
+responses (--students students answering every activity), Q&A with
+answers and votes, and a second small course that must survive. The same
+database is then deleted twice, from identical copies:
+
+    orm        the previous delete_course route: ORM loop over questions
+               and activities, every response deleted as an object through
+               the cascade, one transaction
+    set-based  app.deletion: DELETE ... WHERE ... IN (subquery) over
+               primary key ranges, one transaction per batch
+
+For each it reports the wall time, statements issued, the longest write
+transaction, and how long a concurrent writer (a student submitting to
+the other course every 20 ms from its own connection) had to wait at
+most, which is what holding the database lock for the whole deletion
+costs everyone else.
+
+Usage: python scripts/test_scripts/benchmark_course_delete.py [--responses 100000] [--batch-size 2000]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy.exc import SAWarning  # noqa: E402
+
+
+def seed(app, students, activities, questions):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Activity, Answer, AnswerVote, Course, Enrollment, Question, Response, User
+
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='delete-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        db.session.add(instructor)
+        db.session.flush()
+        target = Course(name='Delete Me', semester='2024 Fall', instructor_id=instructor.id)
+        other = Course(name='Keep Me', semester='2024 Fall', instructor_id=instructor.id)
+        db.session.add_all([target, other])
+        db.session.commit()
+
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'delete-bench-{i}@example.com', 'name': f'Student {i}', 'role': 'student',
+             'student_id': f'DEL{i:06d}', 'password_hash': password} for i in range(students)])
+        student_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'student')]
+        db.session.execute(Enrollment.__table__.insert(), [
+            {'student_id': student_id, 'course_id': course.id}
+            for course in (target, other) for student_id in student_ids])
+
+        def add_activity(course, n):
+            activity = Activity(title=f'Activity {n}', question='Q?', type='poll', options='["A", "B"]',
+                                course_id=course.id, instructor_id=instructor.id, is_active=n % 10 == 0)
+            db.session.add(activity)
+            db.session.flush()
+            return activity.id
+
+        # Interleave the two courses' responses so the target's rows are spread over the table
+        other_activity = None
+        for n in range(activities):
+            activity_id = add_activity(target, n)
+            db.session.execute(Response.__table__.insert(), [
+                {'student_id': student_id, 'activity_id': activity_id, 'answer': 'A'} for student_id in student_ids])
+            if n % 10 == 0:
+                other_activity = add_activity(other, n)
+                db.session.execute(Response.__table__.insert(), [
+                    {'student_id': student_id, 'activity_id': other_activity, 'answer': 'B'}
+                    for student_id in student_ids[:50]])
+
+        for course in (target, other):
+            count = questions if course is target else questions // 10
+            db.session.execute(Question.__table__.insert(), [
+                {'title': f'Question {i}', 'content': 'Why?', 'course_id': course.id, 'author_id': student_ids[i % 50],
+                 'is_resolved': False, 'view_count': 0} for i in range(count)])
+            question_ids = [row[0] for row in db.session.query(Question.id).filter_by(course_id=course.id)]
+            db.session.execute(Answer.__table__.insert(), [
+                {'content': 'Because.', 'question_id': question_id, 'author_id': student_ids[k],
+                 'upvotes': 0, 'downvotes': 0, 'score': 0, 'is_instructor_answer': False}
+                for question_id in question_ids for k in range(4)])
+            answers = db.session.query(Answer.id, Answer.question_id)\
+                .filter(Answer.question_id.in_(question_ids)).all()
+            db.session.execute(AnswerVote.__table__.insert(), [
+                {'answer_id': answer_id, 'user_id': student_ids[k], 'vote_type': 'upvote'}
+                for answer_id, _ in answers for k in range(10, 13)])
+            best = {}
+            for answer_id, question_id in answers:
+                best.setdefault(question_id, answer_id)
+            for question_id, answer_id in list(best.items())[::2]:
+                db.session.execute(Question.__table__.update().where(Question.__table__.c.id == question_id)
+                                   .values(best_answer_id=answer_id))
+        db.session.commit()
+        return target.id, other.id, other_activity, student_ids
+
+
+def row_counts(app, course_id):
+    from app import db
+    from app.models import Activity, Answer, AnswerVote, Course, Enrollment, Question, Response
+
+    with app.app_context():
+        activities = db.session.query(Activity.id).filter_by(course_id=course_id)
+        questions = db.session.query(Question.id).filter_by(course_id=course_id)
+        answers = db.session.query(Answer.id).filter(Answer.question_id.in_(questions))
+        return {
+            'course': Course.query.filter_by(id=course_id).count(),
+            'enrollments': Enrollment.query.filter_by(course_id=course_id).count(),
+            'activities': activities.count(),
+            'responses': Response.query.filter(Response.activity_id.in_(activities)).count(),
+            'questions': questions.count(),
+            'answers': answers.count(),
+            'votes': AnswerVote.query.filter(AnswerVote.answer_id.in_(answers)).count(),
+        }
+
+
+def orm_delete(course_id):
+    """The delete_course route body before app.deletion"""
+    from app import db
+    from app.models import Answer, AnswerVote, Course, Enrollment
+
+    # Question.answers still holds the answers the bulk delete removed; flushing the question
+    # delete warns about them for every question
+    warnings.filterwarnings('ignore', message='DELETE statement on table', category=SAWarning)
+    course = db.session.get(Course, course_id)
+    for question in course.questions:
+        if question.best_answer_id:
+            question.best_answer_id = None
+            db.session.flush()
+        for answer in question.answers:
+            AnswerVote.query.filter_by(answer_id=answer.id).delete()
+        Answer.query.filter_by(question_id=question.id).delete()
+        db.session.delete(question)
+    for activity in course.activities:
+        db.session.delete(activity)
+    Enrollment.query.filter_by(course_id=course.id).delete()
+    db.session.delete(course)
+    db.session.commit()
+
+
+def set_based_delete(course_id, batch_size):
+    from app.deletion import plan_course
+
+    updates = []
+    plan_course(course_id).run(batch_size, lambda percent, message: updates.append(percent))
+    return len(updates)
+
+
+class Writer(threading.Thread):
+    """Submits a response to the other course every interval and records how long each insert waited"""
+
+    def __init__(self, database, activity_id, student_ids, interval=0.02):
+        super().__init__(daemon=True)
+        self.database, self.activity_id = database, activity_id
+        self.student_ids = iter(student_ids)
+        self.interval = interval
+        self.waits = []
+        self.stop = threading.Event()
+
+    def run(self):
+        connection = sqlite3.connect(self.database, timeout=600)
+        while not self.stop.is_set():
+            student_id = next(self.student_ids, None)
+            if student_id is None:
+                break
+            started = time.perf_counter()
+            connection.execute('INSERT INTO response (student_id, activity_id, answer) VALUES (?, ?, ?)',
+                               (student_id, self.activity_id, 'late'))
+            connection.commit()
+            self.waits.append(time.perf_counter() - started)
+            time.sleep(self.interval)
+        connection.close()
+
+
+def measure(app, database, name, work, writer_args):
+    from sqlalchemy import event
+    from app import db
+
+    stats = {'statements': 0, 'transactions': [], 'open': None}
+    with app.app_context():
+        engine = db.engine
+
+        def on_execute(*_):
+            stats['statements'] += 1
+            if stats['open'] is None:
+                stats['open'] = time.perf_counter()
+
+        def on_end(*_):
+            if stats['open'] is not None:
+                stats['transactions'].append(time.perf_counter() - stats['open'])
+                stats['open'] = None
+
+        event.listen(engine, 'before_cursor_execute', on_execute)
+        event.listen(engine, 'commit', on_end)
+        event.listen(engine, 'rollback', on_end)
+        writer = Writer(database, *writer_args)
+        writer.start()
+        time.sleep(0.2)
+        started = time.perf_counter()
+        try:
+            extra = work()
+        finally:
+            elapsed = time.perf_counter() - started
+            time.sleep(0.2)
+            writer.stop.set()
+            writer.join()
+            event.remove(engine, 'before_cursor_execute', on_execute)
+            event.remove(engine, 'commit', on_end)
+            event.remove(engine, 'rollback', on_end)
+            db.session.remove()
+
+    waits = writer.waits or [0]
+    print(f"\n[{name}]")
+    print(f"  time                  {elapsed:8.2f} s")
+    print(f"  statements            {stats['statements']:8d}")
+    print(f"  transactions          {len(stats['transactions']):8d}  "
+          f"(longest {max(stats['transactions'] or [0]):.3f} s)")
+    print(f"  concurrent writer     {len(writer.waits):8d} inserts, longest wait {max(waits):.3f} s")
+    if extra is not None:
+        print(f"  progress updates      {extra:8d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--responses', type=int, default=100000)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    directory = tempfile.mkdtemp(prefix='delete-bench-')
+    database = os.path.join(directory, 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 600}},
+                      'LOG_LEVEL': 'WARNING', 'LOG_LEVELS': 'app.metrics=ERROR', 'VOTE_RECONCILE_SECONDS': 0})
+
+    activities = max(1, args.responses // args.students)
+    started = time.perf_counter()
+    target_id, other_id, other_activity, student_ids = seed(app, args.students, activities, args.questions)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+    print(f"  course to delete: {row_counts(app, target_id)}")
+    other_before = row_counts(app, other_id)
+    print(f"  other course:     {other_before}")
+    with app.app_context():
+        db.engine.dispose()
+    pristine = os.path.join(directory, 'pristine.db')
+    shutil.copy(database, pristine)
+
+    # The writer submits as students without a response to the other course's last activity yet
+    late_students = student_ids[50:]
+    runs = [
+        ('orm', lambda: orm_delete(target_id)),
+        ('set-based', lambda: set_based_delete(target_id, args.batch_size)),
+    ]
+    ok = True
+    for name, work in runs:
+        with app.app_context():
+            db.engine.dispose()
+        shutil.copy(pristine, database)
+        measure(app, database, name, work, (other_activity, late_students))
+        left = row_counts(app, target_id)
+        other_after = row_counts(app, other_id)
+        clean = not any(left.values())
+        untouched = {key: value for key, value in other_after.items() if key != 'responses'} == \
+            {key: value for key, value in other_before.items() if key != 'responses'} and \
+            other_after['responses'] >= other_before['responses']
+        ok &= clean and untouched
+        print(f"  leftover rows         {'none' if clean else left}")
+        print(f"  other course          {'intact' if untouched else other_after}")
+
+    print('\nPASSED' if ok else '\nFAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
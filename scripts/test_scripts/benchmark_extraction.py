@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+PDF text extraction benchmark over generated 5-, 50- and 500-page documents
+
+Compares the previous extractor (serial pdfplumber pass with string +=) with
+the extraction engine, both with the 10,000 character budget used by question
+generation and for a full-document read (sequential vs process pool).
+
+Usage: python scripts/test_scripts/benchmark_extraction.py [page_counts...]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import pdfplumber  # noqa: E402
+from reportlab.lib.pagesizes import A4  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from app import extraction  # noqa: E402
+
+LINE = "Lecture notes: gradient descent updates parameters in the direction of the negative gradient."
+
+
+def create_pdf(path, pages):
+    """Write a PDF with ~40 lines (~3,800 characters) of text per page"""
+    pdf = canvas.Canvas(path, pagesize=A4)
+    for page in range(pages):
+        y = 800
+        pdf.drawString(50, y, f"Page {page + 1}")
+        for line in range(40):
+            y -= 18
+            pdf.drawString(50, y, f"{line + 1}. {LINE}")
+        pdf.showPage()
+    pdf.save()
+
+
+def legacy_extract(path):
+    """Previous extract_text_from_pdf: every page, serially, with string +="""
+    text = ""
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return text[:10000]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    page_counts = [int(arg) for arg in sys.argv[1:]] or [5, 50, 500]
+    workers = extraction.EXTRACT_WORKERS
+
+    print("=" * 78)
+    print(f"PDF extraction benchmark (process pool workers: {workers})")
+    print("=" * 78)
+    print(f"{'pages':>6} {'legacy 10k':>12} {'engine 10k':>12} {'full serial':>12} {'full pool':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in page_counts:
+            path = os.path.join(tmp, f"doc_{pages}.pdf")
+            create_pdf(path, pages)
+
+            legacy_ms, legacy_text = timed(legacy_extract, path)
+            engine_ms, engine_text = timed(extraction.extract_document_text, path, '.pdf', 10000)
+            assert engine_text == legacy_text, "engine output differs from legacy extractor"
+
+            extraction.EXTRACT_WORKERS = 1
+            serial_ms, serial_text = timed(extraction.extract_document_text, path, '.pdf', None)
+            extraction.EXTRACT_WORKERS = workers
+            extraction._get_pool()  # Exclude one-off worker start-up from the timing
+            pool_ms, pool_text = timed(extraction.extract_document_text, path, '.pdf', None)
+            assert pool_text == serial_text, "pooled output differs from serial output"
+
+            print(f"{pages:>6} {legacy_ms:>10.0f}ms {engine_ms:>10.0f}ms {serial_ms:>10.0f}ms {pool_ms:>10.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
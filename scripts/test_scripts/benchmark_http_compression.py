@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+HTTP compression and conditional GET: bytes sent and CPU cost per response
+
+Seeds a temporary SQLite database with one course of --students students,
+--activities activities and one answered poll, then requests the status
+poll, the results page, both CSV exports, the course page and the activity
+list in four ways: compression off (HTTP_COMPRESSION=0), gzip, brotli (when
+the package is installed) and a repeat request carrying the ETag of the
+previous response (If-None-Match). Reports body bytes, server time and CPU
+time per response.
+
+Usage: python scripts/test_scripts/benchmark_http_compression.py [--students 300] [--requests 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_qa_search import summarize  # noqa: E402
+
+
+def seed(app, args):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Activity, Course, Enrollment, Response, User
+
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='gzip-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        db.session.add(instructor)
+        db.session.flush()
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'gzip-bench-{i}@example.com', 'name': f'Student {i}', 'role': 'student',
+             'student_id': f'GZB{i:06d}', 'password_hash': password} for i in range(args.students)])
+        student_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'student')]
+        course = Course(name='Course', semester='2025 Spring', instructor_id=instructor.id)
+        db.session.add(course)
+        db.session.flush()
+        db.session.execute(Enrollment.__table__.insert(), [
+            {'student_id': student_id, 'course_id': course.id} for student_id in student_ids])
+        db.session.execute(Activity.__table__.insert(), [
+            {'title': f'Poll {a}', 'question': 'Which one?', 'type': 'poll', 'options': '["A", "B", "C"]',
+             'course_id': course.id, 'instructor_id': instructor.id, 'is_active': False,
+             'allow_quick_join': False} for a in range(args.activities)])
+        activity_id = db.session.query(Activity.id).order_by(Activity.id).first()[0]
+        db.session.execute(Response.__table__.insert(), [
+            {'student_id': student_id, 'activity_id': activity_id, 'answer': 'ABC'[n % 3]}
+            for n, student_id in enumerate(student_ids)])
+        db.session.commit()
+        return {'instructor': instructor.id, 'student': student_ids[0]}, course.id, activity_id
+
+
+def run(app, client, url, requests, headers):
+    """(body sizes, wall times, CPU seconds per response, last response)"""
+    sizes, samples = [], []
+    cpu_started = time.process_time()
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - started)
+        if response.status_code not in (200, 304):
+            raise SystemExit(f'{url} returned {response.status_code}')
+        sizes.append(len(response.data))
+    return sizes, samples, (time.process_time() - cpu_started) / requests, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--activities', type=int, default=40)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.compression import brotli, http_compression
+
+    directory = tempfile.mkdtemp(prefix='gzip-bench-')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "bench.db")}',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {}, 'LOG_LEVEL': 'WARNING',
+                      'LOG_LEVELS': 'app.metrics=ERROR', 'VOTE_RECONCILE_SECONDS': 0})
+    users, course_id, activity_id = seed(app, args)
+    clients = {}
+    for role, user_id in users.items():
+        clients[role] = app.test_client()
+        with clients[role].session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+    pages = [
+        ('status poll (student)', 'student', f'/activities/status/{activity_id}'),
+        ('status poll (instructor)', 'instructor', f'/activities/status/{activity_id}'),
+        ('results page', 'instructor', f'/activities/{activity_id}/results'),
+        ('results CSV', 'instructor', f'/activities/{activity_id}/export'),
+        ('course CSV', 'instructor', f'/courses/{course_id}/export_all'),
+        ('course page (student)', 'student', f'/courses/{course_id}'),
+        ('activity list (instructor)', 'instructor', '/activities'),
+    ]
+    modes = [('off', {}), ('gzip', {'Accept-Encoding': 'gzip'})]
+    if brotli is not None:
+        modes.append(('br', {'Accept-Encoding': 'br, gzip'}))
+
+    totals = {}
+    for label, role, url in pages:
+        print(f"\n[{label}]")
+        results = {}
+        for mode, headers in modes:
+            http_compression.enabled = mode != 'off'
+            results[mode] = run(app, clients[role], url, args.requests, headers)
+        http_compression.enabled = True
+        last = results[modes[-1][0]][3]
+        etag = last.headers.get('ETag')
+        if etag:
+            repeat = dict(modes[-1][1], **{'If-None-Match': etag})
+            results['304'] = run(app, clients[role], url, args.requests, repeat)
+        for mode, (sizes, samples, cpu, response) in results.items():
+            status = response.status_code
+            totals.setdefault(mode, 0)
+            totals[mode] += sizes[-1]
+            print(f"  {mode:<5} {sizes[-1]:>8} B  status {status}  cpu {cpu * 1000:6.2f} ms  {summarize(samples)}")
+
+    print("\nbody bytes of one request to every page: "
+          + ', '.join(f"{mode} {total}" for mode, total in totals.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Course page and activity list: fragment cache off vs on
+
+Seeds a temporary SQLite database with --courses courses of --students
+students and --activities activities each, then requests the course page
+and the activity list as the instructor, an admin and a student, first with
+PAGE_CACHE_TTL=0 and then with the cache on. With the cache on, every
+--write-every requests an activity is started or stopped, so the numbers
+include re-rendering after invalidation. Reports p50/p95/p99, statements
+per request and the hit rate.
+
+Usage: python scripts/test_scripts/benchmark_page_cache.py [--students 300] [--activities 60] [--requests 300]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_qa_search import summarize  # noqa: E402
+
+
+def seed(app, args):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Activity, Course, Enrollment, User
+
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='page-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        admin = User(email='page-bench-admin@example.com', name='Admin', role='admin', password_hash=password)
+        db.session.add_all([instructor, admin])
+        db.session.flush()
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'page-bench-{i}@example.com', 'name': f'Student {i}', 'role': 'student',
+             'student_id': f'PGB{i:06d}', 'password_hash': password} for i in range(args.students)])
+        student_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'student')]
+        course_ids = []
+        for c in range(args.courses):
+            course = Course(name=f'Course {c}', semester='2025 Spring', instructor_id=instructor.id)
+            db.session.add(course)
+            db.session.flush()
+            course_ids.append(course.id)
+            db.session.execute(Enrollment.__table__.insert(), [
+                {'student_id': student_id, 'course_id': course.id} for student_id in student_ids])
+            db.session.execute(Activity.__table__.insert(), [
+                {'title': f'Poll {a}', 'question': 'Which one?', 'type': 'poll', 'options': '["A", "B"]',
+                 'course_id': course.id, 'instructor_id': instructor.id, 'is_active': False,
+                 'allow_quick_join': False} for a in range(args.activities)])
+        db.session.commit()
+        return {'instructor': instructor.id, 'admin': admin.id, 'student': student_ids[0]}, course_ids
+
+
+def run(app, users, pages, args, write_every):
+    from sqlalchemy import event
+    from app import db
+    from app.models import Activity
+
+    clients = {}
+    for role, user_id in users.items():
+        clients[role] = app.test_client()
+        with clients[role].session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+        activity_id = db.session.query(Activity.id).order_by(Activity.id).first()[0]
+    event.listen(engine, 'before_cursor_execute', count)
+    samples, writes = {}, 0
+    try:
+        for i in range(args.requests):
+            if write_every and i and i % write_every == 0:
+                with app.app_context():
+                    activity = db.session.get(Activity, activity_id)
+                    activity.is_active = not activity.is_active
+                    db.session.commit()
+                writes += 1
+            for label, role, url in pages:
+                started = time.perf_counter()
+                response = clients[role].get(url)
+                samples.setdefault(label, []).append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise SystemExit(f'{label}: {url} returned {response.status_code}')
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return samples, statements[0] / (args.requests * len(pages)), writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--courses', type=int, default=4)
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--activities', type=int, default=60)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--write-every', type=int, default=50)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.page_cache import page_cache
+
+    directory = tempfile.mkdtemp(prefix='page-bench-')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "bench.db")}',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {}, 'LOG_LEVEL': 'WARNING',
+                      'LOG_LEVELS': 'app.metrics=ERROR', 'VOTE_RECONCILE_SECONDS': 0})
+    users, course_ids = seed(app, args)
+    pages = [
+        ('course page (instructor)', 'instructor', f'/courses/{course_ids[0]}'),
+        ('course page (admin)', 'admin', f'/courses/{course_ids[0]}'),
+        ('course page (student)', 'student', f'/courses/{course_ids[0]}'),
+        ('activity list (instructor)', 'instructor', '/activities'),
+        ('activity list (admin)', 'admin', '/activities'),
+        ('activity list (student)', 'student', '/activities'),
+    ]
+
+    ttl = page_cache.ttl
+    page_cache.ttl = 0
+    off, off_statements, _ = run(app, users, pages, args, 0)
+    page_cache.ttl = ttl
+    page_cache.clear()
+    on, on_statements, writes = run(app, users, pages, args, args.write_every)
+
+    for label, _, _ in pages:
+        print(f"\n[{label}]")
+        print(f"  cache off  {summarize(off[label])}")
+        print(f"  cache on   {summarize(on[label])}")
+    stats = page_cache.stats()
+    hits = sum(value for key, value in stats.items() if key.endswith('_hits'))
+    misses = sum(value for key, value in stats.items() if key.endswith('_misses'))
+    print(f"\nstatements per request: {off_statements:.1f} off, {on_statements:.1f} on")
+    print(f"hit rate with {writes} activity writes: {hits / max(1, hits + misses):.1%} ({hits} hits, {misses} misses)")
+
+
+if __name__ == '__main__':
+    main()
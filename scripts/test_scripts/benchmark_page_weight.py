@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Page weight and template load time of the activity pages
+
+Seeds a temporary SQLite database with one course and activity and
+requests the activity page (instructor and student) and the create
+activity page. For each page it reports the HTML size, the size of the
+script/style bundles it links (as sent with gzip, and brotli when
+installed), the bytes of a first and of a repeat visit (bundles are cached
+by the browser), and the server render time. "inline" is the same page
+with its bundles inlined, as it was sent before they were extracted.
+
+Then it loads every template the way a newly started worker does: compiled
+from source, and from a warm Jinja bytecode cache (JINJA_CACHE_DIR).
+
+Usage: python scripts/test_scripts/benchmark_page_weight.py [--requests 200]
+"""
+
+import argparse
+import gzip
+import os
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_qa_search import summarize  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACCEPT_ENCODING = 'br, gzip' if brotli else 'gzip'
+
+
+def seed(app):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Activity, Course, Enrollment, User
+
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='weight-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        student = User(email='weight-bench-student@example.com', name='Student', role='student',
+                       student_id='WGB000001', password_hash=password)
+        db.session.add_all([instructor, student])
+        db.session.flush()
+        course = Course(name='Course', semester='2025 Spring', instructor_id=instructor.id)
+        db.session.add(course)
+        db.session.flush()
+        db.session.add(Enrollment(student_id=student.id, course_id=course.id))
+        activity = Activity(title='Poll', question='Which one?', type='poll', options='["A", "B", "C"]',
+                            course_id=course.id, instructor_id=instructor.id, is_active=False)
+        db.session.add(activity)
+        db.session.commit()
+        return {'instructor': instructor.id, 'student': student.id}, course.id, activity.id
+
+
+def compressed(data: bytes) -> int:
+    return len(brotli.compress(data)) if brotli else len(gzip.compress(data, 6))
+
+
+def page_weight(client, url, requests):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise SystemExit(f'{url} returned {response.status_code}')
+    html = response.data
+    bundles, sent, raw = [], 0, b''
+    for link in re.findall(r'(?:src|href)="(/assets/[^"]+)"', html.decode('utf-8')):
+        asset = client.get(link, headers={'Accept-Encoding': ACCEPT_ENCODING})
+        plain = client.get(link)
+        bundles.append(link.rsplit('/', 1)[1])
+        sent += len(asset.data)
+        raw += plain.data
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get(url)
+        samples.append(time.perf_counter() - started)
+    return {
+        'html': len(html), 'html_sent': compressed(html), 'bundles': bundles, 'bundles_raw': len(raw),
+        'bundles_sent': sent, 'inline': len(html) + len(raw), 'inline_sent': compressed(html + raw),
+        'samples': samples,
+    }
+
+
+def template_load_times(app):
+    """Seconds to load every template in a fresh environment, without and with a warm bytecode cache"""
+    from jinja2 import FileSystemBytecodeCache
+
+    def load(bytecode_cache):
+        with app.app_context():
+            # An overlay keeps the app's filters and globals but starts with no loaded templates
+            env = app.jinja_env.overlay(cache_size=0, bytecode_cache=bytecode_cache)
+            names = [name for name in env.list_templates() if name.endswith('.html')]
+            started = time.perf_counter()
+            for name in names:
+                env.get_template(name)
+            return time.perf_counter() - started, len(names)
+
+    source, count = load(None)
+    cache = FileSystemBytecodeCache(tempfile.mkdtemp(prefix='jinja-bench-'))
+    load(cache)
+    cached, _ = load(cache)
+    return source, cached, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    directory = tempfile.mkdtemp(prefix='weight-bench-')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "bench.db")}',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {}, 'LOG_LEVEL': 'WARNING',
+                      'LOG_LEVELS': 'app.metrics=ERROR', 'VOTE_RECONCILE_SECONDS': 0,
+                      'JINJA_CACHE_DIR': os.path.join(directory, 'jinja')})
+    users, course_id, activity_id = seed(app)
+    clients = {}
+    for role, user_id in users.items():
+        clients[role] = app.test_client()
+        with clients[role].session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+    pages = [
+        ('activity page (instructor)', 'instructor', f'/activities/{activity_id}'),
+        ('activity page (student)', 'student', f'/activities/{activity_id}'),
+        ('create activity page', 'instructor', f'/courses/{course_id}/activities/create'),
+    ]
+    coding = 'br' if brotli else 'gzip'
+    for label, role, url in pages:
+        weight = page_weight(clients[role], url, args.requests)
+        print(f"\n[{label}]  bundles: {', '.join(weight['bundles'])}")
+        print(f"  inline      {weight['inline']:>7} B   {weight['inline_sent']:>6} B {coding}  (every visit)")
+        print(f"  html        {weight['html']:>7} B   {weight['html_sent']:>6} B {coding}  (repeat visit)")
+        print(f"  bundles     {weight['bundles_raw']:>7} B   {weight['bundles_sent']:>6} B {coding}  (first visit only)")
+        print(f"  first visit {weight['html_sent'] + weight['bundles_sent']:>6} B sent, repeat visit {weight['html_sent']} B")
+        print(f"  render      {summarize(weight['samples'])}")
+
+    source, cached, count = template_load_times(app)
+    print(f"\nloading {count} templates in a new worker: {source * 1000:.1f} ms compiled from source, "
+          f"{cached * 1000:.1f} ms from the bytecode cache")
+
+
+if __name__ == '__main__':
+    main()
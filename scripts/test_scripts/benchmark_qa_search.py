@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Q&A search: index build time, incremental update latency and query latency
+
+Seeds a temporary SQLite database with one course holding --posts posts
+(a fifth questions, the rest answers) of synthetic text drawn from a
+Zipf-distributed vocabulary with some Chinese phrases mixed in, then for
+each backend measures:
+
+    build        preparing the backend and answering the first query
+                 (fts5 fills its table, memory loads the course)
+    add          index_question/index_answer after each of --adds new posts,
+                 and whether the new post is found right after
+    query        backend search only, and the full facade search including
+                 loading titles and building snippets; p50/p95/p99
+
+Usage: python scripts/test_scripts/benchmark_qa_search.py [--posts 100000] [--queries 300] [--backends fts5,memory]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+CHINESE_PHRASES = ['机器学习', '数据结构', '线性代数', '操作系统', '计算机网络', '期末考试', '作业提交',
+                   '递归函数', '指针数组', '数据库索引', '并发编程', '内存泄漏']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(seconds):
+    ms = [value * 1000 for value in seconds]
+    return (f"p50 {percentile(ms, 50):7.2f} ms  p95 {percentile(ms, 95):7.2f} ms  "
+            f"p99 {percentile(ms, 99):7.2f} ms  mean {statistics.mean(ms):7.2f} ms")
+
+
+class TextGenerator:
+    def __init__(self, seed=41, vocabulary=5000):
+        self.random = random.Random(seed)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        words = set()
+        while len(words) < vocabulary:
+            words.add(''.join(self.random.choice(letters) for _ in range(self.random.randint(3, 9))))
+        self.words = sorted(words)
+        self.weights = [1 / (rank + 1) for rank in range(len(self.words))]
+
+    def sentence(self, low, high):
+        words = self.random.choices(self.words, self.weights, k=self.random.randint(low, high))
+        if self.random.random() < 0.3:
+            words.insert(self.random.randrange(len(words)), self.random.choice(CHINESE_PHRASES))
+        return ' '.join(words)
+
+    def query(self):
+        """1-3 terms from the middle of the frequency range, sometimes a Chinese phrase"""
+        if self.random.random() < 0.15:
+            return self.random.choice(CHINESE_PHRASES)
+        return ' '.join(self.random.choice(self.words[20:2000]) for _ in range(self.random.randint(1, 3)))
+
+
+def seed_database(app, posts, generator):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Answer, Course, Question, User
+
+    with app.app_context():
+        instructor = User(email='search-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=generate_password_hash('benchmark', method='pbkdf2:sha256:1'))
+        db.session.add(instructor)
+        db.session.flush()
+        course = Course(name='Search Bench', semester='2024 Fall', instructor_id=instructor.id)
+        db.session.add(course)
+        db.session.commit()
+
+        n_questions = max(1, posts // 5)
+        db.session.execute(Question.__table__.insert(), [
+            {'title': generator.sentence(4, 10), 'content': generator.sentence(20, 60), 'course_id': course.id,
+             'author_id': instructor.id, 'is_resolved': False, 'view_count': 0}
+            for _ in range(n_questions)])
+        question_ids = [row[0] for row in db.session.query(Question.id).filter_by(course_id=course.id)]
+        db.session.execute(Answer.__table__.insert(), [
+            {'content': generator.sentence(15, 50), 'question_id': generator.random.choice(question_ids),
+             'author_id': instructor.id, 'upvotes': 0, 'is_instructor_answer': False}
+            for _ in range(posts - n_questions)])
+        db.session.commit()
+        return course.id, instructor.id, question_ids
+
+
+def run_backend(app, name, course_id, author_id, question_ids, generator, queries, adds):
+    from app import db
+    from app.models import Answer, Question
+    from app.qa_search import qa_search, query_terms
+
+    result = {'backend': name}
+    with app.app_context():
+        qa_search.setting = name
+        qa_search._backend = None
+        if name == 'fts5':
+            db.session.execute(db.text('DROP TABLE IF EXISTS qa_search_index'))
+            db.session.commit()
+
+        started = time.perf_counter()
+        qa_search.search(course_id, generator.query())
+        result['build'] = time.perf_counter() - started
+        backend = qa_search.backend
+
+        add_times, found = [], 0
+        for i in range(adds):
+            marker = f'zqmarker{name}{i}'
+            if i % 2 == 0:
+                post = Question(title=f'New {marker}', content=generator.sentence(20, 60), course_id=course_id,
+                                author_id=author_id)
+                db.session.add(post)
+                db.session.commit()
+                started = time.perf_counter()
+                qa_search.index_question(post)
+            else:
+                post = Answer(content=f'{generator.sentence(15, 50)} {marker}',
+                              question_id=generator.random.choice(question_ids), author_id=author_id)
+                db.session.add(post)
+                db.session.commit()
+                started = time.perf_counter()
+                qa_search.index_answer(post, course_id)
+            add_times.append(time.perf_counter() - started)
+            found += bool(qa_search.search(course_id, marker, limit=1))
+        result['add'], result['found'] = add_times, found
+
+        query_list = [generator.query() for _ in range(queries)]
+        backend_times, facade_times, hits = [], [], 0
+        for query in query_list:
+            terms = query_terms(query)
+            started = time.perf_counter()
+            backend.search(course_id, terms, 10)
+            backend_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            hits += len(qa_search.search(course_id, query, limit=10))
+            facade_times.append(time.perf_counter() - started)
+        result['backend_query'], result['facade_query'] = backend_times, facade_times
+        result['hits'] = hits / max(1, len(query_list))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--adds', type=int, default=100)
+    parser.add_argument('--backends', default='fts5,memory')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    database = os.path.join(tempfile.mkdtemp(prefix='qa-search-bench-'), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'SQLALCHEMY_ENGINE_OPTIONS': {},
+                      'LOG_LEVEL': 'WARNING'})
+    generator = TextGenerator()
+
+    started = time.perf_counter()
+    course_id, author_id, question_ids = seed_database(app, args.posts, generator)
+    print(f"Seeded {args.posts} posts ({len(question_ids)} questions) in {time.perf_counter() - started:.1f}s")
+    size_before = os.path.getsize(database)
+
+    for name in args.backends.split(','):
+        result = run_backend(app, name, course_id, author_id, question_ids, generator, args.queries, args.adds)
+        print(f"\n[{name}]")
+        print(f"  build            {result['build']:.2f}s")
+        print(f"  add              {summarize(result['add'])}  ({result['found']}/{args.adds} found right after)")
+        print(f"  query (backend)  {summarize(result['backend_query'])}")
+        print(f"  query (facade)   {summarize(result['facade_query'])}  ({result['hits']:.1f} results/query)")
+        if name == 'fts5':
+            print(f"  index size       {(os.path.getsize(database) - size_before) / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
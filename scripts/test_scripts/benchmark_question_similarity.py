@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Similar-question suggestions: index load time, suggest latency and recall
+
+Seeds a temporary SQLite database with one course holding --questions
+questions of synthetic text (same generator as benchmark_qa_search.py),
+then measures:
+
+    load         building the course's TF-IDF vectors on the first suggest
+    add          add_question after each of --adds new questions
+    suggest      uncached and cached (same draft again) latency, p50/p95/p99
+    recall@5     drafts made from an existing question (title words shuffled,
+                 a few dropped, body truncated) that get it back in the top 5
+
+Usage: python scripts/test_scripts/benchmark_question_similarity.py [--questions 20000] [--drafts 300]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_qa_search import TextGenerator, summarize  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--drafts', type=int, default=300)
+    parser.add_argument('--adds', type=int, default=100)
+    args = parser.parse_args()
+
+    from werkzeug.security import generate_password_hash
+    from app import create_app, db
+    from app.models import Course, Question, User
+    from app.question_similarity import question_similarity
+
+    database = os.path.join(tempfile.mkdtemp(prefix='similar-bench-'), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}', 'SQLALCHEMY_ENGINE_OPTIONS': {},
+                      'LOG_LEVEL': 'WARNING'})
+    generator = TextGenerator()
+
+    with app.app_context():
+        instructor = User(email='similar-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=generate_password_hash('benchmark', method='pbkdf2:sha256:1'))
+        db.session.add(instructor)
+        db.session.flush()
+        course = Course(name='Similarity Bench', semester='2024 Fall', instructor_id=instructor.id)
+        db.session.add(course)
+        db.session.commit()
+        course_id, author_id = course.id, instructor.id
+        db.session.execute(Question.__table__.insert(), [
+            {'title': generator.sentence(5, 12), 'content': generator.sentence(20, 60), 'course_id': course_id,
+             'author_id': author_id, 'is_resolved': False, 'view_count': 0}
+            for _ in range(args.questions)])
+        db.session.commit()
+        questions = db.session.query(Question.id, Question.title, Question.content).all()
+        print(f"Seeded {len(questions)} questions")
+
+        started = time.perf_counter()
+        question_similarity.suggest(course_id, 'warm up')
+        print(f"load             {time.perf_counter() - started:.2f}s")
+
+        add_times = []
+        for i in range(args.adds):
+            question = Question(title=generator.sentence(5, 12), content=generator.sentence(20, 60),
+                                course_id=course_id, author_id=author_id)
+            db.session.add(question)
+            db.session.commit()
+            started = time.perf_counter()
+            question_similarity.add_question(question)
+            add_times.append(time.perf_counter() - started)
+        print(f"add              {summarize(add_times)}")
+
+        uncached, cached, found = [], [], 0
+        for _ in range(args.drafts):
+            question_id, title, content = generator.random.choice(questions)
+            words = title.split()
+            generator.random.shuffle(words)
+            words = words[:max(3, len(words) - 2)]
+            draft_title, draft_content = ' '.join(words), content[:len(content) // 3]
+
+            started = time.perf_counter()
+            suggestions = question_similarity.suggest(course_id, draft_title, draft_content)
+            uncached.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            question_similarity.suggest(course_id, draft_title + ' ', draft_content + '?')
+            cached.append(time.perf_counter() - started)
+            found += any(suggestion['question_id'] == question_id for suggestion in suggestions)
+
+        print(f"suggest          {summarize(uncached)}")
+        print(f"suggest (cached) {summarize(cached)}")
+        print(f"recall@5         {found / args.drafts:.1%}")
+        print(f"cache            {question_similarity.cache_hits} hits, {question_similarity.cache_misses} misses")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Quick join burst benchmark: N logged-in students open the same QR join link at once
+
+Runs the burst against a temporary SQLite database (or --database-url) twice:
+
+- direct:  token lookup, enrollment check and insert + commit in every request
+           (resolver cache disabled, batch window 0)
+- cached:  in-memory token resolver and batched auto-enrollment
+
+and a second "rescan" burst in which everyone is already enrolled. Reports
+latency percentiles, SQL statements and INSERT round trips per burst, and checks that
+every student ends up enrolled exactly once.
+
+Usage:
+    python scripts/test_scripts/benchmark_quick_join_burst.py [--clients 300] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import event  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class SQLCounter:
+    """Count statements, INSERT round trips and commits on an engine"""
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.inserts = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        event.listen(engine, 'commit', self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        with self._lock:
+            self.statements += 1
+            if statement.lstrip().upper().startswith('INSERT'):
+                self.inserts += 1
+
+    def _on_commit(self, *args):
+        with self._lock:
+            self.commits += 1
+
+    def reset(self):
+        with self._lock:
+            self.statements = self.inserts = self.commits = 0
+
+
+def seed(app, clients):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import User, Course, Activity
+
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='burst-instructor@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        db.session.add(instructor)
+        db.session.flush()
+        course = Course(name='Burst Lecture', semester='2024 Fall', instructor_id=instructor.id)
+        db.session.add(course)
+        db.session.flush()
+        activity = Activity(title='Warm-up poll', question='Ready?', type='poll', course_id=course.id,
+                            instructor_id=instructor.id, allow_quick_join=True, is_active=True)
+        activity.generate_join_token()
+        db.session.add(activity)
+        students = [User(email=f'burst-student-{i}@example.com', name=f'Student {i}', role='student',
+                         student_id=f'BURST{i:05d}', password_hash=password) for i in range(clients)]
+        db.session.add_all(students)
+        db.session.commit()
+        return activity.join_token, course.id, [student.id for student in students]
+
+
+def make_clients(app, student_ids):
+    """One logged-in test client per student (session set directly, no password check)"""
+    clients = []
+    for student_id in student_ids:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(student_id)
+            session['_fresh'] = True
+        clients.append(client)
+    return clients
+
+
+def burst(clients, url):
+    """Fire one GET per client at the same moment; return (latencies ms, status counts, wall time)"""
+    barrier = threading.Barrier(len(clients))
+    latencies = [0.0] * len(clients)
+    statuses = {}
+    lock = threading.Lock()
+
+    def run(index, client):
+        barrier.wait()
+        start = time.perf_counter()
+        response = client.get(url)
+        latencies[index] = (time.perf_counter() - start) * 1000
+        ok = response.status_code == 302 and '/activities/' in response.headers.get('Location', '')
+        with lock:
+            key = 'ok' if ok else f'{response.status_code} {response.headers.get("Location", "")}'
+            statuses[key] = statuses.get(key, 0) + 1
+
+    threads = [threading.Thread(target=run, args=(i, client)) for i, client in enumerate(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quick join burst benchmark')
+    parser.add_argument('--clients', type=int, default=300, help='Concurrent students')
+    parser.add_argument('--database-url', help='Database URL (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='quick-join-bench-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    overrides = {'SQLALCHEMY_DATABASE_URI': database_url}
+    if database_url.startswith('sqlite'):
+        overrides['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    else:
+        overrides['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 20, 'max_overflow': 40, 'pool_pre_ping': True}
+
+    from app import create_app, db
+    from app.models import Enrollment
+    from app.join_tokens import join_token_resolver, enrollment_batcher
+
+    app = create_app(overrides)
+    token, course_id, student_ids = seed(app, args.clients)
+    clients = make_clients(app, student_ids)
+    url = f'/activity/join/{token}'
+    batch_window = enrollment_batcher.window
+
+    with app.app_context():
+        counter = SQLCounter(db.engine)
+
+    print("=" * 96)
+    print(f"Quick join burst: {args.clients} students, {database_url.split('://')[0]}, "
+          f"batch window {batch_window * 1000:.0f}ms")
+    print("=" * 96)
+    print(f"{'mode':<26} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'req/s':>8} {'SQL':>7} {'INSERTs':>8} "
+          f"{'enrolled':>9}  status")
+
+    failed = False
+    for mode, cached in (('direct', False), ('cached+batched', True)):
+        with app.app_context():
+            Enrollment.query.filter_by(course_id=course_id).delete()
+            db.session.commit()
+        join_token_resolver.clear()
+        join_token_resolver.enabled = cached
+        enrollment_batcher.window = batch_window if cached else 0
+        enrollment_batcher.forget_course(course_id)
+
+        for phase in ('first scan', 'rescan'):
+            counter.reset()
+            latencies, statuses, wall = burst(clients, url)
+            with app.app_context():
+                enrolled = Enrollment.query.filter_by(course_id=course_id).count()
+            print(f"{mode + ' ' + phase:<26} {percentile(latencies, 50):>6.0f}ms {percentile(latencies, 95):>6.0f}ms "
+                  f"{percentile(latencies, 99):>6.0f}ms {max(latencies):>6.0f}ms {len(latencies) / wall:>8.0f} "
+                  f"{counter.statements:>7} {counter.inserts:>8} {enrolled:>9}  {statuses}")
+            if enrolled != args.clients or statuses.get('ok') != args.clients:
+                failed = True
+
+    print("-" * 96)
+    print(f"Resolver: {join_token_resolver.stats()}")
+    print(f"Batcher:  {enrollment_batcher.stats()}")
+    print("=" * 96)
+    print("FAILED: some students were not enrolled or not redirected" if failed else "PASSED")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
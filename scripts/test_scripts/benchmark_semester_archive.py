@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Semester archive: hot-query latency before and after archiving past semesters
+
+Seeds a temporary SQLite database with --past-semesters semesters of
+--courses courses each plus one current semester ("2025 Spring"); every
+course has --activities activities answered by --students students and
+--questions questions with three answers each. Then:
+
+    before      p50/p95 of the current semester's hot pages (activity list,
+                course page, activity results and analytics, Q&A list,
+                dashboards) as instructor, student and admin
+    archive     archive_course() for every course before 2025 Spring
+    after       the same pages again, plus the historic views of an archived
+                course (served from the archive file, first and cached reads)
+    check       the archived activity's CSV export and the archived Q&A list
+                are the same as before archiving; restoring one course puts
+                back exactly its rows and its questions can be searched again
+
+Usage: python scripts/test_scripts/benchmark_semester_archive.py [--past-semesters 8] [--courses 5] [--students 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_qa_search import summarize  # noqa: E402
+
+CURRENT = '2025 Spring'
+
+
+def past_semesters(count):
+    semesters = []
+    year, fall = 2024, True
+    while len(semesters) < count:
+        semesters.append(f'{year} Fall' if fall else f'Spring {year}')
+        year, fall = (year, False) if fall else (year - 1, True)
+    return semesters[::-1]
+
+
+def seed(app, args):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Activity, Answer, Course, Enrollment, Question, Response, User
+
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='archive-bench@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        admin = User(email='archive-bench-admin@example.com', name='Admin', role='admin', password_hash=password)
+        db.session.add_all([instructor, admin])
+        db.session.flush()
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'archive-bench-{i}@example.com', 'name': f'Student {i}', 'role': 'student',
+             'student_id': f'ARC{i:06d}', 'password_hash': password} for i in range(args.students)])
+        student_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'student')]
+
+        # Oldest semester first, so ids and created_at grow with time as in a real database
+        for semester in past_semesters(args.past_semesters) + [CURRENT]:
+            for c in range(args.courses):
+                course = Course(name=f'Course {c} {semester}', semester=semester, instructor_id=instructor.id)
+                db.session.add(course)
+                db.session.flush()
+                db.session.execute(Enrollment.__table__.insert(), [
+                    {'student_id': student_id, 'course_id': course.id} for student_id in student_ids])
+                for a in range(args.activities):
+                    activity = Activity(title=f'Poll {a}', question='Which one?', type='poll',
+                                        options='["Red", "Green", "Blue"]', course_id=course.id,
+                                        instructor_id=instructor.id, allow_quick_join=False)
+                    db.session.add(activity)
+                    db.session.flush()
+                    db.session.execute(Response.__table__.insert(), [
+                        {'student_id': student_id, 'activity_id': activity.id,
+                         'answer': ('Red', 'Green', 'Blue')[(student_id + a) % 3]} for student_id in student_ids])
+                db.session.execute(Question.__table__.insert(), [
+                    {'title': f'Question {q} of {course.name}', 'content': 'How does this work?',
+                     'course_id': course.id, 'author_id': student_ids[q % len(student_ids)],
+                     'is_resolved': False, 'view_count': 0} for q in range(args.questions)])
+                question_ids = [row[0] for row in db.session.query(Question.id).filter_by(course_id=course.id)]
+                db.session.execute(Answer.__table__.insert(), [
+                    {'content': f'Answer {k}', 'question_id': question_id, 'author_id': student_ids[k],
+                     'upvotes': k, 'downvotes': 0, 'score': k, 'is_instructor_answer': False}
+                    for question_id in question_ids for k in range(3)])
+            db.session.commit()
+        return instructor.id, admin.id, student_ids[0]
+
+
+def client_for(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def time_pages(clients, pages, repeat):
+    results = {}
+    for label, role, url in pages:
+        client = clients[role]
+        response = client.get(url)
+        if response.status_code != 200:
+            raise SystemExit(f'{label}: {url} returned {response.status_code}')
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            client.get(url)
+            samples.append(time.perf_counter() - started)
+        results[label] = samples
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--past-semesters', type=int, default=8)
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--activities', type=int, default=20)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.archive import archive_store, semester_key
+    from app.models import Activity, Answer, Course, Question, Response
+    from app.qa_search import qa_search
+
+    directory = tempfile.mkdtemp(prefix='archive-bench-')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "bench.db")}',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {}, 'ARCHIVE_DIR': os.path.join(directory, 'archive'),
+                      'LOG_LEVEL': 'WARNING', 'LOG_LEVELS': 'app.metrics=ERROR', 'VOTE_RECONCILE_SECONDS': 0})
+
+    started = time.perf_counter()
+    instructor_id, admin_id, student_id = seed(app, args)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    def live_counts():
+        with app.app_context():
+            return {model.__tablename__: model.query.count() for model in (Activity, Response, Question, Answer)}
+
+    with app.app_context():
+        current = Course.query.filter_by(semester=CURRENT).order_by(Course.id).first()
+        old = Course.query.filter(Course.semester != CURRENT).order_by(Course.id).first()
+        current_activity = Activity.query.filter_by(course_id=current.id).order_by(Activity.id).first().id
+        old_activity = Activity.query.filter_by(course_id=old.id).order_by(Activity.id).first().id
+        old_question = Question.query.filter_by(course_id=old.id).order_by(Question.id).first().id
+        current_id, old_id = current.id, old.id
+    print(f"  live rows before: {live_counts()}")
+
+    clients = {'instructor': client_for(app, instructor_id), 'admin': client_for(app, admin_id),
+               'student': client_for(app, student_id)}
+    hot_pages = [
+        ('activity list (instructor)', 'instructor', '/activities'),
+        ('activity list (admin)', 'admin', '/activities'),
+        ('course page', 'instructor', f'/courses/{current_id}'),
+        ('activity results', 'instructor', f'/activities/{current_activity}/results'),
+        ('activity analytics', 'instructor', f'/activities/{current_activity}/analytics'),
+        ('activity (student)', 'student', f'/activities/{current_activity}'),
+        ('Q&A list', 'student', f'/course/{current_id}/qa'),
+        ('dashboard (student)', 'student', '/dashboard'),
+        ('dashboard (instructor)', 'instructor', '/dashboard'),
+    ]
+    historic = {
+        'export': f'/activities/{old_activity}/export',
+        'qa': f'/course/{old_id}/qa',
+        'question': f'/course/{old_id}/qa/{old_question}',
+    }
+    before_historic = {name: clients['instructor'].get(url).get_data(as_text=True) for name, url in historic.items()}
+    with app.app_context():
+        before_search = sorted(hit['question_id'] for hit in qa_search.search(old_id, 'work', limit=1000))
+    before = time_pages(clients, hot_pages, args.repeat)
+
+    cutoff = semester_key(CURRENT)
+    started = time.perf_counter()
+    with app.app_context():
+        to_archive = [course.id for course in Course.query.order_by(Course.id)
+                      if semester_key(course.semester) < cutoff]
+        for course_id in to_archive:
+            archive_store.archive_course(course_id)
+    archive_seconds = time.perf_counter() - started
+    archive_bytes = sum(manifest['bytes'] for manifest in archive_store.manifests())
+    print(f"Archived {len(to_archive)} courses in {archive_seconds:.1f}s "
+          f"({archive_bytes / 1e6:.1f} MB of archive files)")
+    print(f"  live rows after:  {live_counts()}")
+
+    after = time_pages(clients, hot_pages, args.repeat)
+    print(f"\n{'page':<28} {'before p50':>11} {'after p50':>10} {'before p95':>11} {'after p95':>10}")
+    for label, _, _ in hot_pages:
+        b, a = sorted(before[label]), sorted(after[label])
+        print(f"{label:<28} {b[len(b) // 2] * 1000:9.1f}ms {a[len(a) // 2] * 1000:8.1f}ms "
+              f"{b[int(len(b) * 0.95)] * 1000:9.1f}ms {a[int(len(a) * 0.95)] * 1000:8.1f}ms")
+
+    print("\nArchived course read path:")
+    for name, url in historic.items():
+        archive_store._cache.clear()
+        started = time.perf_counter()
+        clients['instructor'].get(url)
+        first = time.perf_counter() - started
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            clients['instructor'].get(url)
+            samples.append(time.perf_counter() - started)
+        print(f"  {name:<10} first read {first * 1000:7.1f} ms   cached {summarize(samples)}")
+
+    ok = True
+    for name, url in historic.items():
+        same = clients['instructor'].get(url).get_data(as_text=True) == before_historic[name]
+        if name == 'question':
+            # The page gains the read-only notice instead of the answer form
+            same = 'read-only' in clients['instructor'].get(url).get_data(as_text=True)
+        ok &= same
+        print(f"  {name:<10} {'same as before archiving' if same else 'DIFFERS'}")
+
+    with app.app_context():
+        counts = archive_store.restore_course(old_id)
+        restored = {'activity': Activity.query.filter_by(course_id=old_id).count(),
+                    'response': Response.query.join(Activity).filter(Activity.course_id == old_id).count(),
+                    'question': Question.query.filter_by(course_id=old_id).count()}
+        searchable = sorted(hit['question_id'] for hit in qa_search.search(old_id, 'work', limit=1000))
+    matches = all(restored[name] == counts[name] for name in restored)
+    ok &= matches and clients['instructor'].get(historic['export']).get_data(as_text=True) == before_historic['export']
+    print(f"  restore    {counts} {'OK' if matches else 'MISMATCH'}")
+    found = bool(before_search) and searchable == before_search
+    ok &= found
+    print(f"  search     {len(searchable)} of {len(before_search)} questions found after restore "
+          f"{'OK' if found else 'MISSING'}")
+
+    print('\nPASSED' if ok else '\nFAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Submit throughput with debug logging off and on
+
+Each mode runs in a fresh subprocess (logging is configured once per process)
+against a temporary SQLite database: N enrolled students submit answers to
+one active quiz from several threads through the Flask test client. Log
+output goes to a file so terminal speed does not distort the numbers.
+
+Modes:
+    debug off          LOG_LEVEL=INFO (submit debug lines are skipped by the level check)
+    debug on, queue    app loggers at DEBUG, records written by the queue listener thread
+    debug on, sync     app loggers at DEBUG, LOG_QUEUE=0 (handler writes in the request thread)
+
+Usage: python scripts/test_scripts/benchmark_submit_logging.py [--submissions 3000] [--threads 8]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+MODES = [
+    ('debug off', {'LOG_LEVEL': 'INFO'}),
+    ('debug on, queue', {'LOG_LEVEL': 'INFO', 'LOG_LEVELS': 'app=DEBUG'}),
+    ('debug on, sync', {'LOG_LEVEL': 'INFO', 'LOG_LEVELS': 'app=DEBUG', 'LOG_QUEUE': '0'}),
+]
+
+
+def run_worker(submissions, threads, students):
+    """Child process: seed the database, run the submissions, print a JSON result line"""
+    from werkzeug.security import generate_password_hash
+    from app import create_app, db
+    from app.models import User, Course, Activity, Enrollment, Response
+
+    database = os.path.join(tempfile.mkdtemp(prefix='submit-bench-'), 'bench.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+    })
+
+    with app.app_context():
+        password = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+        instructor = User(email='bench-instructor@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        db.session.add(instructor)
+        db.session.flush()
+        course = Course(name='Logging Bench', semester='2024 Fall', instructor_id=instructor.id)
+        db.session.add(course)
+        db.session.flush()
+        activity = Activity(title='Quiz', question='2 + 2 = ?', type='quiz', quiz_type='fill_blank',
+                            correct_answer='4', course_id=course.id, instructor_id=instructor.id, is_active=True)
+        db.session.add(activity)
+        users = [User(email=f'bench-student-{i}@example.com', name=f'Student {i}', role='student',
+                      student_id=f'LOG{i:05d}', password_hash=password) for i in range(students)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(Enrollment(student_id=user.id, course_id=course.id) for user in users)
+        db.session.commit()
+        activity_id, student_ids = activity.id, [user.id for user in users]
+
+    clients = []
+    for student_id in student_ids:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(student_id)
+            session['_fresh'] = True
+        clients.append(client)
+
+    url = f'/activities/{activity_id}/submit'
+    per_thread = submissions // threads
+    failures = []
+
+    def submit(worker):
+        # Each thread owns every threads-th student, so one student never submits from two threads at once
+        own = clients[worker::threads]
+        for i in range(per_thread):
+            response = own[i % len(own)].post(url, json={'answer': str(i % 5)})
+            body = response.get_json(silent=True) or {}
+            if not body.get('success'):
+                failures.append(response.status_code)
+
+    workers = [threading.Thread(target=submit, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        stored = Response.query.filter_by(activity_id=activity_id).count()
+    sys.stderr.write(json.dumps({'submissions': per_thread * threads, 'seconds': elapsed,
+                                 'failures': len(failures), 'stored': stored}) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Submit throughput with debug logging off and on')
+    parser.add_argument('--submissions', type=int, default=3000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.submissions, args.threads, args.students)
+        return
+
+    print("=" * 78)
+    print(f"Submit throughput: {args.submissions} submissions, {args.threads} threads, {args.students} students")
+    print("=" * 78)
+    print(f"{'mode':<18} {'time':>9} {'submits/s':>10} {'log lines':>10} {'log bytes':>11} {'failures':>9}")
+
+    for name, env in MODES:
+        with tempfile.NamedTemporaryFile('w+', suffix='.log', delete=False) as log_file:
+            log_path = log_file.name
+            child_env = {key: value for key, value in os.environ.items() if not key.startswith('LOG_')}
+            child_env.update(LOG_FORMAT='json', **env)
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker',
+                 '--submissions', str(args.submissions), '--threads', str(args.threads),
+                 '--students', str(args.students)],
+                stdout=log_file, stderr=subprocess.PIPE, text=True, env=child_env, cwd=ROOT
+            )
+        lines = [line for line in result.stderr.splitlines() if line.startswith('{')]
+        if result.returncode != 0 or not lines:
+            print(f"{name:<18} failed:\n{result.stderr[-2000:]}")
+            continue
+        stats = json.loads(lines[-1])
+        with open(log_path, 'rb') as f:
+            log_bytes = f.read()
+        os.unlink(log_path)
+        log_lines = log_bytes.count(b'\n')
+        print(f"{name:<18} {stats['seconds']:>8.2f}s {stats['submissions'] / stats['seconds']:>10.0f} "
+              f"{log_lines:>10} {len(log_bytes):>11} {stats['failures']:>9}")
+
+
+if __name__ == '__main__':
+    main()
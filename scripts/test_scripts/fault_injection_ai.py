@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Fault-injection test for AI provider circuit breakers and failover
+Drives concurrent question generation against two local stub providers
+(Ark primary, OpenAI secondary) while the primary is healthy, failing with
+HTTP 503, or hanging, and reports latency percentiles and breaker state
+
+Deadlines are shortened so the run takes seconds instead of minutes:
+    AI_FAILOVER_DEADLINE=2  AI_HEDGE_DELAY=0.5  AI_BREAKER_COOLDOWN=3
+
+The test fails (exit code 1) when p99 latency of a fault scenario exceeds
+the failover deadline plus a small margin, i.e. when a dead provider makes
+requests wait for the full request timeout.
+
+Usage: python scripts/test_scripts/fault_injection_ai.py [requests] [concurrency]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ai_server import MockAIServer  # noqa: E402
+
+PROVIDER_LATENCY = 0.2
+HANG_SECONDS = 60
+
+os.environ.setdefault('AI_FAILOVER_DEADLINE', '2')
+os.environ.setdefault('AI_HEDGE_DELAY', '0.5')
+os.environ.setdefault('AI_BREAKER_COOLDOWN', '3')
+
+TEACHING_TEXT = (
+    "Photosynthesis converts light energy into chemical energy. "
+    "Chlorophyll absorbs mostly blue and red light. "
+    "The Calvin cycle fixes carbon dioxide into sugars."
+)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(generate, total, concurrency):
+    """Call generate() total times from concurrency threads, return latencies in ms"""
+    def one(_):
+        start = time.perf_counter()
+        generate()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(total)))
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    ark = MockAIServer(delay=PROVIDER_LATENCY).start()
+    openai = MockAIServer(delay=PROVIDER_LATENCY).start()
+
+    # Point both providers at the stub servers before importing the app modules
+    os.environ['ARK_API_KEY'] = 'ark-fault-injection-key'
+    os.environ['ARK_BASE_URL'] = ark.base_url
+    os.environ['OPENAI_API_KEY'] = 'sk-fault-injection-key'
+    os.environ['OPENAI_BASE_URL'] = openai.base_url
+    from app import ai_client, ai_health
+    from app.ai_utils import generate_questions_with_failover, FAILOVER_DEADLINE
+
+    bound_ms = FAILOVER_DEADLINE * 1000 + 500
+
+    def healthy():
+        ark.fail, ark.delay = False, PROVIDER_LATENCY
+        os.environ['OPENAI_API_KEY'] = 'sk-fault-injection-key'
+
+    def ark_503():
+        ark.fail = True
+
+    def ark_hangs():
+        ark.delay = HANG_SECONDS
+
+    def ark_hangs_alone():
+        ark.delay = HANG_SECONDS
+        os.environ.pop('OPENAI_API_KEY', None)
+
+    scenarios = [
+        ('healthy', healthy, True, None),
+        ('ark HTTP 503', ark_503, True, bound_ms),
+        ('ark hangs', ark_hangs, True, bound_ms),
+        ('ark hangs, no breaker', ark_hangs, False, None),
+        ('ark hangs, only provider', ark_hangs_alone, True, bound_ms),
+    ]
+
+    print("=" * 92)
+    print(f"Fault injection: {total} requests, {concurrency} concurrent, stub latency {PROVIDER_LATENCY * 1000:.0f}ms, "
+          f"failover deadline {FAILOVER_DEADLINE:.1f}s")
+    print("=" * 92)
+    print(f"{'scenario':<26} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}   ark breaker / calls / short-circuits / hedges")
+
+    failed = False
+    try:
+        for name, inject, breaker_enabled, limit_ms in scenarios:
+            healthy()
+            inject()
+            ai_health.BREAKER_ENABLED = breaker_enabled
+            ai_health.reset_breakers()
+
+            latencies = run_load(lambda: generate_questions_with_failover(TEACHING_TEXT), total, concurrency)
+            ark_state = ai_health.breaker_metrics().get('ark', {})
+            p99 = percentile(latencies, 99)
+            print(f"{name:<26} {percentile(latencies, 50):>6.0f}ms {percentile(latencies, 95):>6.0f}ms "
+                  f"{p99:>6.0f}ms {max(latencies):>6.0f}ms   {ark_state.get('state') if breaker_enabled else 'disabled'} / {ark_state.get('calls')} / "
+                  f"{ark_state.get('short_circuits')} / {ark_state.get('hedges')}")
+            if limit_ms and p99 > limit_ms:
+                print(f"   FAIL: p99 {p99:.0f}ms exceeds bound {limit_ms:.0f}ms")
+                failed = True
+
+        # Recovery: after the cooldown a probe call closes the breaker again
+        ai_health.BREAKER_ENABLED = True
+        healthy()
+        time.sleep(ai_health.get_breaker('ark').cooldown + 0.1)
+        run_load(lambda: generate_questions_with_failover(TEACHING_TEXT), concurrency, concurrency)
+        state = ai_health.get_breaker('ark').snapshot()['state']
+        print(f"{'recovery after cooldown':<26} ark breaker {state}")
+        if state != ai_health.CLOSED:
+            print("   FAIL: breaker did not close after the provider recovered")
+            failed = True
+
+        print("-" * 92)
+        print("Breaker metrics:")
+        for provider, snapshot in ai_health.breaker_metrics().items():
+            print(f"  {provider:<7} {snapshot}")
+    finally:
+        ai_client.close_all_providers()
+        ark.stop()
+        openai.stop()
+
+    print("=" * 92)
+    print("FAILED" if failed else "PASSED: p99 stayed bounded while a provider was down")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Local mock of an OpenAI-compatible chat completions endpoint
+Used by the AI client benchmarks so they run without network access or API keys
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "What is the main idea of this lecture?\n"
+    "How would you apply this concept in practice?\n"
+    "What are the limitations of this approach?"
+)
+
+
+def split_tokens(text):
+    """Split text into word-sized tokens (keeping whitespace), like a model stream"""
+    return re.findall(r'\S+\s*|\s+', text)
+
+
+class MockAIHandler(BaseHTTPRequestHandler):
+    """Answers POST /chat/completions with a canned completion"""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real providers
+    disable_nagle_algorithm = True  # Avoid 40ms delayed-ACK stalls on keep-alive
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        server = self.server
+
+        with server.stats_lock:
+            server.request_count += 1
+
+        if server.delay:
+            time.sleep(server.delay)
+
+        if server.fail:
+            self._send_json(503, {'error': {'message': 'mock provider unavailable'}})
+            return
+
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            request = {}
+        reply = server.reply(request) if callable(server.reply) else server.reply
+        if request.get('stream'):
+            self._send_stream(reply, server.token_delay)
+            return
+
+        # Non-streaming clients wait for the whole generation
+        if server.token_delay:
+            time.sleep(server.token_delay * len(split_tokens(reply)))
+
+        payload = {
+            'id': 'mock-completion',
+            'object': 'chat.completion',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop'
+            }]
+        }
+        self._send_json(200, payload)
+
+    def _send_stream(self, reply, token_delay):
+        """Send the reply as server-sent events, one token per chunk"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for token in split_tokens(reply):
+            if token_delay:
+                time.sleep(token_delay)
+            chunk = {'choices': [{'index': 0, 'delta': {'content': token}}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockAIServer(ThreadingHTTPServer):
+    """
+    Threaded mock server with adjustable latency and failure mode
+
+    reply: Completion text, or a function of the decoded request body returning it
+
+    delay: Fixed time before the first byte (queueing / prompt processing)
+    token_delay: Time per generated token; streaming clients see tokens as they
+        are produced, non-streaming clients wait for all of them
+    """
+
+    daemon_threads = True
+
+    def __init__(self, handler=MockAIHandler, reply=DEFAULT_REPLY, delay=0.0, token_delay=0.0):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.reply = reply
+        self.delay = delay
+        self.token_delay = token_delay
+        self.fail = False
+        self.request_count = 0
+        self.connection_count = 0
+        self.stats_lock = threading.Lock()
+        self._thread = None
+
+    def get_request(self):
+        conn = super().get_request()
+        with self.stats_lock:
+            self.connection_count += 1
+        return conn
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    server = MockAIServer().start()
+    print(f"Mock AI server listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Query-count regression harness
+
+Calls every registered route as every role (anonymous, student, instructor,
+admin) against a fixture dataset built at two sizes, and records for each
+call the SQL statements executed (SQLAlchemy before_cursor_execute event) and
+the rows fetched from the database (counted by the SQLite cursor).
+
+A call fails when
+    - it executes more statements than its budget in query_budgets.json, or
+    - its statement count grows with the dataset (an N+1 pattern) and the
+      budget does not already record the route as scaling, or
+    - it has no recorded budget (new route or role).
+
+Known scaling routes are recorded with "scales": true so they stay visible
+in the report without failing the run. Once they are fixed, re-record
+the budgets.
+
+POST routes run with a small payload and the database is restored after each
+one, so deletes and resets do not affect later calls. Routes that reach
+external services (AI providers, SMTP) are skipped.
+
+Usage:
+    python scripts/test_scripts/query_budget.py             # check against the budgets
+    python scripts/test_scripts/query_budget.py --record    # write current counts as budgets
+    python scripts/test_scripts/query_budget.py --report query_report.md [--only qa.]
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event  # noqa: E402
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_budgets.json')
+ROLES = ('anonymous', 'student', 'instructor', 'admin')
+SMALL_SCALE, LARGE_SCALE = 1, 3
+PASSWORD = 'budget-password'
+
+SKIPPED = {
+    'static': 'static files',
+    'assets': 'static files (fingerprinted bundles)',
+    'activities.generate_questions_route': 'calls the AI provider',
+    'activities.generate_activity': 'calls the AI provider',
+    'auth.send_email_captcha': 'sends email',
+    'auth.send_reset_captcha': 'sends email',
+    'auth.send_change_password_captcha': 'sends email',
+    'auth.debug_email_config': 'connects to the SMTP server',
+}
+
+
+def _import_csv():
+    return (io.BytesIO(b'name,email,student_id\n'
+                       b'Imported One,imported-1@example.com,IMP001\n'
+                       b'Imported Two,imported-2@example.com,IMP002\n'), 'students.csv')
+
+
+# POST payloads (keyword arguments for the test client); POST routes without an entry are not called
+PAYLOADS = {
+    'activities.submit_response': lambda: {'json': {'answer': '4'}},
+    'activities.start_activity': dict,
+    'activities.stop_activity': dict,
+    'activities.reset_activity': dict,
+    'activities.delete_activity': dict,
+    'activities.regenerate_qr_code': dict,
+    'activities.toggle_quick_join': dict,
+    'activities.group_activity_answers': lambda: {'json': {'polish_labels': False}},
+    'activities.create_activity': lambda: {'data': {'title': 'Budget poll', 'type': 'poll', 'question': 'Pick one',
+                                                    'options': 'A\nB', 'duration_seconds': '60'}},
+    'qa.ask_question': lambda: {'data': {'title': 'Budget question', 'content': 'How many queries?'}},
+    'qa.submit_answer': lambda: {'data': {'content': 'A budget answer'}},
+    'qa.vote_answer': lambda: {'json': {'vote_type': 'upvote'}},
+    'qa.mark_best_answer': dict,
+    'qa.delete_question': dict,
+    'qa.delete_answer': dict,
+    'courses.create_course': lambda: {'data': {'name': 'Budget Course', 'semester': '2024 Fall'}},
+    'courses.edit_course': lambda: {'data': {'name': 'Renamed Course', 'semester': '2024 Fall',
+                                             'description': 'Edited'}},
+    'courses.enroll_course': dict,
+    'courses.delete_course': dict,
+    'courses.import_students': lambda: {'data': {'csv_file': _import_csv()}, 'content_type': 'multipart/form-data'},
+    'auth.login': lambda: {'data': {'email': 'budget-student-0@example.com', 'password': PASSWORD}},
+    'auth.test_captcha_route': lambda: {'json': {'email': 'budget-student-0@example.com'}},
+    'jobs.cancel_job': dict,
+    'admin.clear_extract_cache': dict,
+    'admin.clear_profiles': dict,
+}
+
+
+class CountingCursor(sqlite3.Cursor):
+    """sqlite3 cursor that counts the rows handed back to SQLAlchemy"""
+
+    rows = 0
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            CountingCursor.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        CountingCursor.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        CountingCursor.rows += len(rows)
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=None):
+        return super().cursor(factory or CountingCursor)
+
+
+class QueryCounter:
+    """Statements executed and rows fetched since the last reset"""
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.sql = []
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        with self._lock:
+            self.statements += 1
+            self.sql.append(' '.join(statement.split())[:160])
+
+    def reset(self):
+        with self._lock:
+            self.statements = 0
+            self.sql = []
+        CountingCursor.rows = 0
+
+    def snapshot(self):
+        return {'statements': self.statements, 'rows': CountingCursor.rows}
+
+
+def build_dataset(app, scale):
+    """
+    Fixture dataset; the entities used in URLs are created first so their ids
+    are identical at every scale
+
+    Scale s: 8s students in the main course, 3s activities with a response
+    from every student, 3s questions with 2s answers each and votes, and 2s
+    further courses of the instructor.
+    """
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import User, Course, Enrollment, Activity, Response, Question, Answer, AnswerVote
+
+    with app.app_context():
+        password = generate_password_hash(PASSWORD, method='pbkdf2:sha256:1')
+        instructor = User(email='budget-instructor@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        other_instructor = User(email='budget-instructor-2@example.com', name='Other Instructor',
+                                role='instructor', password_hash=password)
+        students = [User(email=f'budget-student-{i}@example.com', name=f'Student {i}', role='student',
+                         student_id=f'BUD{i:05d}', password_hash=password) for i in range(8 * scale)]
+        db.session.add_all([instructor, other_instructor] + students)
+        db.session.flush()
+
+        course = Course(name='Main Course', semester='2024 Fall', instructor_id=instructor.id)
+        other_course = Course(name='Other Course', semester='2024 Fall', instructor_id=other_instructor.id)
+        db.session.add_all([course, other_course])
+        db.session.flush()
+
+        activities = []
+        for i in range(3 * scale):
+            activity = Activity(title=f'Quiz {i}', question='2 + 2 = ?', type='quiz', quiz_type='fill_blank',
+                                correct_answer='4', course_id=course.id, instructor_id=instructor.id,
+                                is_active=(i == 0), duration_seconds=3600, allow_quick_join=True)
+            activity.generate_join_token()
+            activities.append(activity)
+        db.session.add_all(activities)
+        db.session.flush()
+
+        questions = [Question(title=f'Question {i}', content='Why?', course_id=course.id,
+                              author_id=students[i % len(students)].id) for i in range(3 * scale)]
+        db.session.add_all(questions)
+        db.session.flush()
+        answers = []
+        for question in questions:
+            for j in range(2 * scale):
+                author = instructor if j == 0 else students[(j + 1) % len(students)]
+                answers.append(Answer(content=f'Answer {j}', question_id=question.id, author_id=author.id,
+                                      is_instructor_answer=(author is instructor)))
+        db.session.add_all(answers)
+        db.session.flush()
+
+        ids = {
+            'course_id': course.id,
+            'other_course_id': other_course.id,
+            'activity_id': activities[0].id,
+            'token': activities[0].join_token,
+            'question_id': questions[0].id,
+            'answer_id': answers[0].id,
+            'student_email': students[0].email,
+            'users': {'student': students[0].id, 'instructor': instructor.id}
+        }
+
+        db.session.add_all(Enrollment(student_id=student.id, course_id=course.id) for student in students)
+        db.session.add_all(Response(student_id=student.id, activity_id=activity.id, answer='4', is_correct=True,
+                                    score=1, points_earned=1)
+                           for activity in activities for student in students)
+        db.session.add_all(AnswerVote(answer_id=answer.id, user_id=student.id, vote_type='upvote')
+                           for answer in answers for student in students[:scale + 1])
+        for i in range(2 * scale):
+            extra = Course(name=f'Extra Course {i}', semester='2023 Spring', instructor_id=instructor.id)
+            db.session.add(extra)
+            db.session.flush()
+            db.session.add_all(Enrollment(student_id=student.id, course_id=extra.id) for student in students[:4])
+        db.session.commit()
+
+        ids['users']['admin'] = User.query.filter_by(role='admin').first().id
+        return ids
+
+
+def route_cases(app):
+    """(endpoint, method, rule) for every route, plus the skipped endpoints with a reason"""
+    cases, skipped = [], {}
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: (r.rule, r.endpoint)):
+        if rule.endpoint in SKIPPED:
+            skipped[rule.endpoint] = SKIPPED[rule.endpoint]
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if method == 'POST' and rule.endpoint not in PAYLOADS:
+                if 'GET' not in rule.methods:
+                    skipped[rule.endpoint] = 'no POST payload defined'
+                continue
+            cases.append((rule.endpoint, method, rule))
+    return cases, skipped
+
+
+def build_url(app, rule, ids):
+    values = {
+        'course_id': ids['other_course_id'] if rule.endpoint == 'courses.enroll_course' else ids['course_id'],
+        'activity_id': ids['activity_id'],
+        'question_id': ids['question_id'],
+        'answer_id': ids['answer_id'],
+        'token': ids['token'],
+        'fmt': 'svg',
+        'job_id': 'no-such-job',
+        'profile_id': '20240101-000000-1-1',
+    }
+    with app.test_request_context():
+        from flask import url_for
+        return url_for(rule.endpoint, **{name: values[name] for name in rule.arguments})
+
+
+class Database:
+    """SQLite file with a pristine copy per scale, restored after calls that write"""
+
+    def __init__(self, app, path):
+        self.app = app
+        self.path = path
+        self.empty = path + '.empty'
+        self._release()
+        shutil.copyfile(path, self.empty)
+
+    def _release(self):
+        from app import db
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    def load(self, scale):
+        self._release()
+        shutil.copyfile(self.empty, self.path)
+        ids = build_dataset(self.app, scale)
+        self._release()
+        self.pristine = f'{self.path}.scale{scale}'
+        shutil.copyfile(self.path, self.pristine)
+        return ids
+
+    def restore(self):
+        self._release()
+        shutil.copyfile(self.pristine, self.path)
+
+
+def run_scale(app, database, counter, cases, scale, show_sql=False):
+    from app.join_tokens import join_token_resolver, enrollment_batcher
+
+    ids = database.load(scale)
+    results = {}
+    for endpoint, method, rule in cases:
+        url = build_url(app, rule, ids)
+        for role in ROLES:
+            client = app.test_client()
+            if role != 'anonymous':
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(ids['users'][role])
+                    session['_fresh'] = True
+            join_token_resolver.clear()
+            enrollment_batcher.forget_course(ids['course_id'])
+
+            counter.reset()
+            if method == 'POST':
+                response = client.post(url, **PAYLOADS[endpoint]())
+            else:
+                response = client.get(url)
+            counts = counter.snapshot()
+            counts['status'] = response.status_code
+            if show_sql:
+                counts['sql'] = list(counter.sql)
+            results[f'{endpoint} {method} {role}'] = counts
+            if method == 'POST':
+                database.restore()
+    return results
+
+
+def evaluate(small, large, budgets):
+    """Merge both scales and compare with the budgets; returns (rows, failures, notes)"""
+    rows, failures, notes = [], [], []
+    for key in small:
+        s, l = small[key], large[key]
+        scales = l['statements'] > s['statements']
+        row = {
+            'key': key, 'status': s['status'],
+            'statements': s['statements'], 'statements_large': l['statements'],
+            'rows': s['rows'], 'rows_large': l['rows'], 'scales': scales
+        }
+        budget = budgets.get(key)
+        row['budget'] = budget['statements'] if budget else None
+        rows.append(row)
+
+        if budget is None:
+            failures.append(f"{key}: no budget recorded ({s['statements']} statements)")
+            continue
+        if s['statements'] > budget['statements']:
+            failures.append(f"{key}: {s['statements']} statements, budget {budget['statements']}")
+        elif s['statements'] < budget['statements']:
+            notes.append(f"{key}: {s['statements']} statements, below budget {budget['statements']}")
+        if scales and not budget.get('scales'):
+            failures.append(f"{key}: statements grow with data size "
+                            f"({s['statements']} at scale {SMALL_SCALE}, {l['statements']} at scale {LARGE_SCALE})")
+        elif budget.get('scales') and not scales:
+            notes.append(f"{key}: no longer scales with data size")
+        if s['status'] >= 500 and budget.get('status', 200) < 500:
+            failures.append(f"{key}: HTTP {s['status']}")
+    return rows, failures, notes
+
+
+def write_report(path, rows, skipped):
+    """Markdown report ranking routes by statements at the large scale, then rows fetched"""
+    ranked = sorted(rows, key=lambda r: (r['statements_large'], r['rows_large']), reverse=True)
+    lines = [
+        '# Query cost by route',
+        '',
+        f'Statements and rows fetched per request with the fixture at scale {SMALL_SCALE} and {LARGE_SCALE}. '
+        'Routes marked "scales" issue more statements as the data grows (N+1).',
+        '',
+        '| # | Route | Method | Role | Status | Statements | Rows | Scales | Budget |',
+        '|---|-------|--------|------|--------|------------|------|--------|--------|',
+    ]
+    for rank, row in enumerate(ranked, 1):
+        endpoint, method, role = row['key'].split(' ')
+        lines.append(f"| {rank} | `{endpoint}` | {method} | {role} | {row['status']} | "
+                     f"{row['statements']} → {row['statements_large']} | {row['rows']} → {row['rows_large']} | "
+                     f"{'scales' if row['scales'] else ''} | {row['budget'] if row['budget'] is not None else '-'} |")
+    if skipped:
+        lines += ['', '## Skipped', ''] + [f'- `{endpoint}`: {reason}' for endpoint, reason in sorted(skipped.items())]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query-count regression harness')
+    parser.add_argument('--record', action='store_true', help='Write the current counts as budgets')
+    parser.add_argument('--report', help='Write a markdown report ranking routes by query cost')
+    parser.add_argument('--only', help='Only routes whose endpoint starts with this prefix')
+    parser.add_argument('--show-sql', help='Print the statements of one "endpoint METHOD role" call')
+    parser.add_argument('--budgets', default=BUDGET_FILE)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='query-budget-'), 'budget.db')
+    from app import create_app, db
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'factory': CountingConnection}},
+        'WTF_CSRF_ENABLED': False,
+        'MAIL_SUPPRESS_SEND': True,
+        'EXTRACT_CACHE_DIR': os.path.join(os.path.dirname(path), 'extract_cache'),
+        'PROFILER_DIR': os.path.join(os.path.dirname(path), 'profiles'),
+        'JOIN_ENROLL_BATCH_WINDOW': 0,  # enroll inline so the statements belong to the request
+        'LOG_LEVEL': 'CRITICAL',  # failing routes show up as HTTP 500 in the results
+    })
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    database = Database(app, path)
+
+    cases, skipped = route_cases(app)
+    if args.only:
+        cases = [case for case in cases if case[0].startswith(args.only)]
+    show_sql = bool(args.show_sql)
+
+    small = run_scale(app, database, counter, cases, SMALL_SCALE, show_sql)
+    large = run_scale(app, database, counter, cases, LARGE_SCALE, show_sql)
+
+    if args.show_sql:
+        for label, results in (('scale %d' % SMALL_SCALE, small), ('scale %d' % LARGE_SCALE, large)):
+            print(f"--- {args.show_sql} ({label}): {results[args.show_sql]['statements']} statements")
+            print('\n'.join(results[args.show_sql]['sql']))
+        return
+
+    budgets = {}
+    if os.path.exists(args.budgets):
+        with open(args.budgets) as f:
+            budgets = json.load(f)
+
+    if args.record:
+        for key in small:
+            entry = {'statements': small[key]['statements']}
+            if large[key]['statements'] > small[key]['statements']:
+                entry['scales'] = True
+            if small[key]['status'] >= 500:
+                entry['status'] = small[key]['status']
+            budgets[key] = entry
+        with open(args.budgets, 'w') as f:
+            json.dump(dict(sorted(budgets.items())), f, indent=2)
+            f.write('\n')
+        print(f"Recorded budgets for {len(small)} route/role combinations in {args.budgets}")
+
+    rows, failures, notes = evaluate(small, large, budgets)
+    if args.report:
+        write_report(args.report, rows, skipped)
+        print(f"Report written to {args.report}")
+
+    print(f"{'route':<58} {'statements':>12} {'rows':>12}")
+    for row in sorted(rows, key=lambda r: r['statements_large'], reverse=True)[:15]:
+        print(f"{row['key']:<58} {row['statements']:>5} → {row['statements_large']:<4} "
+              f"{row['rows']:>5} → {row['rows_large']:<5} {'scales' if row['scales'] else ''}")
+    print(f"\n{len(rows)} calls, {len(skipped)} endpoints skipped, "
+          f"{sum(row['scales'] for row in rows)} calls scale with data size")
+    for note in notes:
+        print(f"  note: {note}")
+    for failure in failures:
+        print(f"  FAIL: {failure}")
+    print("FAILED" if failures else "PASSED")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Concurrent answer votes: exact tallies under parallel requests
+
+Logs --voters students into separate test clients and, released together
+by a barrier, sends their votes for one answer through POST
+/answer/<id>/vote from one thread each:
+
+    round 1   everyone upvotes                       -> up N, down 0
+    round 2   half switch to downvote, a quarter     -> up N/4, down N/2
+              cancel (upvote again), the rest idle
+    check     reconcile_tallies() finds no drift, then fixes a tally that
+              was overwritten by hand
+
+Exits with status 1 when a count is off. Runs against a temporary SQLite
+database unless --database-url is given (use a scratch database: the test
+adds users, a course and an answer and removes them afterwards).
+
+Usage: python scripts/test_scripts/test_vote_concurrency.py [--voters 200] [--database-url mysql+pymysql://...]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+
+def make_app(database_url):
+    from app import create_app
+    if database_url is None:
+        database = os.path.join(tempfile.mkdtemp(prefix='vote-test-'), 'votes.db')
+        database_url = f'sqlite:///{database}'
+    overrides = {'SQLALCHEMY_DATABASE_URI': database_url, 'LOG_LEVEL': 'WARNING', 'VOTE_RECONCILE_SECONDS': 0,
+                 'LOG_LEVELS': 'app.metrics=ERROR'}  # every request of a burst is a "slow request"
+    if database_url.startswith('sqlite'):
+        overrides['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 60}}
+    else:
+        overrides['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 20, 'max_overflow': 200, 'pool_pre_ping': True}
+    return create_app(overrides)
+
+
+def seed(app, voters):
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import Answer, Course, Enrollment, Question, User
+
+    with app.app_context():
+        password = generate_password_hash('vote-test', method='pbkdf2:sha256:1')
+        instructor = User(email='vote-test-instructor@example.com', name='Instructor', role='instructor',
+                          password_hash=password)
+        db.session.add(instructor)
+        db.session.flush()
+        course = Course(name='Vote Test', semester='2024 Fall', instructor_id=instructor.id)
+        db.session.add(course)
+        db.session.flush()
+        question = Question(title='Vote test', content='Vote test', course_id=course.id, author_id=instructor.id)
+        db.session.add(question)
+        db.session.flush()
+        answer = Answer(content='Vote test answer', question_id=question.id, author_id=instructor.id)
+        students = [User(email=f'vote-test-{i}@example.com', name=f'Voter {i}', role='student',
+                         student_id=f'VOTE{i:05d}', password_hash=password) for i in range(voters)]
+        db.session.add(answer)
+        db.session.add_all(students)
+        db.session.flush()
+        db.session.add_all(Enrollment(student_id=student.id, course_id=course.id) for student in students)
+        db.session.commit()
+        return {'course_id': course.id, 'question_id': question.id, 'answer_id': answer.id,
+                'user_ids': [instructor.id] + [student.id for student in students]}, [s.id for s in students]
+
+
+def cleanup(app, ids):
+    from app import db
+    from app.models import Answer, AnswerVote, Course, Enrollment, Question, User
+
+    with app.app_context():
+        AnswerVote.query.filter_by(answer_id=ids['answer_id']).delete()
+        Answer.query.filter_by(id=ids['answer_id']).delete()
+        Question.query.filter_by(id=ids['question_id']).delete()
+        Enrollment.query.filter_by(course_id=ids['course_id']).delete()
+        Course.query.filter_by(id=ids['course_id']).delete()
+        User.query.filter(User.id.in_(ids['user_ids'])).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def vote_round(clients, answer_id, plan):
+    """Send plan[i] (a vote type or None) from clients[i], all threads released at once"""
+    active = [(client, vote_type) for client, vote_type in zip(clients, plan) if vote_type]
+    barrier = threading.Barrier(len(active))
+    failures = []
+
+    def worker(client, vote_type):
+        barrier.wait()
+        response = client.post(f'/answer/{answer_id}/vote', json={'vote_type': vote_type})
+        data = response.get_json(silent=True) or {}
+        if response.status_code != 200 or not data.get('success'):
+            failures.append((response.status_code, data.get('message')))
+
+    threads = [threading.Thread(target=worker, args=item) for item in active]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, failures
+
+
+def tallies(app, answer_id):
+    from app import db
+    from app.models import Answer, AnswerVote
+
+    with app.app_context():
+        answer = db.session.get(Answer, answer_id)
+        votes = {vote_type: AnswerVote.query.filter_by(answer_id=answer_id, vote_type=vote_type).count()
+                 for vote_type in ('upvote', 'downvote')}
+        return (answer.upvotes, answer.downvotes, answer.score), (votes['upvote'], votes['downvote'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--voters', type=int, default=200)
+    parser.add_argument('--database-url', help='Scratch database (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    from app import db
+    from app.answer_votes import reconcile_tallies
+    from app.models import Answer
+
+    app = make_app(args.database_url)
+    ids, student_ids = seed(app, args.voters)
+    answer_id = ids['answer_id']
+    clients = []
+    for student_id in student_ids:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(student_id)
+            session['_fresh'] = True
+        clients.append(client)
+
+    n = args.voters
+    half, quarter = n // 2, n // 4
+    rounds = [
+        ('all upvote', ['upvote'] * n, (n, 0)),
+        ('switch/cancel', ['downvote'] * half + ['upvote'] * quarter + [None] * (n - half - quarter),
+         (n - half - quarter, half)),
+    ]
+
+    ok = True
+    try:
+        for name, plan, (up, down) in rounds:
+            seconds, failures = vote_round(clients, answer_id, plan)
+            stored, counted = tallies(app, answer_id)
+            expected = (up, down, up - down)
+            passed = not failures and stored == expected and counted == (up, down)
+            ok &= passed
+            print(f"{name:14s} {sum(1 for p in plan if p)} votes in {seconds:.2f}s  "
+                  f"tallies {stored}  vote rows {counted}  expected {expected}  "
+                  f"{'OK' if passed else 'FAIL'}")
+            for failure in failures[:5]:
+                print(f"    failed request: {failure}")
+
+        with app.app_context():
+            drift = reconcile_tallies()
+            db.session.execute(Answer.__table__.update().where(Answer.__table__.c.id == answer_id)
+                               .values(upvotes=0, downvotes=0, score=999))
+            db.session.commit()
+            fixed = reconcile_tallies()
+        stored, _ = tallies(app, answer_id)
+        passed = drift == 0 and fixed == 1 and stored == rounds[-1][2] + (rounds[-1][2][0] - rounds[-1][2][1],)
+        ok &= passed
+        print(f"{'reconcile':14s} drift before {drift}, fixed after manual overwrite {fixed}, "
+              f"tallies {stored}  {'OK' if passed else 'FAIL'}")
+    finally:
+        cleanup(app, ids)
+
+    print('PASSED' if ok else 'FAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+// 优化的倒计时功能 - 本地计时 + 定期服务器检查
+function initializeCountdown() {
+    const activityData = document.getElementById('activity-data');
+    const startTimeStr = activityData ? activityData.dataset.startedAt : '';
+    const statusUrl = activityData ? activityData.dataset.statusUrl : null;
+    const durationSeconds = (activityData && activityData.dataset.durationSeconds) ? parseInt(activityData.dataset.durationSeconds, 10) : ((activityData && activityData.dataset.durationMinutes) ? (parseInt(activityData.dataset.durationMinutes, 10) * 60) : 0);
+
+    const remainingTimeElement = document.getElementById('remaining-time');
+    const timerElement = document.getElementById('activity-timer');
+
+    if (!startTimeStr || !durationSeconds || durationSeconds <= 0) {
+        if (remainingTimeElement && timerElement) {
+            remainingTimeElement.textContent = 'Activity has not started';
+            timerElement.className = 'alert alert-secondary';
+        }
+        return;
+    }
+
+    // parse ISO-like time string
+    const parts = startTimeStr.match(/(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})/);
+    if (!parts) {
+        console.error('Invalid time format');
+        return;
+    }
+    const startTime = new Date(parseInt(parts[1]), parseInt(parts[2]) - 1, parseInt(parts[3]), parseInt(parts[4]), parseInt(parts[5]), parseInt(parts[6]));
+    const endTime = new Date(startTime.getTime() + durationSeconds * 1000);
+
+    let countdownInterval = null;
+    let isActivityActive = true;
+    try { window.activityIsActive = isActivityActive; } catch (e) { }
+
+    function updateLocalCountdown() {
+        if (!remainingTimeElement || !timerElement) return false;
+        if (!isActivityActive) {
+            remainingTimeElement.textContent = 'Activity has ended';
+            timerElement.className = 'alert alert-warning';
+            return false;
+        }
+        const now = new Date();
+        const remainingMs = endTime.getTime() - now.getTime();
+        if (remainingMs <= 0) {
+            remainingTimeElement.textContent = 'Activity has ended';
+            timerElement.className = 'alert alert-warning';
+            isActivityActive = false;
+            try { window.activityIsActive = false; } catch (e) { }
+            console.log('[Countdown] Local countdown ended, waiting for server update via Socket.IO');
+            return false;
+        }
+        const minutes = Math.floor(remainingMs / (1000 * 60));
+        const seconds = Math.floor((remainingMs % (1000 * 60)) / 1000);
+        remainingTimeElement.textContent = `Remaining Time: ${minutes}:${seconds.toString().padStart(2, '0')}`;
+        if (remainingMs < 60000) timerElement.className = 'alert alert-danger';
+        else if (remainingMs < 180000) timerElement.className = 'alert alert-warning';
+        else timerElement.className = 'alert alert-info';
+        return true;
+    }
+
+    function checkServerStatus() {
+        if (!statusUrl) return;
+        fetch(statusUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.is_active) {
+                    isActivityActive = false;
+                    try { window.activityIsActive = false; } catch (e) { }
+                    if (countdownInterval) clearInterval(countdownInterval);
+                    if (remainingTimeElement && timerElement) {
+                        remainingTimeElement.textContent = 'Activity has ended';
+                        timerElement.className = 'alert alert-warning';
+                    }
+                    console.log('[Status Check] Activity ended on server, waiting for Socket.IO update');
+                }
+            })
+            .catch(error => { console.error('检查活动状态失败:', error); });
+    }
+
+    if (updateLocalCountdown()) {
+        countdownInterval = setInterval(() => { const shouldContinue = updateLocalCountdown(); if (!shouldContinue && countdownInterval) clearInterval(countdownInterval); }, 1000);
+        setInterval(checkServerStatus, 30000);
+        checkServerStatus();
+    }
+}
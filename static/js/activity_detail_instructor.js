@@ -0,0 +1,262 @@
+// Initialize Socket.IO connection (with safety check)
+const socket = getActivitySocket();
+const activityData = document.getElementById('activity-data');
+const ACTIVITY_ID = activityData ? parseInt(activityData.dataset.activityId, 10) : null;
+if (socket) {
+    try { socket.emit('join_activity', { activity_id: ACTIVITY_ID }); } catch (e) { }
+
+    // Listen for activity updates
+    socket.on('activity_update', function(data) {
+        console.log('[Socket] Activity update received:', data);
+        if (data && data.activity_id === ACTIVITY_ID) {
+            const statusElement = document.getElementById('activity-status');
+            const remainingTimeElement = document.getElementById('remaining-time');
+            const timerElement = document.getElementById('activity-timer');
+
+            if (data.data && data.data.is_active) {
+                if (statusElement) statusElement.innerHTML = '<span class="text-success">Active</span>';
+            } else {
+                // Activity ended
+                if (statusElement) statusElement.innerHTML = '<span class="text-muted">Ended</span>';
+                // Signal global state
+                window.activityIsActive = false;
+
+                // Update countdown display
+                if (remainingTimeElement && timerElement) {
+                    remainingTimeElement.textContent = 'Activity has ended';
+                    timerElement.className = 'alert alert-warning';
+                }
+
+                // Update button state (teacher/admin view)
+                const startBtn = document.getElementById('start-activity');
+                const stopBtn = document.getElementById('stop-activity');
+
+                console.log('[Socket] Start button:', startBtn);
+                console.log('[Socket] Stop button:', stopBtn);
+
+                if (stopBtn) {
+                    stopBtn.style.display = 'none';
+                    console.log('[Socket] Hid stop button');
+                }
+
+                if (startBtn) {
+                    // Start button exists, update it
+                    startBtn.style.display = 'inline-block';
+                    startBtn.className = 'btn btn-success';
+                    startBtn.innerHTML = '<i class="bi bi-play-circle"></i> restart Activity';
+                    console.log('[Socket] Updated start button to green restart');
+                } else if (stopBtn) {
+                    // Start button doesn't exist, create it by replacing stop button
+                    console.log('[Socket] Start button missing, creating new one');
+                    const newStartBtn = document.createElement('button');
+                    newStartBtn.id = 'start-activity';
+                    newStartBtn.className = 'btn btn-success';
+                    newStartBtn.innerHTML = '<i class="bi bi-play-circle"></i> restart Activity';
+                    newStartBtn.onclick = function() { startActivity(); };
+
+                    // Replace stop button with start button
+                    if (stopBtn && stopBtn.parentNode) {
+                        stopBtn.parentNode.replaceChild(newStartBtn, stopBtn);
+                        console.log('[Socket] Replaced stop button with green restart button');
+                    }
+                }
+
+                // 禁用提交表单(学生视图)
+                const responseForm = document.getElementById('response-form');
+                const submitBtn = responseForm ? responseForm.querySelector('button[type="submit"]') : null;
+                const answerInput = document.getElementById('answer');
+                if (submitBtn) {
+                    submitBtn.disabled = true;
+                    submitBtn.innerHTML = '<i class="bi bi-ban"></i> Activity Ended';
+                    submitBtn.className = 'btn btn-secondary';
+                }
+                if (answerInput) {
+                    answerInput.disabled = true;
+                    answerInput.placeholder = 'Activity has ended, cannot submit';
+                }
+
+                // Display notification message
+                if (data.update_type === 'auto_ended') {
+                    const alertDiv = document.createElement('div');
+                    alertDiv.className = 'alert alert-info alert-dismissible fade show mt-3';
+                    alertDiv.innerHTML = `
+                        <strong>⏰ Activity Auto-Ended</strong>
+                        <p class="mb-0">Countdown finished, activity has been automatically stopped.</p>
+                        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+                    `;
+                    const container = document.querySelector('.container');
+                    if (container && container.firstChild) { container.insertBefore(alertDiv, container.firstChild); }
+                }
+            }
+        }
+    });
+
+    // Listen for new responses
+    socket.on('response_added', function(data) {
+        if (data && data.activity_id === ACTIVITY_ID) {
+            const rc = document.getElementById('response-count'); if (rc) rc.textContent = data.response_count;
+        }
+    });
+} else {
+    console.warn('Socket.IO not available');
+}
+
+// 简化版本的开始活动功能
+function startActivity() {
+    console.log('🚀 Start activity function called');
+    
+    const activityId = ACTIVITY_ID;
+    console.log('Activity ID:', activityId);
+    
+    fetch(`/activities/${activityId}/start`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    })
+    .then(response => {
+        console.log('✅ Response received:', response.status);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        console.log('📄 Data received:', data);
+        if (data.success) {
+            alert('Activity started successfully!');
+            window.location.reload();
+        } else {
+            alert('Failed to start activity: ' + (data.message || 'Unknown error'));
+        }
+    })
+    .catch(error => {
+        console.error('❌ Fetch error:', error);
+        alert('Network error: ' + error.message);
+    });
+}
+
+function stopActivity() {
+    console.log('Stop activity function called');
+    
+    fetch(activityData.dataset.stopUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then(response => {
+        console.log('Response received:', response);
+        return response.json();
+    })
+    .then(data => {
+        console.log('Data received:', data);
+        if (data.success) {
+            alert('Activity stopped successfully!');
+            location.reload();
+        } else {
+            alert('Failed to stop activity: ' + (data.message || 'Unknown error'));
+        }
+    })
+    .catch(error => {
+        console.error('Fetch error:', error);
+        alert('Network error: ' + error.message);
+    });
+}
+
+function resetActivity() {
+    console.log('Reset activity function called');
+
+    if (!confirm('Are you sure you want to reset the activity? This will clear all student responses.')) {
+        return;
+    }
+    
+    fetch(activityData.dataset.resetUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then(response => {
+        console.log('Response received:', response);
+        return response.json();
+    })
+    .then(data => {
+        console.log('Data received:', data);
+        if (data.success) {
+            alert('Activity reset successfully!');
+            location.reload();
+        } else {
+            alert('Failed to reset activity: ' + (data.message || 'Unknown error'));
+        }
+    })
+    .catch(error => {
+        console.error('Fetch error:', error);
+        alert('Network error: ' + error.message);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('🔧 DOM loaded, initializing activity buttons...');
+    
+    // 获取按钮元素
+    const startButton = document.getElementById('start-activity');
+    const stopButton = document.getElementById('stop-activity');
+    const resetButton = document.getElementById('reset-activity');
+    
+    // 绑定开始按钮
+    if (startButton) {
+        console.log('✅ Start button found, binding event');
+        startButton.onclick = function(e) {
+            e.preventDefault();
+            e.stopPropagation();
+            console.log('🎯 Start button clicked!');
+            startActivity();
+            return false;
+        };
+        
+        // 也添加addEventListener作为备用
+        startButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            e.stopPropagation();
+            console.log('🎯 Start button addEventListener triggered!');
+        });
+    } else {
+        console.log('❌ Start button not found in DOM');
+        // 调试：查看页面中的所有按钮
+        const allButtons = document.querySelectorAll('button');
+        console.log('🔍 Found buttons:', Array.from(allButtons).map(btn => btn.id || btn.className));
+    }
+    
+    // 绑定停止按钮
+    if (stopButton) {
+        console.log('✅ Stop button found, binding event');
+        stopButton.onclick = function(e) {
+            e.preventDefault();
+            e.stopPropagation();
+            console.log('🛑 Stop button clicked!');
+            stopActivity();
+            return false;
+        };
+    } else {
+        console.log('ℹ️ Stop button not found (normal if activity not active)');
+    }
+    
+    // 绑定重置按钮
+    if (resetButton) {
+        console.log('✅ Reset button found, binding event');
+        resetButton.onclick = function(e) {
+            e.preventDefault();
+            e.stopPropagation();
+            console.log('🔄 Reset button clicked!');
+            resetActivity();
+            return false;
+        };
+    } else {
+        console.log('❌ Reset button not found');
+    }
+    
+    // 初始化倒计时
+    initializeCountdown();
+});
@@ -0,0 +1,115 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const socket = getActivitySocket();
+    const activityData = document.getElementById('activity-data');
+    const ACTIVITY_ID = activityData ? parseInt(activityData.dataset.activityId, 10) : null;
+    const STATUS_URL = activityData ? activityData.dataset.statusUrl : null;
+    const SUBMIT_URL = activityData ? activityData.dataset.submitUrl : null;
+    if (socket) {
+        try { socket.emit('join_activity', { activity_id: ACTIVITY_ID }); } catch (e) { }
+
+        socket.on('activity_update', function(data) {
+            if (data && data.activity_id === ACTIVITY_ID) {
+                const statusElement = document.getElementById('activity-status');
+                const remainingTimeElement = document.getElementById('remaining-time');
+                const timerElement = document.getElementById('activity-timer');
+
+                if (data.data && data.data.is_active) {
+                    if (statusElement) statusElement.innerHTML = '<span class="text-success">Active</span>';
+                } else {
+                    if (statusElement) statusElement.innerHTML = '<span class="text-muted">Ended</span>';
+                    // 当活动结束时，立即更新倒计时显示
+                    if (remainingTimeElement && timerElement) {
+                        remainingTimeElement.textContent = 'Activity has ended';
+                        timerElement.className = 'alert alert-warning';
+                    }
+                    // sync global flag for other scripts
+                    window.activityIsActive = false;
+                }
+            }
+        });
+
+        socket.on('response_added', function(data) {
+            if (data && data.activity_id === ACTIVITY_ID) {
+                const rc = document.getElementById('response-count');
+                if (rc) rc.textContent = data.response_count;
+            }
+        });
+    } else {
+        console.warn('Socket.IO not available');
+    }
+
+    // 初始化倒计时 (学生端)
+    initializeCountdown();
+
+    // Attach form submit handler only if the form exists
+    const responseForm = document.getElementById('response-form');
+    if (responseForm) {
+        responseForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            const answerEl = document.getElementById('answer');
+            const answer = answerEl ? (answerEl.value || '').trim() : '';
+            if (!answer) {
+                alert('Please enter an answer');
+                return;
+            }
+
+            // Show submitting status
+            const submitBtn = this.querySelector('button[type="submit"]');
+            const originalBtnText = submitBtn ? submitBtn.innerHTML : '';
+            if (submitBtn) {
+                submitBtn.disabled = true;
+                submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Submitting...';
+            }
+
+            fetch(SUBMIT_URL, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({answer: answer})
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    const alertDiv = document.createElement('div');
+                    alertDiv.className = 'alert alert-success alert-dismissible fade show mt-3';
+                    alertDiv.innerHTML = `
+                        <strong><i class="bi bi-check-circle"></i> Submission Successful!</strong>
+                        <p class="mb-0">Your answer has been submitted successfully</p>
+                    `;
+                    const container = document.querySelector('.container');
+                    if (container && container.firstChild) container.insertBefore(alertDiv, container.firstChild);
+                    setTimeout(() => location.reload(), 1000);
+                } else {
+                    if (submitBtn) {
+                        submitBtn.disabled = false;
+                        submitBtn.innerHTML = originalBtnText;
+                    }
+                    alert('Submission failed: ' + (data.message || 'Unknown error'));
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                if (submitBtn) {
+                    submitBtn.disabled = false;
+                    submitBtn.innerHTML = originalBtnText;
+                }
+                alert('Submission failed, please try again');
+            });
+        });
+    }
+
+    // Fallback polling (every 10 seconds)
+    setInterval(function() {
+        if (!STATUS_URL) return;
+        fetch(STATUS_URL)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) { console.error(data.error); return; }
+            const statusElement = document.getElementById('activity-status');
+            if (statusElement) statusElement.innerHTML = data.is_active ? '<span class="text-success">Active</span>' : '<span class="text-muted">Ended</span>';
+            if (data.response_count !== undefined) {
+                const rc = document.getElementById('response-count'); if (rc) rc.textContent = data.response_count;
+            }
+        })
+        .catch(error => console.error('Error:', error));
+    }, 10000);
+});
@@ -0,0 +1,87 @@
+function toggleQuickJoin(activityId) {
+    fetch(`/activity/${activityId}/toggle-quick-join`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert(data.message);
+            location.reload();
+        } else {
+            alert('Operation failed: ' + data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Operation failed, please try again');
+    });
+}
+
+function regenerateQRCode(activityId) {
+    if (!confirm('Are you sure you want to regenerate the QR code? The old link will expire.')) {
+        return;
+    }
+    
+    fetch(`/activity/${activityId}/regenerate-qr`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert(data.message);
+            location.reload();
+        } else {
+            alert('Generation failed: ' + data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Operation failed, please try again');
+    });
+}
+
+function copyJoinLink() {
+    const linkInput = document.getElementById('join-link');
+    linkInput.select();
+    linkInput.setSelectionRange(0, 99999); // For mobile devices
+    
+    try {
+        document.execCommand('copy');
+        alert('Link copied to clipboard!');
+    } catch (err) {
+        // Fallback for browsers that don't support execCommand
+        navigator.clipboard.writeText(linkInput.value).then(() => {
+            alert('Link copied to clipboard!');
+        }).catch(err => {
+            alert('Copy failed, please copy manually');
+        });
+    }
+}
+
+// Attach event listeners for QR / quick-join elements (avoid inline handlers with Jinja)
+document.addEventListener('DOMContentLoaded', function () {
+    // Quick join toggle
+    const quickToggle = document.getElementById('quick-join-toggle');
+    if (quickToggle) {
+        const aid = quickToggle.dataset.activityId || (document.getElementById('activity-data') ? document.getElementById('activity-data').dataset.activityId : null);
+        if (aid) {
+            quickToggle.addEventListener('change', function () {
+                toggleQuickJoin(aid);
+            });
+        }
+    }
+
+    // Regenerate QR buttons
+    document.querySelectorAll('[data-action="regenerate-qr"]').forEach(btn => {
+        const aid = btn.dataset.activityId || (document.getElementById('activity-data') ? document.getElementById('activity-data').dataset.activityId : null);
+        if (aid) {
+            btn.addEventListener('click', function () { regenerateQRCode(aid); });
+        }
+    });
+});
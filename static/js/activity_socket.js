@@ -0,0 +1,13 @@
+// Helper to create or return a single shared Socket.IO connection
+function getActivitySocket() {
+    if (typeof window === 'undefined') return null;
+    if (window.activitySocket) return window.activitySocket;
+    if (typeof io === 'undefined') return null;
+    try {
+        window.activitySocket = io();
+        return window.activitySocket;
+    } catch (e) {
+        console.warn('Socket.IO init failed', e);
+        return null;
+    }
+}
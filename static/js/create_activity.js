@@ -0,0 +1,595 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const formEl = document.querySelector('form');
+    const typeSelect = document.getElementById('type');
+    const optionsField = document.getElementById('options-field');
+    const optionsHidden = document.getElementById('options-hidden');
+    const optionsList = document.getElementById('options-list');
+    const addOptionBtn = document.getElementById('add-option');
+    const quizFields = document.getElementById('quiz-fields');
+    const quizTypeSelect = document.getElementById('quiz-type');
+    const correctAnswerField = document.getElementById('correct-answer-field');
+    const correctAnswerSelect = document.getElementById('correct-answer-select');
+    const correctAnswerText = document.getElementById('correct-answer-text');
+    const correctAnswerHidden = document.getElementById('correct-answer-hidden');
+    const correctAnswerHint = document.getElementById('correct-answer-hint');
+    const durationHidden = document.getElementById('duration-hidden');
+    const durationHoursInput = document.getElementById('duration-hours');
+    const durationMinutesInput = document.getElementById('duration-minutes');
+    const durationSecondsInput = document.getElementById('duration-seconds');
+    const generateTextBtn = document.getElementById('generate-questions-text');
+    const generateFileBtn = document.getElementById('generate-questions-file');
+    const fileUploadBtn = document.getElementById('file-upload-btn');
+    const fileInput = document.getElementById('ai-file');
+    const fileStatus = document.getElementById('file-upload-status');
+
+    function createOptionRow(value = '') {
+        const row = document.createElement('div');
+        row.className = 'input-group option-row';
+
+        const label = document.createElement('span');
+        label.className = 'input-group-text option-label';
+        row.appendChild(label);
+
+        const input = document.createElement('input');
+        input.type = 'text';
+        input.className = 'form-control option-input';
+        input.placeholder = 'Enter option';
+        input.value = value;
+        row.appendChild(input);
+
+        const removeBtn = document.createElement('button');
+        removeBtn.type = 'button';
+        removeBtn.className = 'btn btn-outline-danger remove-option';
+        removeBtn.innerHTML = '<i class="bi bi-dash"></i>';
+        row.appendChild(removeBtn);
+
+        removeBtn.addEventListener('click', function() {
+            const rows = optionsList.querySelectorAll('.option-row');
+            if (rows.length <= 1) {
+                input.value = '';
+                return;
+            }
+            row.remove();
+            refreshOptionLabels();
+            syncCorrectAnswerOptions();
+        });
+
+        input.addEventListener('input', syncCorrectAnswerOptions);
+        return row;
+    }
+
+    function refreshOptionLabels() {
+        const rows = optionsList.querySelectorAll('.option-row');
+        rows.forEach((row, index) => {
+            const label = row.querySelector('.option-label');
+            label.textContent = String.fromCharCode(65 + index);
+        });
+    }
+
+    function ensureOptionRows(min = 1) {
+        let rows = optionsList.querySelectorAll('.option-row').length;
+        while (rows < min) {
+            optionsList.appendChild(createOptionRow());
+            rows++;
+        }
+        refreshOptionLabels();
+        syncCorrectAnswerOptions();
+    }
+
+    function getCurrentOptions() {
+        const values = [];
+        optionsList.querySelectorAll('.option-input').forEach(input => {
+            const val = input.value.trim();
+            if (val) {
+                values.push(val);
+            }
+        });
+        return values;
+    }
+
+    function showOptionsField(show) {
+        optionsField.style.display = show ? 'block' : 'none';
+    }
+
+    function showCorrectAnswerSelect(show) {
+        correctAnswerField.style.display = show ? 'block' : 'none';
+        correctAnswerSelect.style.display = show ? 'block' : 'none';
+        correctAnswerText.style.display = 'none';
+        correctAnswerHint.textContent = show ? 'Select the correct answer from the options above.' : '';
+    }
+
+    function showCorrectAnswerText(show, placeholder = 'Enter correct answer') {
+        correctAnswerField.style.display = show ? 'block' : 'none';
+        correctAnswerSelect.style.display = 'none';
+        correctAnswerText.style.display = show ? 'block' : 'none';
+        correctAnswerText.placeholder = placeholder;
+        correctAnswerHint.textContent = show ? 'Type the exact correct answer.' : '';
+    }
+
+    function syncCorrectAnswerOptions() {
+        if (typeSelect.value !== 'quiz') {
+            return;
+        }
+        const quizType = quizTypeSelect.value;
+        if (quizType === 'multiple_choice') {
+            const options = getCurrentOptions();
+            correctAnswerSelect.innerHTML = '<option value="">Select correct answer</option>';
+            options.forEach(option => {
+                const optEl = document.createElement('option');
+                optEl.value = option;
+                optEl.textContent = option;
+                correctAnswerSelect.appendChild(optEl);
+            });
+            if (options.includes(correctAnswerHidden.value)) {
+                correctAnswerSelect.value = correctAnswerHidden.value;
+            } else {
+                correctAnswerSelect.value = '';
+                correctAnswerHidden.value = '';
+            }
+        } else if (quizType === 'true_false') {
+            correctAnswerSelect.innerHTML = '<option value="True">True</option><option value="False">False</option>';
+            if (['True', 'False'].includes(correctAnswerHidden.value)) {
+                correctAnswerSelect.value = correctAnswerHidden.value;
+            } else {
+                correctAnswerSelect.value = 'True';
+                correctAnswerHidden.value = 'True';
+            }
+        }
+    }
+
+    function clampInputValue(input, min, max) {
+        let value = parseInt(input.value, 10);
+        if (isNaN(value) || value < min) {
+            value = min;
+        }
+        if (typeof max === 'number' && value > max) {
+            value = max;
+        }
+        input.value = value;
+    }
+
+    function initializeDurationFields() {
+        if (!durationHidden) {
+            return;
+        }
+        let storedMinutes = parseInt(durationHidden.value, 10);
+        if (isNaN(storedMinutes) || storedMinutes < 1) {
+            storedMinutes = 5;
+        }
+        const totalSeconds = storedMinutes * 60;
+        if (durationHoursInput) {
+            durationHoursInput.value = Math.floor(totalSeconds / 3600);
+        }
+        if (durationMinutesInput) {
+            durationMinutesInput.value = Math.floor((totalSeconds % 3600) / 60);
+        }
+        if (durationSecondsInput) {
+            durationSecondsInput.value = totalSeconds % 60;
+        }
+    }
+
+    function handleTypeChange() {
+        const type = typeSelect.value;
+        if (type === 'poll') {
+            quizFields.style.display = 'none';
+            showOptionsField(true);
+            showCorrectAnswerSelect(false);
+            ensureOptionRows(1);
+        } else if (type === 'quiz') {
+            quizFields.style.display = 'block';
+            handleQuizTypeChange();
+        } else {
+    quizFields.style.display = 'none';
+            showOptionsField(false);
+            showCorrectAnswerSelect(false);
+        }
+    }
+
+    function handleQuizTypeChange() {
+        const quizType = quizTypeSelect.value;
+        if (quizType === 'multiple_choice') {
+            showOptionsField(true);
+            ensureOptionRows(1);
+            showCorrectAnswerSelect(true);
+            syncCorrectAnswerOptions();
+        } else if (quizType === 'true_false') {
+            showOptionsField(false);
+            showCorrectAnswerSelect(true);
+            syncCorrectAnswerOptions();
+        } else {
+            showOptionsField(false);
+            showCorrectAnswerText(true, 'Enter the correct answer');
+        }
+    }
+
+    if (addOptionBtn) {
+        addOptionBtn.addEventListener('click', function() {
+            optionsList.appendChild(createOptionRow());
+            refreshOptionLabels();
+            syncCorrectAnswerOptions();
+        });
+    }
+
+    if (correctAnswerSelect) {
+        correctAnswerSelect.addEventListener('change', function() {
+            correctAnswerHidden.value = this.value;
+        });
+    }
+
+    if (correctAnswerText) {
+        correctAnswerText.addEventListener('input', function() {
+            correctAnswerHidden.value = this.value.trim();
+        });
+    }
+
+    if (formEl) {
+        formEl.addEventListener('submit', function(event) {
+            
+            // Set duration value before validation
+            if (durationHidden && durationHoursInput && durationMinutesInput && durationSecondsInput) {
+                clampInputValue(durationHoursInput, 0, null);
+                clampInputValue(durationMinutesInput, 0, 59);
+                clampInputValue(durationSecondsInput, 0, 59);
+                const hours = parseInt(durationHoursInput.value, 10) || 0;
+                const minutesPart = parseInt(durationMinutesInput.value, 10) || 0;
+                const secondsPart = parseInt(durationSecondsInput.value, 10) || 0;
+                const totalSeconds = hours * 3600 + minutesPart * 60 + secondsPart;
+                
+                // Set the hidden field value (total seconds)
+                durationHidden.value = totalSeconds;
+                durationHidden.setAttribute('value', totalSeconds);
+                
+                // Validate duration
+                if (totalSeconds <= 0) {
+                    event.preventDefault();
+                    alert('Please set a duration greater than zero.');
+                    return;
+                }
+            }
+
+            const type = typeSelect.value;
+            const quizType = quizTypeSelect.value;
+            let options = [];
+
+            if (optionsField.style.display !== 'none') {
+                options = getCurrentOptions();
+                if (options.length < 2) {
+                    event.preventDefault();
+                    alert('Please enter at least two options.');
+                    return;
+                }
+                optionsHidden.value = options.join('\n');
+            } else {
+                optionsHidden.value = '';
+            }
+
+            if (type === 'quiz') {
+                if (quizType === 'multiple_choice') {
+                    if (!correctAnswerSelect.value) {
+                        event.preventDefault();
+                        alert('Please select the correct answer.');
+                        return;
+                    }
+                    correctAnswerHidden.value = correctAnswerSelect.value;
+                } else if (quizType === 'true_false') {
+                    correctAnswerHidden.value = correctAnswerSelect.value || 'True';
+                } else {
+                    const val = correctAnswerText.value.trim();
+                    if (!val) {
+                        event.preventDefault();
+                        alert('Please enter the correct answer.');
+                        return;
+                    }
+                    correctAnswerHidden.value = val;
+                }
+            } else {
+                correctAnswerHidden.value = '';
+            }
+        });
+    }
+
+    const initialOptions = optionsHidden.value
+        ? optionsHidden.value.split('\n').map(opt => opt.trim()).filter(opt => opt)
+        : [];
+    if (initialOptions.length) {
+        initialOptions.forEach(opt => optionsList.appendChild(createOptionRow(opt)));
+    } else {
+        ensureOptionRows(1);
+    }
+    refreshOptionLabels();
+    syncCorrectAnswerOptions();
+
+    if (typeSelect) {
+        handleTypeChange();
+        typeSelect.addEventListener('change', handleTypeChange);
+    }
+    if (quizTypeSelect) {
+        quizTypeSelect.addEventListener('change', handleQuizTypeChange);
+    }
+
+    if (durationHoursInput) {
+        durationHoursInput.addEventListener('input', function() {
+            clampInputValue(durationHoursInput, 0, null);
+        });
+    }
+    if (durationMinutesInput) {
+        durationMinutesInput.addEventListener('input', function() {
+            clampInputValue(durationMinutesInput, 0, 59);
+        });
+    }
+    if (durationSecondsInput) {
+        durationSecondsInput.addEventListener('input', function() {
+            clampInputValue(durationSecondsInput, 0, 59);
+        });
+    }
+
+    document.querySelectorAll('.duration-select-option').forEach(item => {
+        item.addEventListener('click', function() {
+            const target = this.getAttribute('data-target');
+            const value = parseInt(this.getAttribute('data-value'), 10) || 0;
+            
+            if (target === 'hours' && durationHoursInput) {
+                durationHoursInput.value = value;
+            } else if (target === 'minutes' && durationMinutesInput) {
+                durationMinutesInput.value = value;
+            } else if (target === 'seconds' && durationSecondsInput) {
+                durationSecondsInput.value = value;
+            }
+        });
+    });
+
+    initializeDurationFields();
+
+    if (generateTextBtn) {
+        generateTextBtn.addEventListener('click', function() {
+            const textArea = document.getElementById('ai-text');
+            const text = textArea ? textArea.value.trim() : '';
+    if (!text) {
+        alert('Please enter teaching text');
+        return;
+    }
+            generateQuestionsFromText(text, this);
+        });
+    }
+
+    if (generateFileBtn) {
+        generateFileBtn.addEventListener('click', function() {
+            const file = fileInput ? fileInput.files[0] : null;
+            if (!file) {
+                alert('Please select a file');
+                return;
+            }
+            const allowedTypes = ['.pdf', '.docx', '.pptx'];
+            const fileExtension = '.' + file.name.split('.').pop().toLowerCase();
+            if (!allowedTypes.includes(fileExtension)) {
+                alert('Please upload a PDF, Word document, or PowerPoint presentation');
+                return;
+            }
+            if (file.size > 10 * 1024 * 1024) {
+                alert('File size must be less than 10MB');
+                return;
+            }
+            generateQuestionsFromFile(file, this);
+        });
+    }
+
+    if (fileUploadBtn && fileInput && fileStatus) {
+        fileUploadBtn.addEventListener('click', function() {
+            fileInput.click();
+        });
+        fileInput.addEventListener('change', function() {
+            if (fileInput.files && fileInput.files.length > 0) {
+                const fileName = fileInput.files[0].name;
+                const displayName = fileName.length > 30 ? fileName.substring(0, 27) + '...' : fileName;
+                fileStatus.textContent = displayName;
+                fileStatus.classList.remove('text-muted');
+                fileStatus.classList.add('text-success');
+                fileUploadBtn.classList.remove('btn-outline-secondary');
+                fileUploadBtn.classList.add('btn-outline-success');
+                fileUploadBtn.innerHTML = '<i class="bi bi-file-earmark-check"></i> File Selected';
+            } else {
+                fileStatus.textContent = 'No file selected';
+                fileStatus.classList.remove('text-success');
+                fileStatus.classList.add('text-muted');
+                fileUploadBtn.classList.remove('btn-outline-success');
+                fileUploadBtn.classList.add('btn-outline-secondary');
+                fileUploadBtn.innerHTML = '<i class="bi bi-file-earmark-arrow-up"></i> Choose File';
+            }
+        });
+    }
+});
+
+document.addEventListener('click', function(e) {
+    if (e.target.classList.contains('use-question')) {
+        const question = e.target.getAttribute('data-question');
+        const questionTextarea = document.querySelector('textarea[name="question"]');
+        if (!questionTextarea) {
+            return;
+        }
+        const currentValue = questionTextarea.value.trim();
+        questionTextarea.value = currentValue ? currentValue + '\n\n' + question : question;
+        const questionCard = e.target.closest('.card');
+        if (questionCard) {
+            questionCard.style.opacity = '0.6';
+            questionCard.style.borderLeft = '4px solid #28a745';
+            e.target.disabled = true;
+            e.target.innerHTML = '<i class="bi bi-check-circle"></i> Added';
+            e.target.classList.remove('btn-outline-primary');
+            e.target.classList.add('btn-success');
+        }
+        questionTextarea.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        questionTextarea.focus();
+        questionTextarea.setSelectionRange(questionTextarea.value.length, questionTextarea.value.length);
+    }
+});
+
+// Wait for a background job: Socket.IO push with a polling fallback
+// onPartial receives streamed items (e.g. questions) in order, exactly once each
+function waitForJob(job, onProgress, onPartial) {
+    return new Promise((resolve, reject) => {
+        let finished = false;
+        let pollTimer = null;
+        let delivered = 0;
+        const socket = (typeof io !== 'undefined') ? (window.jobSocket = window.jobSocket || io()) : null;
+
+        function deliverPartial(index, item) {
+            if (index === delivered) {
+                delivered += 1;
+                if (onPartial) {
+                    onPartial(item);
+                }
+            }
+        }
+
+        function handlePartial(data) {
+            if (!finished && data && data.job_id === job.job_id) {
+                deliverPartial(data.index, data.item);
+            }
+        }
+
+        function handleUpdate(update) {
+            if (finished || !update || update.job_id !== job.job_id) {
+                return;
+            }
+            (update.partial || []).forEach((item, index) => deliverPartial(index, item));
+            if (onProgress) {
+                onProgress(update);
+            }
+            if (update.status === 'succeeded') {
+                cleanup();
+                resolve(update.result);
+            } else if (update.status === 'failed' || update.status === 'cancelled') {
+                cleanup();
+                reject(new Error(update.error || 'Task ' + update.status));
+            }
+        }
+
+        function poll() {
+            fetch(job.status_url)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        handleUpdate(data.job);
+                    } else {
+                        cleanup();
+                        reject(new Error(data.message));
+                    }
+                })
+                .catch(() => { /* keep polling */ });
+        }
+
+        function cleanup() {
+            finished = true;
+            clearInterval(pollTimer);
+            if (socket) {
+                socket.off('job_update', handleUpdate);
+                socket.off('job_partial', handlePartial);
+            }
+        }
+
+        if (socket) {
+            socket.on('job_update', handleUpdate);
+            socket.on('job_partial', handlePartial);
+        }
+        pollTimer = setInterval(poll, 2000);
+        poll();
+    });
+}
+
+function runQuestionJob(fetchOptions, button, idleLabel) {
+    let rendered = 0;
+    fetch(document.getElementById('ai-question-generator').dataset.generateUrl, fetchOptions)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.message);
+        }
+        clearGeneratedQuestions();
+        return waitForJob(data, update => {
+            if (update.status === 'running' && update.message) {
+                button.innerHTML = '<i class="bi bi-hourglass-split"></i> ' + update.message + '...';
+            }
+        }, item => {
+            // Streamed question: show it right away
+            appendQuestionCard(item.question, rendered === 0);
+            rendered += 1;
+        });
+    })
+    .then(result => {
+        if (rendered < result.questions.length) {
+            handleGeneratedQuestions({ success: true, questions: result.questions });
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Generation failed: ' + error.message);
+    })
+    .finally(() => {
+        button.disabled = false;
+        button.innerHTML = idleLabel;
+    });
+}
+
+function generateQuestionsFromText(text, button) {
+    button.disabled = true;
+    button.innerHTML = '<i class="bi bi-hourglass-split"></i> Generating...';
+    runQuestionJob({
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ text: text })
+    }, button, '<i class="bi bi-robot"></i> Generate Questions');
+}
+
+function generateQuestionsFromFile(file, button) {
+    button.disabled = true;
+    button.innerHTML = '<i class="bi bi-hourglass-split"></i> Processing file...';
+    const formData = new FormData();
+    formData.append('file', file);
+    runQuestionJob({
+        method: 'POST',
+        body: formData
+    }, button, '<i class="bi bi-robot"></i> Generate Questions from File');
+}
+
+function clearGeneratedQuestions() {
+    const questionsList = document.getElementById('questions-list');
+    if (questionsList) {
+        questionsList.innerHTML = '';
+    }
+}
+
+function appendQuestionCard(question, scrollIntoView) {
+    const questionsList = document.getElementById('questions-list');
+    if (!questionsList) {
+        return;
+    }
+    const questionDiv = document.createElement('div');
+    questionDiv.className = 'card mb-2';
+    questionDiv.innerHTML = `
+        <div class="card-body">
+            <p class="card-text">${question}</p>
+            <button class="btn btn-sm btn-outline-primary use-question" data-question="${question}">
+                Use this question
+            </button>
+        </div>
+    `;
+    questionsList.appendChild(questionDiv);
+    document.getElementById('generated-questions').style.display = 'block';
+    if (scrollIntoView) {
+        document.getElementById('generated-questions').scrollIntoView({
+            behavior: 'smooth',
+            block: 'start'
+        });
+    }
+}
+
+function handleGeneratedQuestions(data) {
+    if (data.success) {
+        clearGeneratedQuestions();
+        data.questions.forEach((question, index) => appendQuestionCard(question, index === 0));
+    } else {
+        alert('Generation failed: ' + data.message);
+    }
+}
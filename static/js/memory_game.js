@@ -0,0 +1,38 @@
+// Memory game functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const startBtn = document.getElementById('start-memory-game');
+    if (startBtn) {
+        startBtn.addEventListener('click', function() {
+            const items = ['Apple', 'Banana', 'Cherry', 'Date', 'Elderberry'];
+            const sequence = [];
+            
+            // Generate random sequence of 3-5 items
+            const length = Math.floor(Math.random() * 3) + 3;
+            for (let i = 0; i < length; i++) {
+                const randomItem = items[Math.floor(Math.random() * items.length)];
+                if (!sequence.includes(randomItem)) {
+                    sequence.push(randomItem);
+                }
+            }
+            
+            // Display sequence
+            const display = document.getElementById('sequence-display');
+            display.innerHTML = '<h6>Remember this sequence:</h6><div class="d-flex gap-2 mb-3">';
+            sequence.forEach((item, index) => {
+                display.innerHTML += `<span class="badge bg-primary" style="font-size: 1.2em;">${item}</span>`;
+            });
+            display.innerHTML += '</div>';
+            
+            document.getElementById('memory-game-display').style.display = 'block';
+            
+            // Show sequence for 3 seconds, then hide
+            setTimeout(() => {
+                display.innerHTML = '<h6>Now enter the sequence in order:</h6>';
+                document.getElementById('input-section').style.display = 'block';
+                
+                // Store the correct sequence for validation
+                document.getElementById('answer').setAttribute('data-correct-sequence', sequence.join(','));
+            }, 3000);
+        });
+    }
+});